@@ -1,8 +1,12 @@
 import pytest
 import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 import shutil
 
+from src import metrics, tracing
+from src.cache_tool import hooks
 from src.cache_tool.models import DataLocation
 
 
@@ -34,3 +38,41 @@ def sample_loc():
         symbol="BTC/USDT",
         period="15m",
     )
+
+
+@pytest.fixture
+def data_cwd(temp_dir, monkeypatch):
+    """在临时目录中运行 (src.tools.shared 导入时会读写 ./data 下的配置和目录)"""
+    (temp_dir / "data").mkdir()
+    monkeypatch.chdir(temp_dir)
+    return temp_dir
+
+
+@pytest.fixture
+def cache_hooks():
+    """为 cache_tool 注入指标和追踪 (服务中由 src.tools.shared 启动时注入)"""
+    hooks.install(metrics, tracing)
+    yield
+    hooks.install()
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """本地 HTTP/1.1 服务 (keep-alive)，所有 GET 返回 ok"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
@@ -0,0 +1,203 @@
+import itertools
+
+import ccxt
+import pytest
+
+from src.tools import binance_adapter, ccxt_utils_extended
+from src.tools.exchange_pool import ExchangePool
+from src.tools.order_index import OrderIndex
+from src.types_extended import CancelOrdersBatchRequest, CreateOrdersBatchRequest
+
+
+class BatchExchange:
+    """模拟支持 createOrders / cancelOrders 的合约交易所"""
+
+    def __init__(self, native=True):
+        self.has = {"createOrders": native, "cancelOrders": native}
+        self.ids = itertools.count(1)
+        self.batch_sizes = []
+        self.single_calls = 0
+
+    def create_orders(self, orders, params={}):
+        self.batch_sizes.append(len(orders))
+        return [{"id": str(next(self.ids)), "symbol": o["symbol"]} for o in orders]
+
+    def create_order(self, symbol, type, side, amount, price=None, params={}):
+        self.single_calls += 1
+        if amount <= 0:
+            raise ccxt.InvalidOrder("amount must be positive")
+        return {"id": str(next(self.ids)), "symbol": symbol}
+
+    def cancel_orders(self, ids, symbol=None, params={}):
+        self.batch_sizes.append(len(ids))
+        # 批量撤单中未知订单返回原始错误
+        return [
+            {"id": i, "status": "canceled"}
+            if i != "unknown"
+            else {"id": None, "info": {"code": -2011}}
+            for i in ids
+        ]
+
+    def cancel_order(self, id, symbol=None, params={}):
+        self.single_calls += 1
+        return {"id": id, "status": "canceled"}
+
+
+@pytest.fixture
+def exchange(monkeypatch, temp_dir):
+    instance = BatchExchange()
+    pool = ExchangePool("binance/future/sandbox", [instance] * 4)
+    monkeypatch.setitem(
+        ccxt_utils_extended.exchange_manager._pools,
+        ("binance", "future", "sandbox"),
+        pool,
+    )
+    monkeypatch.setattr(
+        binance_adapter, "order_index", OrderIndex(temp_dir / "order_index.jsonl")
+    )
+    return instance
+
+
+def create_request(orders):
+    return CreateOrdersBatchRequest(
+        exchange_name="binance", market="future", orders=orders
+    )
+
+
+def leg(amount=0.01, **params):
+    return {
+        "symbol": "BTC/USDT:USDT",
+        "type": "market",
+        "side": "buy",
+        "amount": amount,
+        "params": params,
+    }
+
+
+class TestBatchOrders:
+    def test_native_batches_are_chunked(self, exchange):
+        """Binance 每批最多 5 笔"""
+        result = ccxt_utils_extended.create_orders_batch_ccxt(
+            create_request([leg() for _ in range(12)])
+        )
+
+        assert sorted(exchange.batch_sizes) == [2, 5, 5]
+        assert exchange.single_calls == 0
+        assert [r["index"] for r in result["results"]] == list(range(12))
+        assert all(r["ok"] and r["native"] for r in result["results"])
+
+    def test_conditional_orders_submitted_individually(self, exchange):
+        """条件单逐笔提交，并记录到订单类型索引"""
+        result = ccxt_utils_extended.create_orders_batch_ccxt(
+            create_request([leg(), leg(stopLossPrice=100.0)])
+        )
+
+        assert result["results"][0]["native"] is True
+        assert result["results"][1]["native"] is False
+        stop_id = result["results"][1]["order"]["id"]
+        assert (
+            binance_adapter.order_index.lookup("binance", "future", "sandbox", stop_id)
+            == "stop"
+        )
+
+    def test_fallback_reports_per_leg_errors(self, exchange):
+        exchange.has["createOrders"] = False
+
+        result = ccxt_utils_extended.create_orders_batch_ccxt(
+            create_request([leg(), leg(amount=0)])
+        )
+
+        assert exchange.single_calls == 2
+        assert result["results"][0]["ok"] is True
+        assert result["results"][1]["ok"] is False
+        assert "InvalidOrder" in result["results"][1]["error"]
+
+    def test_cancel_batch_retries_failed_legs(self, exchange):
+        """批量撤单中失败的订单逐笔重试"""
+        request = CancelOrdersBatchRequest(
+            exchange_name="binance",
+            market="future",
+            orders=[
+                {"id": "1", "symbol": "BTC/USDT:USDT"},
+                {"id": "unknown", "symbol": "BTC/USDT:USDT"},
+            ],
+        )
+
+        result = ccxt_utils_extended.cancel_orders_batch_ccxt(request)
+
+        assert exchange.batch_sizes == [2]
+        assert exchange.single_calls == 1
+        assert [r["native"] for r in result["results"]] == [True, False]
+        assert all(r["ok"] for r in result["results"])
+
+    def test_short_create_result_marks_missing_legs(self, exchange, monkeypatch):
+        """批量下单返回条数不足: 缺少结果的订单记为失败，且不重复提交"""
+        create_orders = exchange.create_orders
+        monkeypatch.setattr(
+            exchange,
+            "create_orders",
+            lambda orders, params={}: create_orders(orders)[:3],
+        )
+
+        result = ccxt_utils_extended.create_orders_batch_ccxt(
+            create_request([leg() for _ in range(5)])
+        )
+
+        assert exchange.single_calls == 0
+        assert [r["index"] for r in result["results"]] == list(range(5))
+        assert [r["ok"] for r in result["results"]] == [True] * 3 + [False] * 2
+        assert "3/5" in result["results"][4]["error"]
+
+    def test_short_cancel_result_retries_missing_legs(self, exchange, monkeypatch):
+        cancel_orders = exchange.cancel_orders
+        monkeypatch.setattr(
+            exchange,
+            "cancel_orders",
+            lambda ids, symbol=None, params={}: cancel_orders(ids)[:1],
+        )
+        request = CancelOrdersBatchRequest(
+            exchange_name="binance",
+            market="future",
+            orders=[{"id": str(i), "symbol": "BTC/USDT:USDT"} for i in range(3)],
+        )
+
+        result = ccxt_utils_extended.cancel_orders_batch_ccxt(request)
+
+        assert exchange.single_calls == 2
+        assert [r["native"] for r in result["results"]] == [True, False, False]
+        assert all(r["ok"] for r in result["results"])
+
+    def test_cancel_unknown_order_on_fake_backend(self, monkeypatch, temp_dir):
+        """假交易所批量撤单中的未知订单逐笔重试，最终报告失败"""
+        from src.tools.fake_exchange import get_fake_exchange
+
+        fake = get_fake_exchange(
+            {"fake_exchange": {"latency_ms": 0, "jitter_ms": 0}},
+            "future",
+            credentials={"api_key": "batch-cancel"},
+        )
+        monkeypatch.setitem(
+            ccxt_utils_extended.exchange_manager._pools,
+            ("binance", "future", "sandbox"),
+            ExchangePool("binance/future/sandbox", [fake]),
+        )
+        monkeypatch.setattr(
+            binance_adapter, "order_index", OrderIndex(temp_dir / "order_index.jsonl")
+        )
+        placed = fake.create_order("BTC/USDT:USDT", "limit", "buy", 1, 1000.0)
+        request = CancelOrdersBatchRequest(
+            exchange_name="binance",
+            market="future",
+            orders=[
+                {"id": placed["id"], "symbol": "BTC/USDT:USDT"},
+                {"id": "does-not-exist", "symbol": "BTC/USDT:USDT"},
+            ],
+        )
+
+        result = ccxt_utils_extended.cancel_orders_batch_ccxt(request)
+
+        ok, missing = result["results"]
+        assert ok["ok"] and ok["native"]
+        assert missing["ok"] is False
+        assert missing["native"] is False
+        assert "OrderNotFound" in missing["error"]
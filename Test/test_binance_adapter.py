@@ -0,0 +1,158 @@
+import time
+from contextlib import nullcontext
+
+import ccxt
+import pytest
+
+from src.tools import binance_adapter
+from src.tools.order_index import OrderIndex
+from src.types import CancelAllOrdersRequest, FetchOrderRequest
+from src.types_extended import FetchOpenOrdersRequest
+
+
+class SlowExchange:
+    """模拟 Binance: 普通单和条件单走不同接口，每次调用耗时 delay 秒"""
+
+    def __init__(self, delay=0.2, fail_stop=False):
+        self.delay = delay
+        self.fail_stop = fail_stop
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        time.sleep(self.delay)
+        if params.get("stop"):
+            if self.fail_stop:
+                raise ccxt.NetworkError("stop endpoint down")
+            return [{"id": "s1", "timestamp": 3}]
+        return [{"id": "l1", "timestamp": 1}, {"id": "l2", "timestamp": None}]
+
+    def cancel_all_orders(self, symbol=None, params={}):
+        time.sleep(self.delay)
+        return [{"id": "s1" if params.get("stop") else "l1"}]
+
+
+class StopOrderExchange:
+    """只有 stop 接口能查到订单 s1，记录每次调用使用的接口"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch_order(self, id, symbol=None, params={}):
+        self.calls.append("stop" if params.get("stop") else "normal")
+        if id == "s1" and params.get("stop"):
+            return {"id": "s1", "status": "open"}
+        raise ccxt.OrderNotFound("Order does not exist")
+
+
+@pytest.fixture(autouse=True)
+def temp_order_index(temp_dir, monkeypatch):
+    """订单类型索引写到临时目录"""
+    index = OrderIndex(temp_dir / "order_index.jsonl")
+    monkeypatch.setattr(binance_adapter, "order_index", index)
+    return index
+
+
+def lend(exchange):
+    """单实例的借出函数"""
+    return lambda: nullcontext(exchange)
+
+
+def open_orders_request():
+    return FetchOpenOrdersRequest(exchange_name="binance", market="future")
+
+
+class TestBinanceAdapter:
+    def test_legs_run_concurrently(self):
+        """limit/stop 两次请求并发执行，总耗时接近单次"""
+        exchange = SlowExchange(delay=0.2)
+
+        start = time.perf_counter()
+        result = binance_adapter.fetch_open_orders(
+            lend(exchange), open_orders_request()
+        )
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.35
+        assert [o["id"] for o in result["orders"]] == ["s1", "l1", "l2"]
+        assert result["failed_legs"] == {}
+
+    def test_partial_failure_reported(self):
+        """单腿失败时返回另一腿结果，并在 failed_legs 中报告"""
+        exchange = SlowExchange(delay=0, fail_stop=True)
+
+        result = binance_adapter.fetch_open_orders(
+            lend(exchange), open_orders_request()
+        )
+
+        assert [o["id"] for o in result["orders"]] == ["l1", "l2"]
+        assert "stop" in result["failed_legs"]
+        assert "NetworkError" in result["failed_legs"]["stop"]
+
+    def test_all_legs_failed_raises(self):
+        class DownExchange(SlowExchange):
+            def fetch_open_orders(self, *args, **kwargs):
+                raise ccxt.NetworkError("down")
+
+        with pytest.raises(ccxt.NetworkError):
+            binance_adapter.fetch_open_orders(
+                lend(DownExchange()), open_orders_request()
+            )
+
+    def test_cancel_all_keeps_leg_order(self):
+        exchange = SlowExchange(delay=0)
+        request = CancelAllOrdersRequest(
+            exchange_name="binance", market="future", symbol="BTC/USDT"
+        )
+
+        result = binance_adapter.cancel_all_orders(lend(exchange), request)
+
+        assert result["result"] == [[{"id": "l1"}], [{"id": "s1"}]]
+        assert result["failed_legs"] == {}
+
+    def test_cancel_all_failed_leg_keeps_position(self):
+        """limit 腿失败时 stop 的结果仍在第二位，失败的位置为 None"""
+
+        class LimitDownExchange(SlowExchange):
+            def cancel_all_orders(self, symbol=None, params={}):
+                if not params.get("stop"):
+                    raise ccxt.NetworkError("limit endpoint down")
+                return super().cancel_all_orders(symbol, params)
+
+        request = CancelAllOrdersRequest(
+            exchange_name="binance", market="future", symbol="BTC/USDT"
+        )
+
+        result = binance_adapter.cancel_all_orders(
+            lend(LimitDownExchange(delay=0)), request
+        )
+
+        assert result["result"] == [None, [{"id": "s1"}]]
+        assert "NetworkError" in result["failed_legs"]["limit"]
+
+    def test_fetch_order_uses_index(self, temp_order_index):
+        """已知的条件单直接请求 stop 接口，不再多一次失败请求"""
+        exchange = StopOrderExchange()
+        request = FetchOrderRequest(exchange_name="binance", market="future", id="s1")
+
+        binance_adapter.fetch_order(exchange, request)
+        assert exchange.calls == ["normal", "stop"]
+
+        exchange.calls.clear()
+        binance_adapter.fetch_order(exchange, request)
+        assert exchange.calls == ["stop"]
+
+    def test_listing_records_stop_ids(self, temp_order_index):
+        """挂单列表中 stop 腿的订单会被记录为条件单"""
+        binance_adapter.fetch_open_orders(
+            lend(SlowExchange(delay=0)), open_orders_request()
+        )
+
+        assert temp_order_index.lookup("binance", "future", "sandbox", "s1") == "stop"
+        assert temp_order_index.lookup("binance", "future", "sandbox", "l1") == "normal"
+
+    def test_fetch_order_not_found_raises(self):
+        exchange = StopOrderExchange()
+        request = FetchOrderRequest(exchange_name="binance", market="future", id="x")
+
+        with pytest.raises(ccxt.OrderNotFound):
+            binance_adapter.fetch_order(exchange, request)
+        assert exchange.calls == ["normal", "stop"]
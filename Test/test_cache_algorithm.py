@@ -4,7 +4,7 @@ from pathlib import Path
 
 from src.cache_tool.entry import get_ohlcv_with_cache
 from src.cache_tool.storage import save_ohlcv
-from src.cache_tool.log_manager import append_log, compact_log
+from src.cache_tool.log_manager import append_log, compact_log, read_log
 from src.cache_tool.config import get_data_dir
 from src.cache_tool.models import DataLocation
 from .utils import mock_ohlcv, assert_time_continuous
@@ -14,8 +14,8 @@ def mock_fetch(symbol, period, start_time, count, **kwargs):
     """模拟 API 获取"""
     period_ms = 15 * 60 * 1000
     if start_time is None:
-        # 默认返回最新，假设是 5000000
-        start_time = 5000000
+        # 默认返回最新，假设是 4500000
+        start_time = 4500000
     return mock_ohlcv(start_time, count, period_ms)
 
 
@@ -24,8 +24,8 @@ class TestCacheAlgorithmSimple:
 
     def test_start_in_cache_reuse(self, temp_dir, sample_loc, period_ms):
         """起始时间在缓存中，应复用缓存"""
-        # 预先写入缓存数据 t=1000000 开始 20 根
-        pre_data = mock_ohlcv(1000000, 20, period_ms)
+        # 预先写入缓存数据 t=900000 开始 20 根
+        pre_data = mock_ohlcv(900000, 20, period_ms)
         save_ohlcv(temp_dir, sample_loc, pre_data)
 
         call_count = {"value": 0}
@@ -34,9 +34,9 @@ class TestCacheAlgorithmSimple:
             call_count["value"] += 1
             return mock_ohlcv(start_time, count, period_ms)
 
-        # 请求 t=1000000 + 5*period 开始，10 根
-        # 起始在缓存中(1000000 到 1000000+19*period)
-        start = 1000000 + 5 * period_ms
+        # 请求 t=900000 + 5*period 开始，10 根
+        # 起始在缓存中(900000 到 900000+19*period)
+        start = 900000 + 5 * period_ms
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
@@ -51,8 +51,8 @@ class TestCacheAlgorithmSimple:
 
     def test_start_not_in_cache(self, temp_dir, sample_loc, period_ms):
         """起始时间不在缓存中，应发起网络请求"""
-        # 预先写入缓存数据 t=2000000 开始 20 根
-        pre_data = mock_ohlcv(2000000, 20, period_ms)
+        # 预先写入缓存数据 t=1800000 开始 20 根
+        pre_data = mock_ohlcv(1800000, 20, period_ms)
         save_ohlcv(temp_dir, sample_loc, pre_data)
 
         call_count = {"value": 0}
@@ -61,11 +61,11 @@ class TestCacheAlgorithmSimple:
             call_count["value"] += 1
             return mock_ohlcv(start_time, count, period_ms)
 
-        # 请求 t=1000000 开始，10 根（不在缓存 2000000-xxx 中）
+        # 请求 t=900000 开始，10 根（不在缓存 1800000-xxx 中）
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=10,
             fetch_callback=counting_fetch,
         )
@@ -76,15 +76,15 @@ class TestCacheAlgorithmSimple:
 
     def test_partial_cache_hit(self, temp_dir, sample_loc, period_ms):
         """部分缓存命中：起始在缓存中，但需要更多数据"""
-        # 预先写入缓存数据 t=1000000 开始 10 根
-        pre_data = mock_ohlcv(1000000, 10, period_ms)
+        # 预先写入缓存数据 t=900000 开始 10 根
+        pre_data = mock_ohlcv(900000, 10, period_ms)
         save_ohlcv(temp_dir, sample_loc, pre_data)
 
         call_count = {"value": 0}
 
         def counting_fetch(symbol, period, start_time, count, **kwargs):
             call_count["value"] += 1
-            # 注意: fetch callback 的 start_time 是由算法决定的，会是 1000000 + 10*period?
+            # 注意: fetch callback 的 start_time 是由算法决定的，会是 900000 + 10*period?
             # 简化算法读取缓存后，current_time = cache_end (last time)
             # 下一次 fetch 从 current_time 开始 (即 heavy overlap, but keeps last)
             # 或者 +1?
@@ -93,11 +93,11 @@ class TestCacheAlgorithmSimple:
             # mock_ohlcv(data_end, ...)
             return mock_ohlcv(start_time, count, period_ms)
 
-        # 请求 t=1000000 开始，20 根（缓存只有 10 根）
+        # 请求 t=900000 开始，20 根（缓存只有 10 根）
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=20,
             fetch_callback=counting_fetch,
         )
@@ -110,7 +110,7 @@ class TestCacheAlgorithmSimple:
     def test_no_start_time_skip_cache_read(self, temp_dir, sample_loc, period_ms):
         """无起始时间时跳过缓存读取，只写入"""
         # 预先写入缓存数据
-        pre_data = mock_ohlcv(1000000, 10, period_ms)
+        pre_data = mock_ohlcv(900000, 10, period_ms)
         save_ohlcv(temp_dir, sample_loc, pre_data)
 
         call_count = {"value": 0}
@@ -118,7 +118,7 @@ class TestCacheAlgorithmSimple:
         def counting_fetch(symbol, period, start_time, count, **kwargs):
             call_count["value"] += 1
             # 返回模拟的"最新"数据
-            return mock_ohlcv(5000000, count, period_ms)
+            return mock_ohlcv(4500000, count, period_ms)
 
         # 无起始时间请求
         result = get_ohlcv_with_cache(
@@ -143,7 +143,7 @@ class TestCacheAlgorithmSimple:
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=20,
             fetch_callback=partial_fetch,
         )
@@ -153,9 +153,9 @@ class TestCacheAlgorithmSimple:
 
     def test_middle_cache_not_reused(self, temp_dir, sample_loc, period_ms):
         """简化算法不复用中间缓存（与完整算法的区别）"""
-        # 预先写入两段缓存：t=1000000-10根，t=2000000-10根
-        data1 = mock_ohlcv(1000000, 10, period_ms)
-        data2 = mock_ohlcv(2000000, 10, period_ms)
+        # 预先写入两段缓存：t=900000-10根，t=1800000-10根
+        data1 = mock_ohlcv(900000, 10, period_ms)
+        data2 = mock_ohlcv(1800000, 10, period_ms)
         save_ohlcv(temp_dir, sample_loc, data1)
         save_ohlcv(temp_dir, sample_loc, data2)
 
@@ -165,8 +165,8 @@ class TestCacheAlgorithmSimple:
             request_starts.append(start_time)
             return mock_ohlcv(start_time, count, period_ms)
 
-        # 请求 t=500000 开始，覆盖到 2000000 之后
-        # 中间的 2000000-xxx 缓存不会被复用（简化算法特性）
+        # 请求 t=500000 开始，覆盖到 1800000 之后
+        # 中间的 1800000-xxx 缓存不会被复用（简化算法特性）
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
@@ -176,7 +176,7 @@ class TestCacheAlgorithmSimple:
         )
 
         # 起始不在缓存中，所以会从 500000 开始连续请求
-        # 中间经过 2000000 时不会复用缓存
+        # 中间经过 1800000 时不会复用缓存
         assert len(request_starts) >= 1
         assert request_starts[0] == 500000
 
@@ -194,7 +194,7 @@ class TestCacheAlgorithmSimple:
         result1 = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=10,
             fetch_callback=counting_fetch,
             enable_cache=False,
@@ -219,7 +219,7 @@ class TestCacheAlgorithmSimple:
         result2 = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=10,
             fetch_callback=counting_fetch,
             enable_cache=False,
@@ -227,3 +227,135 @@ class TestCacheAlgorithmSimple:
 
         assert len(result2) == 10
         assert call_count["value"] == 2, "禁用缓存时每次都应发起网络请求"
+
+
+class TestRangeQuery:
+    """区间模式 (start+end) 与向前翻页模式 (end+count)"""
+
+    FIRST = 1_000 * 900000  # 交易所历史起点
+
+    def exchange(self, period_ms, calls):
+        """模拟交易所: 历史从 FIRST 开始，返回 since 之后的 count 根"""
+
+        def fetch(symbol, period, start_time, count, **kwargs):
+            calls.append((start_time, count))
+            since = max(start_time, self.FIRST)
+            since += -since % period_ms
+            return mock_ohlcv(since, count, period_ms)
+
+        return fetch
+
+    def test_range_only_fetches_gap(self, temp_dir, sample_loc, period_ms):
+        a = self.FIRST + 100 * period_ms
+        save_ohlcv(temp_dir, sample_loc, mock_ohlcv(a, 50, period_ms))
+        save_ohlcv(temp_dir, sample_loc, mock_ohlcv(a + 80 * period_ms, 50, period_ms))
+
+        calls = []
+        end = a + 129 * period_ms
+        result = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=a,
+            end_time=end,
+            count=1,
+            fetch_callback=self.exchange(period_ms, calls),
+        )
+        assert len(result) == 130
+        assert_time_continuous(result, period_ms)
+        # 只请求两段之间的缺口 (含两端的边界 K 线)
+        assert calls == [(a + 49 * period_ms, 32)]
+
+        # 缺口保存后日志合并为一段，再次请求完全走缓存
+        calls.clear()
+        again = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=a + period_ms // 2,
+            end_time=end,
+            count=1,
+            fetch_callback=self.exchange(period_ms, calls),
+        )
+        assert calls == []
+        assert again["time"].to_list() == result["time"].to_list()[1:]
+
+    def test_backward_pages_from_end(self, temp_dir, sample_loc, period_ms):
+        end = self.FIRST + 10_000 * period_ms + 123  # 未对齐
+        calls = []
+        result = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=None,
+            end_time=end,
+            count=3500,
+            fetch_callback=self.exchange(period_ms, calls),
+        )
+        assert len(result) == 3500
+        assert_time_continuous(result, period_ms)
+        assert result["time"][-1] == end - 123
+        # 从后往前翻页，相邻页重叠一根，不足一页的部分在最早的一页
+        starts = [since for since, _ in calls]
+        assert starts == sorted(starts, reverse=True)
+        assert [limit for _, limit in calls] == [1500, 1500, 502]
+
+        # 向更早翻页: 已缓存部分不再请求
+        calls.clear()
+        older = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=None,
+            end_time=end - 3000 * period_ms,
+            count=1000,
+            fetch_callback=self.exchange(period_ms, calls),
+        )
+        assert len(older) == 1000
+        # 只请求 result 之前缺少的 501 根 (含与缓存重叠的一根)
+        assert calls == [(end - 4000 * period_ms + 1, 501)]
+
+    def test_backward_stops_at_history_start(self, temp_dir, sample_loc, period_ms):
+        end = self.FIRST + 1999 * period_ms
+        calls = []
+        result = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=None,
+            end_time=end,
+            count=10_000,
+            fetch_callback=self.exchange(period_ms, calls),
+        )
+        assert len(result) == 2000
+        assert result["time"][0] == self.FIRST
+        assert len(calls) == 2
+
+    def test_range_requests_compact_log(self, temp_dir, sample_loc, period_ms):
+        """只有区间请求时日志也会被合并"""
+        a = self.FIRST
+        calls = []
+        for i in range(5):
+            get_ohlcv_with_cache(
+                temp_dir,
+                sample_loc,
+                start_time=a + i * 10 * period_ms,
+                end_time=a + (i + 1) * 10 * period_ms,
+                count=1,
+                fetch_callback=self.exchange(period_ms, calls),
+            )
+        get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=None,
+            end_time=a + 50 * period_ms,
+            count=10,
+            fetch_callback=self.exchange(period_ms, calls),
+        )
+
+        data_dir = get_data_dir(
+            temp_dir,
+            sample_loc.exchange,
+            sample_loc.mode,
+            sample_loc.market,
+            sample_loc.symbol,
+            sample_loc.period,
+        )
+        (entry,) = read_log(data_dir)
+        assert (entry.data_start, entry.data_end) == (a, a + 50 * period_ms)
+        assert len(calls) == 5
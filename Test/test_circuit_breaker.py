@@ -0,0 +1,192 @@
+import time
+
+import ccxt
+import polars as pl
+import pytest
+
+from src.tools.circuit_breaker import (
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    StaleData,
+)
+from src.types import OHLCVParams, TickersRequest
+
+
+class FlakyExchange:
+    """fetch2 按 error 属性抛错"""
+
+    def __init__(self):
+        self.error = None
+        self.calls = 0
+
+    def fetch2(
+        self,
+        path,
+        api="public",
+        method="GET",
+        params={},
+        headers=None,
+        body=None,
+        config={},
+    ):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return {}
+
+
+def make_registry(exchange, probe=None, open_seconds=0.05):
+    registry = CircuitBreakerRegistry()
+    registry.configure(
+        {"circuit_breaker": {"failure_threshold": 2, "open_seconds": open_seconds}}
+    )
+    registry.register("kraken/future/sandbox", probe=probe)
+    registry.install(exchange, "kraken/future/sandbox")
+    return registry
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        exchange = FlakyExchange()
+        registry = make_registry(exchange, open_seconds=60)
+        exchange.error = ccxt.ExchangeNotAvailable("502 Bad Gateway")
+
+        for _ in range(2):
+            with pytest.raises(ccxt.ExchangeNotAvailable):
+                exchange.fetch2("tickers")
+        with pytest.raises(CircuitOpenError):
+            exchange.fetch2("tickers")
+
+        assert exchange.calls == 2
+        assert registry.is_open("kraken/future/sandbox")
+
+    def test_business_errors_do_not_count(self):
+        exchange = FlakyExchange()
+        registry = make_registry(exchange)
+        exchange.error = ccxt.InvalidOrder("bad amount")
+
+        for _ in range(5):
+            with pytest.raises(ccxt.InvalidOrder):
+                exchange.fetch2("order")
+
+        assert not registry.is_open("kraken/future/sandbox")
+
+    def test_trial_request_closes_breaker(self):
+        """没有探测函数时，open_seconds 后放行一个试探请求"""
+        exchange = FlakyExchange()
+        registry = make_registry(exchange)
+        exchange.error = ccxt.RequestTimeout("timeout")
+        for _ in range(2):
+            with pytest.raises(ccxt.RequestTimeout):
+                exchange.fetch2("tickers")
+
+        time.sleep(0.06)
+        exchange.error = None
+        exchange.fetch2("tickers")
+
+        assert not registry.is_open("kraken/future/sandbox")
+
+    def test_background_probe(self):
+        exchange = FlakyExchange()
+        registry = make_registry(exchange, probe=lambda: exchange.fetch2("time"))
+        exchange.error = ccxt.ExchangeNotAvailable("502")
+        for _ in range(2):
+            with pytest.raises(ccxt.ExchangeNotAvailable):
+                exchange.fetch2("tickers")
+
+        exchange.error = None
+        deadline = time.monotonic() + 2
+        while registry.is_open("kraken/future/sandbox"):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert exchange.fetch2("tickers") == {}
+
+
+class OpenCircuitExchange:
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        raise CircuitOpenError("kraken/future/sandbox 熔断中")
+
+    def fetch_tickers(self, symbols=None, params={}):
+        raise CircuitOpenError("kraken/future/sandbox 熔断中")
+
+
+@pytest.fixture
+def ccxt_utils(data_cwd, monkeypatch):
+    from src.tools import ccxt_utils
+
+    monkeypatch.setattr(
+        ccxt_utils.exchange_manager, "get", lambda *args: OpenCircuitExchange()
+    )
+    monkeypatch.setattr(ccxt_utils, "_last_tickers", {})
+    return ccxt_utils
+
+
+class TestStaleFallback:
+    def test_ohlcv_served_from_cache(self, ccxt_utils, period_ms):
+        from src.cache_tool import DataLocation
+        from src.cache_tool.storage import save_ohlcv
+
+        loc = DataLocation(
+            exchange="kraken",
+            mode="demo",
+            market="future",
+            symbol="BTC/USD:USD",
+            period="15m",
+        )
+        times = [
+            1_700_000_100_000 // period_ms * period_ms + i * period_ms for i in range(5)
+        ]
+        save_ohlcv(
+            ccxt_utils.OHLCV_DIR,
+            loc,
+            pl.DataFrame(
+                {
+                    "time": times,
+                    "open": [1.0] * 5,
+                    "high": [2.0] * 5,
+                    "low": [0.5] * 5,
+                    "close": [1.5] * 5,
+                    "volume": [10.0] * 5,
+                }
+            ),
+        )
+
+        result = ccxt_utils.fetch_ohlcv_ccxt(
+            OHLCVParams(
+                exchange_name="kraken",
+                market="future",
+                symbol="BTC/USD:USD",
+                timeframe="15m",
+                limit=3,
+            )
+        )
+
+        assert isinstance(result, StaleData)
+        assert [row[0] for row in result.data] == times[-3:]
+        assert result.age_ms > 0
+
+    def test_ohlcv_without_cache_raises(self, ccxt_utils):
+        with pytest.raises(CircuitOpenError):
+            ccxt_utils.fetch_ohlcv_ccxt(
+                OHLCVParams(
+                    exchange_name="kraken",
+                    market="future",
+                    symbol="ETH/USD:USD",
+                    timeframe="15m",
+                )
+            )
+
+    def test_tickers_served_from_last_known(self, ccxt_utils):
+        ccxt_utils._last_tickers[("kraken", "future", "sandbox")] = {
+            "BTC/USD:USD": (int(time.time() * 1000) - 5000, {"last": 1.0}),
+            "ETH/USD:USD": (int(time.time() * 1000), {"last": 2.0}),
+        }
+
+        result = ccxt_utils.fetch_tickers_ccxt(
+            TickersRequest(
+                exchange_name="kraken", market="future", symbols="BTC/USD:USD"
+            )
+        )
+
+        assert result.data == {"tickers": {"BTC/USD:USD": {"last": 1.0}}}
+        assert result.age_ms >= 5000
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import ccxt
+import pytest
+
+from src.tools.exchange_pool import ExchangePool
+from src.types import CloseAllPositionsRequest
+
+
+class PositionsExchange:
+    """模拟持仓: 下单后对应持仓清零，记录最大并发下单数"""
+
+    def __init__(self, positions, delay=0.1):
+        self.positions = positions
+        self.delay = delay
+        self.fetch_calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def fetch_positions(self, symbols=None, params={}):
+        self.fetch_calls += 1
+        return [dict(p) for p in self.positions]
+
+    def create_order(self, symbol, type, side, amount, price=None, params={}):
+        assert params.get("reduceOnly") is True
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if symbol == "BAD/USDT:USDT":
+            raise ccxt.InsufficientFunds("margin")
+        expected = "long" if side == "sell" else "short"
+        for p in self.positions:
+            if p["symbol"] == symbol and p["side"] == expected:
+                p["contracts"] = 0
+        return {"id": f"{symbol}-{side}", "symbol": symbol}
+
+
+def position(symbol, side, contracts=1.0):
+    return {"symbol": symbol, "side": side, "contracts": contracts}
+
+
+@pytest.fixture
+def ccxt_utils(data_cwd):
+    from src.tools import ccxt_utils
+
+    return ccxt_utils
+
+
+@pytest.fixture
+def patch_exchange(monkeypatch, ccxt_utils):
+    """注册一个实例池; instances 为单个实例时池中的 4 个位置都指向它"""
+
+    def apply(instances, size=4):
+        if not isinstance(instances, list):
+            instances = [instances] * size
+        pool = ExchangePool("binance/future/sandbox", instances)
+        monkeypatch.setitem(
+            ccxt_utils.exchange_manager._pools, ("binance", "future", "sandbox"), pool
+        )
+        return instances[0]
+
+    return apply
+
+
+class TestCloseAllPositions:
+    def test_closes_every_symbol_concurrently(self, patch_exchange, ccxt_utils):
+        exchange = patch_exchange(
+            PositionsExchange(
+                [
+                    position("BTC/USDT:USDT", "long"),
+                    position("BTC/USDT:USDT", "short"),
+                    position("ETH/USDT:USDT", "long"),
+                    position("SOL/USDT:USDT", "short"),
+                    position("XRP/USDT:USDT", "long", contracts=0),
+                ]
+            )
+        )
+        request = CloseAllPositionsRequest(
+            exchange_name="binance", market="future", max_concurrency=2
+        )
+
+        start = time.perf_counter()
+        result = ccxt_utils.close_all_positions_ccxt(request)
+        elapsed = time.perf_counter() - start
+
+        assert len(result["legs"]) == 4
+        assert all(leg["ok"] for leg in result["legs"])
+        assert result["remaining_positions"] == []
+        # 平仓前后各一次 fetch_positions
+        assert exchange.fetch_calls == 2
+        # 并发上限生效
+        assert exchange.max_active == 2
+        assert elapsed < 0.35
+
+    def test_side_filter_and_failed_leg(self, patch_exchange, ccxt_utils):
+        patch_exchange(
+            PositionsExchange(
+                [
+                    position("BTC/USDT:USDT", "long"),
+                    position("BAD/USDT:USDT", "long"),
+                    position("ETH/USDT:USDT", "short"),
+                ],
+                delay=0,
+            )
+        )
+        request = CloseAllPositionsRequest(
+            exchange_name="binance", market="future", side="long"
+        )
+
+        result = ccxt_utils.close_all_positions_ccxt(request)
+
+        legs = {leg["symbol"]: leg for leg in result["legs"]}
+        assert set(legs) == {"BTC/USDT:USDT", "BAD/USDT:USDT"}
+        assert legs["BAD/USDT:USDT"]["ok"] is False
+        assert "InsufficientFunds" in legs["BAD/USDT:USDT"]["error"]
+        assert [p["symbol"] for p in result["remaining_positions"]] == ["BAD/USDT:USDT"]
+
+    def test_each_leg_uses_its_own_instance(self, patch_exchange, ccxt_utils):
+        """每笔平仓单各自借出实例，并发数不超过实例池大小"""
+        positions = [position(f"C{i}/USDT:USDT", "long") for i in range(6)]
+        instances = [PositionsExchange(positions, delay=0.05) for _ in range(2)]
+        patch_exchange(instances)
+        request = CloseAllPositionsRequest(
+            exchange_name="binance", market="future", max_concurrency=5
+        )
+
+        result = ccxt_utils.close_all_positions_ccxt(request)
+
+        assert all(leg["ok"] for leg in result["legs"])
+        # 同一实例同一时间只被一个调用使用
+        assert [e.max_active for e in instances] == [1, 1]
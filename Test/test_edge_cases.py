@@ -18,8 +18,8 @@ class TestEdgeCases:
 
     def test_last_candle_price_update(self, temp_dir, sample_loc, period_ms):
         """去重后无新增数据，但最后一根K线价格更新"""
-        # 预先写入缓存：t=1000000 开始 9 根 (比请求少1根，触发网络请求)
-        pre_data = mock_ohlcv(1000000, 9, period_ms)
+        # 预先写入缓存：t=900000 开始 9 根 (比请求少1根，触发网络请求)
+        pre_data = mock_ohlcv(900000, 9, period_ms)
         save_ohlcv(temp_dir, sample_loc, pre_data)
 
         # 缓存的最后一根 (第9根)
@@ -41,7 +41,7 @@ class TestEdgeCases:
                     "open": [100.0],
                     "high": [200.0],
                     "low": [90.0],
-                    "close": [999.9],  # 价格大幅更新
+                    "close": [150.0],  # 价格大幅更新
                     "volume": [5000.0],
                 }
             )
@@ -61,7 +61,7 @@ class TestEdgeCases:
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=10,
             fetch_callback=fetch_overlapping_update,
         )
@@ -71,14 +71,14 @@ class TestEdgeCases:
         # 验证最后一根K线(第9根)是否更新
         # 注意 result 里的第9根 (index 8)
         updated_close = result.filter(pl.col("time") == last_time_in_cache)["close"][0]
-        assert updated_close == 999.9, (
+        assert updated_close == 150.0, (
             f"缓存重叠部分的K线价格应更新，实际为 {updated_close}"
         )
 
         # 验证缓存文件也已更新
         cached = read_ohlcv(temp_dir, sample_loc)
         disk_close = cached.filter(pl.col("time") == last_time_in_cache)["close"][0]
-        assert disk_close == 999.9, "磁盘缓存也应被更新"
+        assert disk_close == 150.0, "磁盘缓存也应被更新"
 
     def test_network_returns_empty(self, temp_dir, sample_loc, period_ms):
         """网络返回空数据时应正确退出，不死循环"""
@@ -108,7 +108,7 @@ class TestEdgeCases:
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=3000,
             fetch_callback=counting_fetch,
         )
@@ -158,7 +158,7 @@ class TestEdgeCases:
     def test_dedup_no_new_data_still_saves(self, temp_dir, sample_loc, period_ms):
         """去重后无新增数据时，仍应保存（测试网络仅返回重叠数据的情况）"""
         # 预先写入 9 根
-        pre_data = mock_ohlcv(1000000, 9, period_ms)
+        pre_data = mock_ohlcv(900000, 9, period_ms)
         save_ohlcv(temp_dir, sample_loc, pre_data)
 
         last_time_in_cache = cast(int, pre_data["time"].max())
@@ -174,7 +174,7 @@ class TestEdgeCases:
                     "open": [100.0],
                     "high": [200.0],
                     "low": [90.0],
-                    "close": [888.8],  # 更新
+                    "close": [188.8],  # 更新
                     "volume": [5000.0],
                 }
             )
@@ -186,7 +186,7 @@ class TestEdgeCases:
         result = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=10,
             fetch_callback=fetch_just_overlap_update,
         )
@@ -197,4 +197,4 @@ class TestEdgeCases:
         cached = read_ohlcv(temp_dir, sample_loc)
         updated_close = cached.filter(pl.col("time") == last_time_in_cache)["close"][0]
 
-        assert updated_close == 888.8, "即使没有新K线增加，已有K线的更新也应被保存"
+        assert updated_close == 188.8, "即使没有新K线增加，已有K线的更新也应被保存"
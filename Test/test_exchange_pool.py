@@ -0,0 +1,195 @@
+import threading
+import time
+
+import ccxt
+import pytest
+import requests
+from fastapi import HTTPException
+
+from src.tools.exchange import share_markets
+from src.tools.exchange_pool import ExchangePool
+
+
+class TestExchangePool:
+    def test_checkout_is_exclusive(self):
+        """同一实例不会同时借给两个调用"""
+        pool = ExchangePool("binance/future/sandbox", [object(), object()])
+        in_use = set()
+        overlaps = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(20):
+                with pool.checkout() as instance:
+                    with lock:
+                        if id(instance) in in_use:
+                            overlaps.append(instance)
+                        in_use.add(id(instance))
+                    time.sleep(0.001)
+                    with lock:
+                        in_use.discard(id(instance))
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = pool.stats()
+        assert overlaps == []
+        assert stats["checkouts"] == 120
+        assert stats["contended"] > 0
+        assert stats["in_use"] == 0
+
+    def test_checkout_timeout(self):
+        pool = ExchangePool("kraken/spot/live", [object()], checkout_timeout=0.05)
+        with pool.checkout():
+            with pytest.raises(HTTPException) as exc:
+                with pool.checkout():
+                    pass
+        assert exc.value.status_code == 503
+        assert pool.stats()["timeouts"] == 1
+
+    def test_share_markets(self):
+        """预热实例复用主实例的 markets，不发起请求"""
+        primary = ccxt.binance()
+        primary.set_markets(
+            [
+                {
+                    "id": "BTCUSDT",
+                    "symbol": "BTC/USDT",
+                    "base": "BTC",
+                    "quote": "USDT",
+                    "spot": True,
+                }
+            ]
+        )
+        clone = ccxt.binance()
+        share_markets(clone, primary)
+
+        assert clone.markets is primary.markets
+        assert clone.market("BTC/USDT")["id"] == "BTCUSDT"
+        assert clone.session is not primary.session
+
+
+class FakeExchange:
+    def __init__(self, credentials=None):
+        self.apiKey = (credentials or {}).get("api_key")
+        self.markets = {}
+        self.session = requests.Session()
+        self.closed = False
+
+    def close(self):
+        # 与 ccxt 一致: 关闭实例即关闭其 Session (及挂载的 adapter)
+        self.session.close()
+        self.closed = True
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    """在全局 exchange_manager 上注册一个主实例和两个子账户配置"""
+    from src.tools import exchange_manager as module
+
+    manager = module.exchange_manager
+    primary = FakeExchange({"api_key": "main"})
+    created = []
+
+    def factory(config, market, mode, markets_from=None, credentials=None):
+        instance = FakeExchange(credentials)
+        instance.markets = markets_from.markets
+        created.append(instance)
+        return instance
+
+    monkeypatch.setitem(module._FACTORIES, "binance", factory)
+    monkeypatch.setitem(manager._registry, ("binance", "future", "sandbox"), primary)
+    monkeypatch.setattr(manager, "_account_pools", {})
+    monkeypatch.setattr(
+        manager,
+        "_config",
+        {
+            "exchange_pool": {"account_size": 1, "account_idle_ttl": 0.05},
+            "binance": {
+                "accounts": {
+                    "sub01": {"test": {"api_key": "k1", "secret": "s1"}},
+                    "sub02": {"test": {"api_key": "k2", "secret": "s2"}},
+                }
+            },
+        },
+    )
+    return manager, primary, created
+
+
+class TestAccounts:
+    def test_account_instances_created_lazily(self, accounts):
+        manager, primary, created = accounts
+        assert created == []
+
+        with manager.checkout("binance", "future", "sandbox", "sub01") as a:
+            assert a.apiKey == "k1"
+            assert a.markets is primary.markets
+        with manager.checkout("binance", "future", "sandbox", "sub01") as again:
+            assert again is a
+        with manager.checkout("binance", "future", "sandbox", "sub02") as b:
+            assert b.apiKey == "k2"
+
+        assert len(created) == 2
+
+    def test_unknown_account(self, accounts):
+        manager, _, _ = accounts
+        with pytest.raises(HTTPException) as exc:
+            with manager.checkout("binance", "future", "sandbox", "nobody"):
+                pass
+        assert exc.value.status_code == 400
+
+    def test_idle_accounts_evicted(self, accounts):
+        manager, _, created = accounts
+        with manager.checkout("binance", "future", "sandbox", "sub01") as first:
+            pass
+        time.sleep(0.1)
+        with manager.checkout("binance", "future", "sandbox", "sub02"):
+            pass
+
+        assert first.closed
+        assert [p["name"] for p in manager.pool_stats()] == [
+            "binance/future/sandbox#sub02"
+        ]
+
+    def test_evicting_account_keeps_shared_connections(
+        self, accounts, server, monkeypatch
+    ):
+        """回收子账户实例不会关闭同一交易所共享的连接池"""
+        from src.tools.http_pool import http_pool_manager
+
+        manager, primary, _ = accounts
+        monkeypatch.setattr(http_pool_manager, "_adapters", {})
+        http_pool_manager.mount(primary, "binance")
+        assert primary.session.get(server).text == "ok"
+
+        with manager.checkout("binance", "future", "sandbox", "sub01") as sub:
+            assert sub.session.get(server).text == "ok"
+        time.sleep(0.1)
+        with manager.checkout("binance", "future", "sandbox", "sub02"):
+            pass
+        assert sub.closed
+
+        assert primary.session.get(server).text == "ok"
+        (stats,) = http_pool_manager.stats()["adapters"]
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 1
+
+    def test_reserved_pool_not_evicted(self, accounts):
+        """拿到子账户池后、借出实例前，并发的回收不会关闭它"""
+        manager, _, _ = accounts
+        pool = manager._get_account_pool(
+            "binance", "future", "sandbox", "sub01", reserve=True
+        )
+        time.sleep(0.1)
+        with manager.checkout("binance", "future", "sandbox", "sub02"):
+            pass
+
+        with pool.checkout(reserved=True) as instance:
+            assert not instance.closed
+        time.sleep(0.1)
+        with manager.checkout("binance", "future", "sandbox", "sub02"):
+            pass
+        assert instance.closed
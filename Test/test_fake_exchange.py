@@ -0,0 +1,157 @@
+from itertools import count
+
+import ccxt
+import pytest
+
+from src.tools.fake_exchange import DEFAULT_FAKE_EXCHANGE, get_fake_exchange
+
+SYMBOL = "BTC/USDT:USDT"
+HOUR = 3600 * 1000
+
+# 每个测试实例使用独立账户
+_keys = count()
+
+
+def make(market="future", **settings):
+    config = {"fake_exchange": {"latency_ms": 0, "jitter_ms": 0, **settings}}
+    return get_fake_exchange(
+        config, market, credentials={"api_key": f"test{next(_keys)}"}
+    )
+
+
+class TestFakeExchange:
+    def test_candles_are_deterministic(self):
+        """同一时间的 K 线在不同实例、不同分页下完全一致"""
+        a, b = make(), make()
+        since = 1_700_000_000_000 - 1_700_000_000_000 % HOUR
+
+        first = a.fetch_ohlcv(SYMBOL, "1h", since=since, limit=10)
+        assert first == b.fetch_ohlcv(SYMBOL, "1h", since=since, limit=10)
+        assert [c[0] for c in first] == [since + i * HOUR for i in range(10)]
+        later = b.fetch_ohlcv(SYMBOL, "1h", since=since + 5 * HOUR, limit=5)
+        assert later == first[5:]
+        # 相邻 K 线首尾相接，不同周期的开盘价一致
+        assert first[0][4] == first[1][1]
+        assert a.fetch_ohlcv(SYMBOL, "1m", since=since, limit=1)[0][1] == first[0][1]
+        for _, o, h, low, c, _ in first:
+            assert low <= min(o, c) <= max(o, c) <= h
+
+    def test_latest_candles_end_at_current_period(self):
+        ex = make()
+        candles = ex.fetch_ohlcv(SYMBOL, "1h", limit=3)
+        now = ex.milliseconds()
+        assert len(candles) == 3
+        assert candles[-1][0] == now - now % HOUR
+
+    def test_market_order_opens_and_reduce_only_closes(self):
+        ex = make()
+        order = ex.create_order(SYMBOL, "market", "buy", 0.5)
+        assert order["status"] == "closed"
+        (position,) = ex.fetch_positions([SYMBOL])
+        assert position["side"] == "long"
+        assert position["contracts"] == 0.5
+
+        # 只减仓单的数量不会超过持仓
+        ex.create_order(SYMBOL, "market", "sell", 2, params={"reduceOnly": True})
+        assert ex.fetch_positions() == []
+        with pytest.raises(ccxt.InvalidOrder):
+            ex.create_order(SYMBOL, "market", "sell", 1, params={"reduceOnly": True})
+
+    def test_clones_share_account(self):
+        """实例池中的克隆实例共享挂单和持仓"""
+        config = {"fake_exchange": {"latency_ms": 0, "jitter_ms": 0}}
+        primary = get_fake_exchange(config, "future", credentials={"api_key": "pool"})
+        clone = get_fake_exchange(
+            config, "future", markets_from=primary, credentials={"api_key": "pool"}
+        )
+        assert clone.markets is primary.markets
+
+        order = primary.create_order(SYMBOL, "limit", "buy", 1, 1000.0)
+        assert [o["id"] for o in clone.fetch_open_orders(SYMBOL)] == [order["id"]]
+        clone.cancel_all_orders(SYMBOL)
+        assert primary.fetch_open_orders(SYMBOL) == []
+
+    def test_stop_orders_use_separate_endpoint(self):
+        """与 Binance 一致: 条件单只能通过 params={"stop": True} 查询和撤销"""
+        ex = make()
+        order = ex.create_order(
+            SYMBOL, "market", "sell", 1, params={"stopPrice": 1.0, "reduceOnly": True}
+        )
+        assert order["status"] == "open"
+        with pytest.raises(ccxt.OrderNotFound):
+            ex.fetch_order(order["id"], SYMBOL)
+        found = ex.fetch_order(order["id"], SYMBOL, params={"stop": True})
+        assert found["id"] == order["id"]
+        assert ex.fetch_open_orders(SYMBOL) == []
+        canceled = ex.cancel_order(order["id"], SYMBOL, params={"stop": True})
+        assert canceled["status"] == "canceled"
+
+    def test_error_injection(self):
+        ex = make(error_rate=1.0, error_types=["RequestTimeout"])
+        with pytest.raises(ccxt.RequestTimeout):
+            ex.fetch_tickers()
+        assert DEFAULT_FAKE_EXCHANGE["error_rate"] == 0.0
+
+    def test_registered_by_whitelist_backend(self, monkeypatch):
+        """白名单项 backend=fake 时 ExchangeManager 创建假交易所实例池"""
+        from src.tools.exchange_manager import exchange_manager as manager
+
+        for attr in (
+            "_registry",
+            "_pools",
+            "_market_tables",
+            "_factories",
+            "_account_pools",
+        ):
+            monkeypatch.setattr(manager, attr, {})
+        monkeypatch.setattr(manager, "_config", {})
+
+        manager.init_from_config(
+            {
+                "exchange_whitelist": [
+                    {
+                        "exchange": "binance",
+                        "market": "future",
+                        "mode": "sandbox",
+                        "backend": "fake",
+                        "pool_size": 2,
+                    }
+                ],
+                "fake_exchange": {"latency_ms": 0, "jitter_ms": 0},
+                "binance": {
+                    "accounts": {"sub01": {"test": {"api_key": "k1", "secret": "s"}}}
+                },
+            }
+        )
+
+        with manager.checkout("binance", "future", "sandbox") as exchange:
+            assert exchange.id == "fake"
+            assert exchange.fetch_tickers([SYMBOL])[SYMBOL]["last"] > 0
+        table = manager.get_market_table("binance", "future", "sandbox")
+        assert SYMBOL in table["symbol"].to_list()
+
+        with manager.checkout("binance", "future", "sandbox", "sub01") as exchange:
+            assert exchange.id == "fake"
+            assert exchange.apiKey == "k1"
+
+    def test_closed_history_is_capped(self):
+        """已结束的订单和成交记录只保留最近的若干条，挂单不受影响"""
+        ex = make(max_closed_orders=3, max_trades=2)
+        resting = ex.create_order(SYMBOL, "limit", "buy", 1, 1000.0)
+        filled = [ex.create_order(SYMBOL, "market", "buy", 0.1) for _ in range(4)]
+        canceled = ex.create_order(SYMBOL, "limit", "buy", 1, 1000.0)
+        ex.cancel_order(canceled["id"], SYMBOL)
+
+        closed = ex.fetch_closed_orders(SYMBOL)
+        assert [o["id"] for o in closed] == [
+            filled[2]["id"],
+            filled[3]["id"],
+            canceled["id"],
+        ]
+        assert [o["id"] for o in ex.fetch_open_orders(SYMBOL)] == [resting["id"]]
+        assert [t["order"] for t in ex.fetch_my_trades(SYMBOL)] == [
+            filled[2]["id"],
+            filled[3]["id"],
+        ]
+        with pytest.raises(ccxt.OrderNotFound):
+            ex.fetch_order(filled[0]["id"], SYMBOL)
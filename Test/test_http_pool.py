@@ -0,0 +1,40 @@
+import socket
+from types import SimpleNamespace
+
+import requests
+
+from src.tools.http_pool import DnsCache, HttpPoolManager, build_socket_options
+
+
+class TestHttpPool:
+    def test_instances_share_connections(self, server):
+        """同一交易所的两个实例 (各自的 Session) 复用同一条连接"""
+        manager = HttpPoolManager()
+        manager.configure({})
+        a = SimpleNamespace(session=requests.Session())
+        b = SimpleNamespace(session=requests.Session())
+        manager.mount(a, "binance")
+        manager.mount(b, "binance")
+
+        for _ in range(3):
+            assert a.session.get(server).text == "ok"
+            assert b.session.get(server).text == "ok"
+
+        (stats,) = manager.stats()["adapters"]
+        assert stats["requests"] == 6
+        assert stats["new_connections"] == 1
+        assert stats["reused"] == 5
+
+    def test_socket_options(self):
+        options = build_socket_options(keepalive_idle=30)
+        assert (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) in options
+        assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+
+    def test_dns_cache(self):
+        cache = DnsCache(ttl=60)
+        first = cache.getaddrinfo("localhost", 80)
+        second = cache.getaddrinfo("localhost", 80)
+
+        assert first == second
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
@@ -0,0 +1,114 @@
+import zipfile
+
+from src.cache_tool.config import get_data_dir
+from src.cache_tool.importer import import_archives, main
+from src.cache_tool.log_manager import read_log
+from src.cache_tool.storage import read_ohlcv
+
+from .utils import make_loc
+
+MINUTE = 60_000
+# 2023-01-01 00:00 UTC
+JAN = 1_672_531_200_000
+
+
+def archive_rows(start: int, count: int, scale: int = 1) -> list[str]:
+    """Binance 归档格式的行 (scale=1000 时为微秒时间戳)"""
+    rows = []
+    for i in range(count):
+        t = start + i * MINUTE
+        o = 100.0 + i
+        rows.append(
+            f"{t * scale},{o},{o + 2},{o - 1},{o + 1},10.5,"
+            f"{(t + MINUTE - 1) * scale},1050.0,42,5.0,500.0,0"
+        )
+    return rows
+
+
+def write_zip(path, rows: list[str], header: bool = False):
+    lines = (
+        ["open_time,open,high,low,close,volume,close_time"] if header else []
+    ) + rows
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(path.stem + ".csv", "\n".join(lines) + "\n")
+    return path
+
+
+class TestImporter:
+    def test_import_parallel(self, temp_dir):
+        src = temp_dir / "archives"
+        src.mkdir()
+        base = temp_dir / "ohlcv"
+        day = 1440 * MINUTE
+        files = [
+            # 期货归档带表头
+            write_zip(src / "BTCUSDT-1m-2023-01-01.zip", archive_rows(JAN, 1440), True),
+            # 2025 年起现货归档为微秒时间戳
+            write_zip(
+                src / "BTCUSDT-1m-2023-01-02.zip",
+                archive_rows(JAN + day, 1440, scale=1000),
+            ),
+        ]
+        csv = src / "BTCUSDT-1m-2023-02-01.csv"
+        csv.write_text("\n".join(archive_rows(JAN + 31 * day, 60)) + "\n")
+        files.append(csv)
+
+        results = import_archives(
+            files, base, "binance", "live", "future", "BTC/USDT", workers=2
+        )
+        assert [r["error"] for r in results] == [None, None, None]
+        assert [r["rows"] for r in results] == [1440, 1440, 60]
+
+        loc = make_loc(period="1m")
+        df = read_ohlcv(base, loc)
+        assert len(df) == 2940
+        assert df["time"][1440] == JAN + day
+        assert df.columns == ["time", "open", "high", "low", "close", "volume"]
+
+        data_dir = get_data_dir(base, "binance", "live", "future", "BTC/USDT", "1m")
+        assert sorted(p.stem for p in data_dir.glob("*.parquet")) == [
+            "2023-01",
+            "2023-02",
+        ]
+        entries = read_log(data_dir)
+        assert {e.source for e in entries} == {"import"}
+        assert (entries[0].data_start, entries[-1].data_end) == (
+            JAN,
+            JAN + 31 * day + 59 * MINUTE,
+        )
+
+    def test_invalid_file_is_skipped(self, temp_dir):
+        rows = archive_rows(JAN, 10)
+        # high 低于 close
+        rows[3] = f"{JAN + 3 * MINUTE},100,100.5,99,101,1,0,0,0,0,0,0"
+        bad = write_zip(temp_dir / "ETHUSDT-1m-2023-01.zip", rows)
+        unaligned = temp_dir / "ETHUSDT-1m-2023-02.csv"
+        unaligned.write_text("\n".join(archive_rows(JAN + 30_000, 5)) + "\n")
+
+        base = temp_dir / "ohlcv"
+        results = import_archives(
+            [bad, unaligned], base, "binance", "live", "spot", "ETH/USDT", workers=1
+        )
+        assert "high < max(open, close)" in results[0]["error"]
+        assert "时间未对齐周期" in results[1]["error"]
+        assert read_ohlcv(
+            base, make_loc(market="spot", symbol="ETH/USDT", period="1m")
+        ).is_empty()
+
+    def test_cli(self, temp_dir, capsys):
+        path = write_zip(temp_dir / "BTCUSDT-1h-2023-02.zip", archive_rows(JAN, 3))
+        code = main(
+            [
+                str(path),
+                "--symbol",
+                "BTC/USDT",
+                "--market",
+                "spot",
+                "--period",
+                "1m",
+                "--base-dir",
+                str(temp_dir / "ohlcv"),
+            ]
+        )
+        assert code == 0
+        assert "1/1 个文件, 3 行" in capsys.readouterr().out
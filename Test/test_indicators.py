@@ -0,0 +1,157 @@
+import math
+
+import polars as pl
+import pytest
+from fastapi import HTTPException
+
+from src.tools.indicators import IndicatorCache, compute, parse_specs
+
+P = 60_000
+LOC = ("binance", "demo", "future", "BTC/USDT", "1m")
+SPECS = "sma:5,ema:10,rsi:14,atr:14,bbands:20:2"
+
+
+def make_frame(n: int, start: int = 0) -> pl.DataFrame:
+    """确定性的 K 线 (第 i 根的数据只取决于 i)"""
+    rows = []
+    for i in range(start, start + n):
+        close = 100 + 10 * math.sin(i / 7) + 3 * math.cos(i / 3)
+        rows.append((i * P, close - 0.5, close + 1.5, close - 2.0, close, 1.0))
+    return pl.DataFrame(
+        rows, schema=["time", "open", "high", "low", "close", "volume"], orient="row"
+    )
+
+
+def assert_close(actual: pl.DataFrame, expected: pl.DataFrame) -> None:
+    assert actual.columns == expected.columns
+    for col in actual.columns:
+        for a, b in zip(actual[col].to_list(), expected[col].to_list()):
+            assert (a is None) == (b is None), col
+            if a is not None:
+                assert a == pytest.approx(b, rel=1e-9), col
+
+
+class TestIndicators:
+    def test_parse_specs(self):
+        specs = parse_specs("EMA:20, rsi:14,bbands:20,ema:20")
+        assert [s.key for s in specs] == ["ema:20", "rsi:14", "bbands:20:2"]
+        assert specs[2].columns == [
+            "bbands:20:2.mid",
+            "bbands:20:2.upper",
+            "bbands:20:2.lower",
+        ]
+        for bad in ("macd:12", "ema", "ema:0", "ema:1.5", "ema:x", "sma:5:2", ""):
+            with pytest.raises(HTTPException):
+                parse_specs(bad)
+
+    def test_matches_reference(self):
+        """ema / rsi 与逐行递推的参考实现一致"""
+        frame = make_frame(60)
+        closes = frame["close"].to_list()
+        (ema, rsi) = parse_specs("ema:10,rsi:14")
+
+        alpha = 2 / 11
+        expected_ema = [closes[0]]
+        for c in closes[1:]:
+            expected_ema.append(alpha * c + (1 - alpha) * expected_ema[-1])
+        values, _ = compute(frame, ema)
+        assert values["ema:10"].to_list()[:9] == [None] * 9
+        assert values["ema:10"].to_list()[9:] == pytest.approx(expected_ema[9:])
+
+        gain = loss = None
+        expected_rsi = [None]
+        for prev, c in zip(closes, closes[1:]):
+            g, lo = max(c - prev, 0), max(prev - c, 0)
+            gain = g if gain is None else gain + (g - gain) / 14
+            loss = lo if loss is None else loss + (lo - loss) / 14
+            expected_rsi.append(100.0 if loss == 0 else 100 - 100 / (1 + gain / loss))
+        values, _ = compute(frame, rsi)
+        assert values["rsi:14"].to_list()[:14] == [None] * 14
+        assert values["rsi:14"].to_list()[14:] == pytest.approx(expected_rsi[14:])
+
+    def test_incremental_matches_full_recompute(self):
+        specs = parse_specs(SPECS)
+        now = 10_000 * P
+        cache = IndicatorCache()
+
+        # 先缓存 300 根，再分两次追加，最后与一次性全量计算比较
+        cache.evaluate(LOC, make_frame(300), specs, P, now)
+        cache.evaluate(LOC, make_frame(330, start=20), specs, P, now)
+        incremental = cache.evaluate(LOC, make_frame(100, start=300), specs, P, now)
+        assert cache.stats()["rebuilds"] == len(specs)
+        assert cache.stats()["extends"] == len(specs) * 2
+
+        full = IndicatorCache().evaluate(LOC, make_frame(400), specs, P, now)
+        assert_close(incremental, full.tail(100))
+        # 递推类指标逐位一致
+        for col in ("ema:10", "rsi:14", "atr:14"):
+            assert incremental[col].to_list() == full.tail(100)[col].to_list()
+
+    def test_forming_candle_is_not_memoized(self):
+        specs = parse_specs("ema:10,sma:5")
+        cache = IndicatorCache()
+        frame = make_frame(50)
+        # 最后一根尚未收盘
+        now = 49 * P + P // 2
+        first = cache.evaluate(LOC, frame, specs, P, now)
+
+        moved = frame.with_columns(
+            pl.when(pl.col("time") == 49 * P)
+            .then(pl.col("close") + 5)
+            .otherwise(pl.col("close"))
+            .alias("close")
+        )
+        second = cache.evaluate(LOC, moved, specs, P, now)
+        assert first.head(49).equals(second.head(49))
+        assert second["ema:10"][-1] != first["ema:10"][-1]
+        assert cache.stats()["hits"] == len(specs)
+        assert_close(second, IndicatorCache().evaluate(LOC, moved, specs, P, now))
+
+    def test_gap_or_earlier_range_rebuilds(self):
+        specs = parse_specs("ema:10")
+        now = 10_000 * P
+        cache = IndicatorCache()
+        cache.evaluate(LOC, make_frame(100, start=100), specs, P, now)
+
+        # 早于缓存起点
+        earlier = cache.evaluate(LOC, make_frame(150), specs, P, now)
+        assert_close(
+            earlier, IndicatorCache().evaluate(LOC, make_frame(150), specs, P, now)
+        )
+        # 与缓存末尾不连续
+        cache.evaluate(LOC, make_frame(10, start=300), specs, P, now)
+        assert cache.stats()["rebuilds"] == 3
+
+    def test_forming_only_request_uses_adjacent_state(self):
+        specs = parse_specs("ema:10")
+        cache = IndicatorCache()
+        cache.evaluate(LOC, make_frame(50), specs, P, 10_000 * P)
+
+        # 只请求紧接缓存末尾的未收盘 K 线: 沿用缓存的状态
+        now = 50 * P + P // 2
+        adjacent = cache.evaluate(LOC, make_frame(1, start=50), specs, P, now)
+        full = IndicatorCache().evaluate(LOC, make_frame(51), specs, P, now)
+        assert adjacent["ema:10"].to_list() == full.tail(1)["ema:10"].to_list()
+
+        # 中间缺了 K 线: 不能把缓存末尾的状态当作上一根，从头计算 (预热期为 null)
+        now = 80 * P + P // 2
+        later = cache.evaluate(LOC, make_frame(1, start=80), specs, P, now)
+        assert later["ema:10"].to_list() == [None]
+
+    def test_result_depends_on_cached_history(self):
+        """同一区间: 冷缓存时开头为预热期，缓存了更早的 K 线后直接返回收敛值"""
+        specs = parse_specs("sma:5,ema:10")
+        now = 10_000 * P
+        cold = IndicatorCache().evaluate(LOC, make_frame(50, start=100), specs, P, now)
+        assert cold["sma:5"].null_count() == 4
+        assert cold["ema:10"].null_count() == 9
+
+        cache = IndicatorCache()
+        cache.evaluate(LOC, make_frame(200), specs, P, now)
+        warm = cache.evaluate(LOC, make_frame(50, start=100), specs, P, now)
+        assert warm.null_count().row(0) == (0, 0, 0)
+        # 滚动类在预热期之后一致，递推类仍有差异
+        assert warm["sma:5"].tail(46).to_list() == pytest.approx(
+            cold["sma:5"].tail(46).to_list()
+        )
+        assert warm["ema:10"][9] != cold["ema:10"][9]
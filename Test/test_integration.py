@@ -17,7 +17,7 @@ class TestIntegration:
         result1 = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=20,
             fetch_callback=fetch_full,
         )
@@ -34,7 +34,7 @@ class TestIntegration:
         result2 = get_ohlcv_with_cache(
             temp_dir,
             sample_loc,
-            start_time=1000000,
+            start_time=900000,
             count=30,  # 多10根
             fetch_callback=fetch_partial,
         )
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from src.tools import rate_limiter
+from src.tools.lanes import Lane, LaneManager
+
+
+class TestLanes:
+    def test_lanes_isolated(self):
+        """market_data 通道被占满时，order 通道仍能立即执行"""
+        manager = LaneManager()
+        manager.configure({"lanes": {"market_data": {"workers": 1, "max_queue": 10}}})
+        release = threading.Event()
+
+        async def scenario():
+            blocked = asyncio.create_task(manager.run("market_data", release.wait, 5))
+            await asyncio.sleep(0.05)
+            result = await asyncio.wait_for(
+                manager.run("order", lambda: "placed"), timeout=1
+            )
+            release.set()
+            await blocked
+            return result
+
+        assert asyncio.run(scenario()) == "placed"
+
+    def test_admission_control(self):
+        """排队数超过上限时返回 503"""
+        lane = Lane("test", workers=1, max_queue=1, priority=0)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.create_task(lane.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(lane.run(lambda: None))
+            await asyncio.sleep(0.01)
+            with pytest.raises(HTTPException) as exc:
+                await lane.run(lambda: None)
+            await asyncio.sleep(0.05)
+            release.set()
+            await asyncio.gather(running, queued)
+            return exc.value.status_code
+
+        assert asyncio.run(scenario()) == 503
+        stats = lane.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        # 第二个任务排队等待了第一个任务
+        assert stats["queue_ms_max"] >= 40
+
+    def test_lane_sets_rate_priority(self):
+        lane = Lane(
+            "test", workers=1, max_queue=1, priority=rate_limiter.PRIORITY_ORDER
+        )
+        priority = asyncio.run(lane.run(rate_limiter._priority.get))
+        assert priority == rate_limiter.PRIORITY_ORDER
+
+    def test_cancelled_request_keeps_queue_count(self):
+        """请求被取消后，线程中仍在执行和排队的任务继续计数，queued 不会为负"""
+        lane = Lane("test", workers=1, max_queue=4, priority=0)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.create_task(lane.run(release.wait, 5))
+            queued = asyncio.create_task(lane.run(lambda: None))
+            await asyncio.sleep(0.05)
+            running.cancel()
+            queued.cancel()
+            await asyncio.sleep(0.01)
+            stats = lane.stats()
+            release.set()
+            return stats
+
+        stats = asyncio.run(scenario())
+        assert stats["running"] == 1
+        assert stats["queued"] == 0
+        lane.shutdown()
+        lane._executor.shutdown(wait=True)
+        final = lane.stats()
+        assert (final["running"], final["queued"], final["completed"]) == (0, 0, 1)
+
+    def test_configure_shuts_down_old_executors(self):
+        manager = LaneManager()
+        old = manager._lanes["order"]._executor
+        manager.configure({})
+        with pytest.raises(RuntimeError):
+            old.submit(lambda: None)
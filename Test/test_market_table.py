@@ -0,0 +1,69 @@
+from src.tools.market_table import build_market_table, filter_market_table
+
+
+def make_market(symbol, type_="swap", settle="USDT", linear=True, **kwargs):
+    base, quote = symbol.split(":")[0].split("/")
+    market = {
+        "symbol": symbol,
+        "base": base,
+        "quote": quote,
+        "settle": settle,
+        "type": type_,
+        "linear": linear,
+        "active": True,
+        "contractSize": 1.0,
+        "precision": {"amount": 0.001, "price": 0.1},
+        "limits": {"amount": {"min": 0.001}},
+    }
+    market.update(kwargs)
+    return market
+
+
+MARKETS = {
+    m["symbol"]: m
+    for m in [
+        make_market("BTC/USDT:USDT"),
+        make_market("ETH/USDT:USDT", limits={"amount": {"min": None}}),
+        make_market("BTC/USD:BTC", settle="BTC", linear=False, contractSize=100.0),
+        make_market("BTC/USDT", type_="spot", settle=None, linear=None),
+        make_market("LUNA/USDT:USDT", active=False),
+    ]
+}
+
+
+class TestMarketTable:
+    def test_build_table(self):
+        """预计算表包含全部市场，min_amount 缺失时回退到精度"""
+        table = build_market_table(MARKETS)
+
+        assert table.height == 5
+        eth = table.filter(table["symbol"] == "ETH/USDT:USDT").to_dicts()[0]
+        assert eth["min_amount"] == 0.001
+        inverse = table.filter(table["symbol"] == "BTC/USD:BTC").to_dicts()[0]
+        assert inverse["contract_size"] == 100.0
+        assert inverse["linear"] is False
+
+    def test_spot_contract_size_defaults_to_one(self):
+        """现货没有 contractSize，按 1 处理"""
+        markets = {"BTC/USDT": make_market("BTC/USDT", type_="spot", contractSize=None)}
+        table = build_market_table(markets)
+        assert table["contract_size"].to_list() == [1.0]
+
+    def test_filter_settle_and_linear(self):
+        table = build_market_table(MARKETS)
+
+        usdt = filter_market_table(table, settle="USDT", contract_only=True)
+        assert usdt["symbol"].to_list() == ["BTC/USDT:USDT", "ETH/USDT:USDT"]
+
+        inverse = filter_market_table(table, linear=False, contract_only=True)
+        assert inverse["symbol"].to_list() == ["BTC/USD:BTC"]
+
+    def test_filter_inactive(self):
+        """默认过滤掉不可交易的市场"""
+        table = build_market_table(MARKETS)
+
+        assert "LUNA/USDT:USDT" not in filter_market_table(table)["symbol"].to_list()
+        assert (
+            "LUNA/USDT:USDT"
+            in filter_market_table(table, active_only=False)["symbol"].to_list()
+        )
@@ -0,0 +1,97 @@
+import time
+
+from src import metrics
+from src.cache_tool.entry import get_ohlcv_with_cache
+from src.cache_tool.storage import save_ohlcv
+from src.metrics import MetricsRegistry
+from .utils import mock_ohlcv
+
+
+def sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class TestMetrics:
+    def test_histogram_render(self):
+        registry = MetricsRegistry()
+        h = registry.histogram("demo_seconds", "demo", ("lane",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            h.observe(("order",), value)
+
+        text = registry.render()
+
+        assert 'demo_seconds_bucket{lane="order",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{lane="order",le="1.0"} 2' in text
+        assert 'demo_seconds_bucket{lane="order",le="+Inf"} 3' in text
+        assert 'demo_seconds_count{lane="order"} 3' in text
+
+    def test_label_values_escaped(self):
+        registry = MetricsRegistry()
+        c = registry.counter("demo_total", "demo", ("error",))
+        c.inc(('bad "quote" \\ path\nnext',))
+
+        text = registry.render()
+
+        assert 'demo_total{error="bad \\"quote\\" \\\\ path\\nnext"} 1.0' in text
+
+    def test_counter_lines(self):
+        lines = metrics.counter_lines(
+            "lane_rejected_total", "demo", [({"lane": "order"}, 3)]
+        )
+
+        assert lines == [
+            "# HELP lane_rejected_total demo",
+            "# TYPE lane_rejected_total counter",
+            'lane_rejected_total{lane="order"} 3.0',
+        ]
+
+    def test_cache_hit_and_miss_counted(
+        self, temp_dir, sample_loc, period_ms, cache_hooks
+    ):
+        labels = '{exchange="binance",market="future",mode="live",period="15m"'
+        before = metrics.registry.render()
+
+        def fetch(symbol, period, start_time, count, **kwargs):
+            return mock_ohlcv(start_time, count, period_ms)
+
+        save_ohlcv(temp_dir, sample_loc, mock_ohlcv(1000000, 20, period_ms))
+        get_ohlcv_with_cache(temp_dir, sample_loc, 1000000, 10, fetch)
+        get_ohlcv_with_cache(temp_dir, sample_loc, 100 * period_ms, 10, fetch)
+
+        after = metrics.registry.render()
+        for result in ("hit", "miss"):
+            prefix = f'ohlcv_cache_requests_total{labels},result="{result}"}}'
+            assert sample(after, prefix) == sample(before, prefix) + 1
+        prefix = f"ohlcv_cache_rows_fetched_sum{labels}}}"
+        assert sample(after, prefix) == sample(before, prefix) + 10
+        prefix = f"ohlcv_log_compact_seconds_count{labels}}}"
+        assert sample(after, prefix) == sample(before, prefix) + 2
+
+    def test_cache_tool_without_hooks(self, temp_dir, sample_loc, period_ms):
+        """未注入时 cache_tool 照常工作，不记录指标"""
+        from src.cache_tool import hooks
+
+        hooks.install()
+        before = metrics.registry.render()
+
+        def fetch(symbol, period, start_time, count, **kwargs):
+            return mock_ohlcv(start_time, count, period_ms)
+
+        save_ohlcv(temp_dir, sample_loc, mock_ohlcv(900000, 20, period_ms))
+        get_ohlcv_with_cache(temp_dir, sample_loc, 900000, 10, fetch)
+        result = get_ohlcv_with_cache(temp_dir, sample_loc, 900000, 30, fetch)
+        assert len(result) == 30
+        assert metrics.registry.render() == before
+
+    def test_hot_path_overhead(self):
+        """单次记录的开销应在微秒级 (宽松上限，避免 CI 抖动)"""
+        h = MetricsRegistry().histogram("overhead_seconds", "demo", ("a",))
+        labels = ("x",)
+        n = 20000
+        start = time.perf_counter()
+        for _ in range(n):
+            h.observe(labels, 0.01)
+        assert (time.perf_counter() - start) / n < 5e-6
@@ -0,0 +1,127 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import polars as pl
+import pyarrow as pa
+import pytest
+
+from src.cache_tool.storage import save_ohlcv
+from src.tools.ohlcv_export import ExportManager
+from src.types import ExportRequest
+
+from .utils import make_loc, mock_ohlcv
+
+HOUR = 3600 * 1000
+# 2023-01-31 00:00 UTC，前后跨两个月度分块
+START = 1_675_123_200_000
+
+
+@pytest.fixture
+def exports(temp_dir):
+    manager = ExportManager()
+    manager.configure(
+        {"export": {"dir": str(temp_dir / "exports"), "chunk_size": 1024}},
+        base_dir=temp_dir / "ohlcv",
+    )
+    save_ohlcv(manager.base_dir, make_loc(period="15m"), mock_ohlcv(START, 200))
+    save_ohlcv(
+        manager.base_dir,
+        make_loc(symbol="ETH/USDT", period="1h"),
+        mock_ohlcv(START, 48, HOUR),
+    )
+    return manager
+
+
+def request(fmt: str, **kwargs) -> ExportRequest:
+    return ExportRequest.model_validate(
+        {
+            "items": [
+                make_loc(period="15m").model_dump(),
+                make_loc(symbol="ETH/USDT", period="1h").model_dump(),
+            ],
+            "format": fmt,
+            **kwargs,
+        }
+    )
+
+
+def run(manager: ExportManager, params: ExportRequest) -> bytes:
+    """创建并下载导出 (边生成边读取)"""
+    job = manager.create(params)
+    manager.start(job)
+
+    async def collect():
+        return b"".join([chunk async for chunk in manager.stream(job)])
+
+    body = asyncio.run(collect())
+    assert job.complete
+    assert body == job.path.read_bytes()
+    return body
+
+
+class TestOhlcvExport:
+    def test_parquet_with_time_range(self, exports):
+        end = START + 24 * HOUR - 1
+        body = run(exports, request("parquet", since=START + HOUR, end=end))
+        df = pl.read_parquet(io.BytesIO(body))
+
+        assert df.columns[:6] == [
+            "exchange",
+            "mode",
+            "market",
+            "symbol",
+            "period",
+            "time",
+        ]
+        counts = dict(df.group_by("symbol").len().iter_rows())
+        assert counts == {"BTC/USDT": 92, "ETH/USDT": 23}
+        assert df["time"].min() == START + HOUR
+        assert df["time"].max() <= end
+
+    def test_arrow_stream(self, exports):
+        body = run(exports, request("arrow"))
+        table = pa.ipc.open_stream(body).read_all()
+        assert table.num_rows == 248
+        assert table.schema.field("time").type == pa.int64()
+
+    def test_zip_mirrors_cache_layout(self, exports):
+        body = run(exports, request("zip", end=START + 10 * HOUR))
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            names = zf.namelist()
+            prefix = "binance/live/future/BTC_USDT/15m"
+            assert f"{prefix}/2023-01.parquet" in names
+            assert f"{prefix}/2023-02.parquet" not in names  # 超出 end 的分块不导出
+            log = [
+                json.loads(line)
+                for line in zf.read(f"{prefix}/fetch_log.jsonl").splitlines()
+            ]
+            assert (log[0]["data_start"], log[0]["data_end"]) == (
+                START,
+                START + 10 * HOUR,
+            )
+            manifest = json.loads(zf.read("manifest.json"))
+            assert [item["rows"] for item in manifest["items"]] == [41, 11]
+
+    def test_id_is_stable_until_data_changes(self, exports):
+        first = exports.create(request("parquet"))
+        exports.start(first)
+        first.done.wait()
+        assert exports.create(request("parquet")) is first
+        assert exports.create(request("zip")).id != first.id
+
+        save_ohlcv(
+            exports.base_dir,
+            make_loc(period="15m"),
+            mock_ohlcv(START + 200 * 900000, 1),
+        )
+        changed = exports.create(request("parquet"))
+        assert changed.id != first.id
+
+        # 重启后从磁盘恢复已完成的导出
+        restarted = ExportManager()
+        restarted.configure({"export": exports.settings}, base_dir=exports.base_dir)
+        restored = restarted.get(first.id)
+        assert restored.complete and restored.size == first.path.stat().st_size
+        assert restarted.get("../etc") is None
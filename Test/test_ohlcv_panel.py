@@ -0,0 +1,135 @@
+import pytest
+
+from src.cache_tool.storage import read_ohlcv, save_ohlcv
+from src.tools.ohlcv_panel import build_panel, grid_start, panel_column
+
+from .utils import make_loc, mock_ohlcv
+
+HOUR = 3600 * 1000
+# 2023-01-01 00:00 UTC
+JAN = 1_672_531_200_000
+
+
+@pytest.fixture
+def locs(temp_dir):
+    locs = {
+        symbol: make_loc(symbol=symbol, period="1h")
+        for symbol in ("BTC/USDT", "ETH/USDT", "SOL/USDT")
+    }
+    save_ohlcv(temp_dir, locs["BTC/USDT"], mock_ohlcv(JAN, 24, HOUR))
+    # ETH 缺第 5~7 根 (日志中为两段)
+    eth = mock_ohlcv(JAN, 24, HOUR)
+    save_ohlcv(temp_dir, locs["ETH/USDT"], eth.head(5))
+    save_ohlcv(temp_dir, locs["ETH/USDT"], eth.tail(16))
+    # SOL 从第 3 根开始上市
+    save_ohlcv(temp_dir, locs["SOL/USDT"], mock_ohlcv(JAN + 3 * HOUR, 21, HOUR))
+    return locs
+
+
+class TestOhlcvPanel:
+    def test_grid_alignment(self):
+        assert grid_start(JAN, "1h") == JAN
+        assert grid_start(JAN + 1, "1h") == JAN + HOUR
+        # 2023-01-02 是周一
+        assert grid_start(JAN, "1w") == JAN + 24 * HOUR
+
+    def test_forward_fill_with_limit(self, temp_dir, locs):
+        del locs["ETH/USDT"]
+        calls = []
+
+        def fetch(loc):
+            # 交易所没有上市前的数据，返回缓存中的全部
+            calls.append(loc.symbol)
+            return read_ohlcv(temp_dir, loc, JAN, JAN + 23 * HOUR)
+
+        result = build_panel(
+            temp_dir,
+            locs,
+            JAN,
+            JAN + 23 * HOUR,
+            fetch,
+            fields=["close", "volume"],
+            fill="both",
+            fill_limit=2,
+        )
+        # 缓存完整覆盖的品种不请求网络
+        assert calls == ["SOL/USDT"]
+        df = result.frame
+        assert df.columns == [
+            "time",
+            "close:BTC/USDT",
+            "volume:BTC/USDT",
+            "close:SOL/USDT",
+            "volume:SOL/USDT",
+        ]
+        assert df["time"].to_list() == [JAN + i * HOUR for i in range(24)]
+        # 上市前 3 根: 第 1 根超出 fill_limit 保持 null，其余用首根开盘价、成交量 0
+        assert df[panel_column("close", "SOL/USDT")][:4].to_list() == [
+            None,
+            100.0,
+            100.0,
+            102.0,
+        ]
+        assert df[panel_column("volume", "SOL/USDT")][1] == 0.0
+        assert result.symbols[1] == {
+            "symbol": "SOL/USDT",
+            "rows": 21,
+            "filled": 2,
+            "fetched": True,
+            "error": None,
+            "elapsed_ms": result.symbols[1]["elapsed_ms"],
+        }
+        assert result.symbols[0]["elapsed_ms"] is None
+
+    def test_gaps_are_fetched_concurrently(self, temp_dir, locs):
+        calls = []
+
+        def fetch(loc):
+            calls.append(loc.symbol)
+            if loc.symbol == "SOL/USDT":
+                raise RuntimeError("exchange down")
+            # 补齐缺口后返回区间内的全部 K 线
+            save_ohlcv(temp_dir, loc, mock_ohlcv(JAN, 24, HOUR))
+            return mock_ohlcv(JAN, 24, HOUR)
+
+        result = build_panel(
+            temp_dir,
+            locs,
+            JAN,
+            JAN + 23 * HOUR,
+            fetch,
+            fields=["close"],
+            fill="none",
+            how="inner",
+        )
+        assert sorted(calls) == ["ETH/USDT", "SOL/USDT"]
+        # SOL 失败时退回缓存，inner 只保留三个品种都有数据的周期
+        assert result.frame["time"][0] == JAN + 3 * HOUR
+        assert len(result.frame) == 21
+        info = {item["symbol"]: item for item in result.symbols}
+        assert info["ETH/USDT"]["fetched"] and info["ETH/USDT"]["rows"] == 24
+        assert "exchange down" in info["SOL/USDT"]["error"]
+        assert info["SOL/USDT"]["rows"] == 21
+
+    def test_forward_fill_inside_gap(self, temp_dir, locs):
+        def fetch(loc):
+            raise RuntimeError("circuit open")
+
+        result = build_panel(
+            temp_dir,
+            {"ETH/USDT": locs["ETH/USDT"]},
+            JAN,
+            JAN + 23 * HOUR,
+            fetch,
+            fields=["open", "high", "close", "volume"],
+        )
+        row = result.frame.row(6, named=True)
+        # 缺失的周期沿用上一根收盘价，成交量为 0
+        assert row == {
+            "time": JAN + 6 * HOUR,
+            "open:ETH/USDT": 106.0,
+            "high:ETH/USDT": 106.0,
+            "close:ETH/USDT": 106.0,
+            "volume:ETH/USDT": 0.0,
+        }
+        assert result.symbols[0]["filled"] == 3
@@ -0,0 +1,110 @@
+import pyarrow as pa
+import pytest
+
+from src.cache_tool.storage import save_ohlcv
+from src.tools.ohlcv_query import OhlcvQueryEngine, QueryError, QueryTimeout, check_sql
+
+from .utils import make_loc, mock_ohlcv
+
+DAY = 24 * 3600 * 1000
+# 2023-01-01 00:00 UTC
+JAN = 1_672_531_200_000
+
+
+@pytest.fixture
+def engine(temp_dir):
+    engine = OhlcvQueryEngine()
+    engine.configure({}, base_dir=temp_dir)
+    for symbol in ("BTC/USDT:USDT", "ETH/USDT:USDT"):
+        save_ohlcv(
+            temp_dir, make_loc(symbol=symbol, period="1d"), mock_ohlcv(JAN, 60, DAY)
+        )
+    save_ohlcv(
+        temp_dir,
+        make_loc(market="spot", symbol="BTC/USDT", period="1d"),
+        mock_ohlcv(JAN, 5, DAY),
+    )
+    return engine
+
+
+class TestOhlcvQuery:
+    def test_cross_symbol_query(self, engine):
+        result = engine.execute(
+            f"""
+            SELECT symbol, count(*) AS days, max(high - low) AS max_range
+            FROM ohlcv
+            WHERE market = 'future' AND period = '1d' AND symbol LIKE '%_USDT_USDT'
+              AND time >= {JAN + 31 * DAY}
+            GROUP BY symbol ORDER BY symbol
+            """
+        )
+        assert result.frame.rows() == [
+            ("BTC_USDT_USDT", 29, 10.0),
+            ("ETH_USDT_USDT", 29, 10.0),
+        ]
+        assert not result.truncated
+
+    def test_partition_filter_is_pushed_down(self, engine):
+        """分区列的过滤下推到 dataset，只扫描匹配的目录"""
+        plan = engine.table().filter(market="spot").explain()
+        assert 'SELECTION: [(col("market")) == ("spot")]' in plan or (
+            'col("market") == "spot"' in plan
+        )
+        assert (
+            len(engine.execute("SELECT * FROM ohlcv WHERE market = 'spot'").frame) == 5
+        )
+
+    def test_read_only(self):
+        for sql in (
+            "DROP TABLE ohlcv",
+            "CREATE TABLE x AS SELECT 1",
+            "SELECT 1; DROP TABLE ohlcv",
+            "SELECT * FROM read_parquet('/etc/passwd')",
+            "/* x */ DELETE FROM ohlcv",
+        ):
+            with pytest.raises(QueryError):
+                check_sql(sql)
+        assert check_sql(" select 1; ") == "select 1"
+        # 字符串和注释中的分号、read_ 不影响
+        sql = "SELECT 'a;read_csv(' AS x -- ; x"
+        assert check_sql(sql) == sql
+
+    def test_table_function_bypasses(self, engine, tmp_path):
+        secret = tmp_path / "secret.csv"
+        secret.write_text("a,b\n1,2\n")
+        for sql in (
+            f"SELECT * FROM \"read_csv\"('{secret}')",
+            f"SELECT * FROM `READ_CSV`('{secret}')",
+            f"SELECT * FROM read_csv/**/('{secret}')",
+            f"SELECT * FROM READ_CSV -- x\n('{secret}')",
+            # 嵌套注释: Polars 视为一整段注释，不能把其中的引号当作字符串开头
+            f"SELECT * FROM /* /* */ ' */ read_csv('{secret}') --'",
+            f"SELECT $$ ' $$ AS x, * FROM read_csv('{secret}') --'",
+        ):
+            with pytest.raises(QueryError, match="表函数"):
+                engine.execute(sql)
+
+    def test_errors_and_limits(self, engine):
+        with pytest.raises(QueryError):
+            engine.execute("SELECT missing_column FROM ohlcv")
+
+        engine.settings["max_rows"] = 10
+        result = engine.execute("SELECT * FROM ohlcv ORDER BY time")
+        assert result.truncated and len(result.frame) == 10
+
+        engine.settings["timeout"] = 1e-6
+        with pytest.raises(QueryTimeout):
+            engine.execute(
+                "SELECT a.time FROM ohlcv a CROSS JOIN ohlcv b CROSS JOIN ohlcv c"
+            )
+
+    def test_ipc_stream_batches(self, engine):
+        engine.settings["batch_rows"] = 50
+        result = engine.execute(
+            "SELECT symbol, time, close FROM ohlcv ORDER BY symbol, time"
+        )
+        chunks = list(engine.ipc_stream(result.frame))
+        assert len(chunks) > 3
+        table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+        assert table.num_rows == 125
+        assert table.column_names == ["symbol", "time", "close"]
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from src.cache_tool.config import get_data_dir
+from src.cache_tool.entry import find_missing_segments
+from src.cache_tool.log_manager import compact_log, read_log
+from src.cache_tool.storage import read_ohlcv
+from src.cache_tool.write_behind import write_behind
+from src.tools.lanes import lane_manager
+from src.tools.ohlcv_stream import (
+    OhlcvFeed,
+    OhlcvStreamManager,
+    StreamKey,
+    Subscriber,
+)
+
+KEY = StreamKey("binance", "future", "sandbox", "BTC/USDT", "15m")
+P = 900000
+
+
+def candle(t: int, close: float) -> list[float]:
+    return [t, 1.0, 2.0, 0.5, close, 10.0]
+
+
+class ScriptedSource:
+    """按顺序返回预设结果 (最后一个结果重复使用)，记录每次调用的 since"""
+
+    def __init__(self, responses: list):
+        self.responses = responses
+        self.calls: list[int | None] = []
+
+    def fetch(self, key, since, limit):
+        self.calls.append(since)
+        response = self.responses[min(len(self.calls), len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def streams(temp_dir):
+    lane_manager.configure({})
+    manager = OhlcvStreamManager()
+    # 轮询间隔足够长，测试中手动调用 poll()
+    manager.configure({"ohlcv_stream": {"poll_interval": 3600}}, base_dir=temp_dir)
+    return manager
+
+
+def drain(subscriber: Subscriber) -> list[dict]:
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+class TestOhlcvStream:
+    def test_fan_out_and_persist_closed_candles(self, streams, temp_dir, sample_loc):
+        source = ScriptedSource(
+            [
+                [candle(0, 1.0), candle(P, 1.1)],
+                [candle(P, 1.2)],
+                [candle(P, 1.3), candle(2 * P, 1.4)],
+            ]
+        )
+        streams.set_source(source)
+
+        async def main():
+            a = streams.subscribe(KEY)
+            b = streams.subscribe(KEY)
+            await asyncio.sleep(0.05)  # 首次轮询
+            feed = streams._feeds[KEY]
+            await feed.poll()
+            await feed.poll()
+
+            # 后来的订阅者立即收到当前 K 线
+            late = streams.subscribe(KEY)
+            assert [e["candle"] for e in drain(late)] == [candle(2 * P, 1.4)]
+
+            events_a, events_b = drain(a), drain(b)
+            for sub in (a, b, late):
+                streams.unsubscribe(KEY, sub)
+            await asyncio.sleep(0)
+            return feed, events_a, events_b
+
+        feed, events_a, events_b = asyncio.run(main())
+
+        assert events_a == events_b
+        assert [(e["candle"][0], e["candle"][4], e["closed"]) for e in events_a] == [
+            (P, 1.1, False),
+            (P, 1.2, False),
+            (P, 1.3, True),
+            (2 * P, 1.4, False),
+        ]
+        # 首次轮询不带 since，之后从当前 K 线开始拉取
+        assert source.calls == [None, P, P]
+        assert streams._feeds == {}
+        assert feed.task.cancelled()
+
+        # 收盘 K 线写入缓存 (sandbox -> demo 目录)
+        write_behind.flush()
+        loc = sample_loc.model_copy(update={"mode": "demo"})
+        cached = read_ohlcv(temp_dir, loc, 0, 3 * P)
+        assert cached["time"].to_list() == [P]
+        assert cached["close"].to_list() == [1.3]
+
+    def test_poll_error_is_broadcast(self, streams):
+        streams.set_source(ScriptedSource([RuntimeError("boom")]))
+
+        async def main():
+            sub = streams.subscribe(KEY)
+            await asyncio.sleep(0.05)
+            events = drain(sub)
+            streams.unsubscribe(KEY, sub)
+            return events
+
+        (event,) = asyncio.run(main())
+        assert event == {"event": "error", "error": "RuntimeError: boom"}
+
+    def test_slow_subscriber_overflows(self):
+        async def main():
+            sub = Subscriber(max_queue=2)
+            for i in range(3):
+                sub.push({"event": "candle", "i": i})
+            return sub, drain(sub)
+
+        sub, events = asyncio.run(main())
+        assert sub.overflowed
+        assert events == [None]
+
+    def test_events_heartbeat_and_unsubscribe(self, streams):
+        streams.settings["heartbeat"] = 0.01
+        streams.set_source(ScriptedSource([[]]))
+
+        async def main():
+            stream = streams.events(KEY)
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        assert asyncio.run(main()) is None
+        assert streams._feeds == {}
+
+    def test_streamed_closes_merge_into_one_log_entry(
+        self, streams, temp_dir, sample_loc
+    ):
+        """逐根收盘写入的日志首尾衔接，合并后为一段，区间请求不再认为有缺口"""
+        streams.set_source(
+            ScriptedSource(
+                [[candle(i * P, 1.0), candle((i + 1) * P, 1.0)] for i in range(6)]
+            )
+        )
+        feed = OhlcvFeed(KEY, streams)
+
+        async def main():
+            for _ in range(6):
+                await feed.poll()
+                write_behind.flush()
+
+        asyncio.run(main())
+
+        loc = sample_loc.model_copy(update={"mode": "demo"})
+        data_dir = get_data_dir(
+            temp_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+        )
+        compact_log(data_dir)
+        (entry,) = read_log(data_dir)
+        assert (entry.data_start, entry.data_end) == (P, 5 * P)
+        assert find_missing_segments(read_log(data_dir), P, 5 * P, P) == []
+        assert feed.persisted == 5
@@ -0,0 +1,42 @@
+from src.tools.order_index import OrderIndex
+
+
+class TestOrderIndex:
+    def test_record_and_lookup(self, temp_dir):
+        index = OrderIndex(temp_dir / "order_index.jsonl")
+        index.record("binance", "future", "live", ["1", "2"], "stop")
+
+        assert index.lookup("binance", "future", "live", "1") == "stop"
+        assert index.lookup("binance", "future", "sandbox", "1") is None
+        assert index.lookup("binance", "future", "live", "3") is None
+
+    def test_persisted_across_instances(self, temp_dir):
+        """重启后从文件恢复索引"""
+        path = temp_dir / "order_index.jsonl"
+        OrderIndex(path).record("binance", "future", "live", ["1"], "stop")
+        OrderIndex(path).record("binance", "future", "live", ["1"], "normal")
+
+        assert OrderIndex(path).lookup("binance", "future", "live", "1") == "normal"
+
+    def test_bounded(self, temp_dir):
+        """超出上限后淘汰最早的记录，文件被压缩"""
+        path = temp_dir / "order_index.jsonl"
+        index = OrderIndex(path, max_entries=3)
+        for i in range(10):
+            index.record("binance", "future", "live", [str(i)], "stop")
+
+        assert index.lookup("binance", "future", "live", "0") is None
+        assert index.lookup("binance", "future", "live", "9") == "stop"
+        assert len(path.read_text().splitlines()) <= 6
+
+        reloaded = OrderIndex(path, max_entries=3)
+        assert reloaded.lookup("binance", "future", "live", "6") is None
+        assert reloaded.lookup("binance", "future", "live", "7") == "stop"
+
+    def test_corrupted_line_skipped(self, temp_dir):
+        path = temp_dir / "order_index.jsonl"
+        OrderIndex(path).record("binance", "future", "live", ["1"], "stop")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("{broken\n")
+
+        assert OrderIndex(path).lookup("binance", "future", "live", "1") == "stop"
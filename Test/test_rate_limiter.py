@@ -0,0 +1,145 @@
+import threading
+import time
+
+from src.tools.rate_limiter import (
+    PRIORITY_BACKFILL,
+    PRIORITY_ORDER,
+    RateLimitScheduler,
+    SharedTokenBucket,
+    rate_priority,
+)
+
+
+class FakeExchange:
+    """只实现 install 用到的 ccxt 接口"""
+
+    apiKey = "key"
+
+    def __init__(self):
+        self.requests = []
+
+    def calculate_rate_limiter_cost(self, api, method, path, params, config):
+        return config.get("cost", 1)
+
+    def fetch2(
+        self,
+        path,
+        api="public",
+        method="GET",
+        params={},
+        headers=None,
+        body=None,
+        config={},
+    ):
+        self.requests.append((path, method))
+        return {}
+
+
+def make_scheduler(temp_dir, capacity, per_second):
+    scheduler = RateLimitScheduler()
+    scheduler.configure(
+        {
+            "rate_limit": {
+                "enabled": True,
+                "state_dir": str(temp_dir),
+                "buckets": {
+                    "binance": {
+                        "weight": {"capacity": capacity, "per_second": per_second},
+                        "order": {"capacity": capacity, "per_second": per_second},
+                    }
+                },
+            }
+        }
+    )
+    return scheduler
+
+
+class TestRateLimiter:
+    def test_bucket_shared_through_file(self, temp_dir):
+        """两个实例 (模拟两个 worker) 共享同一个令牌桶"""
+        path = temp_dir / "bucket.json"
+        a = SharedTokenBucket(path, capacity=10, per_second=1)
+        b = SharedTokenBucket(path, capacity=10, per_second=1)
+
+        assert a.try_acquire(6) == 0
+        wait = b.try_acquire(6)
+        assert 1.5 < wait <= 2.1
+
+    def test_penalize_blocks_refill(self, temp_dir):
+        bucket = SharedTokenBucket(
+            temp_dir / "bucket.json", capacity=10, per_second=100
+        )
+        bucket.penalize(1.0)
+        assert bucket.try_acquire(1) >= 0.9
+
+    def test_priority_order(self, temp_dir):
+        """令牌不足时，高优先级 (下单) 先于回补请求出队"""
+        scheduler = make_scheduler(temp_dir, capacity=1, per_second=10)
+        scheduler.acquire("binance", "k", "weight", 1, PRIORITY_BACKFILL)
+
+        served = []
+
+        def worker(name, priority):
+            scheduler.acquire("binance", "k", "weight", 1, priority)
+            served.append(name)
+
+        threads = [
+            threading.Thread(target=worker, args=(f"backfill{i}", PRIORITY_BACKFILL))
+            for i in range(3)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.02)
+        order_thread = threading.Thread(target=worker, args=("order", PRIORITY_ORDER))
+        order_thread.start()
+        for t in threads + [order_thread]:
+            t.join()
+
+        # 队首的回补可能已在等待令牌，但下单最迟第二个出队
+        assert served.index("order") <= 1
+
+    def test_install_wraps_fetch2(self, temp_dir):
+        scheduler = make_scheduler(temp_dir, capacity=2, per_second=20)
+        exchange = FakeExchange()
+        scheduler.install(exchange, "binance")
+
+        start = time.perf_counter()
+        with rate_priority(PRIORITY_BACKFILL):
+            for _ in range(4):
+                exchange.fetch2("klines", config={"cost": 1})
+        elapsed = time.perf_counter() - start
+
+        assert len(exchange.requests) == 4
+        # 容量 2，之后每 0.05s 一个令牌
+        assert elapsed >= 0.08
+
+    def test_disabled_is_noop(self, temp_dir):
+        scheduler = RateLimitScheduler()
+        scheduler.configure({})
+        exchange = FakeExchange()
+        original = exchange.fetch2
+        scheduler.install(exchange, "binance")
+        assert exchange.fetch2 == original
+
+    def test_penalize_drains_all_classes(self, temp_dir):
+        """行情请求触发 429 后，下单桶同样进入惩罚期"""
+        scheduler = make_scheduler(temp_dir, capacity=10, per_second=100)
+        scheduler.penalize("binance", "k", "weight")
+        for endpoint_class in ("weight", "order"):
+            _, bucket = scheduler._get_bucket("binance", "k", endpoint_class)
+            assert bucket.try_acquire(1) >= 4
+
+    def test_bucket_io_outside_condition(self, temp_dir, monkeypatch):
+        """读写令牌桶文件时不持有调度器的 Condition"""
+        scheduler = make_scheduler(temp_dir, capacity=10, per_second=10)
+        _, bucket = scheduler._get_bucket("binance", "k", "weight")
+        held = []
+        original = bucket.try_acquire
+
+        def try_acquire(weight):
+            held.append(scheduler._cond._is_owned())
+            return original(weight)
+
+        monkeypatch.setattr(bucket, "try_acquire", try_acquire)
+        scheduler.acquire("binance", "k", "weight", 1, PRIORITY_ORDER)
+        assert held == [False]
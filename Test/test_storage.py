@@ -209,3 +209,52 @@ class TestStorage:
         file_names = [f.stem for f in parquet_files]
         assert "2020s" in file_names, "2023年应分块到 2020s.parquet"
         assert "2030s" in file_names, "2030年应分块到 2030s.parquet"
+
+    def test_range_read_skips_other_partitions(self, temp_dir, monkeypatch):
+        """带时间范围读取时只打开范围内的分块文件"""
+        from datetime import datetime, timezone
+
+        loc = make_loc(period="1h")
+        times = [
+            int(datetime(year, 6, 1, tzinfo=timezone.utc).timestamp() * 1000)
+            for year in (2021, 2022, 2023)
+        ]
+        save_ohlcv(
+            temp_dir, loc, pl.DataFrame({"time": times, "close": [1.0, 2.0, 3.0]})
+        )
+
+        opened = []
+        read_parquet = pl.read_parquet
+        monkeypatch.setattr(
+            pl, "read_parquet", lambda f: opened.append(f.stem) or read_parquet(f)
+        )
+        df = read_ohlcv(temp_dir, loc, start_time=times[1], end_time=times[1])
+        assert df["close"].to_list() == [2.0]
+        assert opened == ["2022"]
+
+    def test_failed_write_keeps_existing_file(self, temp_dir, sample_loc, monkeypatch):
+        """写入中途失败时原文件保持完整，不留下临时文件"""
+        data = mock_ohlcv(start=1000000, count=10)
+        save_ohlcv(temp_dir, sample_loc, data)
+
+        def broken_write(self, path, *args, **kwargs):
+            Path(path).write_bytes(b"PAR1")
+            raise OSError("disk full")
+
+        monkeypatch.setattr(pl.DataFrame, "write_parquet", broken_write)
+        with pytest.raises(OSError):
+            save_ohlcv(temp_dir, sample_loc, mock_ohlcv(start=1000000, count=20))
+        monkeypatch.undo()
+
+        assert read_ohlcv(temp_dir, sample_loc)["time"].to_list() == (
+            data["time"].to_list()
+        )
+        data_dir = get_data_dir(
+            temp_dir,
+            sample_loc.exchange,
+            sample_loc.mode,
+            sample_loc.market,
+            sample_loc.symbol,
+            sample_loc.period,
+        )
+        assert [p.suffix for p in data_dir.iterdir() if p.suffix == ".tmp"] == []
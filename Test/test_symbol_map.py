@@ -0,0 +1,30 @@
+from src.tools.symbol_map import SymbolMap
+
+
+class TestSymbolMap:
+    def test_default_templates(self):
+        symbols = SymbolMap()
+        assert symbols.resolve("btc", "binance", "future") == "BTC/USDT:USDT"
+        assert symbols.resolve("BTC", "kraken", "future") == "BTC/USD:USD"
+        assert symbols.resolve("ETH", "kraken", "spot") == "ETH/USD"
+        assert symbols.resolve("BTC", "okx", "future") is None
+
+    def test_config_overrides(self):
+        symbols = SymbolMap()
+        symbols.configure(
+            {
+                "symbol_map": {
+                    "templates": {"okx": {"future": "{base}/USDT:USDT"}},
+                    "instruments": {"btc": {"kraken": {"spot": "XBT/USD"}}},
+                }
+            }
+        )
+        assert symbols.resolve("BTC", "kraken", "spot") == "XBT/USD"
+        # 没有覆盖的市场仍使用模板
+        assert symbols.resolve("BTC", "kraken", "future") == "BTC/USD:USD"
+        assert symbols.resolve("SOL", "okx", "future") == "SOL/USDT:USDT"
+
+        # 重新配置时恢复默认模板
+        symbols.configure({})
+        assert symbols.resolve("BTC", "kraken", "spot") == "BTC/USD"
+        assert symbols.resolve("BTC", "okx", "future") is None
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src import tracing
+from src.cache_tool.entry import get_ohlcv_with_cache
+from src.tools.lanes import Lane
+from .utils import mock_ohlcv
+
+
+class TestTracing:
+    def test_span_is_noop_without_trace(self):
+        """未开启追踪时 span 不记录任何内容"""
+        with tracing.span("x") as s:
+            s.set(rows=1)
+        assert tracing.current_trace() is None
+
+    def test_server_timing_merges_same_stage(self):
+        trace = tracing.Trace("GET /x")
+        trace.add("fetch_page", 0.0, 0.010)
+        trace.add("fetch_page", 1.0, 1.005)
+        trace.add("save_ohlcv", 2.0, 2.002)
+
+        assert trace.server_timing() == (
+            'fetch_page;dur=15.00;desc="x2", save_ohlcv;dur=2.00'
+        )
+
+    def test_spans_propagate_into_lane_threads(self):
+        """通道线程复制了请求上下文，线程中的 span 记入同一个 trace"""
+        lane = Lane("market_data", workers=1, max_queue=4, priority=0)
+
+        def work():
+            with tracing.span("inner", rows=3):
+                return 1
+
+        async def main():
+            token = tracing.start_trace("test")
+            try:
+                await lane.run(work)
+                return tracing.current_trace()
+            finally:
+                tracing.end_trace(token)
+
+        trace = asyncio.run(main())
+        names = [s[0] for s in trace.spans]
+        assert names == ["lane_queue", "inner"]
+        assert trace.spans[1][4] == {"rows": 3}
+
+    def test_cache_pipeline_stages(self, temp_dir, sample_loc, period_ms, cache_hooks):
+        """缓存命中一段 + 两页网络请求，记录各阶段"""
+        start = 900000
+        get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start,
+            10,
+            lambda symbol, period, start_time, count, **kw: mock_ohlcv(
+                start_time, count, period_ms
+            ),
+        )
+
+        def fetch(symbol, period, start_time, count, **kw):
+            return mock_ohlcv(start_time, min(count, 1500), period_ms)
+
+        token = tracing.start_trace("test")
+        try:
+            result = get_ohlcv_with_cache(temp_dir, sample_loc, start, 2000, fetch)
+            trace = tracing.current_trace()
+        finally:
+            tracing.end_trace(token)
+
+        assert len(result) == 2000
+        names = [s[0] for s in trace.spans]
+        for stage in (
+            "write_behind_flush",
+            "lock_wait",
+            "compact_log",
+            "read_log",
+            "cache_read",
+            "dedupe",
+            "save_ohlcv",
+        ):
+            assert stage in names
+        pages = [s[4] for s in trace.spans if s[0] == "fetch_page"]
+        assert [p["page"] for p in pages] == [1, 2]
+        assert pages[0]["rows"] == 1500
+
+    def test_middleware(self, temp_dir, monkeypatch):
+        """X-Trace 或 trace=1 开启: 返回 Server-Timing 并写入 Chrome trace 文件"""
+        app = FastAPI()
+        app.middleware("http")(tracing.trace_middleware)
+
+        @app.get("/ping")
+        async def ping():
+            with tracing.span("handler"):
+                return {"ok": True}
+
+        monkeypatch.setattr(tracing, "TRACE_DIR", temp_dir / "traces")
+        client = TestClient(app)
+        assert "Server-Timing" not in client.get("/ping").headers
+
+        r = client.get("/ping", headers={"X-Trace": "1"})
+        timing = r.headers["Server-Timing"]
+        assert "handler;dur=" in timing
+        assert "serialize;dur=" in timing
+        assert "request;dur=" in timing
+        assert "Server-Timing" in client.get("/ping?trace=1").headers
+
+        assert len(list((temp_dir / "traces").glob("*.json"))) == 2
+        (path,) = (temp_dir / "traces").glob(f"*_{r.headers['X-Trace-Id']}.json")
+        data = json.loads(path.read_text())
+        assert [e["name"] for e in data["traceEvents"]] == [
+            "handler",
+            "serialize",
+            "request",
+        ]
+        assert {e["ph"] for e in data["traceEvents"]} == {"X"}
+
+    def test_trace_files_pruned(self, temp_dir, monkeypatch):
+        """追踪目录只保留最近的 MAX_TRACE_FILES 份"""
+        monkeypatch.setattr(tracing, "MAX_TRACE_FILES", 3)
+        trace_dir = temp_dir / "traces"
+        paths = []
+        for i in range(5):
+            path = tracing.Trace(f"GET /{i}").write(trace_dir)
+            os.utime(path, (1000 + i, 1000 + i))
+            paths.append(path)
+
+        assert sorted(trace_dir.glob("*.json")) == sorted(paths[2:])
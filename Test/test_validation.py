@@ -0,0 +1,176 @@
+import json
+
+import polars as pl
+
+from src.cache_tool.config import get_data_dir
+from src.cache_tool import write_behind as write_behind_module
+from src.cache_tool.entry import find_missing_segments, get_ohlcv_with_cache
+from src.cache_tool.log_manager import read_log
+from src.cache_tool.storage import read_ohlcv
+from src.cache_tool.validation import (
+    QUARANTINE_DIR,
+    OhlcvValidator,
+    ohlcv_validator,
+    validate_ohlcv,
+)
+from src.cache_tool.write_behind import write_behind
+
+from .utils import mock_ohlcv
+
+PERIOD_MS = 900000
+# 2023-01-01 00:00 UTC
+JAN = 1_672_531_200_000
+
+
+class TestValidation:
+    def test_checks(self):
+        assert validate_ohlcv(mock_ohlcv(JAN, 50), "15m").ok
+
+        bad = mock_ohlcv(JAN, 10).with_columns(
+            high=pl.when(pl.int_range(10) == 1).then(0.0).otherwise(pl.col("high")),
+            volume=pl.when(pl.int_range(10) == 2)
+            .then(-1.0)
+            .otherwise(pl.col("volume")),
+            close=pl.when(pl.int_range(10) == 5)
+            .then(float("nan"))
+            .otherwise(pl.col("close")),
+        )
+        bad = pl.concat([bad, bad.tail(1)])
+        report = validate_ohlcv(bad, "15m")
+        assert report.problems == {
+            "non_finite": 1,
+            "high": 1,
+            "price": 1,
+            "volume": 1,
+            "duplicate": 2,
+        }
+        assert "1 行 high < max(open, close)" in report.summary()
+
+        unaligned = mock_ohlcv(JAN + 1000, 3)
+        assert validate_ohlcv(unaligned, "15m").problems == {"unaligned": 3}
+        # 周线从周一开始 (2023-01-02)
+        assert validate_ohlcv(mock_ohlcv(JAN + 86400000, 3, 7 * 86400000), "1w").ok
+
+    def test_spike_only_flags_isolated_moves(self):
+        closes = [100.0, 101.0, 300.0, 102.0, 101.0, 20.0, 19.0, 18.0]
+        df = pl.DataFrame(
+            {
+                "time": [JAN + i * PERIOD_MS for i in range(len(closes))],
+                "open": closes,
+                "high": closes,
+                "low": closes,
+                "close": closes,
+                "volume": [1.0] * len(closes),
+            }
+        )
+        # 300 随后回落为尖刺; 跌到 20 后没有回升，是行情而不是尖刺
+        assert validate_ohlcv(df, "15m").problems == {"spike": 1}
+        assert validate_ohlcv(df, "15m", spike_ratio=None).ok
+
+    def test_flagged_rows_are_quarantined(self, temp_dir, sample_loc):
+        calls = []
+
+        def bad_fetch(symbol, period, start_time, count, **kwargs):
+            calls.append(start_time)
+            # 第 3、4 根 low 高于 high
+            flagged = pl.col("time").is_in([JAN + 3 * PERIOD_MS, JAN + 4 * PERIOD_MS])
+            return mock_ohlcv(start_time, count).with_columns(
+                low=pl.when(flagged).then(pl.col("high") + 1).otherwise(pl.col("low"))
+            )
+
+        end = JAN + 9 * PERIOD_MS
+        for _ in range(3):
+            result = get_ohlcv_with_cache(
+                temp_dir, sample_loc, JAN, 10, bad_fetch, end_time=end
+            )
+            # 有问题的行不写入缓存，也不返回
+            assert len(result) == 8
+            assert JAN + 3 * PERIOD_MS not in result["time"]
+
+        # 隔离的行记入覆盖范围，之后的请求直接读缓存，不再重复获取和隔离
+        assert calls == [JAN]
+        data_dir = get_data_dir(
+            temp_dir, "binance", "live", "future", "BTC/USDT", "15m"
+        )
+        assert len(read_ohlcv(temp_dir, sample_loc)) == 8
+        assert find_missing_segments(read_log(data_dir), JAN, end, PERIOD_MS) == []
+        (quarantined,) = (data_dir / QUARANTINE_DIR).glob("*-api.parquet")
+        flagged = pl.read_parquet(quarantined)
+        assert flagged["time"].to_list() == [JAN + 3 * PERIOD_MS, JAN + 4 * PERIOD_MS]
+        assert flagged["check_low"].all()
+        meta = json.loads(quarantined.with_suffix(".json").read_text(encoding="utf-8"))
+        assert meta["problems"] == {"low": 2}
+
+    def test_quarantined_range_expires(self, temp_dir, sample_loc, monkeypatch):
+        """隔离记录过期后只重新获取隔离行留下的缺口"""
+        calls = []
+
+        def bad_fetch(symbol, period, start_time, count, **kwargs):
+            calls.append(start_time)
+            flagged = pl.col("time") == JAN + 3 * PERIOD_MS
+            return mock_ohlcv(start_time, count).with_columns(
+                low=pl.when(flagged).then(pl.col("high") + 1).otherwise(pl.col("low"))
+            )
+
+        end = JAN + 9 * PERIOD_MS
+        get_ohlcv_with_cache(temp_dir, sample_loc, JAN, 10, bad_fetch, end_time=end)
+        monkeypatch.setitem(ohlcv_validator.settings, "quarantine_ttl", 0)
+        get_ohlcv_with_cache(temp_dir, sample_loc, JAN, 10, bad_fetch, end_time=end)
+
+        assert calls == [JAN, JAN + 2 * PERIOD_MS]
+
+    def test_failed_write_behind_does_not_mark_coverage(
+        self, temp_dir, sample_loc, monkeypatch
+    ):
+        """延迟写入失败时不记录隔离区间的覆盖，下次请求重新获取"""
+        calls = []
+
+        def bad_fetch(symbol, period, start_time, count, **kwargs):
+            calls.append(start_time)
+            return mock_ohlcv(start_time, count).with_columns(
+                volume=pl.when(pl.col("time") == JAN).then(-1.0).otherwise(1.0)
+            )
+
+        def broken_save(*args, **kwargs):
+            raise OSError("disk full")
+
+        end = JAN + 9 * PERIOD_MS
+        monkeypatch.setattr(write_behind_module, "save_ohlcv", broken_save)
+        get_ohlcv_with_cache(
+            temp_dir, sample_loc, JAN, 10, bad_fetch, write_behind=True, end_time=end
+        )
+        write_behind.flush()
+        data_dir = get_data_dir(
+            temp_dir, "binance", "live", "future", "BTC/USDT", "15m"
+        )
+        assert read_log(data_dir) == []
+
+        monkeypatch.undo()
+        get_ohlcv_with_cache(
+            temp_dir, sample_loc, JAN, 10, bad_fetch, write_behind=True, end_time=end
+        )
+        write_behind.flush()
+        assert calls == [JAN, JAN]
+        assert {e.source for e in read_log(data_dir)} == {"api", "quarantine"}
+
+    def test_quarantine_files_are_deduplicated_and_capped(self, temp_dir, sample_loc):
+        validator = OhlcvValidator()
+        validator.configure({"ohlcv_validation": {"max_files": 2}})
+        bad = mock_ohlcv(JAN, 5).with_columns(volume=pl.lit(-1.0))
+
+        # 同一批数据再次隔离时覆盖原文件
+        validator.clean(temp_dir, sample_loc, bad)
+        clean, report = validator.clean(temp_dir, sample_loc, bad)
+        assert clean.is_empty() and report.problems == {"volume": 5}
+        for i in range(1, 4):
+            validator.clean(
+                temp_dir,
+                sample_loc,
+                bad.with_columns(time=bad["time"] + i * 5 * PERIOD_MS),
+            )
+
+        data_dir = get_data_dir(
+            temp_dir, "binance", "live", "future", "BTC/USDT", "15m"
+        )
+        assert len(list((data_dir / QUARANTINE_DIR).glob("*.parquet"))) == 2
+        assert len(list((data_dir / QUARANTINE_DIR).glob("*.json"))) == 2
@@ -0,0 +1,114 @@
+import threading
+
+from src.cache_tool import storage
+from src.cache_tool import write_behind as write_behind_module
+from src.cache_tool.config import get_data_dir
+from src.cache_tool.entry import get_ohlcv_with_cache
+from src.cache_tool.log_manager import read_log
+from src.cache_tool.storage import read_ohlcv
+from src.cache_tool.write_behind import WriteBehindQueue, merge_runs
+from .utils import mock_ohlcv
+
+
+def data_dir_of(base_dir, loc):
+    return get_data_dir(
+        base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+    )
+
+
+class TestWriteBehind:
+    def test_merge_runs(self, period_ms):
+        """相邻/重叠的帧合并，不连续的分开，重叠部分保留后入队的数据"""
+        a = mock_ohlcv(1000000, 5, period_ms)
+        b = mock_ohlcv(1000000 + 4 * period_ms, 5, period_ms).with_columns(close=0.0)
+        c = mock_ohlcv(1000000 + 100 * period_ms, 3, period_ms)
+
+        runs = merge_runs([c, a, b], period_ms)
+
+        assert [len(r) for r in runs] == [9, 3]
+        assert runs[0]["close"][4] == 0.0
+
+    def test_batches_consecutive_writes(
+        self, temp_dir, sample_loc, period_ms, monkeypatch
+    ):
+        """后台线程忙时入队的多次写入合并为一次保存"""
+        queue = WriteBehindQueue()
+        release = threading.Event()
+        started = threading.Event()
+        calls = []
+        original = write_behind_module.save_ohlcv
+
+        def slow_save(base_dir, loc, data):
+            calls.append(len(data))
+            started.set()
+            release.wait(1)
+            original(base_dir, loc, data)
+
+        monkeypatch.setattr(write_behind_module, "save_ohlcv", slow_save)
+
+        queue.save(temp_dir, sample_loc, mock_ohlcv(1000000, 2, period_ms))
+        assert started.wait(1)
+        for i in range(1, 4):
+            queue.save(
+                temp_dir,
+                sample_loc,
+                mock_ohlcv(1000000 + i * 2 * period_ms, 2, period_ms),
+            )
+        release.set()
+        assert queue.flush(timeout=5)
+
+        assert calls == [2, 6]
+        assert len(read_ohlcv(temp_dir, sample_loc)) == 8
+        assert len(read_log(data_dir_of(temp_dir, sample_loc))) == 2
+
+    def test_latest_path_does_not_wait_for_write(
+        self, temp_dir, sample_loc, period_ms, monkeypatch
+    ):
+        release = threading.Event()
+        original = storage.save_ohlcv
+
+        def blocked_save(base_dir, loc, data):
+            release.wait(5)
+            original(base_dir, loc, data)
+
+        monkeypatch.setattr(write_behind_module, "save_ohlcv", blocked_save)
+
+        result = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=None,
+            count=10,
+            fetch_callback=lambda symbol, period, start_time, count, **kw: mock_ohlcv(
+                900000, count, period_ms
+            ),
+            write_behind=True,
+        )
+        assert len(result) == 10
+        assert read_ohlcv(temp_dir, sample_loc).is_empty()
+
+        release.set()
+        assert write_behind_module.write_behind.flush(timeout=5)
+        assert len(read_ohlcv(temp_dir, sample_loc)) == 10
+
+    def test_cached_read_sees_pending_writes(self, temp_dir, sample_loc, period_ms):
+        """读取缓存前先落盘，之后的请求直接命中缓存"""
+
+        def fetch(symbol, period, start_time, count, **kwargs):
+            return mock_ohlcv(start_time or 900000, count, period_ms)
+
+        get_ohlcv_with_cache(
+            temp_dir, sample_loc, None, 20, fetch_callback=fetch, write_behind=True
+        )
+
+        def fail_fetch(*args, **kwargs):
+            raise AssertionError("应该命中缓存")
+
+        result = get_ohlcv_with_cache(
+            temp_dir,
+            sample_loc,
+            start_time=900000,
+            count=10,
+            fetch_callback=fail_fetch,
+            write_behind=True,
+        )
+        assert len(result) == 10
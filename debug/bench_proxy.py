@@ -0,0 +1,422 @@
+"""
+代理整体压测 (离线)
+
+在临时目录中生成配置 (白名单项 backend=fake)，进程内启动 uvicorn，
+通过 /auth/token 登录后以固定并发驱动各场景，输出吞吐、延迟分位数和 CPU / 内存。
+
+用法:
+    just bench
+    just bench --scenarios ohlcv_hit,tickers --concurrency 32 --duration 20
+    just bench --compare debug/bench_results/<之前的结果>.json
+
+注意: 压测客户端与服务端在同一进程中，CPU 统计包含客户端线程，
+适合同一台机器上不同提交之间的横向对比，而不是绝对容量评估。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "debug" / "bench_results"
+
+SYMBOLS = ["BTC/USDT:USDT", "ETH/USDT:USDT", "SOL/USDT:USDT"]
+BASE = {"exchange_name": "binance", "market": "future", "mode": "sandbox"}
+USER, PASSWORD = "bench", "bench"
+
+# 缓存命中场景使用的固定起点 (预热阶段写入缓存)
+HIT_SINCE = 1_700_000_000_000 - 1_700_000_000_000 % 900_000
+
+# 一次请求: (方法, 路径, 查询参数或 JSON)
+Call = tuple[str, str, dict]
+
+
+class Scenario:
+    """按权重随机生成请求的场景"""
+
+    def __init__(self, name: str, mix: list[tuple[float, Callable[[int], Call]]]):
+        self.name = name
+        self.weights = [w for w, _ in mix]
+        self.makers = [m for _, m in mix]
+
+    def next_call(self, rng: random.Random, i: int) -> Call:
+        (maker,) = rng.choices(self.makers, self.weights)
+        return maker(i)
+
+
+def ohlcv_hit(i: int) -> Call:
+    symbol = SYMBOLS[i % len(SYMBOLS)]
+    params = {**BASE, "symbol": symbol, "timeframe": "15m"}
+    return ("GET", "/ccxt/fetch_ohlcv", {**params, "since": HIT_SINCE, "limit": 500})
+
+
+def ohlcv_miss(i: int) -> Call:
+    """每次请求的起点都落在尚未缓存的区间 (1m 周期，步长大于 limit)"""
+    since = 1_546_300_800_000 + i * 101 * 60_000
+    symbol = SYMBOLS[i % len(SYMBOLS)]
+    params = {**BASE, "symbol": symbol, "timeframe": "1m", "limit": 100}
+    return ("GET", "/ccxt/fetch_ohlcv", {**params, "since": since})
+
+
+def tickers(i: int) -> Call:
+    return ("GET", "/ccxt/fetch_tickers", dict(BASE))
+
+
+def balance(i: int) -> Call:
+    return ("GET", "/ccxt/fetch_balance", dict(BASE))
+
+
+def limit_order(i: int) -> Call:
+    """远离市价的限价单 (不会成交)"""
+    body = {**BASE, "symbol": SYMBOLS[0], "side": "buy", "amount": 0.001}
+    return ("POST", "/ccxt/create_limit_order", {**body, "price": 1000.0})
+
+
+def market_order(i: int) -> Call:
+    side = "buy" if i % 2 == 0 else "sell"
+    body = {**BASE, "symbol": SYMBOLS[1], "side": side, "amount": 0.01}
+    return ("POST", "/ccxt/create_market_order", body)
+
+
+def cancel_all(i: int) -> Call:
+    return ("POST", "/ccxt/cancel_all_orders", {**BASE, "symbol": SYMBOLS[0]})
+
+
+SCENARIOS = {
+    "ohlcv_hit": Scenario("ohlcv_hit", [(1, ohlcv_hit)]),
+    "ohlcv_miss": Scenario("ohlcv_miss", [(1, ohlcv_miss)]),
+    "tickers": Scenario("tickers", [(1, tickers)]),
+    "balance": Scenario("balance", [(1, balance)]),
+    "orders": Scenario(
+        "orders", [(4, limit_order), (4, market_order), (1, cancel_all)]
+    ),
+    "mixed": Scenario(
+        "mixed",
+        [
+            (40, ohlcv_hit),
+            (10, ohlcv_miss),
+            (25, tickers),
+            (10, balance),
+            (5, limit_order),
+            (5, market_order),
+            (1, cancel_all),
+        ],
+    ),
+}
+
+
+# === 资源统计 ===
+def _rss_mb() -> float | None:
+    """当前进程常驻内存 (MB)，优先 psutil，其次 /proc"""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(sorted_values: list[float], q: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def _latency_summary(latencies: list[float]) -> dict:
+    values = sorted(latencies)
+    return {
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": _percentile(values, 0.50),
+        "p90": _percentile(values, 0.90),
+        "p99": _percentile(values, 0.99),
+        "max": round(values[-1], 3) if values else None,
+    }
+
+
+# === 服务端 ===
+def prepare_workdir(args) -> Path:
+    """生成临时 data/config.json (src.tools.shared 导入时从当前目录读取)"""
+    workdir = Path(tempfile.mkdtemp(prefix="bench_proxy_"))
+    (workdir / "data").mkdir()
+    config = {
+        "SECRET": "bench-secret",
+        "users": {USER: {"password": PASSWORD}},
+        "exchange_whitelist": [
+            {
+                "exchange": "binance",
+                "market": "future",
+                "mode": "sandbox",
+                "backend": "fake",
+                "pool_size": args.pool_size,
+            }
+        ],
+        "fake_exchange": {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+        },
+        "ohlcv_cache": {"write_behind": args.write_behind},
+    }
+    (workdir / "data" / "config.json").write_text(json.dumps(config, indent=2))
+    return workdir
+
+
+def start_server():
+    """进程内启动 uvicorn (随机端口)，返回 (server, thread, base_url)"""
+    import uvicorn
+
+    sys.path.insert(0, str(ROOT))
+    from src.main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="bench-uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn 启动失败")
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def login(base_url: str) -> str:
+    r = requests.post(
+        f"{base_url}/auth/token", data={"username": USER, "password": PASSWORD}
+    )
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+# === 压测 ===
+def run_scenario(
+    base_url: str, token: str, scenario: Scenario, args, counter_start: int
+) -> dict:
+    """固定并发运行 scenario，直到 duration 秒或 requests 次"""
+    deadline = time.perf_counter() + args.duration
+    lock = threading.Lock()
+    issued = [counter_start]
+    results: list[tuple[str, int, float]] = []
+
+    def next_index() -> int | None:
+        with lock:
+            if args.requests and issued[0] - counter_start >= args.requests:
+                return None
+            issued[0] += 1
+            return issued[0]
+
+    def worker(worker_id: int) -> None:
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {token}"
+        rng = random.Random(args.seed * 1000 + worker_id)
+        records = []
+        while args.requests or time.perf_counter() < deadline:
+            i = next_index()
+            if i is None:
+                break
+            method, path, payload = scenario.next_call(rng, i)
+            started = time.perf_counter()
+            try:
+                if method == "GET":
+                    r = session.get(base_url + path, params=payload)
+                else:
+                    r = session.post(base_url + path, json=payload)
+                status = r.status_code
+            except requests.RequestException:
+                status = 0
+            records.append((path, status, (time.perf_counter() - started) * 1000))
+        with lock:
+            results.extend(records)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    rss_start = _rss_mb()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    statuses: dict[str, int] = {}
+    endpoints: dict[str, list[float]] = {}
+    for path, status, ms in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        endpoints.setdefault(path, []).append(ms)
+    errors = sum(n for s, n in statuses.items() if not s.startswith("2"))
+
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "status": statuses,
+        "duration_s": round(wall, 3),
+        "rps": round(len(results) / wall, 2) if wall else None,
+        "latency_ms": _latency_summary([ms for _, _, ms in results]),
+        "endpoints": {
+            path: {"requests": len(ms), **_latency_summary(ms)}
+            for path, ms in sorted(endpoints.items())
+        },
+        "cpu_s": round(cpu, 3),
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else None,
+        "rss_mb_start": rss_start,
+        "rss_mb_end": _rss_mb(),
+        "rss_mb_peak": _peak_rss_mb(),
+    }
+
+
+def warm_up(base_url: str, token: str) -> None:
+    """写入缓存命中场景所需的数据"""
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    for i in range(len(SYMBOLS)):
+        _, path, params = ohlcv_hit(i)
+        session.get(base_url + path, params=params).raise_for_status()
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline_path: Path) -> None:
+    """与之前的结果对比吞吐和 p99"""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    print(f"\n对比基准: {baseline_path} (commit {baseline['meta'].get('commit')})")
+    for name, current in report["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        rps_ratio = current["rps"] / old["rps"] if old["rps"] else float("nan")
+        p99_old, p99_new = old["latency_ms"]["p99"], current["latency_ms"]["p99"]
+        print(
+            f"  {name:<12} rps {old['rps']:>9} -> {current['rps']:>9} ({rps_ratio:.2f}x)"
+            f"  p99 {p99_old} -> {p99_new} ms"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="代理整体压测 (离线假交易所)")
+    parser.add_argument(
+        "--scenarios",
+        default="ohlcv_hit,ohlcv_miss,tickers,balance,orders,mixed",
+        help=f"逗号分隔，可选: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="每个场景秒数")
+    parser.add_argument(
+        "--requests", type=int, default=0, help="每个场景请求数 (优先于 duration)"
+    )
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="结果 JSON 路径")
+    parser.add_argument("--compare", type=Path, help="用于对比的之前结果 JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"未知场景: {unknown}，可选: {list(SCENARIOS)}")
+
+    # 相对路径按启动目录解析 (之后会切换到临时工作目录)
+    if args.output is not None:
+        args.output = args.output.resolve()
+    if args.compare is not None:
+        args.compare = args.compare.resolve()
+
+    workdir = prepare_workdir(args)
+    os.chdir(workdir)
+    server, thread, base_url = start_server()
+    print(f"[Bench] 服务已启动: {base_url} (工作目录 {workdir})")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {
+                k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()
+            },
+        },
+        "scenarios": {},
+    }
+    try:
+        token = login(base_url)
+        warm_up(base_url, token)
+        counter = 0
+        for name in names:
+            print(f"[Bench] 场景 {name} (并发 {args.concurrency})...")
+            result = run_scenario(base_url, token, SCENARIOS[name], args, counter)
+            counter += result["requests"]
+            report["scenarios"][name] = result
+            lat = result["latency_ms"]
+            print(
+                f"  {result['requests']} 请求, {result['rps']} req/s, "
+                f"p50 {lat['p50']} ms, p99 {lat['p99']} ms, 错误 {result['errors']}, "
+                f"CPU {result['cpu_percent']}%"
+            )
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = RESULTS_DIR / f"{stamp}_{report['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"[Bench] 结果已写入 {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
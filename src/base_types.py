@@ -49,6 +49,12 @@ class BaseExchangeRequest(BaseModel):
         description="sandbox (测试网) 或 live (实盘)",
         examples=["sandbox", "live"],
     )
+    account: str | None = Field(
+        None,
+        title="子账户",
+        description="config.json 中 <exchange>.accounts 下的子账户名，不传则使用默认账户",
+        examples=["sub01"],
+    )
 
 
 class BaseSymbolRequest(BaseExchangeRequest):
@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import datetime, timezone
 
+import polars as pl
+
 
 # 单次网络请求最大数量（硬编码，取交易所限制的最小公约数）
 # 币安等主流交易所限制为 1500，不暴露给用户配置
@@ -49,6 +51,19 @@ def get_partition_key(timestamp_ms: int, period: str) -> str:
         return str(dt.year)
 
 
+def partition_key_expr(period: str, time_col: str = "time") -> pl.Expr:
+    """get_partition_key 的向量化版本，对整列时间戳计算分块 key"""
+    dt = pl.from_epoch(pl.col(time_col), time_unit="ms")
+    window = PARTITION_CONFIG.get(period, "year")
+
+    if window == "month":
+        return dt.dt.strftime("%Y-%m")
+    elif window == "decade":
+        return ((dt.dt.year() // 10) * 10).cast(pl.Utf8) + "s"
+    else:
+        return dt.dt.strftime("%Y")
+
+
 def get_data_dir(
     base_dir: Path,
     exchange: str,
@@ -1,12 +1,16 @@
+import time
 import polars as pl
 from pathlib import Path
-from typing import Protocol
+from typing import Callable, Protocol
 from filelock import FileLock
 
-from .config import get_data_dir, MAX_PER_REQUEST
+from .config import get_data_dir, period_to_ms, MAX_PER_REQUEST
 from .storage import read_ohlcv, save_ohlcv
-from .log_manager import compact_log
-from .models import DataLocation
+from .log_manager import append_log, compact_log, read_log
+from .models import DataLocation, DataRange, LogEntry
+from .write_behind import split_runs, write_behind as write_behind_queue
+from .validation import ohlcv_validator
+from .hooks import add_span, metrics, span
 
 
 class FetchCallback(Protocol):
@@ -30,23 +34,31 @@ def get_ohlcv_with_cache(
     fetch_callback: FetchCallback,
     fetch_callback_params: dict | None = None,
     enable_cache: bool = True,
+    write_behind: bool = False,
+    end_time: int | None = None,
 ) -> pl.DataFrame:
     """
     获取 OHLCV 数据（简化缓存算法）
 
-    算法特点：
-    - 只在起始时检查一次缓存
-    - 之后连续网络请求
-    - 不在中间检查缓存
+    查询模式：
+    - start_time + count: 从 start_time 开始的 count 根（只在起始时检查一次缓存，之后连续网络请求）
+    - start_time=None + count: 最新的 count 根（跳过缓存读取，只写入）
+    - start_time + end_time: [start_time, end_time] 内的全部 K 线（忽略 count）
+    - start_time=None + end_time + count: 截止 end_time（含）的 count 根
+
+    后两种为区间模式：按日志找出区间内缓存缺失的段，只请求缺失部分，
+    其余直接从本地分块读取（图表向前翻页基本都由磁盘提供）。
 
     Args:
         base_dir: 数据根目录
         loc: 数据位置参数（exchange, mode, market, symbol, period）
         start_time: 起始时间戳（毫秒），None 表示获取最新数据
         count: 数据条数
+        end_time: 结束时间戳（毫秒，含），用于区间模式
         fetch_callback: 数据获取回调函数
         fetch_callback_params: 回调函数额外参数
         enable_cache: 是否启用缓存
+        write_behind: 是否延迟写入（交给后台线程保存，不等待落盘即返回）
     """
     if fetch_callback_params is None:
         fetch_callback_params = {}
@@ -57,23 +69,111 @@ def get_ohlcv_with_cache(
     lock_path = data_dir / ".lock"
     data_dir.mkdir(parents=True, exist_ok=True)
 
+    labels = metrics.loc_labels(loc)
+    started = time.perf_counter()
+    fetched_rows = 0
+    page = 0
+
+    def fetch(current_time: int | None, batch_size: int) -> pl.DataFrame:
+        nonlocal fetched_rows, page
+        page += 1
+        t = time.perf_counter()
+        with span("fetch_page", page=page, since=current_time, limit=batch_size) as s:
+            data = fetch_callback(
+                loc.symbol,
+                loc.period,
+                current_time,
+                batch_size,
+                **fetch_callback_params,
+            )
+            s.set(rows=len(data))
+        metrics.cache_fetch_seconds.observe(labels, time.perf_counter() - t)
+        fetched_rows += len(data)
+        return data
+
+    def finish(result_kind: str) -> None:
+        metrics.cache_requests.inc((*labels, result_kind))
+        metrics.cache_rows_fetched.observe(labels, fetched_rows)
+        metrics.cache_request_seconds.observe(labels, time.perf_counter() - started)
+
+    def without_quarantined(data: pl.DataFrame) -> pl.DataFrame:
+        if not quarantined:
+            return data
+        return data.filter(~pl.col("time").is_in(pl.concat(quarantined).implode()))
+
+    # 未通过校验、已隔离的 K 线时间 (不写入缓存，也从本次结果中去掉)
+    quarantined: list[pl.Series] = []
+
+    def save(data: pl.DataFrame) -> None:
+        with span("validate", rows=len(data)):
+            clean, report = ohlcv_validator.clean(base_dir, loc, data)
+        coverage = None
+        if not report.ok:
+            quarantined.append(
+                data["time"].filter(~data["time"].is_in(clean["time"].implode()))
+            )
+            # 隔离的行也记入覆盖范围，否则该区间每次请求都会重新获取、再次隔离。
+            # 在正常行落盘后才追加 (写入失败时不记录)，并在 quarantine_ttl 后过期重新获取
+            coverage = (
+                int(data["time"].min()),  # type: ignore
+                int(data["time"].max()),  # type: ignore
+                len(clean),
+                "quarantine",
+            )
+            data = clean
+        if write_behind:
+            with span("write_behind_enqueue", rows=len(data)):
+                write_behind_queue.save(base_dir, loc, data, coverage=coverage)
+            return
+        with span("save_ohlcv", rows=len(data)):
+            if coverage is None:
+                save_ohlcv(base_dir, loc, data)
+            else:
+                # 隔离的行留下的缺口单独成段，隔离记录过期后该缺口会被重新获取
+                for run in split_runs(data, period_to_ms(loc.period)):
+                    save_ohlcv(base_dir, loc, run)
+                append_log(data_dir, *coverage)
+
+    # 读取缓存前，等待该目录尚未落盘的数据（需在加锁前，后台线程写入时也要加锁）
+    if (start_time is not None or end_time is not None) and enable_cache:
+        with span("write_behind_flush"):
+            write_behind_queue.flush(data_dir)
+
+    lock_started = time.perf_counter()
     with FileLock(lock_path):
+        lock_acquired = time.perf_counter()
+        metrics.cache_lock_wait_seconds.observe(labels, lock_acquired - lock_started)
+        add_span("lock_wait", lock_started, lock_acquired)
+
+        # 先合并日志 (各模式都会追加日志，只读区间的流量也要合并，否则日志无限增长)
+        with span("compact_log"):
+            compact_log(data_dir, loc, ohlcv_validator.settings.get("quarantine_ttl"))
+
+        if end_time is not None:
+            result, fetched_segments, cached_rows = _get_range(
+                base_dir, loc, start_time, end_time, count, fetch, enable_cache
+            )
+            # 每段单独保存，日志才能如实记录覆盖范围
+            if enable_cache:
+                for segment in fetched_segments:
+                    save(segment)
+            if not cached_rows:
+                finish("miss")
+            else:
+                finish("partial" if fetched_rows else "hit")
+            return without_quarantined(result)
+
         # 无起始时间：跳过缓存读取，只写入
         if start_time is None:
-            new_data = fetch_callback(
-                loc.symbol, loc.period, None, count, **fetch_callback_params
-            )
+            new_data = fetch(None, count)
             if enable_cache and not new_data.is_empty():
-                save_ohlcv(base_dir, loc, new_data)
-            return new_data
-
-        # 先合并日志
-        compact_log(data_dir)
+                save(new_data)
+            finish("latest")
+            return without_quarantined(new_data)
 
         # 读取合并后的日志
-        from .log_manager import read_log
-
-        log_entries = read_log(data_dir)
+        with span("read_log"):
+            log_entries = read_log(data_dir)
 
         result = pl.DataFrame()
         current_time = start_time
@@ -88,7 +188,11 @@ def get_ohlcv_with_cache(
 
         if cache_entry is not None and enable_cache:
             # 从缓存读取起始段
-            cached_data = read_ohlcv(base_dir, loc, start_time, cache_entry.data_end)
+            with span("cache_read") as s:
+                cached_data = read_ohlcv(
+                    base_dir, loc, start_time, cache_entry.data_end
+                )
+                s.set(rows=len(cached_data))
             result = cached_data
             current_time = cache_entry.data_end
             remaining_count = count - len(result)
@@ -104,13 +208,7 @@ def get_ohlcv_with_cache(
             else:
                 batch_size = min(MAX_PER_REQUEST, remaining_count + 1)
 
-            new_data = fetch_callback(
-                loc.symbol,
-                loc.period,
-                current_time,
-                batch_size,
-                **fetch_callback_params,
-            )
+            new_data = fetch(current_time, batch_size)
 
             # 边界检查：网络返回空数据
             if new_data.is_empty():
@@ -121,8 +219,9 @@ def get_ohlcv_with_cache(
             if result.is_empty():
                 result = new_data
             else:
-                result = pl.concat([result, new_data])
-                result = result.unique(subset=["time"], keep="last").sort("time")
+                with span("dedupe"):
+                    result = pl.concat([result, new_data])
+                    result = result.unique(subset=["time"], keep="last").sort("time")
 
             # 边界检查：去重后没有新数据（防止死循环）
             if len(result) == prev_len:
@@ -142,6 +241,139 @@ def get_ohlcv_with_cache(
 
         # 保存到缓存
         if enable_cache and not result.is_empty():
-            save_ohlcv(base_dir, loc, result)
+            save(result)
+
+        if cache_entry is None or not enable_cache:
+            finish("miss")
+        else:
+            finish("partial" if fetched_rows else "hit")
+        return without_quarantined(result)
+
+
+def _get_range(
+    base_dir: Path,
+    loc: DataLocation,
+    start_time: int | None,
+    end_time: int,
+    count: int,
+    fetch: Callable[[int | None, int], pl.DataFrame],
+    enable_cache: bool,
+) -> tuple[pl.DataFrame, list[pl.DataFrame], int]:
+    """
+    区间模式（调用方已持有目录锁并合并日志）
+
+    返回 (结果, 需要保存的网络数据段, 缓存命中行数)。
+    start_time 为 None 时取截止 end_time 的 count 根：缺失段从新到旧、段内从后往前翻页，
+    遇到交易所历史起点即停止。
+    """
+    period_ms = period_to_ms(loc.period)
+    backward = start_time is None
+    if start_time is None:
+        # 长度为 count * period - 1 的区间恰好包含 count 个周期起点
+        start_time = max(0, end_time - count * period_ms + 1)
+
+    cached = pl.DataFrame()
+    if enable_cache:
+        data_dir = get_data_dir(
+            base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+        )
+        with span("read_log"):
+            log_entries = read_log(data_dir)
+        missing = find_missing_segments(log_entries, start_time, end_time, period_ms)
+        with span("cache_read") as s:
+            cached = read_ohlcv(base_dir, loc, start_time, end_time)
+            s.set(rows=len(cached))
+    else:
+        missing = [DataRange(start=start_time, end=end_time)]
 
-        return result
+    fetched_segments: list[pl.DataFrame] = []
+    for segment in reversed(missing) if backward else missing:
+        pages, reached_first = _fetch_segment(fetch, segment, period_ms, backward)
+        if pages:
+            fetched_segments.append(
+                pl.concat(pages).unique(subset=["time"], keep="last").sort("time")
+            )
+        if reached_first:
+            break
+
+    result = pl.concat([cached, *fetched_segments]) if fetched_segments else cached
+    if not result.is_empty():
+        with span("dedupe"):
+            result = (
+                result.unique(subset=["time"], keep="last")
+                .sort("time")
+                .filter(pl.col("time").is_between(start_time, end_time))
+            )
+        if backward:
+            result = result.tail(count)
+    return result, fetched_segments, len(cached)
+
+
+def _fetch_segment(
+    fetch: Callable[[int | None, int], pl.DataFrame],
+    segment: DataRange,
+    period_ms: int,
+    backward: bool,
+) -> tuple[list[pl.DataFrame], bool]:
+    """
+    分页请求一个缺失段，返回 (各页数据, 是否已到交易所历史起点)
+
+    正向：从段首开始，每页从上一页最后一根开始（与上一页重叠一根）。
+    反向：与 minimal_example/chunk_calculator.py 的反向切片相同，
+    从段尾开始取满页、不足一页的部分留在最早的一页，相邻页同样重叠一根。
+    """
+    pages: list[pl.DataFrame] = []
+    if not backward:
+        since = segment.start
+        while True:
+            limit = min(MAX_PER_REQUEST, (segment.end - since) // period_ms + 1)
+            data = fetch(since, limit)
+            if data.is_empty():
+                return pages, False
+            pages.append(data)
+            last = int(data["time"].max())  # type: ignore
+            if last >= segment.end or len(data) < limit or last <= since:
+                return pages, False
+            since = last
+
+    upper = segment.end
+    while True:
+        # 长度为 MAX_PER_REQUEST * period - 1 的区间恰好包含一整页
+        since = max(segment.start, upper - MAX_PER_REQUEST * period_ms + 1)
+        data = fetch(since, (upper - since) // period_ms + 1)
+        if data.is_empty():
+            return pages, True
+        pages.append(data)
+        first = int(data["time"].min())  # type: ignore
+        # 返回的第一根晚于 since 所在周期：交易所没有更早的数据
+        if first - since >= period_ms:
+            return pages, True
+        if since == segment.start:
+            return pages, False
+        upper = first
+
+
+def find_missing_segments(
+    log_entries: list[LogEntry], start_time: int, end_time: int, period_ms: int
+) -> list[DataRange]:
+    """
+    [start_time, end_time] 内缓存未覆盖的段（按时间排序）
+
+    每段两端包含相邻缓存段的边界 K 线，保存后日志能与之合并。
+    两端都是已缓存 K 线、且相差不足一个周期的段不包含新 K 线，直接忽略。
+    """
+    missing: list[DataRange] = []
+    cursor = start_time
+    cursor_cached = False
+    for entry in log_entries:
+        if entry.data_end < cursor:
+            continue
+        if entry.data_start > end_time:
+            break
+        if entry.data_start - cursor >= period_ms:
+            missing.append(DataRange(start=cursor, end=entry.data_start))
+        cursor = max(cursor, entry.data_end)
+        cursor_cached = True
+    if not cursor_cached or end_time - cursor >= period_ms:
+        missing.append(DataRange(start=cursor, end=end_time))
+    return missing
@@ -0,0 +1,77 @@
+"""
+可选的指标 / 追踪钩子
+
+cache_tool 可以脱离服务单独使用 (例如 importer 命令行)，因此不直接导入
+src.metrics / src.tracing，而是由服务启动时调用 install() 注入。
+未注入时所有记录都是空操作。
+"""
+
+from types import ModuleType
+from typing import Any
+
+_metrics: ModuleType | None = None
+_tracing: ModuleType | None = None
+
+
+class _NoopMetric:
+    __slots__ = ()
+
+    def observe(self, values: tuple = (), value: float = 0.0) -> None:
+        pass
+
+    def inc(self, values: tuple = (), amount: float = 1.0) -> None:
+        pass
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_METRIC = _NoopMetric()
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Metrics:
+    """转发到已注入的 src.metrics (metrics.cache_requests.inc(...) 等写法不变)"""
+
+    def __getattr__(self, name: str) -> Any:
+        if _metrics is not None:
+            return getattr(_metrics, name)
+        if name == "loc_labels":
+            return lambda loc: ()
+        return _NOOP_METRIC
+
+
+metrics = _Metrics()
+
+
+def span(name: str, **args: Any) -> Any:
+    """见 src.tracing.span"""
+    if _tracing is None:
+        return _NOOP_SPAN
+    return _tracing.span(name, **args)
+
+
+def add_span(name: str, start: float, end: float, **args: Any) -> None:
+    """见 src.tracing.add_span"""
+    if _tracing is not None:
+        _tracing.add_span(name, start, end, **args)
+
+
+def install(
+    metrics_module: ModuleType | None = None,
+    tracing_module: ModuleType | None = None,
+) -> None:
+    """注入指标 (src.metrics) 和追踪 (src.tracing) 模块，传 None 恢复为空操作"""
+    global _metrics, _tracing
+    _metrics = metrics_module
+    _tracing = tracing_module
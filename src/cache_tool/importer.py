@@ -0,0 +1,250 @@
+"""
+离线导入交易所公开的 K 线归档 (Binance data.binance.vision 月度 / 日度 CSV 或 ZIP)
+
+归档文件需先下载到本地，例如:
+    BTCUSDT-1m-2023-01.zip   (内含同名 .csv)
+
+用法:
+    python -m src.cache_tool.importer --symbol BTC/USDT:USDT --market future \\
+        data/archives/BTCUSDT-1m-2023-*.zip
+
+每个文件:
+- 用 Polars 流式读取 CSV (自动识别有无表头，微秒时间戳转为毫秒)
+- 校验价格关系、非负、周期对齐、重复时间和尖刺 (见 validation.py)，
+  有问题的文件整体跳过并隔离到数据目录的 quarantine/
+- 按 get_data_dir 分块写入，并追加一条 source="import" 的获取日志
+多个文件在多个进程中并行处理，同一目录的写入由目录锁串行化。
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import polars as pl
+
+from .models import DataLocation
+from .storage import save_ohlcv_with_lock
+from .validation import ohlcv_validator
+
+# Binance K 线归档的列 (只使用前 6 列)
+ARCHIVE_COLUMNS = [
+    "open_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "close_time",
+    "quote_volume",
+    "count",
+    "taker_buy_volume",
+    "taker_buy_quote_volume",
+    "ignore",
+]
+ARCHIVE_SCHEMA = {
+    name: pl.Int64 if name in ("open_time", "close_time", "count") else pl.Float64
+    for name in ARCHIVE_COLUMNS
+}
+
+# 大于该值的时间戳视为微秒 (2025 年起的现货归档使用微秒)
+MICROSECOND_THRESHOLD = 10**14
+
+# 文件名中的周期，如 BTCUSDT-1m-2023-01.zip
+_PERIOD_PATTERN = re.compile(r"-(\d+[mhdwM])-")
+
+
+def period_from_filename(path: Path) -> str | None:
+    match = _PERIOD_PATTERN.search(path.name)
+    return match.group(1) if match else None
+
+
+def _has_header(csv_path: Path) -> bool:
+    """第一行第一列不是数字时视为表头 (期货归档带表头，现货不带)"""
+    with open(csv_path, "r", encoding="utf-8") as f:
+        first = f.readline().split(",", 1)[0].strip()
+    return not first.isdigit()
+
+
+def scan_archive_csv(csv_path: Path) -> pl.LazyFrame:
+    """以 LazyFrame 读取归档 CSV，返回 time(ms) + OHLCV 列"""
+    # 表头名称在不同年份的归档中不一致，统一按位置读取
+    lf = pl.scan_csv(
+        csv_path,
+        has_header=False,
+        skip_rows=1 if _has_header(csv_path) else 0,
+        schema=ARCHIVE_SCHEMA,
+    )
+    time_col = pl.col("open_time")
+    return lf.select(
+        pl.when(time_col >= MICROSECOND_THRESHOLD)
+        .then(time_col // 1000)
+        .otherwise(time_col)
+        .alias("time"),
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+    )
+
+
+def _open_csv(path: Path, workdir: Path) -> Path:
+    """CSV 直接返回; ZIP 解压出其中的 CSV 到 workdir (流式复制)"""
+    if path.suffix.lower() != ".zip":
+        return path
+    with zipfile.ZipFile(path) as zf:
+        members = [m for m in zf.namelist() if m.lower().endswith(".csv")]
+        if len(members) != 1:
+            raise ValueError(f"ZIP 中应有且只有一个 CSV，实际 {len(members)} 个")
+        target = workdir / Path(members[0]).name
+        with zf.open(members[0]) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    return target
+
+
+def import_file(path: Path, base_dir: Path, loc: DataLocation) -> dict:
+    """
+    导入单个归档文件 (可在子进程中运行)
+
+    返回 {"file", "rows", "start", "end", "seconds", "error"}，
+    error 不为 None 时没有写入任何缓存数据。
+    """
+    started = time.perf_counter()
+    result = {"file": str(path), "rows": 0, "start": None, "end": None, "error": None}
+    try:
+        with tempfile.TemporaryDirectory(prefix="ohlcv-import-") as workdir:
+            csv_path = _open_csv(path, Path(workdir))
+            df = scan_archive_csv(csv_path).collect(engine="streaming").sort("time")
+
+        if df.is_empty():
+            raise ValueError("文件为空")
+        report = ohlcv_validator.check(base_dir, loc, df, source="import")
+        if not report.ok:
+            raise ValueError("校验失败，已隔离: " + report.summary())
+
+        save_ohlcv_with_lock(base_dir, loc, df, source="import")
+        result.update(rows=len(df), start=int(df["time"][0]), end=int(df["time"][-1]))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def import_archives(
+    files: list[Path],
+    base_dir: Path,
+    exchange: str,
+    mode: str,
+    market: str,
+    symbol: str,
+    period: str | None = None,
+    workers: int | None = None,
+) -> list[dict]:
+    """
+    并行导入多个归档文件，返回每个文件的结果 (顺序与 files 一致)
+
+    period 为 None 时从文件名解析 (如 BTCUSDT-1m-2023-01.zip)。
+    workers 默认为 CPU 核数，为 1 时在当前进程中顺序执行。
+    """
+    jobs: list[tuple[Path, Path, DataLocation]] = []
+    results: dict[int, dict] = {}
+    for i, path in enumerate(files):
+        file_period = period or period_from_filename(path)
+        if file_period is None:
+            results[i] = {
+                "file": str(path),
+                "rows": 0,
+                "error": "无法从文件名解析周期，请指定 --period",
+            }
+            continue
+        loc = DataLocation(
+            exchange=exchange,
+            mode=mode,  # type: ignore
+            market=market,  # type: ignore
+            symbol=symbol,
+            period=file_period,  # type: ignore
+        )
+        jobs.append((path, base_dir, loc))
+
+    indexes = [i for i in range(len(files)) if i not in results]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers == 1:
+        outcomes = [import_file(*job) for job in jobs]
+    else:
+        # Polars 内部有线程池，fork 出的子进程可能死锁，需使用 spawn
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            outcomes = list(pool.map(import_file, *zip(*jobs)))
+    results.update(zip(indexes, outcomes))
+    return [results[i] for i in range(len(files))]
+
+
+def _expand(paths: list[str]) -> list[Path]:
+    """展开目录 (其中的 .zip / .csv)"""
+    files: list[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(
+                sorted(
+                    p for p in path.iterdir() if p.suffix.lower() in (".zip", ".csv")
+                )
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="导入 Binance K 线归档到本地缓存")
+    parser.add_argument("paths", nargs="+", help="归档文件 (.zip / .csv) 或目录")
+    parser.add_argument(
+        "--symbol", required=True, help="缓存使用的交易对，如 BTC/USDT:USDT"
+    )
+    parser.add_argument("--market", required=True, choices=["future", "spot"])
+    parser.add_argument("--exchange", default="binance")
+    parser.add_argument("--mode", default="live", choices=["live", "demo"])
+    parser.add_argument("--period", help="周期，默认从文件名解析")
+    parser.add_argument("--workers", type=int, help="并行进程数，默认 CPU 核数")
+    parser.add_argument("--base-dir", default="./data/ohlcv", help="缓存根目录")
+    args = parser.parse_args(argv)
+
+    files = _expand(args.paths)
+    started = time.perf_counter()
+    results = import_archives(
+        files,
+        base_dir=Path(args.base_dir),
+        exchange=args.exchange,
+        mode=args.mode,
+        market=args.market,
+        symbol=args.symbol,
+        period=args.period,
+        workers=args.workers,
+    )
+
+    failed = 0
+    rows = 0
+    for r in results:
+        if r["error"]:
+            failed += 1
+            print(f"[Importer] 失败 {r['file']}: {r['error']}")
+        else:
+            rows += r["rows"]
+            print(f"[Importer] {r['file']}: {r['rows']} 行 ({r['seconds']:.2f}s)")
+    print(
+        f"[Importer] 完成: {len(results) - failed}/{len(results)} 个文件, "
+        f"{rows} 行, 用时 {time.perf_counter() - started:.1f}s"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,11 @@
+import time
 import warnings
 
 import polars as pl
 from pathlib import Path
 from datetime import datetime, timezone
-from .models import LogEntry
+from .models import DataLocation, LogEntry
+from .hooks import metrics
 
 
 def get_log_path(data_dir: Path) -> Path:
@@ -91,18 +93,44 @@ def can_merge(entry_a: LogEntry, entry_b: LogEntry) -> bool:
     return False
 
 
-def compact_log(data_dir: Path) -> None:
+def compact_log(
+    data_dir: Path,
+    loc: DataLocation | None = None,
+    quarantine_ttl: float | None = None,
+) -> None:
     """
     合并可合并的日志条目，减少日志行数
 
     合并条件：首尾衔接 或 重叠/包含
+    loc: 用于耗时指标的标签，不传时不记录
+    quarantine_ttl: 隔离区间 (source="quarantine") 的覆盖记录保留秒数，
+        过期后删除，该区间下次请求时重新获取; None 为永久保留。
+        隔离记录不与其他条目合并，以便过期时单独删除。
     """
+    started = time.perf_counter()
+    try:
+        _compact_log(data_dir, quarantine_ttl)
+    finally:
+        if loc is not None:
+            metrics.log_compact_seconds.observe(
+                metrics.loc_labels(loc), time.perf_counter() - started
+            )
+
+
+def _compact_log(data_dir: Path, quarantine_ttl: float | None) -> None:
     entries = read_log(data_dir)
+    quarantined = [e for e in entries if e.source == "quarantine"]
+    entries = [e for e in entries if e.source != "quarantine"]
 
-    if len(entries) < 2:
+    kept = quarantined
+    if quarantine_ttl is not None:
+        now = datetime.now(timezone.utc)
+        kept = [e for e in quarantined if _age(e, now) <= quarantine_ttl]
+
+    if len(entries) < 2 and len(kept) == len(quarantined):
         return
 
-    compacted: list[LogEntry] = [entries[0]]
+    compacted: list[LogEntry] = entries[:1]
 
     for entry in entries[1:]:
         last = compacted[-1]
@@ -120,6 +148,8 @@ def compact_log(data_dir: Path) -> None:
         else:
             compacted.append(entry)
 
+    compacted = sorted(compacted + kept, key=lambda e: e.data_start)
+
     # 重写日志文件
     log_path = get_log_path(data_dir)
     with open(log_path, "w", encoding="utf-8") as f:
@@ -127,6 +157,14 @@ def compact_log(data_dir: Path) -> None:
             f.write(entry.model_dump_json() + "\n")
 
 
+def _age(entry: LogEntry, now: datetime) -> float:
+    """日志条目距今的秒数 (无时区的 fetch_time 按 UTC 处理)"""
+    fetch_time = entry.fetch_time
+    if fetch_time.tzinfo is None:
+        fetch_time = fetch_time.replace(tzinfo=timezone.utc)
+    return (now - fetch_time).total_seconds()
+
+
 def rebuild_log_from_data(data_dir: Path) -> None:
     """
     从数据文件重建日志（用于日志丢失时恢复）
@@ -1,9 +1,12 @@
+import os
+import time
 import polars as pl
 from pathlib import Path
 from filelock import FileLock
-from .config import get_partition_key, get_data_dir
+from .config import get_partition_key, get_data_dir, partition_key_expr
 from .log_manager import append_log
 from .models import DataLocation
+from .hooks import metrics
 
 
 def read_ohlcv(
@@ -13,15 +16,21 @@ def read_ohlcv(
     end_time: int | None = None,
 ) -> pl.DataFrame:
     """读取 OHLCV 数据，支持时间范围过滤"""
-    data_dir = get_data_dir(
-        base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
-    )
+    started = time.perf_counter()
+    df = _read_ohlcv(base_dir, loc, start_time, end_time)
+    labels = metrics.loc_labels(loc)
+    metrics.parquet_read_seconds.observe(labels, time.perf_counter() - started)
+    metrics.parquet_rows_read.inc(labels, len(df))
+    return df
 
-    if not data_dir.exists():
-        return pl.DataFrame()
 
-    # 找到所有 parquet 文件
-    parquet_files = sorted(data_dir.glob("*.parquet"))
+def _read_ohlcv(
+    base_dir: Path,
+    loc: DataLocation,
+    start_time: int | None,
+    end_time: int | None,
+) -> pl.DataFrame:
+    parquet_files = list_partition_files(base_dir, loc, start_time, end_time)
     if not parquet_files:
         return pl.DataFrame()
 
@@ -38,15 +47,56 @@ def read_ohlcv(
     return df
 
 
+def list_partition_files(
+    base_dir: Path,
+    loc: DataLocation,
+    start_time: int | None = None,
+    end_time: int | None = None,
+) -> list[Path]:
+    """与时间范围有交集的分块文件 (按时间排序)"""
+    data_dir = get_data_dir(
+        base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+    )
+
+    if not data_dir.exists():
+        return []
+
+    # 找到所有 parquet 文件
+    parquet_files = sorted(data_dir.glob("*.parquet"))
+
+    # 按分块 key 跳过范围外的文件 (key 的字典序与时间顺序一致)
+    if start_time is not None:
+        first_key = get_partition_key(start_time, loc.period)
+        parquet_files = [f for f in parquet_files if f.stem >= first_key]
+    if end_time is not None:
+        last_key = get_partition_key(end_time, loc.period)
+        parquet_files = [f for f in parquet_files if f.stem <= last_key]
+    return parquet_files
+
+
 def save_ohlcv(
     base_dir: Path,
     loc: DataLocation,
     new_data: pl.DataFrame,
+    source: str = "api",
 ) -> None:
-    """保存 OHLCV 数据，按时间分块"""
+    """保存 OHLCV 数据，按时间分块; source 记录到获取日志"""
     if new_data.is_empty():
         return
 
+    started = time.perf_counter()
+    _save_ohlcv(base_dir, loc, new_data, source)
+    labels = metrics.loc_labels(loc)
+    metrics.parquet_write_seconds.observe(labels, time.perf_counter() - started)
+    metrics.parquet_rows_written.inc(labels, len(new_data))
+
+
+def _save_ohlcv(
+    base_dir: Path,
+    loc: DataLocation,
+    new_data: pl.DataFrame,
+    source: str,
+) -> None:
     data_dir = get_data_dir(
         base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
     )
@@ -54,9 +104,7 @@ def save_ohlcv(
 
     # 按分块 key 分组
     new_data = new_data.with_columns(
-        pl.col("time")
-        .map_elements(lambda t: get_partition_key(t, loc.period), return_dtype=pl.Utf8)
-        .alias("__partition__")
+        partition_key_expr(loc.period).alias("__partition__")
     )
 
     for (partition_key,), group in new_data.group_by("__partition__"):
@@ -73,8 +121,8 @@ def save_ohlcv(
         # 去重并排序（保留新数据，最后一根K线可能未走完）
         group = group.unique(subset=["time"], keep="last").sort("time")
 
-        # 写入
-        group.write_parquet(file_path)
+        # 写入临时文件后原子替换: 不持锁的读取方 (面板 / SQL 查询) 只会看到完整的文件
+        _write_parquet_atomic(group, file_path)
 
     # 追加日志
     append_log(
@@ -82,13 +130,26 @@ def save_ohlcv(
         data_start=int(new_data["time"].min()),  # type: ignore
         data_end=int(new_data["time"].max()),  # type: ignore
         count=len(new_data),
+        source=source,
     )
 
 
+def _write_parquet_atomic(df: pl.DataFrame, file_path: Path) -> None:
+    """先写同目录下的 .tmp 文件 (不匹配 *.parquet)，再 os.replace 到目标路径"""
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    try:
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
 def save_ohlcv_with_lock(
     base_dir: Path,
     loc: DataLocation,
     new_data: pl.DataFrame,
+    source: str = "api",
 ) -> None:
     """带文件锁的保存，防止并发冲突"""
     data_dir = get_data_dir(
@@ -98,4 +159,4 @@ def save_ohlcv_with_lock(
 
     lock_path = data_dir / ".lock"
     with FileLock(lock_path):
-        save_ohlcv(base_dir, loc, new_data)
+        save_ohlcv(base_dir, loc, new_data, source)
@@ -0,0 +1,263 @@
+"""
+OHLCV 入库前校验 (向量化)
+
+与 models.OHLCVRow 的约束相同，但以 Polars 表达式对整批数据一次计算，
+不逐行构造 pydantic 模型。检查项:
+- null:        存在空值
+- non_finite:  价格或成交量为 NaN / inf
+- high:        high < max(open, close)
+- low:         low > min(open, close)
+- price:       价格不为正
+- volume:      成交量为负
+- unaligned:   时间未对齐周期 (周线从周一开始，月线不检查)
+- duplicate:   重复时间
+- spike:       孤立尖刺 (收盘价相对前后两根同向偏离超过 spike_ratio，随后回落)
+
+未通过检查的行隔离到数据目录下的 quarantine/，其余行照常写入缓存 (clean)；
+导入归档文件时整个文件作废 (check)。隔离文件带每行的检查结果列，便于排查，
+以批次的时间范围命名 (重复校验同一批数据只保留一份)，每个数据目录最多保留 max_files 份。
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+
+from .config import get_data_dir, period_to_ms
+from .models import DataLocation
+from .hooks import metrics
+
+# 默认配置，可通过 config["ohlcv_validation"] 覆盖
+# enabled: 是否在入库前校验
+# spike_ratio: 尖刺阈值 (相对偏离比例)，为 null 时不检查尖刺
+# max_files: 每个数据目录最多保留的隔离文件数 (超出后删除最早的)
+# quarantine_ttl: 隔离区间记为已覆盖的秒数，过期后重新获取 (为 null 时永不过期)
+DEFAULT_VALIDATION: dict[str, Any] = {
+    "enabled": True,
+    "spike_ratio": 0.5,
+    "max_files": 100,
+    "quarantine_ttl": 24 * 3600,
+}
+
+# 隔离目录 (位于数据目录下，不会被 *.parquet 的分块扫描读到)
+QUARANTINE_DIR = "quarantine"
+
+# 检查项说明
+CHECKS: dict[str, str] = {
+    "null": "存在空值",
+    "non_finite": "存在 NaN / inf",
+    "high": "high < max(open, close)",
+    "low": "low > min(open, close)",
+    "price": "价格不为正",
+    "volume": "成交量为负",
+    "unaligned": "时间未对齐周期",
+    "duplicate": "重复时间",
+    "spike": "孤立尖刺",
+}
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# 周线从周一开始，而 1970-01-01 是周四
+WEEK_OFFSET_MS = 4 * 24 * 3600 * 1000
+
+
+@dataclass
+class ValidationReport:
+    rows: int
+    # 检查项 -> 未通过的行数 (只包含有问题的检查项)
+    problems: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    def summary(self) -> str:
+        return "; ".join(f"{n} 行 {CHECKS[name]}" for name, n in self.problems.items())
+
+
+def check_exprs(period: str, spike_ratio: float | None = 0.5) -> dict[str, pl.Expr]:
+    """各检查项的逐行布尔表达式 (True 为未通过)，要求数据已按时间排序"""
+    columns = ["time", *PRICE_COLUMNS, "volume"]
+    exprs = {
+        "null": pl.any_horizontal(pl.col(columns).is_null()),
+        "non_finite": pl.any_horizontal(
+            ~pl.col([*PRICE_COLUMNS, "volume"]).is_finite()
+        ),
+        "high": pl.col("high") < pl.max_horizontal("open", "close"),
+        "low": pl.col("low") > pl.min_horizontal("open", "close"),
+        "price": pl.min_horizontal(PRICE_COLUMNS) <= 0,
+        "volume": pl.col("volume") < 0,
+        "duplicate": pl.col("time").is_duplicated(),
+    }
+    try:
+        period_ms = period_to_ms(period)
+    except ValueError:
+        period_ms = None  # 月线长度不固定，不检查对齐
+    if period_ms is not None:
+        offset = WEEK_OFFSET_MS if period.endswith("w") else 0
+        exprs["unaligned"] = (pl.col("time") - offset) % period_ms != 0
+    if spike_ratio is not None:
+        close = pl.col("close").fill_nan(None)
+        prev, nxt = close.shift(1), close.shift(-1)
+        factor = 1 + spike_ratio
+        exprs["spike"] = ((close > prev * factor) & (close > nxt * factor)) | (
+            (close * factor < prev) & (close * factor < nxt)
+        )
+    # 边界行 (shift 产生的 null) 和含空值 / NaN 的行不判定为其他问题
+    return {name: expr.fill_null(False) for name, expr in exprs.items()}
+
+
+def validate_ohlcv(
+    df: pl.DataFrame, period: str, spike_ratio: float | None = 0.5
+) -> ValidationReport:
+    """校验一批 K 线，返回各检查项未通过的行数"""
+    if df.is_empty():
+        return ValidationReport(rows=0)
+    exprs = check_exprs(period, spike_ratio)
+    counts = (
+        df.lazy()
+        .sort("time")
+        .select(*(expr.sum().alias(name) for name, expr in exprs.items()))
+        .collect()
+        .row(0, named=True)
+    )
+    return ValidationReport(
+        rows=len(df), problems={name: n for name, n in counts.items() if n}
+    )
+
+
+class OhlcvValidator:
+    """入库前校验，未通过的批次写入隔离目录"""
+
+    def __init__(self) -> None:
+        self.settings: dict[str, Any] = dict(DEFAULT_VALIDATION)
+
+    def configure(self, config: dict) -> None:
+        """根据 config["ohlcv_validation"] 初始化"""
+        self.settings = {**DEFAULT_VALIDATION, **config.get("ohlcv_validation", {})}
+
+    def check(
+        self,
+        base_dir: Path,
+        loc: DataLocation,
+        data: pl.DataFrame,
+        source: str = "api",
+    ) -> ValidationReport:
+        """
+        校验一批待写入的数据 (未启用校验时总是通过)
+
+        未通过 (report.ok 为 False) 时其中有问题的行已隔离 (见 quarantine)，
+        调用方不应再写入这批数据的任何一行。
+        """
+        report = self._validate(loc, data)
+        if not report.ok:
+            self._quarantine(base_dir, loc, data, report, source)
+        return report
+
+    def clean(
+        self,
+        base_dir: Path,
+        loc: DataLocation,
+        data: pl.DataFrame,
+        source: str = "api",
+    ) -> tuple[pl.DataFrame, ValidationReport]:
+        """
+        校验一批待写入的数据，返回 (通过检查的行, 报告)
+
+        未通过检查的行已隔离，只有它们不写入缓存。
+        """
+        report = self._validate(loc, data)
+        if report.ok:
+            return data, report
+        flagged = self._quarantine(base_dir, loc, data, report, source)
+        return flagged.filter(~pl.col("__flagged__")).select(data.columns), report
+
+    def _validate(self, loc: DataLocation, data: pl.DataFrame) -> ValidationReport:
+        if not self.settings["enabled"] or data.is_empty():
+            return ValidationReport(rows=len(data))
+        started = time.perf_counter()
+        report = validate_ohlcv(data, loc.period, self.settings["spike_ratio"])
+        metrics.validation_seconds.observe(
+            metrics.loc_labels(loc), time.perf_counter() - started
+        )
+        return report
+
+    def _quarantine(
+        self,
+        base_dir: Path,
+        loc: DataLocation,
+        data: pl.DataFrame,
+        report: ValidationReport,
+        source: str,
+    ) -> pl.DataFrame:
+        """隔离未通过检查的行，返回按时间排序、带 __flagged__ 列的整批数据"""
+        exprs = check_exprs(loc.period, self.settings["spike_ratio"])
+        checked = data.sort("time").with_columns(
+            expr.alias(f"check_{name}") for name, expr in exprs.items()
+        )
+        checked = checked.with_columns(
+            __flagged__=pl.any_horizontal(f"check_{name}" for name in exprs)
+        )
+        path = self.quarantine(base_dir, loc, checked, report, source)
+
+        labels = metrics.loc_labels(loc)
+        for name, n in report.problems.items():
+            metrics.quarantined_rows.inc((*labels, name), n)
+        print(f"[Validation] 已隔离 ({report.summary()}): {path}")
+        return checked
+
+    def quarantine(
+        self,
+        base_dir: Path,
+        loc: DataLocation,
+        checked: pl.DataFrame,
+        report: ValidationReport,
+        source: str,
+    ) -> Path:
+        """
+        把未通过检查的行写入 {数据目录}/quarantine/{起始时间}-{结束时间}-{source}.parquet
+
+        checked 为带检查结果列 (check_<name>) 和 __flagged__ 列的整批数据，
+        同名 .json 记录汇总。同一批数据再次隔离时覆盖原文件。
+        """
+        data_dir = get_data_dir(
+            base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+        )
+        target = data_dir / QUARANTINE_DIR
+        target.mkdir(parents=True, exist_ok=True)
+        start, end = int(checked["time"][0]), int(checked["time"][-1])
+        stem = f"{start}-{end}-{source}"
+
+        path = target / f"{stem}.parquet"
+        checked.filter("__flagged__").drop("__flagged__").write_parquet(path)
+        (target / f"{stem}.json").write_text(
+            json.dumps(
+                {
+                    "created": datetime.now().isoformat(),
+                    "source": source,
+                    "start": start,
+                    "end": end,
+                    "rows": report.rows,
+                    "problems": report.problems,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        self._prune(target)
+        return path
+
+    def _prune(self, target: Path) -> None:
+        """只保留最近的 max_files 份隔离文件"""
+        files = sorted(target.glob("*.parquet"), key=lambda p: p.stat().st_mtime)
+        for path in files[: max(0, len(files) - self.settings["max_files"])]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+
+
+# 全局单例，供外部导入使用
+ohlcv_validator = OhlcvValidator()
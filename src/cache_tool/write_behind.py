@@ -0,0 +1,168 @@
+import atexit
+import threading
+from pathlib import Path
+
+import polars as pl
+from filelock import FileLock
+
+from .config import get_data_dir, period_to_ms
+from .log_manager import append_log
+from .storage import save_ohlcv
+from .models import DataLocation
+
+
+class _DirQueue:
+    """单个数据目录的待写队列"""
+
+    def __init__(self, base_dir: Path, loc: DataLocation) -> None:
+        self.base_dir = base_dir
+        self.loc = loc
+        self.pending: list[pl.DataFrame] = []
+        # 待写数据全部落盘后才追加的日志: (data_start, data_end, count, source)
+        self.coverage: list[tuple[int, int, int, str]] = []
+        self.running = False
+
+
+def merge_runs(frames: list[pl.DataFrame], period_ms: int) -> list[pl.DataFrame]:
+    """
+    把待写的数据帧合并为若干段连续数据
+
+    相邻或重叠的帧合并为一段 (同一时间保留后入队的数据)，
+    不连续的帧分开保存，避免日志把中间的缺口记为已覆盖。
+    """
+    frames = [f for f in frames if not f.is_empty()]
+    if not frames:
+        return []
+
+    # 先按入队顺序编号，合并时按编号保留最新数据
+    indexed = [f.with_columns(pl.lit(i).alias("__seq__")) for i, f in enumerate(frames)]
+    indexed.sort(key=lambda f: int(f["time"].min()))  # type: ignore
+
+    runs: list[list[pl.DataFrame]] = []
+    run_end = None
+    for frame in indexed:
+        start = int(frame["time"].min())  # type: ignore
+        if run_end is None or start > run_end + period_ms:
+            runs.append([frame])
+        else:
+            runs[-1].append(frame)
+        end = int(frame["time"].max())  # type: ignore
+        run_end = end if run_end is None else max(run_end, end)
+
+    return [
+        pl.concat(run)
+        .sort("__seq__")
+        .unique(subset=["time"], keep="last")
+        .sort("time")
+        .drop("__seq__")
+        for run in runs
+    ]
+
+
+def split_runs(data: pl.DataFrame, period_ms: int) -> list[pl.DataFrame]:
+    """按缺口 (相邻两根相差超过一个周期) 把一帧拆为若干段连续数据"""
+    if data.is_empty():
+        return []
+    run = (pl.col("time").diff().fill_null(0) > period_ms).cum_sum()
+    return (
+        data.sort("time")
+        .with_columns(run.alias("__run__"))
+        .partition_by("__run__", maintain_order=True, include_key=False)
+    )
+
+
+class WriteBehindQueue:
+    """
+    延迟写入队列
+
+    - save() 只把数据放入对应数据目录的队列并立即返回
+    - 每个数据目录最多一个后台线程，一次取出全部待写数据合并后写入 (一次分块重写)
+    - 队列为空时线程退出；进程退出时 (atexit) 写完所有数据
+    - flush() 等待写入完成，读取缓存前或测试中使用
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._queues: dict[Path, _DirQueue] = {}
+
+    def save(
+        self,
+        base_dir: Path,
+        loc: DataLocation,
+        new_data: pl.DataFrame,
+        coverage: tuple[int, int, int, str] | None = None,
+    ) -> None:
+        """
+        coverage: 与 new_data 同批写入成功后追加的日志 (data_start, data_end, count, source)，
+        写入失败时与数据一起丢弃。此时 new_data 中的缺口 (隔离的行) 不会被合并为已覆盖
+        """
+        if new_data.is_empty() and coverage is None:
+            return
+        data_dir = get_data_dir(
+            base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+        )
+        with self._cond:
+            queue = self._queues.get(data_dir)
+            if queue is None:
+                queue = self._queues[data_dir] = _DirQueue(base_dir, loc)
+            if coverage is None:
+                queue.pending.append(new_data)
+            else:
+                queue.pending.extend(split_runs(new_data, period_to_ms(loc.period)))
+                queue.coverage.append(coverage)
+            if not queue.running:
+                queue.running = True
+                threading.Thread(
+                    target=self._worker,
+                    args=(data_dir, queue),
+                    name=f"write-behind-{loc.symbol}-{loc.period}",
+                    daemon=True,
+                ).start()
+
+    def _worker(self, data_dir: Path, queue: _DirQueue) -> None:
+        while True:
+            with self._cond:
+                frames, queue.pending = queue.pending, []
+                coverage, queue.coverage = queue.coverage, []
+                if not frames and not coverage:
+                    queue.running = False
+                    self._cond.notify_all()
+                    return
+            try:
+                runs = merge_runs(frames, period_to_ms(queue.loc.period))
+                data_dir.mkdir(parents=True, exist_ok=True)
+                with FileLock(data_dir / ".lock"):
+                    for run in runs:
+                        save_ohlcv(queue.base_dir, queue.loc, run)
+                    for data_start, data_end, count, source in coverage:
+                        append_log(data_dir, data_start, data_end, count, source)
+            except Exception as e:
+                # 缓存写入失败不影响已返回的响应，丢弃本批数据，下次请求会重新获取
+                print(f"[WriteBehind] 写入失败 {data_dir}: {e}")
+
+    def flush(self, data_dir: Path | None = None, timeout: float | None = None) -> bool:
+        """
+        等待指定数据目录 (None 为全部) 的待写数据落盘
+
+        注意: 不能在持有该目录 .lock 时调用，否则后台线程无法写入。
+        返回 False 表示超时。
+        """
+
+        def drained() -> bool:
+            if data_dir is None:
+                queues = list(self._queues.values())
+            else:
+                queues = [q for d, q in self._queues.items() if d == data_dir]
+            return all(
+                not q.running and not q.pending and not q.coverage for q in queues
+            )
+
+        with self._cond:
+            return self._cond.wait_for(drained, timeout=timeout)
+
+
+# 全局单例
+write_behind = WriteBehindQueue()
+
+# 进程退出前写完所有待写数据
+atexit.register(write_behind.flush)
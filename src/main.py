@@ -15,6 +15,11 @@ from src.router.trader_router import ccxt_router
 from src.router.file_handler import file_router
 from src.router.auth_handler import auth_router
 from src.router.extended_router import extended_router
+from src.router.stats_router import stats_router
+from src.router.metrics_router import metrics_router
+from src.router.stream_router import stream_router
+from src.router.export_router import export_router
+from src.router.query_router import query_router
 from scalar_fastapi import get_scalar_api_reference
 
 
@@ -22,6 +27,11 @@ app.include_router(auth_router)
 app.include_router(ccxt_router)
 app.include_router(extended_router)
 app.include_router(file_router)
+app.include_router(stats_router)
+app.include_router(metrics_router)
+app.include_router(stream_router)
+app.include_router(export_router)
+app.include_router(query_router)
 
 
 @app.get("/", response_class=HTMLResponse)
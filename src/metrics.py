@@ -0,0 +1,348 @@
+"""
+进程内指标 (Prometheus 文本格式)
+
+只依赖标准库。热路径上每次记录只有一次字典查找、一次二分查找和一次无竞争的加锁，
+开销在 1 微秒以内 (调用方预先构造标签元组); 导出时才做格式化。
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable
+
+# 默认耗时分桶 (秒)
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# 行数分桶
+ROW_BUCKETS = (0, 1, 10, 100, 500, 1000, 1500, 5000, 10000, 50000)
+
+
+def _escape(value: object) -> str:
+    """标签值转义 (文本格式要求转义 \\、" 和换行)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        lock = self._lock
+        lock.acquire()
+        self.value += amount
+        lock.release()
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._bounds, value)
+        # 显式 acquire/release 比 with 语句少一次上下文管理器调用
+        lock = self._lock
+        lock.acquire()
+        self.counts[i] += 1
+        self.sum += value
+        lock.release()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, values: tuple):
+        """按标签取子指标 (同一组标签复用同一个对象)"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, values: tuple = (), amount: float = 1.0) -> None:
+        self.labels(values).inc(amount)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}{labels} {child.value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, values: tuple, value: float) -> None:
+        self.labels(values).observe(value)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            count = sum(counts)
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.label_names, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，另外支持在导出时调用的 collector (用于通道/实例池等现有统计)"""
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """collector 返回 Prometheus 文本行 (含 HELP/TYPE)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                lines.append(f"# collector {collector.__name__} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+def gauge_lines(
+    name: str, help: str, samples: Iterable[tuple[dict[str, object], float]]
+) -> list[str]:
+    """把 (标签, 值) 列表格式化为 gauge 文本行"""
+    return _sample_lines(name, help, "gauge", samples)
+
+
+def counter_lines(
+    name: str, help: str, samples: Iterable[tuple[dict[str, object], float]]
+) -> list[str]:
+    """把 (标签, 累计值) 列表格式化为 counter 文本行 (name 应以 _total 结尾)"""
+    return _sample_lines(name, help, "counter", samples)
+
+
+def _sample_lines(
+    name: str,
+    help: str,
+    kind: str,
+    samples: Iterable[tuple[dict[str, object], float]],
+) -> list[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        names = tuple(labels.keys())
+        lines.append(
+            f"{name}{_format_labels(names, tuple(labels.values()))} {float(value)}"
+        )
+    return lines
+
+
+# 全局注册表
+registry = MetricsRegistry()
+
+LOC_LABELS = ("exchange", "market", "mode", "period")
+EXCHANGE_LABELS = ("exchange", "market", "mode")
+
+# === OHLCV 缓存 ===
+cache_requests = registry.counter(
+    "ohlcv_cache_requests_total",
+    "get_ohlcv_with_cache 调用次数，result: hit (全部来自缓存) / partial / miss / latest (无起始时间)",
+    (*LOC_LABELS, "result"),
+)
+cache_request_seconds = registry.histogram(
+    "ohlcv_cache_request_seconds",
+    "get_ohlcv_with_cache 总耗时",
+    LOC_LABELS,
+)
+cache_lock_wait_seconds = registry.histogram(
+    "ohlcv_cache_lock_wait_seconds",
+    "数据目录 FileLock 等待耗时",
+    LOC_LABELS,
+)
+cache_rows_fetched = registry.histogram(
+    "ohlcv_cache_rows_fetched",
+    "每次请求从交易所获取的 K 线条数",
+    LOC_LABELS,
+    ROW_BUCKETS,
+)
+cache_fetch_seconds = registry.histogram(
+    "ohlcv_cache_fetch_seconds",
+    "每页网络获取 (fetch_callback) 耗时",
+    LOC_LABELS,
+)
+parquet_read_seconds = registry.histogram(
+    "ohlcv_parquet_read_seconds",
+    "read_ohlcv 耗时",
+    LOC_LABELS,
+)
+parquet_write_seconds = registry.histogram(
+    "ohlcv_parquet_write_seconds",
+    "save_ohlcv 耗时 (分块重写 + 追加日志)",
+    LOC_LABELS,
+)
+parquet_rows_read = registry.counter(
+    "ohlcv_parquet_rows_read_total",
+    "read_ohlcv 返回的行数",
+    LOC_LABELS,
+)
+parquet_rows_written = registry.counter(
+    "ohlcv_parquet_rows_written_total",
+    "save_ohlcv 写入的行数",
+    LOC_LABELS,
+)
+validation_seconds = registry.histogram(
+    "ohlcv_validation_seconds",
+    "入库前校验耗时",
+    LOC_LABELS,
+)
+quarantined_rows = registry.counter(
+    "ohlcv_quarantined_rows_total",
+    "校验未通过被隔离的批次中各检查项失败的行数",
+    (*LOC_LABELS, "check"),
+)
+log_compact_seconds = registry.histogram(
+    "ohlcv_log_compact_seconds",
+    "compact_log 耗时",
+    LOC_LABELS,
+)
+
+# === 交易所调用 ===
+ccxt_call_seconds = registry.histogram(
+    "ccxt_call_seconds",
+    "ccxt 封装函数耗时 (含重试、实例池等待)",
+    (*EXCHANGE_LABELS, "call"),
+)
+ccxt_call_errors = registry.counter(
+    "ccxt_call_errors_total",
+    "ccxt 封装函数抛出的异常",
+    (*EXCHANGE_LABELS, "call", "error"),
+)
+
+
+def loc_labels(loc) -> tuple[str, str, str, str]:
+    """DataLocation -> 指标标签 (不含 symbol，避免标签基数过大)"""
+    return (loc.exchange, loc.market, loc.mode, loc.period)
+
+
+def instrument_ccxt_call(call: str):
+    """
+    装饰 ccxt 封装函数，按 exchange/market/mode/call 记录耗时和异常
+
+    标签取自第一个参数 (请求模型) 或同名关键字参数。
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = args[0] if args else None
+            source = request if hasattr(request, "exchange_name") else None
+            if source is not None:
+                labels = (source.exchange_name, source.market, source.mode, call)
+            else:
+                labels = (
+                    kwargs.get("exchange_name"),
+                    kwargs.get("market"),
+                    kwargs.get("mode"),
+                    call,
+                )
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                ccxt_call_errors.inc((*labels, type(e).__name__))
+                raise
+            finally:
+                ccxt_call_seconds.observe(labels, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
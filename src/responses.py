@@ -46,6 +46,35 @@ class MarketInfoResponse(BaseModel):
     )
 
 
+class MarketTableItem(BaseModel):
+    """市场信息表中的单行 (不含杠杆，杠杆需按品种单独查询)"""
+
+    symbol: str = Field(..., title="交易对", examples=["BTC/USDT:USDT"])
+    base: Optional[str] = Field(None, title="基础货币", examples=["BTC"])
+    quote: Optional[str] = Field(None, title="报价货币", examples=["USDT"])
+    settle: Optional[str] = Field(None, title="结算货币", examples=["USDT", "BTC"])
+    type: Optional[str] = Field(
+        None, title="市场品种", description="swap, future, spot", examples=["swap"]
+    )
+    linear: bool = Field(..., title="是否U本位", examples=[True])
+    active: bool = Field(..., title="是否可交易", examples=[True])
+    precision_amount: Optional[float] = Field(
+        None, title="数量精度 (步长)", examples=[0.001]
+    )
+    precision_price: Optional[float] = Field(
+        None, title="价格精度 (步长)", examples=[0.1]
+    )
+    min_amount: Optional[float] = Field(None, title="最小下单数量", examples=[0.001])
+    contract_size: float = Field(..., title="合约乘数", examples=[1.0])
+
+
+class MarketTableResponse(BaseModel):
+    """市场信息表响应"""
+
+    count: int = Field(..., title="市场数量", examples=[1])
+    markets: List[MarketTableItem] = Field(..., title="市场信息列表")
+
+
 # === Tickers ===
 
 
@@ -237,9 +266,126 @@ class OHLCVResponse(BaseModel):
     pass
 
 
+class IndicatorResponse(BaseModel):
+    columns: List[str] = Field(
+        ..., title="列名", description="time, [OHLCV,] 以及各指标列 (如 ema:20)"
+    )
+    data: List[List[Optional[float]]] = Field(
+        ...,
+        title="数据",
+        description="按行排列，未满预热期的指标为 null (服务端已缓存更早的 K 线时，开头的行直接使用已收敛的值)",
+    )
+
+
+class PanelSymbolInfo(BaseModel):
+    symbol: str = Field(..., title="交易对")
+    rows: int = Field(..., title="原始 K 线数", description="区间内实际存在的 K 线")
+    filled: int = Field(..., title="填充数", description="按填充规则补出的周期数")
+    fetched: bool = Field(
+        ..., title="是否请求了交易所", description="缓存有缺口时才会请求"
+    )
+    error: Optional[str] = Field(
+        None, title="补齐失败原因", description="失败时使用本地缓存中已有的数据"
+    )
+    elapsed_ms: Optional[float] = Field(
+        None, title="补齐耗时 (ms)", description="未请求交易所时为 null"
+    )
+
+
+class PanelResponse(BaseModel):
+    time: List[int] = Field(..., title="周期网格", description="各周期的开盘时间")
+    data: Dict[str, Dict[str, List[Optional[float]]]] = Field(
+        ...,
+        title="数据",
+        description="字段 -> 交易对 -> 与 time 对齐的值",
+        examples=[{"close": {"BTC/USDT": [16500.0, 16510.5]}}],
+    )
+    symbols: List[PanelSymbolInfo] = Field(..., title="各交易对概况")
+
+
+class VenueInfo(BaseModel):
+    """跨交易所查询中单个交易所的结果概况"""
+
+    exchange: str = Field(..., title="交易所", examples=["binance"])
+    symbol: Optional[str] = Field(
+        None,
+        title="交易对",
+        description="按 symbol_map 映射得到",
+        examples=["BTC/USDT:USDT"],
+    )
+    ok: bool = Field(..., title="是否成功")
+    error: Optional[str] = Field(None, title="失败原因")
+    elapsed_ms: Optional[float] = Field(
+        None, title="耗时 (ms)", description="该交易所的请求耗时，未请求时为 null"
+    )
+
+
+class VenueTicker(VenueInfo):
+    ticker: Optional[TickerInfo] = Field(None, title="报价")
+    age_ms: Optional[int] = Field(
+        None, title="报价延迟 (ms)", description="收到响应时距报价时间戳的毫秒数"
+    )
+
+
+class BestPrice(BaseModel):
+    exchange: str = Field(..., title="交易所")
+    price: float = Field(..., title="价格")
+
+
+class ConsolidatedTickerResponse(BaseModel):
+    instrument: str = Field(..., title="品种", examples=["BTC"])
+    venues: List[VenueTicker] = Field(..., title="各交易所报价")
+    best_bid: Optional[BestPrice] = Field(None, title="最高买一价")
+    best_ask: Optional[BestPrice] = Field(None, title="最低卖一价")
+    spread: Optional[float] = Field(
+        None,
+        title="跨交易所价差",
+        description="best_ask - best_bid，为负表示不同交易所之间买卖价交叉",
+    )
+    skew_ms: Optional[int] = Field(
+        None, title="报价时间差 (ms)", description="各交易所报价时间戳的最大差值"
+    )
+
+
+class VenueOHLCV(VenueInfo):
+    rows: int = Field(0, title="原始 K 线数")
+    filled: int = Field(0, title="填充数")
+    fetched: bool = Field(
+        False, title="是否请求了交易所", description="缓存有缺口时才会请求"
+    )
+
+
+class ConsolidatedOHLCVResponse(BaseModel):
+    instrument: str = Field(..., title="品种", examples=["BTC"])
+    time: List[int] = Field(..., title="周期网格", description="各周期的开盘时间")
+    data: Dict[str, Dict[str, List[Optional[float]]]] = Field(
+        ...,
+        title="数据",
+        description="字段 (open/high/low/close/volume) -> 交易所 -> 与 time 对齐的值",
+        examples=[{"close": {"binance": [16500.0], "kraken": [16498.5]}}],
+    )
+    venues: List[VenueOHLCV] = Field(..., title="各交易所概况")
+
+
+class VenueMarket(VenueInfo):
+    market: Optional[MarketTableItem] = Field(None, title="市场信息")
+
+
+class ConsolidatedMarketInfoResponse(BaseModel):
+    instrument: str = Field(..., title="品种", examples=["BTC"])
+    venues: List[VenueMarket] = Field(..., title="各交易所市场信息")
+
+
 class CancelAllOrdersResponse(BaseModel):
     result: List[OrderStructure] | Any = Field(
-        ..., title="取消结果", description="被取消的订单列表或原始响应"
+        ...,
+        title="取消结果",
+        description="被取消的订单列表或原始响应; Binance 固定为 [limit, stop] 两项，失败的一项为 null",
+    )
+    failed_legs: Dict[str, str] = Field(
+        default_factory=dict,
+        title="失败的子请求",
+        description="Binance 分 limit/stop 两次取消，部分失败时在此列出错误",
     )
 
 
@@ -302,3 +448,42 @@ class ClosePositionResponse(BaseModel):
         title="剩余持仓列表",
         description="平仓操作后剩余的持仓（理论上应为空或变少）",
     )
+
+
+class ClosePositionLeg(BaseModel):
+    """单个持仓的平仓结果"""
+
+    symbol: str = Field(..., title="交易对", examples=["BTC/USDT:USDT"])
+    side: Optional[PositionSide] = Field(None, title="持仓方向", examples=["long"])
+    amount: float = Field(..., title="平仓数量", examples=[0.01])
+    ok: bool = Field(..., title="是否成功")
+    order: Optional[Dict[str, Any]] = Field(None, title="平仓订单")
+    error: Optional[str] = Field(None, title="错误信息")
+    elapsed_ms: float = Field(..., title="下单耗时 (ms)")
+
+
+class CloseAllPositionsResponse(BaseModel):
+    legs: List[ClosePositionLeg] = Field(..., title="每个持仓的平仓结果")
+    remaining_positions: List[PositionStructure] = Field(
+        ...,
+        title="剩余持仓列表",
+        description="平仓后再次查询的非零持仓，理论上应为空",
+    )
+    elapsed_ms: float = Field(..., title="总耗时 (ms)")
+
+
+# === Export ===
+
+
+class ExportInfoResponse(BaseModel):
+    id: str = Field(
+        ..., title="导出 id", description="选择条件和数据版本不变时 id 不变"
+    )
+    url: str = Field(..., title="下载地址", description="GET 下载，支持 Range 断点续传")
+    format: str = Field(..., title="导出格式")
+    status: str = Field(
+        ..., title="状态", description="pending / running / complete / failed"
+    )
+    rows: int = Field(..., title="已导出的行数")
+    size: Optional[int] = Field(None, title="文件大小 (字节)", description="完成后才有")
+    error: Optional[str] = Field(None, title="失败原因")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
 from src.responses import OrderStructure, PositionStructure
 from src.base_types import SideType
@@ -28,6 +28,11 @@ class OrdersResponse(BaseModel):
     """订单列表响应 (用于 open/closed orders)"""
 
     orders: List[OrderStructure]
+    failed_legs: Dict[str, str] = Field(
+        default_factory=dict,
+        title="失败的子请求",
+        description="Binance 分 limit/stop 两次请求，部分失败时在此列出错误",
+    )
 
 
 class TradesResponse(BaseModel):
@@ -46,3 +51,25 @@ class GenericResponse(BaseModel):
     """通用响应 (用于 setLeverage, setMarginMode)"""
 
     result: Dict[str, Any]
+
+
+class BatchLegResult(BaseModel):
+    """批量操作中单笔订单的结果"""
+
+    index: int = Field(..., title="请求中的序号")
+    ok: bool = Field(..., title="是否成功")
+    order: Optional[Dict[str, Any]] = Field(None, title="订单结构")
+    error: Optional[str] = Field(None, title="错误信息")
+    native: bool = Field(
+        ..., title="是否走交易所批量接口", description="False 表示逐笔并发提交"
+    )
+    elapsed_ms: float = Field(
+        ..., title="耗时 (ms)", description="批量接口时为所在批次的耗时"
+    )
+
+
+class BatchOrdersResponse(BaseModel):
+    """批量下单 / 批量撤单响应"""
+
+    results: List[BatchLegResult]
+    elapsed_ms: float = Field(..., title="总耗时 (ms)")
@@ -0,0 +1,64 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from src.router.auth_handler import manager
+from src.responses import ExportInfoResponse
+from src.tools.ohlcv_export import export_manager
+from src.types import ExportRequest
+
+# 缓存导出路由，并添加鉴权依赖
+export_router = APIRouter(
+    prefix="/export", dependencies=[Depends(manager)], tags=["Export"]
+)
+
+
+@export_router.post("/ohlcv", response_model=ExportInfoResponse)
+async def create_export(params: ExportRequest):
+    """
+    创建 OHLCV 缓存导出，返回下载地址
+
+    相同的选择条件在数据没有变化时返回同一个导出 (已生成的文件直接复用)。
+    """
+    try:
+        job = await asyncio.to_thread(export_manager.create, params)
+        return job.info()
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@export_router.get("/ohlcv/{export_id}")
+async def download_export(export_id: str, request: Request):
+    """
+    下载导出文件
+
+    - 未生成时边生成边发送 (chunked transfer)，客户端断开后后台继续生成
+    - 已生成时支持 Range / If-Range 断点续传 (ETag 为导出 id)
+    - 带 Range 请求尚未生成完的导出时，等待生成完成后返回对应范围
+    """
+    job = export_manager.get(export_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导出不存在或已过期")
+
+    headers = {"ETag": f'"{job.id}"', "Accept-Ranges": "bytes"}
+    if not job.complete:
+        export_manager.start(job)
+        if "range" not in request.headers:
+            return StreamingResponse(
+                export_manager.stream(job),
+                media_type=job.media_type,
+                headers={
+                    **headers,
+                    "Content-Disposition": f'attachment; filename="{job.filename}"',
+                },
+            )
+        await asyncio.to_thread(job.done.wait)
+        if not job.complete:
+            raise HTTPException(status_code=500, detail=f"导出失败: {job.error}")
+
+    return FileResponse(
+        job.path, media_type=job.media_type, filename=job.filename, headers=headers
+    )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from src.router.auth_handler import manager
+from src.tools.lanes import lane_manager
 from src.types_extended import (
     FetchOpenOrdersRequest,
     FetchClosedOrdersRequest,
@@ -8,12 +9,15 @@ from src.types_extended import (
     SetLeverageRequest,
     SetMarginModeRequest,
     CancelOrderRequest,
+    CreateOrdersBatchRequest,
+    CancelOrdersBatchRequest,
 )
 from src.responses_extended import (
     OrdersResponse,
     TradesResponse,
     PositionsResponse,
     GenericResponse,
+    BatchOrdersResponse,
 )
 from src.responses import OrderResponse  # Reuse existing OrderResponse
 from src.tools.ccxt_utils_extended import (
@@ -24,6 +28,8 @@ from src.tools.ccxt_utils_extended import (
     set_leverage_ccxt,
     set_margin_mode_ccxt,
     cancel_order_ccxt,
+    create_orders_batch_ccxt,
+    cancel_orders_batch_ccxt,
 )
 
 extended_router = APIRouter(
@@ -32,72 +38,113 @@ extended_router = APIRouter(
 
 
 @extended_router.get("/fetch_open_orders", response_model=OrdersResponse)
-def get_open_orders(params: FetchOpenOrdersRequest = Depends()):
+async def get_open_orders(params: FetchOpenOrdersRequest = Depends()):
     """获取当前挂单
     包括限价挂单和止盈止损挂单, 不包括持仓
     """
     try:
-        return fetch_open_orders_ccxt(params)
+        return await lane_manager.run("account", fetch_open_orders_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @extended_router.get("/fetch_closed_orders", response_model=OrdersResponse)
-def get_closed_orders(params: FetchClosedOrdersRequest = Depends()):
+async def get_closed_orders(params: FetchClosedOrdersRequest = Depends()):
     """获取历史订单"""
     try:
-        return fetch_closed_orders_ccxt(params)
+        return await lane_manager.run("account", fetch_closed_orders_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @extended_router.get("/fetch_my_trades", response_model=TradesResponse)
-def get_my_trades(params: FetchMyTradesRequest = Depends()):
+async def get_my_trades(params: FetchMyTradesRequest = Depends()):
     """获取成交记录"""
     try:
-        return fetch_my_trades_ccxt(params)
+        return await lane_manager.run("account", fetch_my_trades_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @extended_router.get("/fetch_positions", response_model=PositionsResponse)
-def get_positions(params: FetchPositionsRequest = Depends()):
+async def get_positions(params: FetchPositionsRequest = Depends()):
     """
     获取持仓信息
     不包括限价挂单和止盈止损挂单
     """
     try:
-        return fetch_positions_ccxt(params)
+        return await lane_manager.run("account", fetch_positions_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @extended_router.post("/set_leverage", response_model=GenericResponse)
-def set_leverage(params: SetLeverageRequest):
+async def set_leverage(params: SetLeverageRequest):
     """设置杠杆"""
     try:
-        return set_leverage_ccxt(params)
+        return await lane_manager.run("account", set_leverage_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @extended_router.post("/set_margin_mode", response_model=GenericResponse)
-def set_margin_mode(params: SetMarginModeRequest):
+async def set_margin_mode(params: SetMarginModeRequest):
     """设置保证金模式 (cross/isolated)
     kraken不支持设置保证金模式
     """
     try:
-        return set_margin_mode_ccxt(params)
+        return await lane_manager.run("account", set_margin_mode_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @extended_router.post("/cancel_order", response_model=OrderResponse)
-def cancel_order(params: CancelOrderRequest):
+async def cancel_order(params: CancelOrderRequest):
     """取消单个订单
     包括限价挂单和止盈止损挂单, 不包括持仓
     """
     try:
-        return cancel_order_ccxt(params)
+        return await lane_manager.run("order", cancel_order_ccxt, params)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@extended_router.post("/create_orders_batch", response_model=BatchOrdersResponse)
+async def create_orders_batch(params: CreateOrdersBatchRequest):
+    """批量下单
+    交易所支持时走批量接口 (Binance 合约每批最多 5 笔, 不支持条件单),
+    否则逐笔并发提交, 返回每笔订单的结果和耗时
+    """
+    try:
+        return await lane_manager.run("order", create_orders_batch_ccxt, params)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@extended_router.post("/cancel_orders_batch", response_model=BatchOrdersResponse)
+async def cancel_orders_batch(params: CancelOrdersBatchRequest):
+    """批量撤单
+    按交易对分组走批量接口, 失败或不支持时逐笔并发撤单, 返回每笔订单的结果和耗时
+    """
+    try:
+        return await lane_manager.run("order", cancel_orders_batch_ccxt, params)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
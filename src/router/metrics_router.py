@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from src.router.auth_handler import manager
+from src.metrics import registry, counter_lines, gauge_lines
+from src.tools.lanes import lane_manager
+from src.tools.exchange_manager import exchange_manager
+from src.tools.circuit_breaker import circuit_breakers
+from src.tools.http_pool import http_pool_manager
+
+# Prometheus 指标路由，并添加鉴权依赖 (抓取时使用 Bearer token)
+metrics_router = APIRouter(dependencies=[Depends(manager)], tags=["Stats"])
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _lane_metrics() -> list[str]:
+    lanes = lane_manager.stats()
+    return [
+        *gauge_lines(
+            "lane_running",
+            "执行通道中正在执行的任务数",
+            [({"lane": s["name"]}, s["running"]) for s in lanes],
+        ),
+        *gauge_lines(
+            "lane_queued",
+            "执行通道中排队的任务数",
+            [({"lane": s["name"]}, s["queued"]) for s in lanes],
+        ),
+        *counter_lines(
+            "lane_rejected_total",
+            "执行通道因排队已满拒绝的请求数 (累计)",
+            [({"lane": s["name"]}, s["rejected"]) for s in lanes],
+        ),
+        *gauge_lines(
+            "lane_queue_ms_p99",
+            "执行通道最近排队耗时 p99 (毫秒)",
+            [({"lane": s["name"]}, s["queue_ms_p99"]) for s in lanes],
+        ),
+    ]
+
+
+def _pool_metrics() -> list[str]:
+    pools = exchange_manager.pool_stats()
+    return [
+        *gauge_lines(
+            "exchange_pool_in_use",
+            "实例池中已借出的实例数",
+            [({"pool": p["name"]}, p["in_use"]) for p in pools],
+        ),
+        *gauge_lines(
+            "exchange_pool_size",
+            "实例池大小",
+            [({"pool": p["name"]}, p["size"]) for p in pools],
+        ),
+        *counter_lines(
+            "exchange_pool_contended_total",
+            "借出时需要等待的次数 (累计)",
+            [({"pool": p["name"]}, p["contended"]) for p in pools],
+        ),
+        *gauge_lines(
+            "exchange_pool_wait_ms_max",
+            "借出实例的最长等待耗时 (毫秒)",
+            [({"pool": p["name"]}, p["wait_ms_max"]) for p in pools],
+        ),
+    ]
+
+
+def _breaker_metrics() -> list[str]:
+    return gauge_lines(
+        "circuit_breaker_state",
+        "熔断器状态: 0=closed 1=half_open 2=open",
+        [
+            ({"breaker": b["name"]}, _BREAKER_STATES[b["state"]])
+            for b in circuit_breakers.stats()
+        ],
+    )
+
+
+def _http_metrics() -> list[str]:
+    adapters = http_pool_manager.stats()["adapters"]
+    return [
+        *counter_lines(
+            "http_pool_requests_total",
+            "共享连接池发出的请求数 (累计)",
+            [({"exchange": a["exchange"]}, a["requests"]) for a in adapters],
+        ),
+        *counter_lines(
+            "http_pool_new_connections_total",
+            "共享连接池新建的连接数 (累计)",
+            [({"exchange": a["exchange"]}, a["new_connections"]) for a in adapters],
+        ),
+    ]
+
+
+for _collector in (_lane_metrics, _pool_metrics, _breaker_metrics, _http_metrics):
+    registry.register_collector(_collector)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus 文本格式指标
+
+    OHLCV 缓存命中/耗时、parquet 读写、ccxt 调用耗时与异常，以及执行通道、实例池、熔断器、连接池状态。
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,45 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.router.auth_handler import manager
+from src.tools.ohlcv_query import QueryError, QueryTimeout, query_engine
+from src.types import SqlQueryRequest
+
+# 缓存查询路由，并添加鉴权依赖
+query_router = APIRouter(
+    prefix="/query", dependencies=[Depends(manager)], tags=["Query"]
+)
+
+
+@query_router.post("/sql")
+async def query_sql(params: SqlQueryRequest):
+    """
+    在 OHLCV 缓存上执行只读 SQL，结果以 Arrow IPC stream 返回
+
+    表 ohlcv 的分区列 exchange / mode / market / symbol / period 来自缓存目录层级
+    (symbol 为目录名形式，如 BTC_USDT_USDT)，按分区列过滤时只读取匹配的目录。
+
+    响应头: X-Query-Rows 行数, X-Query-Ms 执行耗时, X-Query-Truncated 超过行数上限被截断。
+    """
+    try:
+        result = await asyncio.to_thread(
+            query_engine.execute, params.sql, params.timeout
+        )
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        query_engine.ipc_stream(result.frame),
+        media_type="application/vnd.apache.arrow.stream",
+        headers={
+            "X-Query-Rows": str(len(result.frame)),
+            "X-Query-Ms": f"{result.elapsed_ms:.1f}",
+            "X-Query-Truncated": "true" if result.truncated else "false",
+        },
+    )
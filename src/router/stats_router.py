@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends
+from src.router.auth_handler import manager
+from src.tools.lanes import lane_manager
+from src.tools.exchange_manager import exchange_manager
+from src.tools.http_pool import http_pool_manager
+from src.tools.circuit_breaker import circuit_breakers
+from src.tools.ohlcv_stream import ohlcv_streams
+from src.tools.indicators import indicator_cache
+from src.tools.ohlcv_export import export_manager
+
+# 运行状态查询路由，并添加鉴权依赖
+stats_router = APIRouter(
+    prefix="/stats", dependencies=[Depends(manager)], tags=["Stats"]
+)
+
+
+@stats_router.get("/lanes")
+def get_lane_stats():
+    """
+    执行通道状态
+
+    各通道 (order / account / market_data) 的线程数、执行中/排队数量、拒绝次数和排队耗时。
+    """
+    return {"lanes": lane_manager.stats()}
+
+
+@stats_router.get("/exchange_pools")
+def get_exchange_pool_stats():
+    """
+    交易所实例池状态
+
+    各 (exchange, market, mode) 的实例数、占用数、借出次数、发生等待的次数和等待耗时。
+    """
+    return {"pools": exchange_manager.pool_stats()}
+
+
+@stats_router.get("/http")
+def get_http_pool_stats():
+    """
+    HTTP 连接池状态
+
+    各交易所共享连接池的请求数、新建连接数与复用率，DNS 缓存命中情况和预热 ping 结果。
+    """
+    return http_pool_manager.stats()
+
+
+@stats_router.get("/circuit_breakers")
+def get_circuit_breaker_stats():
+    """
+    熔断器状态
+
+    各交易所的状态 (closed / open / half_open)、连续错误数、熔断次数和拒绝的请求数。
+    """
+    return {"breakers": circuit_breakers.stats()}
+
+
+@stats_router.get("/streams")
+def get_stream_stats():
+    """
+    OHLCV 实时推送状态
+
+    各上游 feed 的订阅者数、轮询次数、推送事件数、已保存的收盘 K 线数和最近错误。
+    """
+    return {"streams": ohlcv_streams.stats()}
+
+
+@stats_router.get("/indicators")
+def get_indicator_stats():
+    """
+    指标结果缓存状态
+
+    缓存条目数、缓存的行数，以及命中 / 增量计算 / 重建次数。
+    """
+    return {"indicators": indicator_cache.stats()}
+
+
+@stats_router.get("/exports")
+def get_export_stats():
+    """
+    缓存导出状态
+
+    本次运行中创建或下载过的导出: 状态、已导出行数、文件大小和失败原因。
+    """
+    return {"exports": export_manager.stats()}
@@ -0,0 +1,57 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.router.auth_handler import manager
+from src.tools.exchange_manager import exchange_manager
+from src.tools.ohlcv_stream import ohlcv_streams, StreamKey
+from src.types import OHLCVStreamParams
+
+# 实时推送路由，并添加鉴权依赖
+stream_router = APIRouter(
+    prefix="/stream", dependencies=[Depends(manager)], tags=["Stream"]
+)
+
+
+async def _sse(key: StreamKey):
+    """把订阅事件编码为 Server-Sent Events"""
+    async for event in ohlcv_streams.events(key):
+        if event is None:
+            yield ": ping\n\n"
+            continue
+        yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@stream_router.get("/ohlcv")
+async def stream_ohlcv(params: OHLCVStreamParams = Depends()):
+    """
+    订阅 OHLCV 实时更新 (Server-Sent Events)
+
+    同一 (exchange, market, mode, symbol, timeframe) 的所有订阅者共用一个上游轮询。
+    - event: candle，data 为 {"candle": [time, open, high, low, close, volume], "closed": bool, ...}
+      正在形成的 K 线每次变化推送一次，收盘时推送 closed=true (同时写入本地缓存)
+    - event: error，上游轮询失败 (会自动重试)
+    - event: overflow，客户端消费过慢被断开
+    - 无事件时每 heartbeat 秒发送一次 ": ping" 注释行
+    """
+    try:
+        # 交易所组合未启用时直接返回 503，而不是建立空的推送
+        exchange_manager.get(params.exchange_name, params.market, params.mode)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    key = StreamKey(
+        params.exchange_name,
+        params.market,
+        params.mode,
+        params.symbol,
+        params.timeframe,
+    )
+    return StreamingResponse(
+        _sse(key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,29 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from src.tools.ccxt_utils import (
     fetch_tickers_ccxt,
     fetch_ohlcv_ccxt,
+    fetch_indicators_ccxt,
+    fetch_panel_ccxt,
+    fetch_consolidated_ticker_ccxt,
+    fetch_consolidated_ohlcv_ccxt,
+    fetch_consolidated_market_info_ccxt,
     fetch_balance_ccxt,
     fetch_market_info_ccxt,
+    fetch_market_table_ccxt,
     create_market_order_ccxt,
     create_limit_order_ccxt,
     create_stop_market_order_ccxt,
     create_take_profit_market_order_ccxt,
     close_position_ccxt,
+    close_all_positions_ccxt,
     cancel_all_orders_ccxt,
     fetch_order_ccxt,
 )
 from src.router.auth_handler import manager
+from src.tools.lanes import lane_manager
+from src.tools.circuit_breaker import StaleData
+from src.tracing import span
 from src.types import (
     MarketOrderRequest,
     LimitOrderRequest,
     StopMarketOrderRequest,
     TakeProfitMarketOrderRequest,
     ClosePositionRequest,
+    CloseAllPositionsRequest,
     CancelAllOrdersRequest,
     OHLCVParams,
+    IndicatorParams,
+    PanelRequest,
+    ConsolidatedRequest,
+    ConsolidatedOHLCVRequest,
     BalanceRequest,
     TickersRequest,
     MarketInfoRequest,
+    MarketTableRequest,
     FetchOrderRequest,
 )
 from src.responses import (
@@ -31,8 +47,15 @@ from src.responses import (
     BalanceResponse,
     OrderResponse,
     MarketInfoResponse,
+    MarketTableResponse,
     ClosePositionResponse,
+    CloseAllPositionsResponse,
     CancelAllOrdersResponse,
+    IndicatorResponse,
+    PanelResponse,
+    ConsolidatedTickerResponse,
+    ConsolidatedOHLCVResponse,
+    ConsolidatedMarketInfoResponse,
 )
 
 # 创建文件处理路由，并添加鉴权依赖
@@ -41,10 +64,22 @@ ccxt_router = APIRouter(
 )
 
 
+def _unwrap_stale(result, response: Response):
+    """熔断期间返回的缓存数据: 标记响应头并取出原始数据"""
+    if not isinstance(result, StaleData):
+        return result
+    response.headers["X-Data-Stale"] = "true"
+    response.headers["X-Data-Stale-Reason"] = "circuit-open"
+    if result.age_ms is not None:
+        response.headers["X-Data-Age-Ms"] = str(result.age_ms)
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    return result.data
+
+
 @ccxt_router.get("/fetch_balance", response_model=BalanceResponse)
-def get_balance(params: BalanceRequest = Depends()):
+async def get_balance(params: BalanceRequest = Depends()):
     try:
-        result = fetch_balance_ccxt(params)
+        result = await lane_manager.run("account", fetch_balance_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -53,13 +88,15 @@ def get_balance(params: BalanceRequest = Depends()):
 
 
 @ccxt_router.get("/fetch_tickers", response_model=TickersResponse)
-def get_tickers(params: TickersRequest = Depends()):
+async def get_tickers(response: Response, params: TickersRequest = Depends()):
     """
     获取指定交易所的交易对报价（tickers）数据。
+
+    交易所熔断期间返回最近一次的报价，响应头带 X-Data-Stale / X-Data-Age-Ms。
     """
     try:
-        result = fetch_tickers_ccxt(params)
-        return result
+        result = await lane_manager.run("market_data", fetch_tickers_ccxt, params)
+        return _unwrap_stale(result, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -68,30 +105,146 @@ def get_tickers(params: TickersRequest = Depends()):
 
 
 @ccxt_router.get("/fetch_ohlcv", response_model=list[list[float]])
-def get_ohlcv(params: OHLCVParams = Depends()):
+async def get_ohlcv(response: Response, params: OHLCVParams = Depends()):
     """
     获取 OHLCV（开盘价、最高价、最低价、收盘价、成交量）数据。
+
+    交易所熔断期间直接返回本地缓存，响应头带 X-Data-Stale / X-Data-Age-Ms。
+    请求头 X-Trace: 1 或 trace=1 时返回各阶段耗时 (Server-Timing)。
+    """
+    try:
+        with span("handler"):
+            ohlcv_data = await lane_manager.run("market_data", fetch_ohlcv_ccxt, params)
+            return _unwrap_stale(ohlcv_data, response)
+    except HTTPException as e:
+        print(e)
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@ccxt_router.get("/fetch_indicators", response_model=IndicatorResponse)
+async def get_indicators(response: Response, params: IndicatorParams = Depends()):
+    """
+    在 OHLCV 数据上计算指标 (sma / ema / rsi / atr / bbands)
+
+    已收盘 K 线的结果在服务端缓存并增量更新，未满预热期的行为 null。
+    交易所熔断期间基于本地缓存计算，响应头带 X-Data-Stale / X-Data-Age-Ms。
+    """
+    try:
+        with span("handler"):
+            result = await lane_manager.run(
+                "market_data", fetch_indicators_ccxt, params
+            )
+            return _unwrap_stale(result, response)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@ccxt_router.post("/fetch_panel", response_model=PanelResponse)
+async def get_panel(params: PanelRequest):
+    """
+    多品种 K 线对齐面板 (time × symbol)
+
+    所有品种对齐到同一周期网格，缺失的周期按 fill 规则填充。
+    缓存完整覆盖的品种直接读取本地数据，有缺口的品种并发补齐，
+    补齐失败的品种使用本地缓存并在 symbols[].error 中说明。
+    """
+    try:
+        with span("handler"):
+            return await lane_manager.run("market_data", fetch_panel_ccxt, params)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@ccxt_router.get(
+    "/fetch_consolidated_ticker", response_model=ConsolidatedTickerResponse
+)
+async def get_consolidated_ticker(params: ConsolidatedRequest = Depends()):
+    """
+    同一品种在各交易所的报价 (并发请求)
+
+    品种按 symbol_map 映射为各交易所的交易对，返回各交易所的报价和请求耗时、
+    最优买卖价及跨交易所价差。单个交易所失败时在 venues[].error 中说明。
     """
     try:
-        ohlcv_data = fetch_ohlcv_ccxt(params)
-        return ohlcv_data
+        return await lane_manager.run(
+            "market_data", fetch_consolidated_ticker_ccxt, params
+        )
     except HTTPException as e:
+        raise e
+    except Exception as e:
         print(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@ccxt_router.get("/fetch_consolidated_ohlcv", response_model=ConsolidatedOHLCVResponse)
+async def get_consolidated_ohlcv(params: ConsolidatedOHLCVRequest = Depends()):
+    """
+    同一品种在各交易所的 K 线，对齐到同一周期网格
+
+    缓存完整覆盖的交易所直接读取本地数据，有缺口的交易所并发补齐。
+    """
+    try:
+        with span("handler"):
+            return await lane_manager.run(
+                "market_data", fetch_consolidated_ohlcv_ccxt, params
+            )
+    except HTTPException as e:
         raise e
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@ccxt_router.get(
+    "/fetch_consolidated_market_info", response_model=ConsolidatedMarketInfoResponse
+)
+async def get_consolidated_market_info(params: ConsolidatedRequest = Depends()):
+    """同一品种在各交易所的市场信息 (精度、最小数量、合约乘数等)"""
+    try:
+        return await lane_manager.run(
+            "market_data", fetch_consolidated_market_info_ccxt, params
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @ccxt_router.get("/fetch_market_info", response_model=MarketInfoResponse)
-def get_market_info(params: MarketInfoRequest = Depends()):
+async def get_market_info(params: MarketInfoRequest = Depends()):
     """
     获取市场元数据 (用于下单计算)
 
     返回精度、最小数量、合约类型、杠杆等信息。
     """
     try:
-        result = fetch_market_info_ccxt(params)
+        result = await lane_manager.run("account", fetch_market_info_ccxt, params)
+        return result
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@ccxt_router.get("/fetch_market_table", response_model=MarketTableResponse)
+async def get_market_table(params: MarketTableRequest = Depends()):
+    """
+    批量获取市场元数据表 (用于全市场扫描)
+
+    返回所有品种的精度、最小数量、合约乘数、结算货币等信息。
+    数据在加载 markets 时预计算，可按 type / settle / linear 过滤。
+    """
+    try:
+        result = await lane_manager.run("market_data", fetch_market_table_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -100,13 +253,13 @@ def get_market_info(params: MarketInfoRequest = Depends()):
 
 
 @ccxt_router.get("/fetch_order", response_model=OrderResponse)
-def get_order(params: FetchOrderRequest = Depends()):
+async def get_order(params: FetchOrderRequest = Depends()):
     """
     获取特定订单详情
     注意kraken目前不支持
     """
     try:
-        result = fetch_order_ccxt(params)
+        result = await lane_manager.run("account", fetch_order_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -115,12 +268,12 @@ def get_order(params: FetchOrderRequest = Depends()):
 
 
 @ccxt_router.post("/create_market_order", response_model=OrderResponse)
-def create_market_order(params: MarketOrderRequest):
+async def create_market_order(params: MarketOrderRequest):
     """
     在指定交易所创建市价订单。
     """
     try:
-        result = create_market_order_ccxt(params)
+        result = await lane_manager.run("order", create_market_order_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -130,12 +283,12 @@ def create_market_order(params: MarketOrderRequest):
 
 
 @ccxt_router.post("/create_limit_order", response_model=OrderResponse)
-def create_limit_order(params: LimitOrderRequest):
+async def create_limit_order(params: LimitOrderRequest):
     """
     在指定交易所创建限价订单。
     """
     try:
-        result = create_limit_order_ccxt(params)
+        result = await lane_manager.run("order", create_limit_order_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -145,12 +298,12 @@ def create_limit_order(params: LimitOrderRequest):
 
 
 @ccxt_router.post("/create_stop_market_order", response_model=OrderResponse)
-def create_stop_market_order(params: StopMarketOrderRequest):
+async def create_stop_market_order(params: StopMarketOrderRequest):
     """
     在指定交易所创建止损市价订单。
     """
     try:
-        result = create_stop_market_order_ccxt(params)
+        result = await lane_manager.run("order", create_stop_market_order_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -160,12 +313,14 @@ def create_stop_market_order(params: StopMarketOrderRequest):
 
 
 @ccxt_router.post("/create_take_profit_market_order", response_model=OrderResponse)
-def create_take_profit_market_order(params: TakeProfitMarketOrderRequest):
+async def create_take_profit_market_order(params: TakeProfitMarketOrderRequest):
     """
     在指定交易所创建止盈市价订单。
     """
     try:
-        result = create_take_profit_market_order_ccxt(params)
+        result = await lane_manager.run(
+            "order", create_take_profit_market_order_ccxt, params
+        )
         return result
     except HTTPException as e:
         raise e
@@ -175,7 +330,7 @@ def create_take_profit_market_order(params: TakeProfitMarketOrderRequest):
 
 
 @ccxt_router.post("/close_position", response_model=ClosePositionResponse)
-def close_position(params: ClosePositionRequest):
+async def close_position(params: ClosePositionRequest):
     """
     关闭指定品种的当前仓位 (不包含限价挂单和止盈止损挂单)。
     "side": "long" "short" null, 如果是null就平仓所有方向
@@ -184,7 +339,7 @@ def close_position(params: ClosePositionRequest):
     Equivalent to Close Position.
     """
     try:
-        result = close_position_ccxt(params)
+        result = await lane_manager.run("order", close_position_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -193,13 +348,31 @@ def close_position(params: ClosePositionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@ccxt_router.post("/close_all_positions", response_model=CloseAllPositionsResponse)
+async def close_all_positions(params: CloseAllPositionsRequest):
+    """
+    关闭账户下所有品种的仓位 (不包含限价挂单和止盈止损挂单)。
+    "side": "long" "short" null, 如果是null就平仓所有方向
+
+    所有平仓单并发提交 (max_concurrency 控制并发上限)，返回每个持仓的结果和耗时。
+    """
+    try:
+        result = await lane_manager.run("order", close_all_positions_ccxt, params)
+        return result
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"Error closing all positions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @ccxt_router.post("/cancel_all_orders", response_model=CancelAllOrdersResponse)
-def cancel_all_orders(params: CancelAllOrdersRequest):
+async def cancel_all_orders(params: CancelAllOrdersRequest):
     """
     取消指定交易对所有挂单
     """
     try:
-        result = cancel_all_orders_ccxt(params)
+        result = await lane_manager.run("order", cancel_all_orders_ccxt, params)
         return result
     except HTTPException as e:
         raise e
@@ -1,4 +1,8 @@
+from typing import Any, Callable, ContextManager
+
 import ccxt
+from src.tools.concurrent_calls import run_concurrently, with_instance
+from src.tools.order_index import order_index, OrderKind
 from src.types import CancelAllOrdersRequest, FetchOrderRequest
 from src.types_extended import (
     FetchOpenOrdersRequest,
@@ -7,133 +11,200 @@ from src.types_extended import (
 )
 
 
-# --- Fetch Open Orders ---
-def fetch_open_orders(exchange, request: FetchOpenOrdersRequest):
+# --- Order Type Index ---
+def remember_orders(request, orders: list, kind: OrderKind) -> None:
+    """Records order ids as normal / stop so later lookups hit the right endpoint."""
+    order_ids = [str(o["id"]) for o in orders if o and o.get("id") is not None]
+    if order_ids:
+        order_index.record(
+            request.exchange_name, request.market, request.mode, order_ids, kind
+        )
+
+
+def _endpoint_order(request) -> list[tuple[bool, bool]]:
+    """Returns [(use_stop, is_last), ...], known stop orders try the stop endpoint first."""
+    kind = order_index.lookup(
+        request.exchange_name, request.market, request.mode, request.id
+    )
+    if kind == "stop":
+        return [(True, False), (False, True)]
+    return [(False, False), (True, True)]
+
+
+def _stop_params(stop: bool) -> dict:
+    return {"stop": True} if stop else {}
+
+
+# --- Dual-leg helper ---
+Checkout = Callable[[], ContextManager[Any]]
+
+
+def _run_legs(checkout: Checkout, calls: dict) -> tuple[dict, dict[str, str]]:
     """
-    Patched fetch_open_orders for Binance:
-    Merges Limit orders (default) and Stop orders (params={'stop': True}).
+    Runs the limit leg and the stop leg concurrently, each on its own checked-out
+    instance (one instance is never shared between threads).
+    Raises if every leg failed; partial failures are returned as failed_legs.
     """
-    # 1. Fetch Limit Orders
-    limit_orders = exchange.fetch_open_orders(
-        symbol=request.symbol, since=request.since, limit=request.limit, params={}
+    results, errors = run_concurrently(
+        {name: with_instance(checkout, fn) for name, fn in calls.items()}
     )
+    if not results:
+        raise next(iter(errors.values()))
+
+    failed_legs = {}
+    for name, e in errors.items():
+        print(f"[BinanceAdapter] {name.capitalize()} leg failed: {e}")
+        failed_legs[name] = f"{type(e).__name__}: {e}"
+    return results, failed_legs
 
-    # 2. Fetch Stop Orders
-    stop_orders = exchange.fetch_open_orders(
-        symbol=request.symbol,
-        since=request.since,
-        limit=request.limit,
-        params={"stop": True},
+
+def _merge_orders(request, results: dict) -> list:
+    """Merge and sort by timestamp descending, remembering the type of every id seen"""
+    remember_orders(request, results.get("limit", []), "normal")
+    remember_orders(request, results.get("stop", []), "stop")
+    all_orders = results.get("limit", []) + results.get("stop", [])
+    all_orders.sort(key=lambda x: x["timestamp"] or 0, reverse=True)
+    return all_orders
+
+
+# --- Fetch Open Orders ---
+def fetch_open_orders(checkout: Checkout, request: FetchOpenOrdersRequest):
+    """
+    Patched fetch_open_orders for Binance:
+    Merges Limit orders (default) and Stop orders (params={'stop': True}),
+    both legs are fetched concurrently on separate instances from checkout.
+    """
+    results, failed_legs = _run_legs(
+        checkout,
+        {
+            # 1. Fetch Limit Orders
+            "limit": lambda exchange: exchange.fetch_open_orders(
+                symbol=request.symbol,
+                since=request.since,
+                limit=request.limit,
+                params={},
+            ),
+            # 2. Fetch Stop Orders
+            "stop": lambda exchange: exchange.fetch_open_orders(
+                symbol=request.symbol,
+                since=request.since,
+                limit=request.limit,
+                params={"stop": True},
+            ),
+        },
     )
 
     # 3. Merge and Sort
-    all_orders = limit_orders + stop_orders
-    # Sort by timestamp descending
-    all_orders.sort(key=lambda x: x["timestamp"], reverse=True)
-
-    return {"orders": all_orders}
+    return {"orders": _merge_orders(request, results), "failed_legs": failed_legs}
 
 
 # --- Fetch Closed Orders ---
-def fetch_closed_orders(exchange, request: FetchClosedOrdersRequest):
+def fetch_closed_orders(checkout: Checkout, request: FetchClosedOrdersRequest):
     """
     Patched fetch_closed_orders for Binance:
-    Merges Limit orders (default) and Stop orders (params={'stop': True}).
+    Merges Limit orders (default) and Stop orders (params={'stop': True}),
+    both legs are fetched concurrently on separate instances from checkout.
     """
-    # 1. Fetch Limit History
-    limit_orders = exchange.fetch_closed_orders(
-        symbol=request.symbol, since=request.since, limit=request.limit, params={}
-    )
-
-    # 2. Fetch Stop History
-    stop_orders = exchange.fetch_closed_orders(
-        symbol=request.symbol,
-        since=request.since,
-        limit=request.limit,
-        params={"stop": True},
+    results, failed_legs = _run_legs(
+        checkout,
+        {
+            # 1. Fetch Limit History
+            "limit": lambda exchange: exchange.fetch_closed_orders(
+                symbol=request.symbol,
+                since=request.since,
+                limit=request.limit,
+                params={},
+            ),
+            # 2. Fetch Stop History
+            "stop": lambda exchange: exchange.fetch_closed_orders(
+                symbol=request.symbol,
+                since=request.since,
+                limit=request.limit,
+                params={"stop": True},
+            ),
+        },
     )
 
     # 3. Merge and Sort
-    all_orders = limit_orders + stop_orders
-    all_orders.sort(key=lambda x: x["timestamp"], reverse=True)
-
-    return {"orders": all_orders}
+    return {"orders": _merge_orders(request, results), "failed_legs": failed_legs}
 
 
 # --- Cancel All Orders ---
-def cancel_all_orders(exchange, request: CancelAllOrdersRequest):
+def cancel_all_orders(checkout: Checkout, request: CancelAllOrdersRequest):
     """
     Patched cancel_all_orders for Binance:
-    Cancels Limit orders (default) AND Stop orders (params={'stop': True}).
+    Cancels Limit orders (default) AND Stop orders (params={'stop': True}),
+    both legs are sent concurrently on separate instances from checkout.
     """
-    results = []
-
-    # 1. Cancel Limit Orders
-    print(f"[BinanceAdapter] Cancelling Limit Orders for {request.symbol}...")
-    res_limit = exchange.cancel_all_orders(request.symbol, params={})
-    print(
-        f"[BinanceAdapter] Limit Cancel Result: {len(res_limit) if isinstance(res_limit, list) else res_limit}"
+    print(f"[BinanceAdapter] Cancelling Limit + Stop Orders for {request.symbol}...")
+    results, failed_legs = _run_legs(
+        checkout,
+        {
+            # 1. Cancel Limit Orders
+            "limit": lambda exchange: exchange.cancel_all_orders(
+                request.symbol, params={}
+            ),
+            # 2. Cancel Stop Orders
+            "stop": lambda exchange: exchange.cancel_all_orders(
+                request.symbol, params={"stop": True}
+            ),
+        },
     )
-    results.append(res_limit)
 
-    # 2. Cancel Stop Orders
-    print(f"[BinanceAdapter] Cancelling Stop Orders for {request.symbol}...")
-    res_stop = exchange.cancel_all_orders(request.symbol, params={"stop": True})
-    print(
-        f"[BinanceAdapter] Stop Cancel Result: {len(res_stop) if isinstance(res_stop, list) else res_stop}"
-    )
-    results.append(res_stop)
+    for name, res in results.items():
+        summary = len(res) if isinstance(res, list) else res
+        print(f"[BinanceAdapter] {name.capitalize()} Cancel Result: {summary}")
 
-    return {"result": results}
+    # Positional [limit, stop]; a failed leg is None (its error is in failed_legs)
+    return {
+        "result": [results.get(name) for name in ("limit", "stop")],
+        "failed_legs": failed_legs,
+    }
 
 
 # --- Fetch Single Order ---
 def fetch_order(exchange, request: FetchOrderRequest):
     """
     Patched fetch_order for Binance:
-    Tries default fetch. If fails with 'Order does not exist', retries with params={'stop': True}.
+    Tries the endpoint known from the order index first (default if unknown).
+    If fails with 'Order does not exist', retries with the other endpoint.
     """
-    try:
-        return {
-            "order": exchange.fetch_order(
-                id=request.id, symbol=request.symbol, params={}
+    for stop, is_last in _endpoint_order(request):
+        try:
+            order = exchange.fetch_order(
+                id=request.id, symbol=request.symbol, params=_stop_params(stop)
             )
-        }
-    except ccxt.OrderNotFound:
-        # Retry with stop param
-        return {
-            "order": exchange.fetch_order(
-                id=request.id, symbol=request.symbol, params={"stop": True}
-            )
-        }
+        except ccxt.OrderNotFound:
+            if is_last:
+                raise
+            continue
+        remember_orders(request, [order], "stop" if stop else "normal")
+        return {"order": order}
 
 
 # --- Cancel Single Order ---
 def cancel_order(exchange, request: CancelOrderRequest):
     """
     Patched cancel_order for Binance:
-    Tries default cancel. If fails with 'Unknown order', retries with params={'stop': True}.
+    Tries the endpoint known from the order index first (default if unknown).
+    If fails with 'Unknown order', retries with the other endpoint.
     """
-    try:
-        print(f"[BinanceAdapter] Cancelling Order ID {request.id} (Default)...")
-        res = exchange.cancel_order(id=request.id, symbol=request.symbol, params={})
+    for stop, is_last in _endpoint_order(request):
+        label = "Stop" if stop else "Default"
+        try:
+            print(f"[BinanceAdapter] Cancelling Order ID {request.id} ({label})...")
+            res = exchange.cancel_order(
+                id=request.id, symbol=request.symbol, params=_stop_params(stop)
+            )
+        except ccxt.OrderNotFound as e:
+            # Binance often throws "Unknown order sent" (code -2011)
+            # or "Order does not exist" (code -2013)
+            print(f"[BinanceAdapter] {label} Cancel Failed: {e}")
+            if is_last:
+                raise
+            continue
         print(
-            f"[BinanceAdapter] Default Cancel Success: {res.get('status', 'unknown')}"
+            f"[BinanceAdapter] {label} Cancel Success: {res.get('status', 'unknown')}"
         )
+        remember_orders(request, [res], "stop" if stop else "normal")
         return {"order": res}
-    except ccxt.OrderNotFound as e:
-        # Binance often throws "Unknown order sent" (code -2011)
-        # or "Order does not exist" (code -2013)
-        print(f"[BinanceAdapter] Default Cancel Failed: {e}")
-
-        # Try to cancel as stop order
-        print(
-            f"[BinanceAdapter] Retrying Cancel Order ID {request.id} with Stop param..."
-        )
-        res_stop = exchange.cancel_order(
-            id=request.id, symbol=request.symbol, params={"stop": True}
-        )
-        print(
-            f"[BinanceAdapter] Stop Cancel Success: {res_stop.get('status', 'unknown')}"
-        )
-        return {"order": res_stop}
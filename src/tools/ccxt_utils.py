@@ -1,5 +1,7 @@
+import time
 from typing import Literal
 from src.base_types import (
+    BaseExchangeRequest,
     ExchangeName,
     MarketType,
     OrderType,
@@ -10,46 +12,455 @@ from src.types import (
     BalanceRequest,
     TickersRequest,
     OHLCVParams,
+    IndicatorParams,
+    PanelRequest,
+    ConsolidatedRequest,
+    ConsolidatedOHLCVRequest,
     MarketOrderRequest,
     LimitOrderRequest,
     StopMarketOrderRequest,
     TakeProfitMarketOrderRequest,
     ClosePositionRequest,
+    CloseAllPositionsRequest,
     CancelAllOrdersRequest,
     MarketInfoRequest,
+    MarketTableRequest,
     FetchOrderRequest,
 )
 from src.responses import MarketInfoResponse
 import polars as pl
-from src.tools.shared import OHLCV_DIR
+from fastapi import HTTPException
+from src.tools.shared import OHLCV_DIR, config
 from src.tools.exchange_manager import exchange_manager
+from src.metrics import instrument_ccxt_call
+from src.tracing import span
 from src.cache_tool import get_ohlcv_with_cache, DataLocation
+from src.cache_tool.storage import read_ohlcv
+from src.cache_tool.config import period_to_ms
+from src.tools.circuit_breaker import CircuitOpenError, StaleData
 from src.tools import binance_adapter
+from src.tools.market_table import filter_market_table
+from src.tools.concurrent_calls import run_bounded, with_instance
+from src.tools.indicators import indicator_cache, parse_specs
+from src.tools.ohlcv_panel import OHLCV_FIELDS, build_panel, panel_column
+from src.tools.symbol_map import symbol_map
+from src.tools.rate_limiter import (
+    rate_priority,
+    PRIORITY_BACKFILL,
+    PRIORITY_MARKET_DATA,
+)
+
+
+# 区间查询 (since + end) 最多返回的 K 线数
+MAX_RANGE_CANDLES = 100_000
 
+# 最近一次成功获取的报价，熔断期间作为兜底
+# key: (exchange, market, mode) -> {symbol: (接收时间毫秒, ticker)}
+_last_tickers: dict[tuple[str, str, str], dict[str, tuple[int, dict]]] = {}
 
+
+@instrument_ccxt_call("fetch_tickers")
 def fetch_tickers_ccxt(request: TickersRequest):
     """
     获取指定交易所的交易对报价（tickers）数据。
+
+    交易所熔断期间返回最近一次获取到的报价 (StaleData)。
     """
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
+    key = (request.exchange_name, request.market, request.mode)
     symbols_list = request.symbols_list  # 使用 property 获取列表
 
-    tickers = exchange.fetch_tickers(symbols_list, params={})
+    try:
+        with exchange_manager.checkout(
+            request.exchange_name, request.market, request.mode, request.account
+        ) as exchange:
+            tickers = exchange.fetch_tickers(symbols_list, params={})
+    except CircuitOpenError as e:
+        cached = {
+            symbol: item
+            for symbol, item in _last_tickers.get(key, {}).items()
+            if symbols_list is None or symbol in symbols_list
+        }
+        if not cached:
+            raise
+        oldest = min(received for received, _ in cached.values())
+        return StaleData(
+            data={"tickers": {symbol: t for symbol, (_, t) in cached.items()}},
+            age_ms=int(time.time() * 1000) - oldest,
+            reason=str(e),
+        )
+
+    received = int(time.time() * 1000)
+    _last_tickers.setdefault(key, {}).update(
+        {symbol: (received, ticker) for symbol, ticker in tickers.items()}
+    )
     return {"tickers": tickers}
 
 
+@instrument_ccxt_call("fetch_ohlcv")
 def fetch_ohlcv_ccxt(request: OHLCVParams):
     """
     获取 OHLCV（开盘价、最高价、最低价、收盘价、成交量）数据。
     """
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    symbol_to_use = request.symbol
+    _check_ohlcv_range(request)
+    loc = _ohlcv_location(request)
+    try:
+        ohlcv_df = _fetch_ohlcv_frame(request, loc)
+    except CircuitOpenError as e:
+        # 熔断期间直接返回本地缓存
+        return _stale_ohlcv_from_cache(loc, request, e)
+
+    with span("to_list", rows=len(ohlcv_df)):
+        return ohlcv_df.to_numpy().tolist()
+
+
+@instrument_ccxt_call("fetch_indicators")
+def fetch_indicators_ccxt(request: IndicatorParams):
+    """
+    在 OHLCV 缓存数据上计算指标，返回 {"columns": [...], "data": [[...], ...]}
+
+    已收盘 K 线的指标结果按 (数据位置, 指标) 缓存并增量更新。
+    熔断期间基于本地缓存计算 (StaleData)。
+    """
+    specs = parse_specs(request.indicators)
+    _check_ohlcv_range(request)
+    loc = _ohlcv_location(request)
+    stale: tuple[int, str] | None = None
+    try:
+        ohlcv_df = _fetch_ohlcv_frame(request, loc)
+    except CircuitOpenError as e:
+        ohlcv_df, age_ms = _stale_ohlcv_frame(loc, request, e)
+        stale = (age_ms, str(e))
+
+    with span("indicators", rows=len(ohlcv_df), specs=len(specs)):
+        values = indicator_cache.evaluate(
+            loc_key=tuple(loc.model_dump().values()),
+            frame=ohlcv_df,
+            specs=specs,
+            period_ms=period_to_ms(loc.period),  # type: ignore
+            now_ms=int(time.time() * 1000),
+        )
+    if request.include_ohlcv:
+        values = ohlcv_df.join(values, on="time", how="left")
+
+    with span("to_list", rows=len(values)):
+        result = {
+            "columns": values.columns,
+            "data": values.fill_nan(None).rows(),
+        }
+    if stale is not None:
+        return StaleData(data=result, age_ms=stale[0], reason=stale[1])
+    return result
+
+
+@instrument_ccxt_call("fetch_panel")
+def fetch_panel_ccxt(request: PanelRequest):
+    """
+    多品种 K 线对齐到同一周期网格，返回 {"time": [...], "data": {字段: {品种: [...]}}}
+
+    缓存完整覆盖的品种直接读取本地分块，有缺口的品种有界并发地补齐。
+    单个品种补齐失败 (如熔断) 时使用本地缓存，错误记录在 symbols 中。
+    """
+    symbols = list(dict.fromkeys(request.symbols))
+    end = request.end if request.end is not None else int(time.time() * 1000)
+    template = OHLCVParams(
+        **request.model_dump(include=set(BaseExchangeRequest.model_fields)),
+        symbol=symbols[0],
+        timeframe=request.timeframe,
+        since=request.since,
+        end=end,
+        enable_cache=request.enable_cache,
+    )
+    _check_ohlcv_range(template)
+
+    def fetch(loc: DataLocation) -> pl.DataFrame:
+        params = template.model_copy(update={"symbol": loc.symbol})
+        return _fetch_ohlcv_frame(params, loc)
+
+    with span("panel", symbols=len(symbols)):
+        result = build_panel(
+            OHLCV_DIR,
+            {
+                symbol: _ohlcv_location(template.model_copy(update={"symbol": symbol}))
+                for symbol in symbols
+            },
+            start=request.since,
+            end=end,
+            fetch=fetch,
+            fields=list(request.fields),
+            fill=request.fill,
+            fill_limit=request.fill_limit,
+            how=request.how,
+            max_concurrency=request.max_concurrency,
+            enable_cache=request.enable_cache,
+        )
+
+    with span("to_list", rows=len(result.frame)):
+        return {
+            "time": result.frame["time"].to_list(),
+            "data": {
+                field: {
+                    symbol: result.frame[panel_column(field, symbol)].to_list()
+                    for symbol in symbols
+                }
+                for field in request.fields
+            },
+            "symbols": result.symbols,
+        }
+
+
+def _resolve_venues(
+    request: ConsolidatedRequest,
+) -> tuple[dict[str, str], list[dict]]:
+    """
+    品种在各交易所的交易对
+
+    返回 (已上市: 交易所 -> 交易对, 跳过的交易所的结果项)。
+
+    异常:
+        HTTPException 503: 没有启用该市场/模式的交易所
+    """
+    enabled = exchange_manager.enabled_exchanges(request.market, request.mode)
+    if not enabled:
+        raise HTTPException(
+            status_code=503,
+            detail=f"没有启用 {request.market}/{request.mode} 的交易所",
+        )
+
+    listed: dict[str, str] = {}
+    skipped: list[dict] = []
+    for exchange in dict.fromkeys(request.exchanges_list or enabled):
+        symbol = symbol_map.resolve(request.instrument, exchange, request.market)
+        if exchange not in enabled:
+            error = f"交易所实例未启用: {exchange}/{request.market}/{request.mode}"
+        elif symbol is None:
+            error = f"symbol_map 中没有 {exchange}/{request.market} 的交易对"
+        elif (
+            symbol
+            not in exchange_manager.get_market_table(
+                exchange,
+                request.market,
+                request.mode,  # type: ignore
+            )["symbol"]
+        ):
+            error = f"{symbol} 未上市"
+        else:
+            listed[exchange] = symbol
+            continue
+        skipped.append(
+            {
+                "exchange": exchange,
+                "symbol": symbol,
+                "ok": False,
+                "error": error,
+                "elapsed_ms": None,
+            }
+        )
+    return listed, skipped
+
+
+def _venue_calls(listed: dict[str, str], call) -> list[dict]:
+    """所有交易所并发执行 call(exchange, symbol)，返回每个交易所的结果项"""
+    outcomes = run_bounded(
+        [
+            lambda exchange=exchange, symbol=symbol: call(exchange, symbol)
+            for exchange, symbol in listed.items()
+        ],
+        max_concurrency=len(listed),
+    )
+    return [
+        {"exchange": exchange, "symbol": symbol, **outcome}
+        for (exchange, symbol), outcome in zip(listed.items(), outcomes)
+    ]
+
+
+@instrument_ccxt_call("fetch_ticker")
+def _fetch_venue_ticker(
+    *, exchange_name: ExchangeName, market: MarketType, mode: ModeType, symbol: str
+) -> tuple[dict | None, int]:
+    """单个交易所的报价，返回 (ticker, 收到响应的时间毫秒)"""
+    with exchange_manager.checkout(exchange_name, market, mode) as exchange:
+        tickers = exchange.fetch_tickers([symbol], params={})
+    return tickers.get(symbol), int(time.time() * 1000)
+
+
+def fetch_consolidated_ticker_ccxt(request: ConsolidatedRequest):
+    """
+    并发获取品种在各交易所的报价，汇总最优买卖价和跨交易所价差
+
+    单个交易所失败不影响其他交易所，失败原因记录在对应的 venues 项中。
+    """
+    listed, skipped = _resolve_venues(request)
+    venues = _venue_calls(
+        listed,
+        lambda exchange, symbol: _fetch_venue_ticker(
+            exchange_name=exchange,
+            market=request.market,
+            mode=request.mode,
+            symbol=symbol,
+        ),
+    )
+
+    stamps: list[int] = []
+    bids: list[tuple[float, str]] = []
+    asks: list[tuple[float, str]] = []
+    for venue in venues:
+        ticker, received = venue.pop("result") or (None, None)
+        venue["ticker"] = ticker
+        venue["age_ms"] = None
+        if ticker is None:
+            if venue["ok"]:
+                venue.update(ok=False, error=f"{venue['symbol']} 没有报价")
+            continue
+        if ticker.get("timestamp") is not None:
+            stamps.append(ticker["timestamp"])
+            venue["age_ms"] = max(0, received - ticker["timestamp"])
+        if ticker.get("bid") is not None:
+            bids.append((ticker["bid"], venue["exchange"]))
+        if ticker.get("ask") is not None:
+            asks.append((ticker["ask"], venue["exchange"]))
+
+    best_bid = max(bids) if bids else None
+    best_ask = min(asks) if asks else None
+    return {
+        "instrument": request.instrument.strip().upper(),
+        "venues": venues + skipped,
+        "best_bid": best_bid and {"exchange": best_bid[1], "price": best_bid[0]},
+        "best_ask": best_ask and {"exchange": best_ask[1], "price": best_ask[0]},
+        "spread": best_ask[0] - best_bid[0] if best_bid and best_ask else None,
+        "skew_ms": max(stamps) - min(stamps) if len(stamps) > 1 else None,
+    }
+
+
+def fetch_consolidated_ohlcv_ccxt(request: ConsolidatedOHLCVRequest):
+    """
+    品种在各交易所的 K 线对齐到同一周期网格，返回 {字段: {交易所: [...]}}
+
+    与 fetch_panel 相同: 缓存完整覆盖的交易所直接读取本地分块，
+    有缺口的交易所并发补齐，补齐失败时使用本地缓存。
+    """
+    listed, skipped = _resolve_venues(request)
+    end = request.end if request.end is not None else int(time.time() * 1000)
+    templates = {
+        exchange: OHLCVParams(
+            exchange_name=exchange,  # type: ignore
+            market=request.market,
+            mode=request.mode,
+            symbol=symbol,
+            timeframe=request.timeframe,
+            since=request.since,
+            end=end,
+            enable_cache=request.enable_cache,
+        )
+        for exchange, symbol in listed.items()
+    }
+    for params in templates.values():
+        _check_ohlcv_range(params)
+    if not templates:
+        return {
+            "instrument": request.instrument.strip().upper(),
+            "time": [],
+            "data": {},
+            "venues": skipped,
+        }
+
+    def fetch(loc: DataLocation) -> pl.DataFrame:
+        return _fetch_ohlcv_frame(templates[loc.exchange], loc)
+
+    with span("consolidated_ohlcv", venues=len(templates)):
+        result = build_panel(
+            OHLCV_DIR,
+            {
+                exchange: _ohlcv_location(params)
+                for exchange, params in templates.items()
+            },
+            start=request.since,
+            end=end,
+            fetch=fetch,
+            fields=OHLCV_FIELDS,
+            fill=request.fill,
+            fill_limit=request.fill_limit,
+            how=request.how,
+            max_concurrency=len(templates),
+            enable_cache=request.enable_cache,
+        )
+
+    with span("to_list", rows=len(result.frame)):
+        return {
+            "instrument": request.instrument.strip().upper(),
+            "time": result.frame["time"].to_list(),
+            "data": {
+                field: {
+                    exchange: result.frame[panel_column(field, exchange)].to_list()
+                    for exchange in templates
+                }
+                for field in OHLCV_FIELDS
+            },
+            "venues": [
+                {
+                    **item,
+                    "exchange": item["symbol"],
+                    "symbol": listed[item["symbol"]],
+                    "ok": item["error"] is None,
+                }
+                for item in result.symbols
+            ]
+            + skipped,
+        }
+
+
+def fetch_consolidated_market_info_ccxt(request: ConsolidatedRequest):
+    """品种在各交易所的市场信息 (来自预计算的市场表，不请求交易所)"""
+    listed, skipped = _resolve_venues(request)
+
+    def market_info(exchange: str, symbol: str) -> dict:
+        table = exchange_manager.get_market_table(
+            exchange,  # type: ignore
+            request.market,
+            request.mode,
+        )
+        return table.filter(pl.col("symbol") == symbol).to_dicts()[0]
+
+    venues = _venue_calls(listed, market_info)
+    for venue in venues:
+        venue["market"] = venue.pop("result")
+    return {
+        "instrument": request.instrument.strip().upper(),
+        "venues": venues + skipped,
+    }
+
 
+def _check_ohlcv_range(request: OHLCVParams) -> None:
+    """
+    校验区间查询参数
+
+    异常:
+        HTTPException 400: end 早于 since、周期不支持区间查询或区间过大
+    """
+    if request.end is None:
+        return
+    if request.since is not None and request.since > request.end:
+        raise HTTPException(status_code=400, detail="end 不能早于 since")
+    try:
+        period_ms = period_to_ms(request.timeframe)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"周期 {request.timeframe} 不支持按 end 查询"
+        )
+    if request.since is not None:
+        count = (request.end - request.since) // period_ms + 1
+        if count > MAX_RANGE_CANDLES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"区间包含 {count} 根 K 线，超过上限 {MAX_RANGE_CANDLES}",
+            )
+
+
+def _ohlcv_location(request: OHLCVParams) -> DataLocation:
+    """请求对应的缓存数据位置"""
     # 根据 sandbox 推导 mode（用于缓存目录路径）
     mode: Literal["live", "demo"] = "demo" if request.mode == "sandbox" else "live"
 
-    # 构造数据位置对象
-    loc = DataLocation(
+    return DataLocation(
         exchange=request.exchange_name,
         mode=mode,
         market=request.market,
@@ -57,6 +468,16 @@ def fetch_ohlcv_ccxt(request: OHLCVParams):
         period=request.timeframe,
     )
 
+
+def _fetch_ohlcv_frame(request: OHLCVParams, loc: DataLocation) -> pl.DataFrame:
+    """
+    经缓存获取请求范围的 K 线 DataFrame
+
+    异常:
+        CircuitOpenError: 交易所熔断中
+    """
+    symbol_to_use = request.symbol
+
     def fetch_callback(
         symbol: str, period: str, start_time: int | None, count: int, **kwargs
     ) -> pl.DataFrame:
@@ -66,55 +487,96 @@ def fetch_ohlcv_ccxt(request: OHLCVParams):
         if exchange_instance is None:
             return pl.DataFrame()
 
-        # 使用 ccxt 获取数据
-        data = exchange_instance.fetch_ohlcv(
-            symbol_to_use, period, since=start_time, limit=limit
-        )
+        # 使用 ccxt 获取数据 (历史回补的优先级低于其他请求)
+        priority = PRIORITY_MARKET_DATA if start_time is None else PRIORITY_BACKFILL
+        with rate_priority(priority), span("ccxt.fetch_ohlcv", limit=limit):
+            data = exchange_instance.fetch_ohlcv(
+                symbol_to_use, period, since=start_time, limit=limit
+            )
 
         if not data:
             return pl.DataFrame()
 
-        df = pl.DataFrame(
-            data,
-            schema=["time", "open", "high", "low", "close", "volume"],
-            orient="row",
-        )
-        return df.with_columns(
-            [
-                pl.col("time").cast(pl.Int64),
-                pl.col("open").cast(pl.Float64),
-                pl.col("high").cast(pl.Float64),
-                pl.col("low").cast(pl.Float64),
-                pl.col("close").cast(pl.Float64),
-                pl.col("volume").cast(pl.Float64),
-            ]
-        )
+        with span("to_dataframe", rows=len(data)):
+            df = pl.DataFrame(
+                data,
+                schema=["time", "open", "high", "low", "close", "volume"],
+                orient="row",
+            )
+            return df.with_columns(
+                [
+                    pl.col("time").cast(pl.Int64),
+                    pl.col("open").cast(pl.Float64),
+                    pl.col("high").cast(pl.Float64),
+                    pl.col("low").cast(pl.Float64),
+                    pl.col("close").cast(pl.Float64),
+                    pl.col("volume").cast(pl.Float64),
+                ]
+            )
 
     def mock_fetch_callback(
         symbol: str, period: str, start_time: int | None, count: int, **kwargs
     ) -> pl.DataFrame:
         return pl.DataFrame()
 
-    ohlcv_df = get_ohlcv_with_cache(
-        base_dir=OHLCV_DIR,
-        loc=loc,
-        start_time=request.since,
-        count=request.limit or 100,
-        fetch_callback=mock_fetch_callback if request.enable_test else fetch_callback,
-        fetch_callback_params={"exchange": exchange},
-        enable_cache=request.enable_cache,
-    )
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        return get_ohlcv_with_cache(
+            base_dir=OHLCV_DIR,
+            loc=loc,
+            start_time=request.since,
+            count=request.limit or 100,
+            fetch_callback=mock_fetch_callback
+            if request.enable_test
+            else fetch_callback,
+            fetch_callback_params={"exchange": exchange},
+            enable_cache=request.enable_cache,
+            write_behind=config.get("ohlcv_cache", {}).get("write_behind", False),
+            end_time=request.end,
+        )
+
+
+def _stale_ohlcv_frame(
+    loc: DataLocation, request: OHLCVParams, error: CircuitOpenError
+) -> tuple[pl.DataFrame, int]:
+    """
+    从缓存中取出请求范围的 K 线
+    (有 since 和 end 取区间内全部，只有 since 取其后的 limit 根，否则取截止 end 或最新的 limit 根)
+
+    返回 (K 线, age_ms)，age_ms 为最后一根 K 线收盘时间距今的毫秒数，缓存为空时重新抛出 error。
+    """
+    cached = read_ohlcv(OHLCV_DIR, loc, start_time=request.since, end_time=request.end)
+    if cached.is_empty():
+        raise error
+
+    limit = request.limit or 100
+    if request.since is None:
+        cached = cached.tail(limit)
+    elif request.end is None:
+        cached = cached.head(limit)
+    last_close = int(cached["time"].max()) + period_to_ms(loc.period)  # type: ignore
+    return cached, max(0, int(time.time() * 1000) - last_close)
 
-    return ohlcv_df.to_numpy().tolist()
 
+def _stale_ohlcv_from_cache(
+    loc: DataLocation, request: OHLCVParams, error: CircuitOpenError
+) -> StaleData:
+    """熔断期间以缓存中的 K 线作为兜底 (见 _stale_ohlcv_frame)"""
+    cached, age_ms = _stale_ohlcv_frame(loc, request, error)
+    return StaleData(data=cached.to_numpy().tolist(), age_ms=age_ms, reason=str(error))
 
+
+@instrument_ccxt_call("fetch_balance")
 def fetch_balance_ccxt(request: BalanceRequest):
     """
     获取指定交易所的余额信息。
     """
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    balance = exchange.fetch_balance(params={})
-    return {"balance": balance}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        balance = exchange.fetch_balance(params={})
+        return {"balance": balance}
 
 
 def create_order_ccxt(
@@ -127,15 +589,17 @@ def create_order_ccxt(
     amount: float,
     price: float | None = None,
     params: dict = {},
+    account: str | None = None,
 ):
     """
     在指定交易所创建订单。
     """
-    exchange = exchange_manager.get(exchange_name, market, mode)
-    result = exchange.create_order(symbol, type, side, amount, price, params=params)
-    return {"order": result}
+    with exchange_manager.checkout(exchange_name, market, mode, account) as exchange:
+        result = exchange.create_order(symbol, type, side, amount, price, params=params)
+        return {"order": result}
 
 
+@instrument_ccxt_call("create_market_order")
 def create_market_order_ccxt(request: MarketOrderRequest):
     """创建市价订单。"""
     params = request.model_extra or {}
@@ -152,9 +616,11 @@ def create_market_order_ccxt(request: MarketOrderRequest):
         amount=request.amount,
         price=None,
         params=params,
+        account=request.account,
     )
 
 
+@instrument_ccxt_call("create_limit_order")
 def create_limit_order_ccxt(request: LimitOrderRequest):
     """创建限价订单。"""
     params = request.model_extra or {}
@@ -175,9 +641,11 @@ def create_limit_order_ccxt(request: LimitOrderRequest):
         amount=request.amount,
         price=request.price,
         params=params,
+        account=request.account,
     )
 
 
+@instrument_ccxt_call("create_stop_market_order")
 def create_stop_market_order_ccxt(request: StopMarketOrderRequest):
     """创建止损市价订单。"""
     params = {
@@ -191,7 +659,7 @@ def create_stop_market_order_ccxt(request: StopMarketOrderRequest):
     if request.timeInForce:
         params["timeInForce"] = request.timeInForce
 
-    return create_order_ccxt(
+    result = create_order_ccxt(
         exchange_name=request.exchange_name,
         mode=request.mode,
         market=request.market,
@@ -201,9 +669,16 @@ def create_stop_market_order_ccxt(request: StopMarketOrderRequest):
         amount=request.amount,
         price=None,
         params=params,
+        account=request.account,
     )
 
+    # Binance 条件单走单独接口，记录 id 以便查询/取消时直接命中
+    if request.exchange_name == "binance":
+        binance_adapter.remember_orders(request, [result["order"]], "stop")
+    return result
+
 
+@instrument_ccxt_call("create_take_profit_market_order")
 def create_take_profit_market_order_ccxt(request: TakeProfitMarketOrderRequest):
     """创建止盈市价订单。"""
     params = {
@@ -217,7 +692,7 @@ def create_take_profit_market_order_ccxt(request: TakeProfitMarketOrderRequest):
     if request.timeInForce:
         params["timeInForce"] = request.timeInForce
 
-    return create_order_ccxt(
+    result = create_order_ccxt(
         exchange_name=request.exchange_name,
         mode=request.mode,
         market=request.market,
@@ -227,90 +702,207 @@ def create_take_profit_market_order_ccxt(request: TakeProfitMarketOrderRequest):
         amount=request.amount,
         price=None,
         params=params,
+        account=request.account,
     )
 
+    # 止盈单在 Binance 同样属于条件单
+    if request.exchange_name == "binance":
+        binance_adapter.remember_orders(request, [result["order"]], "stop")
+    return result
+
+
+def _open_positions(positions: list) -> list:
+    """过滤掉数量为 0 的持仓"""
+    return [p for p in positions if p.get("contracts")]
 
+
+def _close_positions(checkout, positions: list, max_concurrency: int) -> list[dict]:
+    """对每个持仓并发提交只减仓市价单 (每笔各自借出实例)，返回每个持仓的平仓结果"""
+    params = {"reduceOnly": True}
+    legs = [
+        {
+            "symbol": p["symbol"],
+            "side": p["side"],
+            "amount": p["contracts"],
+        }
+        for p in positions
+    ]
+    outcomes = run_bounded(
+        [
+            with_instance(
+                checkout,
+                lambda exchange, leg=leg: exchange.create_order(
+                    leg["symbol"],
+                    "market",
+                    "sell" if leg["side"] == "long" else "buy",
+                    leg["amount"],
+                    params=params,
+                ),
+            )
+            for leg in legs
+        ],
+        max_concurrency,
+    )
+    return [
+        {
+            **leg,
+            "ok": outcome["ok"],
+            "order": outcome["result"],
+            "error": outcome["error"],
+            "elapsed_ms": outcome["elapsed_ms"],
+        }
+        for leg, outcome in zip(legs, outcomes)
+    ]
+
+
+@instrument_ccxt_call("close_position")
 def close_position_ccxt(request: ClosePositionRequest):
     """
     关闭指定品种的当前仓位 (不包含挂单)。
 
     Equivalent to Close Position.
     """
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    symbol_to_use = request.symbol
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        symbol_to_use = request.symbol
 
-    params = {"reduceOnly": True}
-    positions = exchange.fetch_positions([symbol_to_use])
+        params = {"reduceOnly": True}
+        positions = exchange.fetch_positions([symbol_to_use])
 
-    # Filter positions if side is specified
+        # Filter positions if side is specified
+        if request.side:
+            positions = [p for p in positions if p["side"] == request.side]
+
+        for i in positions:
+            side = "sell" if i["side"] == "long" else "buy"
+            amount = i["contracts"]
+            exchange.create_order(symbol_to_use, "market", side, amount, params=params)
+        remaining_positions = exchange.fetch_positions([symbol_to_use])
+        return {"remaining_positions": remaining_positions}
+
+
+@instrument_ccxt_call("close_all_positions")
+def close_all_positions_ccxt(request: CloseAllPositionsRequest):
+    """
+    一键平掉账户下所有仓位 (不包含挂单)。
+
+    一次 fetch_positions 获取全部持仓，所有品种/方向的只减仓单有界并发提交，
+    最后再用一次 fetch_positions 确认是否已全部平仓。
+    每笔平仓单各自借出实例，并发数不超过实例池大小。
+    """
+    start = time.perf_counter()
+    checkout, capacity = exchange_manager.leg_checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    )
+    with checkout() as exchange:
+        positions = _open_positions(exchange.fetch_positions())
     if request.side:
         positions = [p for p in positions if p["side"] == request.side]
 
-    for i in positions:
-        side = "sell" if i["side"] == "long" else "buy"
-        amount = i["contracts"]
-        exchange.create_order(symbol_to_use, "market", side, amount, params=params)
-    remaining_positions = exchange.fetch_positions([symbol_to_use])
-    return {"remaining_positions": remaining_positions}
+    legs = _close_positions(checkout, positions, min(request.max_concurrency, capacity))
+
+    with checkout() as exchange:
+        remaining_positions = _open_positions(exchange.fetch_positions())
+    if request.side:
+        remaining_positions = [
+            p for p in remaining_positions if p["side"] == request.side
+        ]
+
+    return {
+        "legs": legs,
+        "remaining_positions": remaining_positions,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
 
 
+@instrument_ccxt_call("cancel_all_orders")
 def cancel_all_orders_ccxt(request: CancelAllOrdersRequest):
     """
     取消指定交易对的所有挂单。
     """
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-
-    # Binance Patch
+    # Binance Patch (两条腿各自借出实例)
     if request.exchange_name == "binance":
-        return binance_adapter.cancel_all_orders(exchange, request)
+        checkout, _ = exchange_manager.leg_checkout(
+            request.exchange_name, request.market, request.mode, request.account
+        )
+        return binance_adapter.cancel_all_orders(checkout, request)
 
-    result = exchange.cancelAllOrders(request.symbol, params=request.model_extra or {})
-    return {"result": result}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        result = exchange.cancelAllOrders(
+            request.symbol, params=request.model_extra or {}
+        )
+        return {"result": result}
 
 
+@instrument_ccxt_call("fetch_market_info")
 def fetch_market_info_ccxt(request: MarketInfoRequest) -> MarketInfoResponse:
     """获取市场信息"""
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    symbol_to_use = request.symbol
-
-    # 1. 获取 market 基础信息
-    market = exchange.market(symbol_to_use)
-
-    # 2. 处理 min_amount (若为 None 则回退到 precision)
-    min_amount = market["limits"]["amount"]["min"]
-    if min_amount is None:
-        min_amount = market["precision"]["amount"]
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        symbol_to_use = request.symbol
+
+        # 1. 获取 market 基础信息
+        market = exchange.market(symbol_to_use)
+
+        # 2. 处理 min_amount (若为 None 则回退到 precision)
+        min_amount = market["limits"]["amount"]["min"]
+        if min_amount is None:
+            min_amount = market["precision"]["amount"]
+
+        # 3. 获取当前杠杆 (从 fetch_positions)
+        current_leverage = 1  # 默认值
+        try:
+            positions = exchange.fetch_positions([symbol_to_use])
+            if positions:
+                pos = positions[0]
+                current_leverage = int(pos.get("leverage", 1))
+        except Exception as e:
+            print(f"Fetch positions failed for {symbol_to_use}: {e}")
+
+        return MarketInfoResponse(
+            symbol=request.symbol,
+            linear=market.get("linear", False),
+            settle=market["settle"],
+            precision_amount=float(market["precision"]["amount"]),
+            min_amount=float(min_amount),
+            contract_size=float(market["contractSize"]),
+            leverage=current_leverage,
+        )
 
-    # 3. 获取当前杠杆 (从 fetch_positions)
-    current_leverage = 1  # 默认值
-    try:
-        positions = exchange.fetch_positions([symbol_to_use])
-        if positions:
-            pos = positions[0]
-            current_leverage = int(pos.get("leverage", 1))
-    except Exception as e:
-        print(f"Fetch positions failed for {symbol_to_use}: {e}")
 
-    return MarketInfoResponse(
-        symbol=request.symbol,
-        linear=market.get("linear", False),
-        settle=market["settle"],
-        precision_amount=float(market["precision"]["amount"]),
-        min_amount=float(min_amount),
-        contract_size=float(market["contractSize"]),
-        leverage=current_leverage,
+@instrument_ccxt_call("fetch_market_table")
+def fetch_market_table_ccxt(request: MarketTableRequest):
+    """批量获取市场信息表 (基于预计算的列式表)"""
+    table = exchange_manager.get_market_table(
+        request.exchange_name, request.market, request.mode
     )
+    table = filter_market_table(
+        table,
+        market_type=request.type,
+        settle=request.settle,
+        linear=request.linear,
+        active_only=request.active_only,
+        # 合约实例的 markets 也包含现货，未指定品种时只保留合约
+        contract_only=request.type is None and request.market == "future",
+    )
+    return {"count": table.height, "markets": table.to_dicts()}
 
 
+@instrument_ccxt_call("fetch_order")
 def fetch_order_ccxt(request: FetchOrderRequest):
     """
     获取特定订单详情
     """
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-
-    # Binance Patch
-    if request.exchange_name == "binance":
-        return binance_adapter.fetch_order(exchange, request)
-
-    result = exchange.fetch_order(id=request.id, symbol=request.symbol, params={})
-    return {"order": result}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        # Binance Patch
+        if request.exchange_name == "binance":
+            return binance_adapter.fetch_order(exchange, request)
+
+        result = exchange.fetch_order(id=request.id, symbol=request.symbol, params={})
+        return {"order": result}
@@ -1,5 +1,9 @@
+import time
+import ccxt
 from src.tools.exchange_manager import exchange_manager
+from src.metrics import instrument_ccxt_call
 from src.tools import binance_adapter
+from src.tools.concurrent_calls import run_bounded, with_instance
 from src.types_extended import (
     FetchOpenOrdersRequest,
     FetchClosedOrdersRequest,
@@ -8,93 +12,383 @@ from src.types_extended import (
     SetLeverageRequest,
     SetMarginModeRequest,
     CancelOrderRequest,
+    CreateOrdersBatchRequest,
+    CancelOrdersBatchRequest,
+    BatchOrderItem,
 )
 
+# 交易所批量接口单次请求的最大订单数
+NATIVE_BATCH_LIMITS = {
+    "binance": {"create": 5, "cancel": 10},
+}
+DEFAULT_NATIVE_BATCH_LIMIT = 10
+
+# 带有这些参数的订单是条件单 (Binance 批量接口不支持，需逐笔提交)
+CONDITIONAL_PARAMS = ("stopLossPrice", "takeProfitPrice", "triggerPrice", "stopPrice")
 
-def fetch_open_orders_ccxt(request: FetchOpenOrdersRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
 
-    # Binance Patch
+@instrument_ccxt_call("fetch_open_orders")
+def fetch_open_orders_ccxt(request: FetchOpenOrdersRequest):
+    # Binance Patch (两条腿各自借出实例)
     if request.exchange_name == "binance":
-        return binance_adapter.fetch_open_orders(exchange, request)
+        checkout, _ = exchange_manager.leg_checkout(
+            request.exchange_name, request.market, request.mode, request.account
+        )
+        return binance_adapter.fetch_open_orders(checkout, request)
 
-    orders = exchange.fetch_open_orders(
-        symbol=request.symbol,
-        since=request.since,
-        limit=request.limit,
-        params={},
-    )
-    return {"orders": orders}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        orders = exchange.fetch_open_orders(
+            symbol=request.symbol,
+            since=request.since,
+            limit=request.limit,
+            params={},
+        )
+        return {"orders": orders}
 
 
+@instrument_ccxt_call("fetch_closed_orders")
 def fetch_closed_orders_ccxt(request: FetchClosedOrdersRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-
-    # Binance Patch
+    # Binance Patch (两条腿各自借出实例)
     if request.exchange_name == "binance":
-        return binance_adapter.fetch_closed_orders(exchange, request)
+        checkout, _ = exchange_manager.leg_checkout(
+            request.exchange_name, request.market, request.mode, request.account
+        )
+        return binance_adapter.fetch_closed_orders(checkout, request)
 
-    orders = exchange.fetch_closed_orders(
-        symbol=request.symbol,
-        since=request.since,
-        limit=request.limit,
-        params={},
-    )
-    return {"orders": orders}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        orders = exchange.fetch_closed_orders(
+            symbol=request.symbol,
+            since=request.since,
+            limit=request.limit,
+            params={},
+        )
+        return {"orders": orders}
 
 
+@instrument_ccxt_call("fetch_my_trades")
 def fetch_my_trades_ccxt(request: FetchMyTradesRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    trades = exchange.fetch_my_trades(
-        symbol=request.symbol,
-        since=request.since,
-        limit=request.limit,
-        params={},
-    )
-    return {"trades": trades}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        trades = exchange.fetch_my_trades(
+            symbol=request.symbol,
+            since=request.since,
+            limit=request.limit,
+            params={},
+        )
+        return {"trades": trades}
 
 
+@instrument_ccxt_call("fetch_positions")
 def fetch_positions_ccxt(request: FetchPositionsRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    positions = exchange.fetch_positions(
-        symbols=request.symbols,
-        params={},
-    )
-    return {"positions": positions}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        positions = exchange.fetch_positions(
+            symbols=request.symbols,
+            params={},
+        )
+        return {"positions": positions}
 
 
+@instrument_ccxt_call("set_leverage")
 def set_leverage_ccxt(request: SetLeverageRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    # setLeverage(leverage, symbol=None, params={})
-    # Note: symbol is practically required for most exchanges
-    result = exchange.set_leverage(
-        leverage=request.leverage,
-        symbol=request.symbol,
-        params=request.model_extra or {},
-    )
-    return {"result": result}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        # setLeverage(leverage, symbol=None, params={})
+        # Note: symbol is practically required for most exchanges
+        result = exchange.set_leverage(
+            leverage=request.leverage,
+            symbol=request.symbol,
+            params=request.model_extra or {},
+        )
+        return {"result": result}
 
 
+@instrument_ccxt_call("set_margin_mode")
 def set_margin_mode_ccxt(request: SetMarginModeRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
-    result = exchange.set_margin_mode(
-        marginMode=request.marginMode,
-        symbol=request.symbol,
-        params=request.model_extra or {},
-    )
-    return {"result": result}
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        result = exchange.set_margin_mode(
+            marginMode=request.marginMode,
+            symbol=request.symbol,
+            params=request.model_extra or {},
+        )
+        return {"result": result}
 
 
+@instrument_ccxt_call("cancel_order")
 def cancel_order_ccxt(request: CancelOrderRequest):
-    exchange = exchange_manager.get(request.exchange_name, request.market, request.mode)
+    with exchange_manager.checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    ) as exchange:
+        # Binance Patch
+        if request.exchange_name == "binance":
+            return binance_adapter.cancel_order(exchange, request)
+
+        order = exchange.cancel_order(
+            id=request.id,
+            symbol=request.symbol,
+            params=request.model_extra or {},
+        )
+        return {"order": order}
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _native_batch_limit(exchange_name: str, action: str) -> int:
+    return NATIVE_BATCH_LIMITS.get(exchange_name, {}).get(
+        action, DEFAULT_NATIVE_BATCH_LIMIT
+    )
+
+
+def _is_conditional(order: BatchOrderItem) -> bool:
+    return any(order.params.get(k) is not None for k in CONDITIONAL_PARAMS)
+
+
+def _leg_result(index: int, outcome: dict, order=None, native=False) -> dict:
+    ok = outcome["ok"] and order is not None and order.get("id") is not None
+    error = outcome["error"]
+    if outcome["ok"] and not ok:
+        # 批量接口中单笔失败时，订单结构里只有原始错误信息
+        error = str((order or {}).get("info"))
+    return {
+        "index": index,
+        "ok": ok,
+        "order": order,
+        "error": None if ok else error,
+        "native": native,
+        "elapsed_ms": outcome["elapsed_ms"],
+    }
+
+
+def _missing_leg(index: int, outcome: dict, error: str) -> dict:
+    """批量接口返回的结果少于提交的订单时，缺少结果的订单记为失败"""
+    return {
+        "index": index,
+        "ok": False,
+        "order": None,
+        "error": error,
+        "native": True,
+        "elapsed_ms": outcome["elapsed_ms"],
+    }
+
 
-    # Binance Patch
+@instrument_ccxt_call("create_orders_batch")
+def create_orders_batch_ccxt(request: CreateOrdersBatchRequest):
+    """
+    批量下单
+
+    交易所支持 createOrders 时按批量上限分批提交 (各批次并发)，
+    否则或遇到不支持的订单 (如 Binance 条件单) 时逐笔有界并发提交。
+    每个批次 / 每笔订单各自借出实例，并发数不超过实例池大小。
+    """
+    start = time.perf_counter()
+    checkout, capacity = exchange_manager.leg_checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    )
+    max_concurrency = min(request.max_concurrency, capacity)
+    with checkout() as exchange:
+        use_native = request.market != "spot" and exchange.has.get("createOrders")
+
+    legs = list(enumerate(request.orders))
+    native_legs: list[tuple[int, BatchOrderItem]] = []
+    single_legs: list[tuple[int, BatchOrderItem]] = []
+    if use_native:
+        for leg in legs:
+            (single_legs if _is_conditional(leg[1]) else native_legs).append(leg)
+    else:
+        single_legs = legs
+
+    def create_chunk(exchange, chunk):
+        try:
+            return exchange.create_orders(
+                [
+                    {
+                        "symbol": o.symbol,
+                        "type": o.type,
+                        "side": o.side,
+                        "amount": o.amount,
+                        "price": o.price,
+                        "params": dict(o.params),
+                    }
+                    for _, o in chunk
+                ]
+            )
+        except ccxt.NotSupported:
+            # 请求未发出，可以安全回退到逐笔提交
+            return None
+
+    def create_single(exchange, o: BatchOrderItem):
+        return exchange.create_order(
+            o.symbol, o.type, o.side, o.amount, o.price, params=dict(o.params)
+        )
+
+    chunks = _chunks(native_legs, _native_batch_limit(request.exchange_name, "create"))
+    outcomes = run_bounded(
+        [with_instance(checkout, lambda ex, c=c: create_chunk(ex, c)) for c in chunks]
+        + [
+            with_instance(checkout, lambda ex, o=o: create_single(ex, o))
+            for _, o in single_legs
+        ],
+        max_concurrency,
+    )
+
+    results: dict[int, dict] = {}
+    fallback_legs: list[tuple[int, BatchOrderItem]] = []
+    for chunk, outcome in zip(chunks, outcomes[: len(chunks)]):
+        if outcome["ok"] and outcome["result"] is None:
+            fallback_legs.extend(chunk)
+            continue
+        orders = outcome["result"] or [None] * len(chunk)
+        if len(orders) != len(chunk):
+            print(
+                f"[BatchOrders] createOrders 返回 {len(orders)} 条结果，"
+                f"提交了 {len(chunk)} 笔"
+            )
+        for n, (i, _) in enumerate(chunk):
+            if n < len(orders):
+                results[i] = _leg_result(i, outcome, orders[n], native=True)
+            else:
+                # 订单可能已提交，不能重试 (会重复下单)，由调用方查询确认
+                results[i] = _missing_leg(
+                    i,
+                    outcome,
+                    f"交易所只返回了 {len(orders)}/{len(chunk)} 笔结果，"
+                    "该笔订单状态未知，请查询挂单确认",
+                )
+    for (i, _), outcome in zip(single_legs, outcomes[len(chunks) :]):
+        results[i] = _leg_result(i, outcome, outcome["result"])
+
+    fallback_outcomes = run_bounded(
+        [
+            with_instance(checkout, lambda ex, o=o: create_single(ex, o))
+            for _, o in fallback_legs
+        ],
+        max_concurrency,
+    )
+    for (i, _), outcome in zip(fallback_legs, fallback_outcomes):
+        results[i] = _leg_result(i, outcome, outcome["result"])
+
+    # Binance 条件单记录到订单类型索引
     if request.exchange_name == "binance":
-        return binance_adapter.cancel_order(exchange, request)
+        stop_orders = [
+            results[i]["order"]
+            for i, o in legs
+            if results[i]["ok"] and _is_conditional(o)
+        ]
+        binance_adapter.remember_orders(request, stop_orders, "stop")
+
+    return {
+        "results": [results[i] for i, _ in legs],
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
 
-    order = exchange.cancel_order(
-        id=request.id,
-        symbol=request.symbol,
-        params=request.model_extra or {},
+
+@instrument_ccxt_call("cancel_orders_batch")
+def cancel_orders_batch_ccxt(request: CancelOrdersBatchRequest):
+    """
+    批量撤单
+
+    交易所支持 cancelOrders 时按交易对分组、分批撤单，
+    批量接口不可用或其中撤单失败的订单再逐笔有界并发撤单 (重复撤单无副作用)。
+    每个批次 / 每笔撤单各自借出实例，并发数不超过实例池大小。
+    """
+    start = time.perf_counter()
+    checkout, capacity = exchange_manager.leg_checkout(
+        request.exchange_name, request.market, request.mode, request.account
+    )
+    max_concurrency = min(request.max_concurrency, capacity)
+    with checkout() as exchange:
+        use_native = request.market != "spot" and exchange.has.get("cancelOrders")
+
+    legs = list(enumerate(request.orders))
+    groups: dict[str, list] = {}
+    single_legs = []
+    for i, o in legs:
+        known_stop = request.exchange_name == "binance" and (
+            binance_adapter.order_index.lookup(
+                request.exchange_name, request.market, request.mode, o.id
+            )
+            == "stop"
+        )
+        if use_native and o.symbol is not None and not known_stop:
+            groups.setdefault(o.symbol, []).append((i, o))
+        else:
+            single_legs.append((i, o))
+
+    def cancel_chunk(exchange, symbol, chunk):
+        try:
+            return exchange.cancel_orders([o.id for _, o in chunk], symbol)
+        except (ccxt.NotSupported, ccxt.BadRequest, ccxt.ArgumentsRequired):
+            return None
+
+    chunks = [
+        (symbol, chunk)
+        for symbol, group in groups.items()
+        for chunk in _chunks(
+            group, _native_batch_limit(request.exchange_name, "cancel")
+        )
+    ]
+    outcomes = run_bounded(
+        [
+            with_instance(checkout, lambda ex, s=s, c=c: cancel_chunk(ex, s, c))
+            for s, c in chunks
+        ],
+        max_concurrency,
     )
-    return {"order": order}
+
+    results: dict[int, dict] = {}
+    for (_, chunk), outcome in zip(chunks, outcomes):
+        orders = outcome["result"] or []
+        if outcome["ok"] and len(orders) != len(chunk):
+            print(
+                f"[BatchOrders] cancelOrders 返回 {len(orders)} 条结果，"
+                f"提交了 {len(chunk)} 笔，缺少结果的订单逐笔重试"
+            )
+        orders_by_id = {
+            str(order.get("id")): order for order in orders if order is not None
+        }
+        # 按订单 id 对应结果 (不依赖返回顺序和条数)，缺少结果的订单逐笔重试
+        for i, o in chunk:
+            order = orders_by_id.get(o.id)
+            if order is None:
+                single_legs.append((i, o))
+            else:
+                results[i] = _leg_result(i, outcome, order, native=True)
+
+    def cancel_single(exchange, o):
+        if request.exchange_name == "binance":
+            # 复用 Binance 补丁: 自动处理条件单接口
+            single_request = CancelOrderRequest(
+                exchange_name=request.exchange_name,
+                market=request.market,
+                mode=request.mode,
+                id=o.id,
+                symbol=o.symbol,
+            )
+            return binance_adapter.cancel_order(exchange, single_request)["order"]
+        return exchange.cancel_order(id=o.id, symbol=o.symbol)
+
+    single_outcomes = run_bounded(
+        [
+            with_instance(checkout, lambda ex, o=o: cancel_single(ex, o))
+            for _, o in single_legs
+        ],
+        max_concurrency,
+    )
+    for (i, _), outcome in zip(single_legs, single_outcomes):
+        results[i] = _leg_result(i, outcome, outcome["result"])
+
+    return {
+        "results": [results[i] for i, _ in legs],
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
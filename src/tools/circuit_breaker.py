@@ -0,0 +1,256 @@
+"""交易所熔断器 (连续网络错误后快速失败，由后台探测恢复)"""
+
+import contextvars
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Literal
+
+import ccxt
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+# 默认配置，可通过 config["circuit_breaker"] 覆盖
+# failure_threshold: 连续多少次网络错误后熔断
+# open_seconds: 熔断后多久开始探测
+DEFAULT_BREAKER: dict[str, Any] = {
+    "enabled": True,
+    "failure_threshold": 5,
+    "open_seconds": 30.0,
+}
+
+# 当前线程是否为探测请求 (探测请求在熔断期间放行)
+_probing: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "circuit_breaker_probing", default=False
+)
+
+
+class CircuitOpenError(ccxt.ExchangeNotAvailable):
+    """熔断期间直接拒绝的请求 (未发往交易所)"""
+
+
+@dataclass
+class StaleData:
+    """熔断期间从缓存返回的数据，age_ms 为最新一条数据距今的毫秒数"""
+
+    data: Any
+    age_ms: int | None
+    reason: str
+
+
+def _counts_as_failure(e: Exception) -> bool:
+    """只有网络层错误 (502 / 超时 / 连接失败) 计入熔断，限频和业务错误不计入"""
+    return isinstance(e, ccxt.NetworkError) and not isinstance(
+        e, (ccxt.DDoSProtection, CircuitOpenError)
+    )
+
+
+class CircuitBreaker:
+    """
+    单个交易所 (exchange/market/mode) 的熔断器
+
+    - closed: 正常放行，统计连续网络错误
+    - open: 直接抛出 CircuitOpenError；open_seconds 后进入 half_open
+    - half_open: 有探测函数时由后台线程探测，否则放行一个试探请求;
+      成功则 closed，失败则重新 open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        open_seconds: float,
+        probe: Callable[[], Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.probe = probe
+        self._lock = threading.Lock()
+        self.state: BreakerState = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._probe_running = False
+        self._opened_count = 0
+        self._rejected = 0
+        self.last_error: str | None = None
+
+    def before_call(self) -> bool:
+        """
+        请求前检查，返回本次是否为试探请求
+
+        异常:
+            CircuitOpenError: 熔断中
+        """
+        if _probing.get():
+            return False
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if (
+                self.state == "open"
+                and self.probe is None
+                and time.monotonic() - self._opened_at >= self.open_seconds
+            ):
+                self.state = "half_open"
+            if (
+                self.state == "half_open"
+                and self.probe is None
+                and not self._trial_running
+            ):
+                self._trial_running = True
+                return True
+            self._rejected += 1
+        raise CircuitOpenError(
+            f"{self.name} 熔断中 (最近错误: {self.last_error})，请稍后重试"
+        )
+
+    def record_success(self, trial: bool = False) -> None:
+        with self._lock:
+            self._failures = 0
+            if trial:
+                self._trial_running = False
+            if self.state != "closed":
+                print(f"[CircuitBreaker] {self.name} 已恢复")
+            self.state = "closed"
+
+    def record_failure(self, e: Exception, trial: bool = False) -> None:
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if not _counts_as_failure(e):
+                if trial:
+                    # 试探请求拿到了交易所的业务响应，说明链路已恢复
+                    self.state = "closed"
+                    self._failures = 0
+                return
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._failures += 1
+            if self.state == "half_open" or (
+                self.state == "closed" and self._failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        """进入 open 状态 (调用方需持有 _lock)"""
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._opened_count += 1
+        print(f"[CircuitBreaker] {self.name} 熔断: {self.last_error}")
+        if self.probe is not None and not self._probe_running:
+            self._probe_running = True
+            threading.Thread(
+                target=self._probe_loop, name=f"breaker-{self.name}", daemon=True
+            ).start()
+
+    def _probe_loop(self) -> None:
+        """后台探测，直到交易所恢复"""
+        _probing.set(True)
+        while True:
+            time.sleep(self.open_seconds)
+            with self._lock:
+                self.state = "half_open"
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    self.state = "open"
+                    self._opened_at = time.monotonic()
+                continue
+            with self._lock:
+                self._probe_running = False
+            self.record_success()
+            return
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state != "closed"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "opened": self._opened_count,
+                "rejected": self._rejected,
+                "last_error": self.last_error,
+            }
+
+
+class CircuitBreakerRegistry:
+    """熔断器注册表，按 exchange/market/mode 区分 (子账户共用同一个熔断器)"""
+
+    def __init__(self) -> None:
+        self._settings: dict[str, Any] = dict(DEFAULT_BREAKER)
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def configure(self, config: dict) -> None:
+        """根据 config["circuit_breaker"] 初始化，此方法应在创建交易所实例前调用"""
+        self._settings = {**DEFAULT_BREAKER, **config.get("circuit_breaker", {})}
+        self._breakers.clear()
+
+    def get(self, name: str) -> CircuitBreaker | None:
+        return self._breakers.get(name)
+
+    def register(
+        self, name: str, probe: Callable[[], Any] | None = None
+    ) -> CircuitBreaker | None:
+        if not self._settings["enabled"]:
+            return None
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=self._settings["failure_threshold"],
+                open_seconds=self._settings["open_seconds"],
+                probe=probe,
+            )
+            self._breakers[name] = breaker
+        return breaker
+
+    def is_open(self, name: str) -> bool:
+        breaker = self._breakers.get(name)
+        return breaker is not None and breaker.is_open()
+
+    def install(self, exchange, name: str) -> None:
+        """
+        包装 ccxt 实例的 fetch2
+
+        应在 rate_limit_scheduler.install 之后调用，熔断中的请求不占用令牌。
+        """
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            return
+        original_fetch2 = exchange.fetch2
+
+        def fetch2(
+            path,
+            api="public",
+            method="GET",
+            params={},
+            headers=None,
+            body=None,
+            config={},
+        ):
+            trial = breaker.before_call()
+            try:
+                result = original_fetch2(
+                    path, api, method, params, headers, body, config
+                )
+            except Exception as e:
+                breaker.record_failure(e, trial)
+                raise
+            breaker.record_success(trial)
+            return result
+
+        exchange.fetch2 = fetch2
+
+    def stats(self) -> list[dict]:
+        return [breaker.stats() for breaker in self._breakers.values()]
+
+
+# 全局单例，供外部导入使用
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,85 @@
+"""并发执行交易所调用 (用于一次请求内需要多次 REST 调用的场景)"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, ContextManager
+
+# 共享线程池: ccxt 同步实例的调用基本都是 IO 等待，线程足够
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ccxt-call")
+
+
+def run_concurrently(
+    calls: dict[str, Callable[[], Any]],
+) -> tuple[dict[str, Any], dict[str, Exception]]:
+    """
+    并发执行多个调用，等待全部完成
+
+    参数:
+        calls: 名称 -> 无参调用
+
+    返回:
+        (results, errors): 成功调用的结果 和 失败调用的异常，均按名称索引
+    """
+    # 复制上下文，使限频优先级等 contextvar 在线程中仍然生效
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, fn)
+        for name, fn in calls.items()
+    }
+
+    results: dict[str, Any] = {}
+    errors: dict[str, Exception] = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+
+    return results, errors
+
+
+def with_instance(
+    checkout: Callable[[], ContextManager[Any]], fn: Callable[[Any], Any]
+) -> Callable[[], Any]:
+    """把 fn(交易所实例) 包装为无参调用: 执行时借出独立的实例，用完归还"""
+
+    def call() -> Any:
+        with checkout() as instance:
+            return fn(instance)
+
+    return call
+
+
+def _timed_call(fn: Callable[[], Any]) -> dict:
+    start = time.perf_counter()
+    try:
+        result = fn()
+        error = None
+    except Exception as e:
+        result = None
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "ok": error is None,
+        "result": result,
+        "error": error,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def run_bounded(calls: list[Callable[[], Any]], max_concurrency: int) -> list[dict]:
+    """
+    有界并发执行调用，按输入顺序返回每个调用的结果
+
+    每项结果: {"ok", "result", "error", "elapsed_ms"}，单个调用失败不影响其他调用
+    """
+    if not calls:
+        return []
+
+    workers = max(1, min(max_concurrency, len(calls)))
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="ccxt-batch"
+    ) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _timed_call, fn) for fn in calls
+        ]
+        return [f.result() for f in futures]
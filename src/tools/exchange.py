@@ -3,14 +3,42 @@ import ccxt
 
 from src.types import MarketType, ModeType
 
+# load_markets 之后生成的市场数据属性，池内实例之间共享引用
+_MARKET_ATTRS = (
+    "markets",
+    "markets_by_id",
+    "symbols",
+    "ids",
+    "currencies",
+    "currencies_by_id",
+    "codes",
+    "baseCurrencies",
+    "quoteCurrencies",
+)
 
-def get_binance_exchange(config, market: MarketType, mode: ModeType = "sandbox"):
+
+def share_markets(exchange, source) -> None:
+    """让 exchange 直接复用 source 已加载的市场数据 (不发起 load_markets 请求)"""
+    for attr in _MARKET_ATTRS:
+        if hasattr(source, attr):
+            setattr(exchange, attr, getattr(source, attr))
+
+
+def get_binance_exchange(
+    config,
+    market: MarketType,
+    mode: ModeType = "sandbox",
+    markets_from=None,
+    credentials: dict | None = None,
+):
     http_proxy = config["proxy"]["http"]
 
     binance_enable_proxy = config["binance"]["enable_proxy"]
     mode_key = "test" if mode == "sandbox" else "live"
-    binance_api_key = config["binance"][mode_key]["api_key"]
-    binance_secret = config["binance"][mode_key]["secret"]
+    # credentials 用于子账户: {"api_key": ..., "secret": ...}
+    credentials = credentials or config["binance"][mode_key]
+    binance_api_key = credentials["api_key"]
+    binance_secret = credentials["secret"]
 
     binance_exchange = ccxt.binance(
         {
@@ -29,19 +57,29 @@ def get_binance_exchange(config, market: MarketType, mode: ModeType = "sandbox")
         # binance_exchange.set_sandbox_mode(True)
         binance_exchange.enable_demo_trading(True)
 
-    binance_exchange.load_markets()
+    if markets_from is not None:
+        share_markets(binance_exchange, markets_from)
+    else:
+        binance_exchange.load_markets()
 
     return binance_exchange
 
 
-def get_kraken_exchange(config, market: MarketType, mode: ModeType = "sandbox"):
+def get_kraken_exchange(
+    config,
+    market: MarketType,
+    mode: ModeType = "sandbox",
+    markets_from=None,
+    credentials: dict | None = None,
+):
     # market_type = config["market_type"] <-- Removed
     http_proxy = config["proxy"]["http"]
 
     kraken_enable_proxy = config["kraken"]["enable_proxy"]
     mode_key = "test" if mode == "sandbox" else "live"
-    kraken_api_key = config["kraken"][mode_key]["api_key"]
-    kraken_secret = config["kraken"][mode_key]["secret"]
+    credentials = credentials or config["kraken"][mode_key]
+    kraken_api_key = credentials["api_key"]
+    kraken_secret = credentials["secret"]
 
     if market == "future":
         kraken_exchange = ccxt.krakenfutures(
@@ -66,6 +104,9 @@ def get_kraken_exchange(config, market: MarketType, mode: ModeType = "sandbox"):
         if mode == "sandbox":
             kraken_exchange.set_sandbox_mode(True)
 
-    kraken_exchange.load_markets()
+    if markets_from is not None:
+        share_markets(kraken_exchange, markets_from)
+    else:
+        kraken_exchange.load_markets()
 
     return kraken_exchange
@@ -1,9 +1,35 @@
 """交易所实例管理器"""
 
-from typing import Any
+import threading
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, ContextManager, Iterator
+import polars as pl
 from fastapi import HTTPException
 from src.types import ExchangeName, MarketType, ModeType, ExchangeWhitelistItem
 from src.tools.exchange import get_binance_exchange, get_kraken_exchange
+from src.tools.fake_exchange import get_fake_exchange
+from src.tools.market_table import build_market_table
+from src.tools.rate_limiter import (
+    rate_limit_scheduler,
+    rate_priority,
+    PRIORITY_BACKFILL,
+)
+from src.tools.http_pool import http_pool_manager
+from src.tools.circuit_breaker import circuit_breakers
+from src.tools.exchange_pool import (
+    ExchangePool,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_CHECKOUT_TIMEOUT,
+    DEFAULT_ACCOUNT_POOL_SIZE,
+    DEFAULT_ACCOUNT_IDLE_TTL,
+)
+
+# 交易所名称 -> 实例构造函数
+_FACTORIES = {
+    "binance": get_binance_exchange,
+    "kraken": get_kraken_exchange,
+}
 
 
 class ExchangeManager:
@@ -28,35 +54,97 @@ class ExchangeManager:
             return
         self._initialized = True
 
-        # 交易所实例注册表
+        # 交易所实例注册表 (每个 key 的主实例，负责 load_markets)
         # key: (exchange, market, mode) -> value: ccxt exchange instance
         self._registry: dict[tuple[str, str, str], Any] = {}
 
+        # 实例池 (主实例 + 共享 markets 的预热实例，各自独立的 HTTP session)
+        # key: (exchange, market, mode) -> value: ExchangePool
+        self._pools: dict[tuple[str, str, str], ExchangePool] = {}
+
+        # 市场信息列式表 (load_markets 后预计算)
+        # key: (exchange, market, mode) -> value: polars DataFrame
+        self._market_tables: dict[tuple[str, str, str], pl.DataFrame] = {}
+
+        # 子账户实例池 (按需创建，闲置后回收)，与主实例共享 markets
+        # key: (exchange, market, mode, account) -> value: ExchangePool
+        self._account_pools: dict[tuple[str, str, str, str], ExchangePool] = {}
+        self._account_lock = threading.Lock()
+
+        # 每个 key 使用的实例构造函数 (白名单项 backend 为 fake 时替换为假交易所)
+        self._factories: dict[tuple[str, str, str], Any] = {}
+
         # 白名单配置
         self._whitelist: list[ExchangeWhitelistItem] = []
 
+        # 启动配置 (创建子账户实例时读取密钥)
+        self._config: dict = {}
+
     def init_from_config(self, config: dict) -> None:
         """
         根据配置文件白名单初始化交易所实例
         此方法应在应用启动时调用一次
         """
+        # 跨进程共享限频 (config["rate_limit"]["enabled"] 为 true 时生效)
+        rate_limit_scheduler.configure(config)
+        # 共享 HTTP 连接池 (config["http_pool"])
+        http_pool_manager.configure(config)
+        # 熔断器 (config["circuit_breaker"])
+        circuit_breakers.configure(config)
+
+        self._config = config
+
+        # 实例池配置: config["exchange_pool"] = {"size": 4, "checkout_timeout": 10}
+        pool_config = config.get("exchange_pool", {})
+        default_pool_size = pool_config.get("size", DEFAULT_POOL_SIZE)
+        checkout_timeout = pool_config.get("checkout_timeout", DEFAULT_CHECKOUT_TIMEOUT)
+
         whitelist_raw = config.get("exchange_whitelist", [])
         self._whitelist = [ExchangeWhitelistItem(**item) for item in whitelist_raw]
 
         for item in self._whitelist:
             key = (item.exchange, item.market, item.mode)
 
-            if item.exchange == "binance":
-                self._registry[key] = get_binance_exchange(
-                    config, market=item.market, mode=item.mode
-                )
-            elif item.exchange == "kraken":
-                self._registry[key] = get_kraken_exchange(
-                    config, market=item.market, mode=item.mode
+            if item.backend == "fake":
+                factory = get_fake_exchange
+            else:
+                factory = _FACTORIES.get(item.exchange)
+            if factory is None:
+                continue
+
+            primary = factory(config, market=item.market, mode=item.mode)
+            pool_size = item.pool_size or default_pool_size
+            instances = [primary] + [
+                factory(
+                    config, market=item.market, mode=item.mode, markets_from=primary
                 )
+                for _ in range(pool_size - 1)
+            ]
+            name = "/".join(key)
+            pool = ExchangePool(name, instances, checkout_timeout=checkout_timeout)
+
+            # 有 fetchTime 的交易所由后台 ping 探测恢复，否则放行一个试探请求
+            ping = None
+            if primary.has.get("fetchTime"):
+                ping = partial(self._ping, pool)
+            circuit_breakers.register(name, probe=ping)
+
+            for instance in instances:
+                rate_limit_scheduler.install(instance, item.exchange)
+                circuit_breakers.install(instance, name)
+                http_pool_manager.mount(instance, item.exchange)
+
+            self._registry[key] = primary
+            self._pools[key] = pool
+            self._factories[key] = factory
+            self._market_tables[key] = build_market_table(primary.markets)
+
+            # 定时轻量请求，保持到交易所 (或代理) 的连接处于打开状态
+            if ping is not None:
+                http_pool_manager.start_warming(name, ping)
 
             print(
-                f"[ExchangeManager] 已初始化: {item.exchange}/{item.market}/{item.mode}"
+                f"[ExchangeManager] 已初始化: {item.exchange}/{item.market}/{item.mode} (实例池: {pool_size}, backend: {item.backend})"
             )
 
     def get(
@@ -91,6 +179,188 @@ class ExchangeManager:
 
         return instance
 
+    @contextmanager
+    def checkout(
+        self,
+        exchange_name: ExchangeName,
+        market: MarketType,
+        mode: ModeType,
+        account: str | None = None,
+    ) -> Iterator[Any]:
+        """
+        从实例池借出一个交易所实例，退出上下文时归还
+
+        同一实例同一时间只被一个调用使用 (避免 session / nonce 争用)。
+        未建池的 key (例如直接写入注册表的实例) 退化为 get()。
+
+        参数:
+            account: 子账户名 (config 中 <exchange>.accounts.<account>.<test|live> 的 <account>)，None 为默认账户
+
+        异常:
+            HTTPException 400: 子账户未配置
+            HTTPException 503: 交易所组合未启用，或等待空闲实例超时
+        """
+        if account is not None:
+            # 在 _account_lock 内预留，避免拿到池后、借出前被并发回收关闭
+            pool = self._get_account_pool(
+                exchange_name, market, mode, account, reserve=True
+            )
+            with pool.checkout(reserved=True) as instance:
+                yield instance
+            return
+        pool = self._pools.get((exchange_name, market, mode))
+        if pool is None:
+            yield self.get(exchange_name, market, mode)
+            return
+        with pool.checkout() as instance:
+            yield instance
+
+    def leg_checkout(
+        self,
+        exchange_name: ExchangeName,
+        market: MarketType,
+        mode: ModeType,
+        account: str | None = None,
+    ) -> tuple[Callable[[], ContextManager[Any]], int]:
+        """
+        供一次请求内的并发调用使用，返回 (借出函数, 可同时借出的实例数)
+
+        每个并发调用各自 checkout 一个实例，不能把同一个实例交给多个线程。
+        并发数应不超过实例数，多出的调用只能排队等待空闲实例 (超时后 503)。
+        """
+        if account is not None:
+            pool = self._get_account_pool(exchange_name, market, mode, account)
+        else:
+            pool = self._pools.get((exchange_name, market, mode))
+        checkout = partial(self.checkout, exchange_name, market, mode, account)
+        return checkout, pool.size if pool is not None else 1
+
+    def _get_account_pool(
+        self,
+        exchange_name: ExchangeName,
+        market: MarketType,
+        mode: ModeType,
+        account: str,
+        reserve: bool = False,
+    ) -> ExchangePool:
+        """
+        获取子账户实例池，不存在时基于主实例的 markets 创建 (不请求交易所)
+
+        reserve: 在持有 _account_lock 时预留一次 checkout，调用方随后必须
+        以 checkout(reserved=True) 借出，否则该池不会被回收
+        """
+        pool_config = self._config.get("exchange_pool", {})
+        key = (exchange_name, market, mode, account)
+
+        with self._account_lock:
+            self._evict_idle_accounts(
+                pool_config.get("account_idle_ttl", DEFAULT_ACCOUNT_IDLE_TTL)
+            )
+            pool = self._account_pools.get(key)
+            if pool is not None:
+                if reserve:
+                    pool.reserve()
+                return pool
+
+            primary = self.get(exchange_name, market, mode)
+            mode_key = "test" if mode == "sandbox" else "live"
+            credentials = (
+                self._config.get(exchange_name, {})
+                .get("accounts", {})
+                .get(account, {})
+                .get(mode_key)
+            )
+            if credentials is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"子账户未配置: {exchange_name}/{account} ({mode_key})，请在 config.json 的 {exchange_name}.accounts.{account}.{mode_key} 中添加",
+                )
+
+            factory = self._factories.get(
+                (exchange_name, market, mode), _FACTORIES[exchange_name]
+            )
+            instances = [
+                factory(
+                    self._config,
+                    market=market,
+                    mode=mode,
+                    markets_from=primary,
+                    credentials=credentials,
+                )
+                for _ in range(
+                    pool_config.get("account_size", DEFAULT_ACCOUNT_POOL_SIZE)
+                )
+            ]
+            for instance in instances:
+                rate_limit_scheduler.install(instance, exchange_name)
+                circuit_breakers.install(instance, f"{exchange_name}/{market}/{mode}")
+                http_pool_manager.mount(instance, exchange_name)
+
+            pool = ExchangePool(
+                f"{exchange_name}/{market}/{mode}#{account}",
+                instances,
+                checkout_timeout=pool_config.get(
+                    "checkout_timeout", DEFAULT_CHECKOUT_TIMEOUT
+                ),
+            )
+            self._account_pools[key] = pool
+            print(f"[ExchangeManager] 已创建子账户实例: {pool.name}")
+            if reserve:
+                pool.reserve()
+            return pool
+
+    @staticmethod
+    def _ping(pool: ExchangePool) -> None:
+        """预热用的轻量请求，以最低优先级发出"""
+        with pool.checkout() as instance, rate_priority(PRIORITY_BACKFILL):
+            instance.fetch_time()
+
+    def _evict_idle_accounts(self, ttl: float) -> None:
+        """回收闲置超过 ttl 秒的子账户实例池 (调用方需持有 _account_lock)"""
+        for key, pool in list(self._account_pools.items()):
+            if pool.is_idle(ttl):
+                del self._account_pools[key]
+                # 共享 adapter 上还有主实例的连接，不能随子账户实例一起关闭
+                for instance in pool.instances():
+                    http_pool_manager.unmount(instance)
+                pool.close()
+                print(f"[ExchangeManager] 已回收闲置子账户实例: {pool.name}")
+
+    def pool_stats(self) -> list[dict]:
+        """各实例池 (含子账户) 的借出与等待统计"""
+        with self._account_lock:
+            pools = list(self._pools.values()) + list(self._account_pools.values())
+        return [pool.stats() for pool in pools]
+
+    def get_market_table(
+        self,
+        exchange_name: ExchangeName,
+        market: MarketType,
+        mode: ModeType,
+    ) -> pl.DataFrame:
+        """
+        获取预计算的市场信息表
+
+        若实例存在但表缺失 (例如 markets 被重新加载)，则即时重建一次。
+        """
+        key = (exchange_name, market, mode)
+        table = self._market_tables.get(key)
+        if table is None:
+            instance = self.get(exchange_name, market, mode)
+            table = build_market_table(instance.markets)
+            self._market_tables[key] = table
+        return table
+
+    def enabled_exchanges(self, market: MarketType, mode: ModeType) -> list[str]:
+        """白名单中已启用指定市场/模式的交易所 (按白名单顺序)"""
+        return [
+            item.exchange
+            for item in self._whitelist
+            if item.market == market
+            and item.mode == mode
+            and (item.exchange, market, mode) in self._registry
+        ]
+
     def is_enabled(
         self,
         exchange_name: ExchangeName,
@@ -0,0 +1,130 @@
+"""交易所实例池 (同一 key 下多个 ccxt 实例，各自独立的 HTTP session)"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from fastapi import HTTPException
+
+from src.tracing import add_span
+
+# 默认每个 key 的实例数量，可通过 config["exchange_pool"]["size"] 或白名单项覆盖
+DEFAULT_POOL_SIZE = 4
+
+# 等待空闲实例的超时时间 (秒)
+DEFAULT_CHECKOUT_TIMEOUT = 10.0
+
+# 子账户实例池大小 (按需创建)
+DEFAULT_ACCOUNT_POOL_SIZE = 2
+
+# 子账户实例池闲置多久后回收 (秒)
+DEFAULT_ACCOUNT_IDLE_TTL = 900.0
+
+
+class ExchangePool:
+    """
+    单个 (exchange, market, mode) 的实例池
+
+    - 实例在启动时预热 (共享主实例已加载的 markets)
+    - checkout 独占一个实例，用完归还; 全部占用时等待
+    - 记录借出次数、等待次数和等待耗时，用于衡量争用
+    """
+
+    def __init__(
+        self,
+        name: str,
+        instances: list[Any],
+        checkout_timeout: float = DEFAULT_CHECKOUT_TIMEOUT,
+    ) -> None:
+        self.name = name
+        self.size = len(instances)
+        self.checkout_timeout = checkout_timeout
+        self._idle: deque[Any] = deque(instances)
+        self._cond = threading.Condition()
+        self._checkouts = 0
+        self._contended = 0
+        self._timeouts = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        # 已交给调用方、尚未开始 checkout 的次数 (期间不能被回收)
+        self._reserved = 0
+        self.last_used = time.monotonic()
+
+    def reserve(self) -> None:
+        """预留一次 checkout: 在随后的 checkout(reserved=True) 之前 is_idle 恒为 False"""
+        with self._cond:
+            self._reserved += 1
+
+    @contextmanager
+    def checkout(self, reserved: bool = False) -> Iterator[Any]:
+        """
+        借出一个实例，退出上下文时归还
+
+        reserved: 调用方之前已 reserve()，借出 (或超时) 时释放预留
+        """
+        start = time.perf_counter()
+        with self._cond:
+            contended = not self._idle
+            acquired = self._cond.wait_for(
+                lambda: self._idle, timeout=self.checkout_timeout
+            )
+            if reserved:
+                self._reserved -= 1
+            if not acquired:
+                self._timeouts += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"交易所实例繁忙: {self.name}，请稍后重试",
+                )
+            instance = self._idle.popleft()
+
+            wait_ms = (time.perf_counter() - start) * 1000
+            self._checkouts += 1
+            self._contended += contended
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+        add_span("pool_wait", start, start + wait_ms / 1000, pool=self.name)
+
+        try:
+            yield instance
+        finally:
+            with self._cond:
+                self._idle.append(instance)
+                self.last_used = time.monotonic()
+                self._cond.notify()
+
+    def is_idle(self, ttl: float) -> bool:
+        """没有实例被借出或预留，且距上次归还已超过 ttl 秒"""
+        with self._cond:
+            return (
+                len(self._idle) == self.size
+                and not self._reserved
+                and time.monotonic() - self.last_used > ttl
+            )
+
+    def close(self) -> None:
+        """关闭所有实例的 HTTP session"""
+        for instance in self.instances():
+            instance.close()
+
+    def instances(self) -> list[Any]:
+        """当前空闲的实例 (用于启动时的统一配置，不要在请求中使用)"""
+        with self._cond:
+            return list(self._idle)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "name": self.name,
+                "size": self.size,
+                "in_use": self.size - len(self._idle),
+                "checkouts": self._checkouts,
+                "contended": self._contended,
+                "timeouts": self._timeouts,
+                "wait_ms_avg": self._wait_ms_total / self._checkouts
+                if self._checkouts
+                else 0.0,
+                "wait_ms_max": self._wait_ms_max,
+            }
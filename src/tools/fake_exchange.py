@@ -0,0 +1,646 @@
+"""
+离线假交易所 (压测 / 浸泡测试用)
+
+白名单项设置 "backend": "fake" 后，ExchangeManager 用 FakeExchange 代替 ccxt 实例，
+请求仍经过实例池、限频、熔断和缓存，只是不访问交易所。
+
+- K 线为时间的确定性函数: 同一 symbol / 时间永远返回相同数据，不同周期之间的开收盘价一致
+  (正在形成的 K 线收盘价为当前价格，随时间变化)
+- 每次调用经过 fetch2 (因此限频和熔断包装照常生效)，按配置模拟延迟和错误
+- 下单 / 持仓 / 余额为内存状态，同一账户 (apiKey) 的所有实例共享
+- 市价单按当前价格立即成交，限价单和条件单保持挂单状态直到撤销
+
+配置 (config["fake_exchange"]，均可省略):
+    latency_ms / jitter_ms: 每次请求的模拟延迟 (均匀分布 latency ± jitter)
+    error_rate: 请求失败概率 (0~1)
+    error_types: 失败时随机抛出的 ccxt 异常名
+    seed: 延迟/错误序列和 K 线的随机种子 (相同种子可复现)
+    symbols: 各市场的交易对，例如 {"future": ["BTC/USDT:USDT"], "spot": ["BTC/USDT"]}
+    balance: 初始 USDT 余额
+    max_closed_orders / max_trades: 每个账户保留的已结束订单和成交记录数
+        (超出后丢弃最早的，避免长时间压测时内存持续增长)
+"""
+
+import math
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from itertools import count
+from typing import Any
+
+import ccxt
+import requests
+
+from src.types import MarketType, ModeType
+from src.tools.exchange import share_markets
+
+DEFAULT_FAKE_EXCHANGE: dict[str, Any] = {
+    "latency_ms": 20.0,
+    "jitter_ms": 10.0,
+    "error_rate": 0.0,
+    "error_types": ["RequestTimeout", "ExchangeNotAvailable"],
+    "seed": 0,
+    "symbols": {
+        "future": ["BTC/USDT:USDT", "ETH/USDT:USDT", "SOL/USDT:USDT"],
+        "spot": ["BTC/USDT", "ETH/USDT", "SOL/USDT"],
+    },
+    "balance": 10000.0,
+    "max_closed_orders": 1000,
+    "max_trades": 1000,
+}
+
+# 与 Binance 一致的单次 K 线上限
+MAX_OHLCV_LIMIT = 1500
+
+# 各基础币种的参考价格，其他币种按名称散列到 1~100
+_BASE_PRICES = {"BTC": 60000.0, "ETH": 3000.0, "SOL": 150.0}
+
+_DAY_MS = 24 * 3600 * 1000
+
+# 价格曲线: (周期毫秒, 振幅) 的正弦叠加
+_WAVES = ((7 * _DAY_MS, 0.06), (_DAY_MS, 0.02), (3600 * 1000, 0.004), (300000, 0.001))
+
+
+def _mix(x: int) -> float:
+    """splitmix64，把整数散列为 [0, 1) 的浮点数"""
+    x = (x + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return ((x ^ (x >> 31)) >> 11) / float(1 << 53)
+
+
+class PriceModel:
+    """确定性价格: price(t) 只依赖 symbol、种子和时间"""
+
+    def __init__(self, symbol: str, seed: int = 0) -> None:
+        self.key = zlib.crc32(f"{seed}:{symbol}".encode())
+        base = symbol.split("/")[0]
+        self.base_price = _BASE_PRICES.get(base, 1 + 99 * _mix(self.key))
+        self.phases = [2 * math.pi * _mix(self.key + i) for i in range(len(_WAVES))]
+
+    def price(self, t: int) -> float:
+        offset = 0.0
+        for (period, amplitude), phase in zip(_WAVES, self.phases):
+            offset += amplitude * math.sin(2 * math.pi * t / period + phase)
+        return self.base_price * (1 + offset)
+
+    def candle(self, t: int, period_ms: int, now: int | None = None) -> list[float]:
+        """
+        t 开始的 K 线; now 落在该周期内时为正在形成的 K 线 (收盘价为当前价格，
+        影线和成交量按已过去的比例缩放)
+        """
+        progress = 1.0
+        if now is not None and now < t + period_ms:
+            progress = max(now - t, 0) / period_ms
+        o = self.price(t)
+        c = self.price(t + int(period_ms * progress))
+        noise = _mix(self.key ^ t)
+        wick = 0.001 * math.sqrt(period_ms / 60000) * progress
+        h = max(o, c) * (1 + wick * noise)
+        low = min(o, c) * (1 - wick * _mix(self.key ^ (t + 1)))
+        volume = (10 + 90 * _mix(self.key ^ (t + 2))) * progress
+        return [t, o, h, low, c, volume]
+
+
+class FakeAccount:
+    """一个账户的挂单、持仓和余额 (同一账户的实例共享)"""
+
+    def __init__(
+        self, balance: float, max_closed_orders: int = 1000, max_trades: int = 1000
+    ) -> None:
+        self.lock = threading.Lock()
+        # 挂单全部保留，已结束的订单只保留最近 max_closed_orders 笔
+        self.orders: dict[str, dict] = {}
+        self.max_closed_orders = max_closed_orders
+        self._closed_ids: deque[str] = deque()
+        # 单向持仓: symbol -> {"contracts": 带符号数量, "entryPrice": 开仓均价}
+        self.positions: dict[str, dict] = {}
+        self.balances: dict[str, float] = {"USDT": balance}
+        self.leverage: dict[str, int] = {}
+        self.trades: deque[dict] = deque(maxlen=max_trades)
+
+    def retire(self, order_id: str) -> None:
+        """订单成交或撤销后调用，超出上限时丢弃最早结束的订单 (调用方持有 lock)"""
+        self._closed_ids.append(order_id)
+        while len(self._closed_ids) > self.max_closed_orders:
+            self.orders.pop(self._closed_ids.popleft(), None)
+
+
+_order_ids = count(1)
+
+# 实例编号 (用于各实例的延迟/错误随机序列)
+_instance_ids = count()
+
+# (market, mode, apiKey) -> FakeAccount
+_accounts: dict[tuple[str, str, str], FakeAccount] = {}
+_accounts_lock = threading.Lock()
+
+
+def _get_account(market: str, mode: str, api_key: str, settings: dict) -> FakeAccount:
+    with _accounts_lock:
+        key = (market, mode, api_key)
+        account = _accounts.get(key)
+        if account is None:
+            account = _accounts[key] = FakeAccount(
+                settings["balance"],
+                max_closed_orders=settings["max_closed_orders"],
+                max_trades=settings["max_trades"],
+            )
+        return account
+
+
+def _iso(ms: int) -> str:
+    return ccxt.Exchange.iso8601(ms)
+
+
+def _build_market(symbol: str, market: MarketType) -> dict:
+    base, rest = symbol.split("/")
+    quote, _, settle = rest.partition(":")
+    swap = market == "future"
+    return {
+        "id": (base + quote).upper(),
+        "symbol": symbol,
+        "base": base,
+        "quote": quote,
+        "settle": settle or None,
+        "type": "swap" if swap else "spot",
+        "spot": not swap,
+        "swap": swap,
+        "contract": swap,
+        "linear": True if swap else None,
+        "inverse": False if swap else None,
+        "active": True,
+        "contractSize": 1.0 if swap else None,
+        "precision": {"amount": 0.001, "price": 0.01},
+        "limits": {"amount": {"min": 0.001, "max": None}},
+        "info": {},
+    }
+
+
+class FakeExchange:
+    """
+    模拟 ccxt 同步实例的离线交易所
+
+    只实现代理用到的方法和属性 (session / has / markets / fetch2 / apiKey 等)。
+    """
+
+    id = "fake"
+
+    has = {
+        "fetchTime": True,
+        "fetchOHLCV": True,
+        "fetchTickers": True,
+        "fetchPositions": True,
+        "createOrders": True,
+        "cancelOrders": True,
+    }
+
+    def __init__(
+        self,
+        settings: dict,
+        market: MarketType,
+        mode: ModeType,
+        api_key: str = "fake",
+        instance_index: int = 0,
+    ) -> None:
+        self.settings = settings
+        self.market_type = market
+        self.mode = mode
+        self.apiKey = api_key
+        self.session = requests.Session()
+        self.account = _get_account(market, mode, api_key, settings)
+        self._rng = random.Random(f"{settings['seed']}:{api_key}:{instance_index}")
+        self._rng_lock = threading.Lock()
+        self._models: dict[str, PriceModel] = {}
+
+        self.markets: dict[str, dict] = {}
+        self.markets_by_id: dict[str, list[dict]] = {}
+        self.symbols: list[str] = []
+
+    # === 与 ccxt 实例兼容的基础设施 ===
+    def load_markets(self, reload: bool = False, params: dict = {}) -> dict:
+        # 启动时调用，不模拟延迟和错误
+        if self.markets and not reload:
+            return self.markets
+        symbols = self.settings["symbols"].get(self.market_type, [])
+        self.markets = {s: _build_market(s, self.market_type) for s in symbols}
+        self.markets_by_id = {m["id"]: [m] for m in self.markets.values()}
+        self.symbols = sorted(self.markets)
+        return self.markets
+
+    def market(self, symbol: str) -> dict:
+        market = self.markets.get(symbol)
+        if market is None:
+            raise ccxt.BadSymbol(f"fake does not have market symbol {symbol}")
+        return market
+
+    def calculate_rate_limiter_cost(self, api, method, path, params, config={}):
+        return config.get("cost", 1)
+
+    def fetch2(
+        self,
+        path,
+        api="public",
+        method="GET",
+        params={},
+        headers=None,
+        body=None,
+        config={},
+    ):
+        """模拟一次 REST 请求: 等待延迟，按 error_rate 抛出网络错误"""
+        with self._rng_lock:
+            latency = self.settings["latency_ms"] + self.settings[
+                "jitter_ms"
+            ] * self._rng.uniform(-1, 1)
+            failed = self._rng.random() < self.settings["error_rate"]
+            error_name = self._rng.choice(self.settings["error_types"])
+        if latency > 0:
+            time.sleep(latency / 1000)
+        if failed:
+            raise getattr(ccxt, error_name)(f"fake {method} {path}: 模拟错误")
+        return None
+
+    def close(self) -> None:
+        self.session.close()
+
+    def milliseconds(self) -> int:
+        return int(time.time() * 1000)
+
+    def _model(self, symbol: str) -> PriceModel:
+        model = self._models.get(symbol)
+        if model is None:
+            model = self._models[symbol] = PriceModel(symbol, self.settings["seed"])
+        return model
+
+    def _last(self, symbol: str) -> float:
+        return self._model(symbol).price(self.milliseconds())
+
+    # === 行情 ===
+    def fetch_time(self, params: dict = {}) -> int:
+        self.fetch2("time")
+        return self.milliseconds()
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str = "1m",
+        since: int | None = None,
+        limit: int | None = None,
+        params: dict = {},
+    ) -> list[list[float]]:
+        self.market(symbol)
+        self.fetch2("klines", config={"cost": 5})
+        period_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        limit = min(limit or 500, MAX_OHLCV_LIMIT)
+        now = self.milliseconds()
+        current = now - now % period_ms
+        if since is None:
+            start = current - (limit - 1) * period_ms
+        else:
+            start = since + (-since) % period_ms
+        end = min(start + limit * period_ms, current + period_ms)
+        model = self._model(symbol)
+        return [model.candle(t, period_ms, now) for t in range(start, end, period_ms)]
+
+    def fetch_tickers(self, symbols: list[str] | None = None, params: dict = {}):
+        self.fetch2("ticker/24hr", config={"cost": 40})
+        now = self.milliseconds()
+        tickers = {}
+        for symbol in symbols or self.symbols:
+            model = self._model(symbol)
+            last = model.price(now)
+            open_ = model.price(now - _DAY_MS)
+            tickers[symbol] = {
+                "symbol": symbol,
+                "timestamp": now,
+                "datetime": _iso(now),
+                "last": last,
+                "close": last,
+                "open": open_,
+                "bid": last * 0.9999,
+                "ask": last * 1.0001,
+                "change": last - open_,
+                "percentage": (last / open_ - 1) * 100,
+                "info": {},
+            }
+        return tickers
+
+    # === 账户 ===
+    def fetch_balance(self, params: dict = {}) -> dict:
+        self.fetch2("account", "private")
+        now = self.milliseconds()
+        with self.account.lock:
+            balances = dict(self.account.balances)
+            used = {code: 0.0 for code in balances}
+            for order in self.account.orders.values():
+                if order["status"] == "open" and order["price"]:
+                    used["USDT"] += order["price"] * order["remaining"]
+        result: dict[str, Any] = {
+            "free": {code: total - used[code] for code, total in balances.items()},
+            "used": used,
+            "total": balances,
+            "timestamp": now,
+            "datetime": _iso(now),
+            "info": {},
+        }
+        for code, total in balances.items():
+            result[code] = {
+                "free": result["free"][code],
+                "used": used[code],
+                "total": total,
+            }
+        return result
+
+    def fetch_positions(self, symbols: list[str] | None = None, params: dict = {}):
+        self.fetch2("positionRisk", "private")
+        now = self.milliseconds()
+        with self.account.lock:
+            positions = dict(self.account.positions)
+            leverage = dict(self.account.leverage)
+        result = []
+        for symbol, pos in positions.items():
+            if symbols and symbol not in symbols:
+                continue
+            contracts = pos["contracts"]
+            if not contracts:
+                continue
+            mark = self._last(symbol)
+            notional = abs(contracts) * mark
+            result.append(
+                {
+                    "symbol": symbol,
+                    "timestamp": now,
+                    "datetime": _iso(now),
+                    "contracts": abs(contracts),
+                    "contractSize": 1.0,
+                    "side": "long" if contracts > 0 else "short",
+                    "notional": notional,
+                    "leverage": leverage.get(symbol, 1),
+                    "entryPrice": pos["entryPrice"],
+                    "markPrice": mark,
+                    "unrealizedPnl": (mark - pos["entryPrice"]) * contracts,
+                    "hedged": False,
+                    "marginMode": "cross",
+                    "info": {},
+                }
+            )
+        return result
+
+    def set_leverage(self, leverage: int, symbol: str | None = None, params={}):
+        self.fetch2("leverage", "private", "POST")
+        with self.account.lock:
+            self.account.leverage[symbol] = int(leverage)
+        return {"symbol": symbol, "leverage": int(leverage)}
+
+    def set_margin_mode(self, marginMode: str, symbol: str | None = None, params={}):
+        self.fetch2("marginType", "private", "POST")
+        return {"symbol": symbol, "marginMode": marginMode}
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params={}):
+        self.fetch2("userTrades", "private")
+        with self.account.lock:
+            trades = [
+                t
+                for t in self.account.trades
+                if (symbol is None or t["symbol"] == symbol)
+                and (since is None or t["timestamp"] >= since)
+            ]
+        return trades[-limit:] if limit else trades
+
+    # === 订单 ===
+    def _apply_fill(self, order: dict, price: float) -> None:
+        """按 price 成交整张订单 (调用方持有 account.lock)"""
+        symbol, amount = order["symbol"], order["remaining"]
+        signed = amount if order["side"] == "buy" else -amount
+        account = self.account
+        if self.market_type == "spot":
+            base, quote = symbol.split("/")
+            account.balances[base] = account.balances.get(base, 0.0) + signed
+            account.balances[quote] = account.balances.get(quote, 0.0) - signed * price
+        else:
+            pos = account.positions.setdefault(
+                symbol, {"contracts": 0.0, "entryPrice": 0.0}
+            )
+            old = pos["contracts"]
+            new = old + signed
+            if old == 0 or (old > 0) == (signed > 0):
+                # 加仓: 更新开仓均价
+                pos["entryPrice"] = (
+                    pos["entryPrice"] * abs(old) + price * amount
+                ) / abs(new)
+            else:
+                # 减仓 / 反手: 已平部分计入已实现盈亏
+                closed = min(abs(old), amount)
+                pnl = (price - pos["entryPrice"]) * closed * (1 if old > 0 else -1)
+                account.balances["USDT"] += pnl
+                if abs(new) > 1e-12 and (new > 0) != (old > 0):
+                    pos["entryPrice"] = price
+            pos["contracts"] = 0.0 if abs(new) < 1e-12 else new
+
+        order.update(
+            filled=order["amount"],
+            remaining=0.0,
+            average=price,
+            cost=price * order["amount"],
+            status="closed",
+            lastTradeTimestamp=self.milliseconds(),
+        )
+        account.trades.append(
+            {
+                "id": f"t{order['id']}",
+                "order": order["id"],
+                "symbol": symbol,
+                "side": order["side"],
+                "price": price,
+                "amount": amount,
+                "cost": price * amount,
+                "timestamp": order["lastTradeTimestamp"],
+                "datetime": _iso(order["lastTradeTimestamp"]),
+                "info": {},
+            }
+        )
+
+    def create_order(
+        self,
+        symbol: str,
+        type: str,
+        side: str,
+        amount: float,
+        price: float | None = None,
+        params: dict = {},
+    ) -> dict:
+        self.market(symbol)
+        self.fetch2("order", "private", "POST")
+        if amount is None or amount <= 0:
+            raise ccxt.InvalidOrder(f"fake: 数量无效 {amount}")
+        if type == "limit" and price is None:
+            raise ccxt.ArgumentsRequired("fake: 限价单需要 price")
+
+        trigger = (
+            params.get("triggerPrice")
+            or params.get("stopPrice")
+            or params.get("stopLossPrice")
+            or params.get("takeProfitPrice")
+        )
+        now = self.milliseconds()
+        order = {
+            "id": str(next(_order_ids)),
+            "clientOrderId": params.get("clientOrderId"),
+            "timestamp": now,
+            "datetime": _iso(now),
+            "lastTradeTimestamp": None,
+            "symbol": symbol,
+            "type": type,
+            "side": side,
+            "price": price,
+            "amount": float(amount),
+            "filled": 0.0,
+            "remaining": float(amount),
+            "cost": 0.0,
+            "average": None,
+            "status": "open",
+            "trades": [],
+            "fee": None,
+            "triggerPrice": trigger,
+            "reduceOnly": bool(params.get("reduceOnly", False)),
+            "postOnly": bool(params.get("postOnly", False)),
+            "timeInForce": params.get("timeInForce", "GTC"),
+            "info": {},
+        }
+
+        with self.account.lock:
+            fill_now = type == "market" and trigger is None
+            if fill_now and order["reduceOnly"] and self.market_type != "spot":
+                held = self.account.positions.get(symbol, {}).get("contracts", 0.0)
+                closable = -held if side == "buy" else held
+                if closable <= 0:
+                    raise ccxt.InvalidOrder("fake: ReduceOnly Order is rejected.")
+                order["amount"] = order["remaining"] = min(order["amount"], closable)
+            if fill_now:
+                self._apply_fill(order, self._last(symbol))
+            self.account.orders[order["id"]] = order
+            if fill_now:
+                self.account.retire(order["id"])
+            return dict(order)
+
+    def create_orders(self, orders: list[dict], params: dict = {}) -> list[dict]:
+        self.fetch2("batchOrders", "private", "POST", config={"cost": 5})
+        result = []
+        for o in orders:
+            try:
+                result.append(
+                    self.create_order(
+                        o["symbol"],
+                        o["type"],
+                        o["side"],
+                        o["amount"],
+                        o.get("price"),
+                        o.get("params") or {},
+                    )
+                )
+            except ccxt.BaseError as e:
+                # 与 Binance 批量接口一致: 失败的单腿返回错误信息而不是抛出
+                result.append({"id": None, "info": {"msg": str(e)}})
+        return result
+
+    def _find(self, id: str, params: dict) -> dict:
+        """按 id 查找订单; params["stop"] 区分普通单和条件单 (模拟 Binance 的两个接口)"""
+        order = self.account.orders.get(str(id))
+        if order is None or bool(params.get("stop")) != (
+            order["triggerPrice"] is not None
+        ):
+            raise ccxt.OrderNotFound(f"fake: Order does not exist ({id})")
+        return order
+
+    def fetch_order(self, id: str, symbol: str | None = None, params: dict = {}):
+        self.fetch2("order", "private")
+        with self.account.lock:
+            return dict(self._find(id, params))
+
+    def _list_orders(self, symbol, since, limit, params, open_: bool) -> list[dict]:
+        stop = bool(params.get("stop"))
+        with self.account.lock:
+            orders = [
+                dict(o)
+                for o in self.account.orders.values()
+                if (o["status"] == "open") == open_
+                and (symbol is None or o["symbol"] == symbol)
+                and (since is None or o["timestamp"] >= since)
+                and (o["triggerPrice"] is not None) == stop
+            ]
+        return orders[-limit:] if limit else orders
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        self.fetch2("openOrders", "private")
+        return self._list_orders(symbol, since, limit, params, open_=True)
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params={}):
+        self.fetch2("allOrders", "private")
+        return self._list_orders(symbol, since, limit, params, open_=False)
+
+    def cancel_order(self, id: str, symbol: str | None = None, params: dict = {}):
+        self.fetch2("order", "private", "DELETE")
+        with self.account.lock:
+            order = self._find(id, params)
+            if order["status"] != "open":
+                raise ccxt.OrderNotFound(f"fake: Unknown order sent ({id})")
+            order["status"] = "canceled"
+            self.account.retire(order["id"])
+            return dict(order)
+
+    def cancel_orders(self, ids: list[str], symbol=None, params: dict = {}):
+        self.fetch2("batchOrders", "private", "DELETE")
+        result = []
+        with self.account.lock:
+            for id in ids:
+                order = self.account.orders.get(str(id))
+                if order is None or order["status"] != "open":
+                    # 与 create_orders 和 Binance 批量接口一致: 失败项的 id 为 None
+                    result.append(
+                        {"id": None, "info": {"msg": f"Unknown order sent ({id})"}}
+                    )
+                    continue
+                order["status"] = "canceled"
+                self.account.retire(order["id"])
+                result.append(dict(order))
+        return result
+
+    def cancel_all_orders(self, symbol: str | None = None, params: dict = {}):
+        self.fetch2("allOpenOrders", "private", "DELETE")
+        stop = bool(params.get("stop"))
+        canceled = []
+        with self.account.lock:
+            for order in self.account.orders.values():
+                if (
+                    order["status"] == "open"
+                    and (symbol is None or order["symbol"] == symbol)
+                    and (order["triggerPrice"] is not None) == stop
+                ):
+                    order["status"] = "canceled"
+                    canceled.append(dict(order))
+            for order in canceled:
+                self.account.retire(order["id"])
+        return canceled
+
+    # ccxt 的驼峰别名
+    cancelAllOrders = cancel_all_orders
+
+
+def get_fake_exchange(
+    config,
+    market: MarketType,
+    mode: ModeType = "sandbox",
+    markets_from=None,
+    credentials: dict | None = None,
+):
+    """与 get_binance_exchange 相同的构造签名，供 ExchangeManager 替换使用"""
+    settings = {**DEFAULT_FAKE_EXCHANGE, **config.get("fake_exchange", {})}
+    api_key = (credentials or {}).get("api_key", "fake")
+    exchange = FakeExchange(settings, market, mode, api_key, next(_instance_ids))
+    if markets_from is not None:
+        share_markets(exchange, markets_from)
+    else:
+        exchange.load_markets()
+    return exchange
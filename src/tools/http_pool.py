@@ -0,0 +1,226 @@
+"""交易所 HTTP 连接池 (共享连接、keep-alive、DNS 缓存、定时预热)"""
+
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# 默认配置，可通过 config["http_pool"] 覆盖
+# pool_connections: 每个 adapter 缓存的主机连接池数量
+# pool_maxsize: 每个主机连接池的最大连接数 (应不小于并发请求数)
+# keepalive_idle: TCP keep-alive 探测前的空闲秒数 (0 表示不开启)
+# dns_ttl: getaddrinfo 结果缓存秒数 (0 表示不缓存)
+# warm_interval: 预热 ping 的间隔秒数 (0 表示不预热)
+DEFAULT_HTTP_POOL: dict[str, Any] = {
+    "enabled": True,
+    "pool_connections": 4,
+    "pool_maxsize": 32,
+    "keepalive_idle": 30,
+    "dns_ttl": 0,
+    "warm_interval": 0,
+}
+
+
+def build_socket_options(keepalive_idle: int) -> list[tuple[int, int, int]]:
+    """TCP_NODELAY + keep-alive (探测参数仅在平台支持时设置)"""
+    options = list(HTTPConnection.default_socket_options)
+    if (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) not in options:
+        options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+    if keepalive_idle > 0:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive_idle))
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10))
+    return options
+
+
+class TunedHTTPAdapter(HTTPAdapter):
+    """
+    带 socket 参数的 HTTPAdapter
+
+    同一交易所的所有 ccxt 实例挂载同一个 adapter:
+    各实例保留自己的 Session (cookies / headers 互不影响)，
+    底层 urllib3 连接池 (线程安全) 共享，已建立的 TLS 连接可以被任意实例复用。
+    """
+
+    def __init__(self, socket_options: list, **kwargs: Any) -> None:
+        self._socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: Any) -> Any:
+        proxy_kwargs["socket_options"] = self._socket_options
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+    def pool_counters(self) -> tuple[int, int]:
+        """所有主机连接池的 (请求数, 新建连接数)，包含经代理的连接池"""
+        managers = [self.poolmanager, *self.proxy_manager.values()]
+        requests = connections = 0
+        for manager in managers:
+            for key in manager.pools.keys():
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                requests += pool.num_requests
+                connections += pool.num_connections
+        return requests, connections
+
+
+class DnsCache:
+    """getaddrinfo 结果的 TTL 缓存 (替换 socket.getaddrinfo，进程级生效)"""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, Any]] = {}
+        self._original = socket.getaddrinfo
+        self.hits = 0
+        self.misses = 0
+
+    def getaddrinfo(self, *args: Any, **kwargs: Any) -> Any:
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        result = self._original(*args, **kwargs)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+    def install(self) -> None:
+        socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self) -> None:
+        socket.getaddrinfo = self._original
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class HttpPoolManager:
+    """
+    HTTP 连接池管理器
+
+    - 每个交易所一个共享 adapter (连接池大小、keep-alive、TCP_NODELAY)
+    - 可选 DNS 缓存
+    - 可选的定时预热 ping，避免空闲连接被代理或交易所断开后冷启动
+    """
+
+    def __init__(self) -> None:
+        self._settings: dict[str, Any] = dict(DEFAULT_HTTP_POOL)
+        self._adapters: dict[str, TunedHTTPAdapter] = {}
+        self._dns_cache: DnsCache | None = None
+        self._warmers: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def configure(self, config: dict) -> None:
+        """根据 config["http_pool"] 初始化，此方法应在创建交易所实例前调用"""
+        self._settings = {**DEFAULT_HTTP_POOL, **config.get("http_pool", {})}
+        self._adapters.clear()
+
+        if self._dns_cache is not None:
+            self._dns_cache.uninstall()
+            self._dns_cache = None
+        if self._settings["enabled"] and self._settings["dns_ttl"] > 0:
+            self._dns_cache = DnsCache(self._settings["dns_ttl"])
+            self._dns_cache.install()
+
+    def mount(self, exchange, exchange_name: str) -> None:
+        """让 ccxt 实例的 Session 使用该交易所共享的 adapter"""
+        if not self._settings["enabled"]:
+            return
+        with self._lock:
+            adapter = self._adapters.get(exchange_name)
+            if adapter is None:
+                adapter = TunedHTTPAdapter(
+                    build_socket_options(self._settings["keepalive_idle"]),
+                    pool_connections=self._settings["pool_connections"],
+                    pool_maxsize=self._settings["pool_maxsize"],
+                )
+                self._adapters[exchange_name] = adapter
+        exchange.session.mount("https://", adapter)
+        exchange.session.mount("http://", adapter)
+
+    def unmount(self, exchange) -> None:
+        """
+        让 ccxt 实例的 Session 换回独立的默认 adapter
+
+        关闭实例 (session.close) 会关闭挂载的 adapter 并清空其连接池，
+        共享 adapter 上其他实例的连接和统计会一起丢失，因此关闭前先卸下。
+        """
+        if not self._settings["enabled"]:
+            return
+        exchange.session.mount("https://", HTTPAdapter())
+        exchange.session.mount("http://", HTTPAdapter())
+
+    def start_warming(self, name: str, ping: Callable[[], Any]) -> None:
+        """
+        按 warm_interval 定时调用 ping (后台守护线程)
+
+        ping 应是轻量请求 (例如 fetch_time)，失败只计数不抛出。
+        """
+        interval = self._settings["warm_interval"]
+        if not self._settings["enabled"] or interval <= 0 or name in self._warmers:
+            return
+
+        state = {"pings": 0, "failures": 0, "last_ms": None, "last_error": None}
+        self._warmers[name] = state
+
+        def loop():
+            while not self._stop.wait(interval):
+                start = time.perf_counter()
+                try:
+                    ping()
+                    state["last_error"] = None
+                except Exception as e:
+                    state["failures"] += 1
+                    state["last_error"] = f"{type(e).__name__}: {e}"
+                state["pings"] += 1
+                state["last_ms"] = (time.perf_counter() - start) * 1000
+
+        threading.Thread(target=loop, name=f"http-warm-{name}", daemon=True).start()
+
+    def stats(self) -> dict:
+        adapters = []
+        for name, adapter in list(self._adapters.items()):
+            requests, connections = adapter.pool_counters()
+            adapters.append(
+                {
+                    "exchange": name,
+                    "requests": requests,
+                    "new_connections": connections,
+                    # 复用已有连接的请求视为命中
+                    "reused": max(0, requests - connections),
+                    "hit_ratio": (requests - connections) / requests
+                    if requests
+                    else 0.0,
+                }
+            )
+        return {
+            "settings": self._settings,
+            "adapters": adapters,
+            "dns": self._dns_cache.stats() if self._dns_cache else None,
+            "warmers": {name: dict(state) for name, state in self._warmers.items()},
+        }
+
+
+# 全局单例，供外部导入使用
+http_pool_manager = HttpPoolManager()
@@ -0,0 +1,375 @@
+"""
+服务端指标计算 (Polars)
+
+支持的指标 (spec 格式 name:参数[:参数]):
+    sma:N          简单移动平均
+    ema:N          指数移动平均 (alpha=2/(N+1)，以第一根收盘价为种子)
+    rsi:N          RSI (Wilder 平滑)
+    atr:N          ATR (Wilder 平滑)
+    bbands:N:K     布林带 (中轨 N 期均值，上下轨 ±K 倍总体标准差)
+
+已收盘 K 线的结果按 (数据位置, spec) 缓存，新 K 线到达时只用保存的状态计算新增部分:
+- 递推类 (ema / rsi / atr) 保存最后的平滑值，增量结果与全量重算逐位一致
+- 滚动类 (sma / bbands) 保存最后 N-1 根收盘价作为窗口上下文
+正在形成的 K 线每次单独计算，不写入缓存。
+
+结果与请求历史有关: 缓存覆盖了请求起点之前的 K 线时，请求开头的行直接取缓存中
+已收敛的值; 冷缓存时从请求的第一根开始计算，开头的预热期为 null，递推类指标
+在预热期之后也还在向收敛值靠拢。滚动类指标在预热期之后两种情况结果相同。
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import polars as pl
+from fastapi import HTTPException
+
+# 默认配置，可通过 config["indicators"] 覆盖
+# max_entries: 最多缓存多少个 (数据位置, spec)
+# max_rows: 每个缓存最多保留多少根已收盘 K 线的结果 (超出后丢弃最早的部分)
+DEFAULT_INDICATORS: dict[str, Any] = {
+    "max_entries": 256,
+    "max_rows": 100_000,
+}
+
+# 单个请求最多计算的指标数
+MAX_SPECS = 20
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    name: str
+    params: tuple[float, ...]
+
+    @property
+    def key(self) -> str:
+        return ":".join([self.name, *(f"{p:g}" for p in self.params)])
+
+    @property
+    def period(self) -> int:
+        return int(self.params[0])
+
+    @property
+    def columns(self) -> list[str]:
+        if self.name == "bbands":
+            return [f"{self.key}.{part}" for part in ("mid", "upper", "lower")]
+        return [self.key]
+
+
+# 指标名 -> (参数个数, 默认参数)
+_SIGNATURES: dict[str, tuple[int, tuple[float, ...]]] = {
+    "sma": (1, ()),
+    "ema": (1, ()),
+    "rsi": (1, ()),
+    "atr": (1, ()),
+    "bbands": (2, (2.0,)),
+}
+
+
+def parse_specs(text: str) -> list[IndicatorSpec]:
+    """
+    解析 "ema:20,rsi:14,bbands:20:2"
+
+    异常:
+        HTTPException 400: 格式错误或不支持的指标
+    """
+    specs: list[IndicatorSpec] = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, *raw = item.lower().split(":")
+        signature = _SIGNATURES.get(name)
+        if signature is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"不支持的指标: {name}，可选: {', '.join(_SIGNATURES)}",
+            )
+        arity, defaults = signature
+        try:
+            params = tuple(float(p) for p in raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"指标参数无效: {item}")
+        params = params + defaults[len(params) - 1 :] if params else params
+        if len(params) != arity or params[0] < 1 or params[0] != int(params[0]):
+            raise HTTPException(status_code=400, detail=f"指标参数无效: {item}")
+        spec = IndicatorSpec(name, params)
+        if spec not in specs:
+            specs.append(spec)
+
+    if not specs:
+        raise HTTPException(status_code=400, detail="indicators 不能为空")
+    if len(specs) > MAX_SPECS:
+        raise HTTPException(status_code=400, detail=f"一次最多计算 {MAX_SPECS} 个指标")
+    return specs
+
+
+# === 计算 ===
+# 每个指标的计算函数: (新增 K 线, spec, 之前的状态) -> (结果列, 新状态)
+# 状态为 None 表示从头计算; 结果列与新增 K 线逐行对应
+
+
+def _ewm(values: pl.Series, alpha: float, seed: float | None) -> pl.Series:
+    """adjust=False 的指数平滑; seed 为上一行的平滑值 (作为第一行输入，结果与连续计算一致)"""
+    if seed is None:
+        return values.ewm_mean(alpha=alpha, adjust=False)
+    seeded = pl.concat([pl.Series([seed], dtype=pl.Float64), values])
+    return seeded.ewm_mean(alpha=alpha, adjust=False).slice(1)
+
+
+def _mask_warmup(values: pl.Series, seen: int, warmup: int) -> pl.Series:
+    """全局行号小于 warmup 的行置为 null"""
+    skip = max(0, min(len(values), warmup - seen))
+    if skip == 0:
+        return values
+    return pl.concat([pl.Series([None] * skip, dtype=pl.Float64), values.slice(skip)])
+
+
+def _sma(frame: pl.DataFrame, spec: IndicatorSpec, state: dict | None):
+    n = spec.period
+    context = state["closes"] if state else []
+    closes = pl.concat([pl.Series(context, dtype=pl.Float64), frame["close"]])
+    mean = closes.rolling_mean(window_size=n).slice(len(context))
+    return [mean.alias(spec.key)], {"closes": closes.tail(n - 1).to_list()}
+
+
+def _bbands(frame: pl.DataFrame, spec: IndicatorSpec, state: dict | None):
+    n, k = spec.period, spec.params[1]
+    context = state["closes"] if state else []
+    closes = pl.concat([pl.Series(context, dtype=pl.Float64), frame["close"]])
+    mid = closes.rolling_mean(window_size=n).slice(len(context))
+    std = closes.rolling_std(window_size=n, ddof=0).slice(len(context))
+    mid_col, upper_col, lower_col = spec.columns
+    return [
+        mid.alias(mid_col),
+        (mid + k * std).alias(upper_col),
+        (mid - k * std).alias(lower_col),
+    ], {"closes": closes.tail(n - 1).to_list()}
+
+
+def _ema(frame: pl.DataFrame, spec: IndicatorSpec, state: dict | None):
+    n = spec.period
+    seen = state["seen"] if state else 0
+    raw = _ewm(frame["close"], 2 / (n + 1), state["ema"] if state else None)
+    new_state = {"ema": raw[-1], "seen": seen + len(frame)}
+    return [_mask_warmup(raw, seen, n - 1).alias(spec.key)], new_state
+
+
+def _rsi(frame: pl.DataFrame, spec: IndicatorSpec, state: dict | None):
+    n = spec.period
+    seen = state["seen"] if state else 0
+    closes = frame["close"]
+    if state:
+        diff = closes - pl.concat([pl.Series([state["close"]]), closes.head(-1)])
+        gains = _ewm(diff.clip(lower_bound=0), 1 / n, state["gain"])
+        losses = _ewm((-diff).clip(lower_bound=0), 1 / n, state["loss"])
+    else:
+        # 第一根没有涨跌，平滑从第二根开始
+        diff = closes.diff().slice(1)
+        gains = _ewm(diff.clip(lower_bound=0), 1 / n, None)
+        losses = _ewm((-diff).clip(lower_bound=0), 1 / n, None)
+        pad = pl.Series([None], dtype=pl.Float64)
+        gains, losses = pl.concat([pad, gains]), pl.concat([pad, losses])
+
+    rsi = (
+        pl.DataFrame({"g": gains, "l": losses})
+        .select(
+            pl.when(pl.col("l") == 0)
+            .then(pl.when(pl.col("g") == 0).then(50.0).otherwise(100.0))
+            .otherwise(100 - 100 / (1 + pl.col("g") / pl.col("l")))
+        )
+        .to_series()
+    )
+    new_state = {
+        "close": closes[-1],
+        "gain": gains[-1],
+        "loss": losses[-1],
+        "seen": seen + len(frame),
+    }
+    return [_mask_warmup(rsi, seen, n).alias(spec.key)], new_state
+
+
+def _atr(frame: pl.DataFrame, spec: IndicatorSpec, state: dict | None):
+    n = spec.period
+    seen = state["seen"] if state else 0
+    prev_close = frame["close"].shift(1)
+    if state:
+        prev_close = prev_close.fill_null(state["close"])
+    tr = frame.select(
+        pl.max_horizontal(
+            pl.col("high") - pl.col("low"),
+            (pl.col("high") - prev_close).abs(),
+            (pl.col("low") - prev_close).abs(),
+        )
+    ).to_series()
+    raw = _ewm(tr, 1 / n, state["atr"] if state else None)
+    new_state = {"atr": raw[-1], "close": frame["close"][-1], "seen": seen + len(frame)}
+    return [_mask_warmup(raw, seen, n - 1).alias(spec.key)], new_state
+
+
+_COMPUTE: dict[str, Callable] = {
+    "sma": _sma,
+    "ema": _ema,
+    "rsi": _rsi,
+    "atr": _atr,
+    "bbands": _bbands,
+}
+
+
+def compute(
+    frame: pl.DataFrame, spec: IndicatorSpec, state: dict | None = None
+) -> tuple[pl.DataFrame, dict]:
+    """计算 frame 各行的指标 (time + 结果列) 和计算后的状态"""
+    columns, new_state = _COMPUTE[spec.name](frame, spec, state)
+    return frame.select("time").with_columns(columns), new_state
+
+
+# === 缓存 ===
+@dataclass
+class _Memo:
+    """某个 (数据位置, spec) 已收盘 K 线的结果和末尾状态"""
+
+    values: pl.DataFrame
+    state: dict
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def start(self) -> int:
+        return int(self.values["time"][0])
+
+    @property
+    def end(self) -> int:
+        return int(self.values["time"][-1])
+
+
+class IndicatorCache:
+    """已收盘 K 线指标结果的 LRU 缓存"""
+
+    def __init__(self) -> None:
+        self.settings: dict[str, Any] = dict(DEFAULT_INDICATORS)
+        self._memos: OrderedDict[tuple, _Memo] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._extends = 0
+        self._rebuilds = 0
+
+    def configure(self, config: dict) -> None:
+        self.settings = {**DEFAULT_INDICATORS, **config.get("indicators", {})}
+
+    def evaluate(
+        self,
+        loc_key: tuple,
+        frame: pl.DataFrame,
+        specs: list[IndicatorSpec],
+        period_ms: int,
+        now_ms: int,
+    ) -> pl.DataFrame:
+        """
+        计算 frame (按时间排序的 OHLCV) 每一行的指标，返回 time + 各指标列
+
+        time + period_ms <= now_ms 的行视为已收盘，走缓存; 之后的行单独计算。
+        """
+        result = frame.select("time")
+        if frame.is_empty():
+            return result.with_columns(
+                pl.lit(None, dtype=pl.Float64).alias(c)
+                for s in specs
+                for c in s.columns
+            )
+
+        is_closed = (pl.col("time") + period_ms) <= now_ms
+        closed = frame.filter(is_closed)
+        forming = frame.filter(~is_closed)
+
+        forming_start = None if forming.is_empty() else int(forming["time"][0])
+        for spec in specs:
+            values, state = self._closed_values(
+                loc_key, spec, closed, period_ms, forming_start
+            )
+            if not forming.is_empty():
+                forming_values, _ = compute(forming, spec, state)
+                values = pl.concat([values, forming_values])
+            result = result.join(values, on="time", how="left")
+        return result
+
+    def _closed_values(
+        self,
+        loc_key: tuple,
+        spec: IndicatorSpec,
+        closed: pl.DataFrame,
+        period_ms: int,
+        forming_start: int | None = None,
+    ) -> tuple[pl.DataFrame, dict | None]:
+        """
+        返回 closed 时间范围内的结果和末尾状态 (必要时增量计算或重建缓存)
+
+        closed 为空时 (请求只包含未收盘的 K 线)，仅当缓存末尾紧接 forming_start 时
+        返回缓存的状态，否则中间缺少的 K 线会被当作不存在，返回 None 从头计算。
+        """
+        if closed.is_empty():
+            memo = self._get((loc_key, spec))
+            if memo is None:
+                return compute(closed, spec)[0], None
+            with memo.lock:
+                if forming_start != memo.end + period_ms:
+                    return memo.values.clear(), None
+                return memo.values.clear(), memo.state
+
+        first, last = int(closed["time"][0]), int(closed["time"][-1])
+        memo = self._get((loc_key, spec))
+        if memo is None:
+            memo = self._rebuild((loc_key, spec), spec, closed)
+            return memo.values, memo.state
+        with memo.lock:
+            covers = memo.start <= first and memo.end + period_ms >= first
+            new_rows = closed.filter(pl.col("time") > memo.end)
+            contiguous = new_rows.is_empty() or (
+                int(new_rows["time"][0]) == memo.end + period_ms
+                and len(new_rows) == (last - memo.end) // period_ms
+            )
+            if covers and contiguous:
+                if not new_rows.is_empty():
+                    values, memo.state = compute(new_rows, spec, memo.state)
+                    memo.values = pl.concat([memo.values, values]).tail(
+                        self.settings["max_rows"]
+                    )
+                    self._extends += 1
+                else:
+                    self._hits += 1
+                values = memo.values.filter(pl.col("time").is_between(first, last))
+                # 请求末尾早于缓存末尾时没有对应状态 (这种请求也不包含未收盘的 K 线)
+                return values, memo.state if last == memo.end else None
+
+        memo = self._rebuild((loc_key, spec), spec, closed)
+        return memo.values, memo.state
+
+    def _get(self, key: tuple) -> _Memo | None:
+        with self._lock:
+            memo = self._memos.get(key)
+            if memo is not None:
+                self._memos.move_to_end(key)
+            return memo
+
+    def _rebuild(self, key: tuple, spec: IndicatorSpec, closed: pl.DataFrame) -> _Memo:
+        values, state = compute(closed, spec)
+        memo = _Memo(values.tail(self.settings["max_rows"]), state)
+        with self._lock:
+            self._rebuilds += 1
+            self._memos[key] = memo
+            self._memos.move_to_end(key)
+            while len(self._memos) > self.settings["max_entries"]:
+                self._memos.popitem(last=False)
+        return memo
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._memos),
+                "rows": sum(len(m.values) for m in self._memos.values()),
+                "hits": self._hits,
+                "extends": self._extends,
+                "rebuilds": self._rebuilds,
+            }
+
+
+# 全局单例，供外部导入使用
+indicator_cache = IndicatorCache()
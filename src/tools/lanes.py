@@ -0,0 +1,166 @@
+"""执行通道 (下单 / 账户 / 行情请求使用独立的线程池和队列)"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Literal
+
+from fastapi import HTTPException
+
+from src.tracing import add_span
+
+from src.tools.rate_limiter import (
+    rate_priority,
+    PRIORITY_ORDER,
+    PRIORITY_ACCOUNT,
+    PRIORITY_MARKET_DATA,
+)
+
+LaneName = Literal["order", "account", "market_data"]
+
+# 默认配置，可通过 config["lanes"] 覆盖
+# workers: 线程数; max_queue: 排队上限 (不含执行中)，超出直接拒绝
+DEFAULT_LANES: dict[str, dict[str, int]] = {
+    "order": {"workers": 8, "max_queue": 64},
+    "account": {"workers": 8, "max_queue": 64},
+    "market_data": {"workers": 16, "max_queue": 128},
+}
+
+LANE_PRIORITIES: dict[str, int] = {
+    "order": PRIORITY_ORDER,
+    "account": PRIORITY_ACCOUNT,
+    "market_data": PRIORITY_MARKET_DATA,
+}
+
+# 排队耗时统计窗口 (最近 N 次)
+_QUEUE_TIME_WINDOW = 1000
+
+
+class Lane:
+    """
+    单个执行通道
+
+    - 独立线程池，行情回补占满线程时不影响下单
+    - 排队数超过 max_queue 时返回 503 (准入控制)
+    - 记录排队耗时，供 /stats/lanes 查询
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int, priority: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.priority = priority
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"lane-{name}"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_times_ms: deque[float] = deque(maxlen=_QUEUE_TIME_WINDOW)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """在通道线程池中执行 fn(*args)"""
+        with self._lock:
+            if self._pending - self._running >= self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"执行通道繁忙: {self.name}，请稍后重试",
+                )
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._queue_times_ms.append((started - submitted) * 1000)
+            add_span("lane_queue", submitted, started, lane=self.name)
+            try:
+                with rate_priority(self.priority):
+                    return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        # 复制上下文，使 contextvar 在通道线程中仍然生效
+        ctx = contextvars.copy_context()
+        try:
+            future = self._executor.submit(ctx.run, job)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # 在任务真正结束 (或排队中被取消) 时出队: 请求被取消后，
+        # 已开始执行的任务仍会跑完，期间继续计入 pending
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._completed += 1
+
+    def shutdown(self) -> None:
+        """不再接受新任务，已提交的任务继续执行完"""
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            queue_times = sorted(self._queue_times_ms)
+            running = self._running
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": running,
+                "queued": self._pending - running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "queue_ms_avg": sum(queue_times) / len(queue_times)
+                if queue_times
+                else 0.0,
+                "queue_ms_p99": queue_times[int(len(queue_times) * 0.99)]
+                if queue_times
+                else 0.0,
+                "queue_ms_max": queue_times[-1] if queue_times else 0.0,
+            }
+
+
+class LaneManager:
+    """执行通道管理器"""
+
+    def __init__(self) -> None:
+        self._lanes: dict[str, Lane] = {}
+        self.configure({})
+
+    def configure(self, config: dict) -> None:
+        """根据 config["lanes"] 创建通道，此方法应在应用启动时调用一次"""
+        lanes_config = config.get("lanes", {})
+        for name, defaults in DEFAULT_LANES.items():
+            settings = {**defaults, **lanes_config.get(name, {})}
+            old = self._lanes.get(name)
+            if old is not None:
+                old.shutdown()
+            self._lanes[name] = Lane(
+                name,
+                workers=settings["workers"],
+                max_queue=settings["max_queue"],
+                priority=LANE_PRIORITIES[name],
+            )
+
+    async def run(self, lane: LaneName, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self._lanes[lane].run(fn, *args)
+
+    def stats(self) -> list[dict]:
+        return [lane.stats() for lane in self._lanes.values()]
+
+
+# 全局单例，供外部导入使用
+lane_manager = LaneManager()
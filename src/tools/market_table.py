@@ -0,0 +1,86 @@
+"""市场信息列式表 (用于批量查询精度/最小数量/合约乘数)"""
+
+import polars as pl
+
+# 列式表结构，字段名与 MarketInfoResponse 保持一致
+MARKET_TABLE_SCHEMA: dict[str, type[pl.DataType]] = {
+    "symbol": pl.Utf8,
+    "base": pl.Utf8,
+    "quote": pl.Utf8,
+    "settle": pl.Utf8,
+    "type": pl.Categorical,
+    "linear": pl.Boolean,
+    "active": pl.Boolean,
+    "precision_amount": pl.Float64,
+    "precision_price": pl.Float64,
+    "min_amount": pl.Float64,
+    "contract_size": pl.Float64,
+}
+
+
+def _to_float(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def build_market_table(markets: dict) -> pl.DataFrame:
+    """
+    将 ccxt 的 markets 字典预计算为紧凑的 Polars 表
+
+    在 load_markets 之后调用一次，之后的查询只做列过滤，不再遍历 market 字典。
+    min_amount 为 None 时回退到 precision_amount (与 fetch_market_info 一致)。
+    """
+    rows: dict[str, list] = {name: [] for name in MARKET_TABLE_SCHEMA}
+
+    for market in markets.values():
+        precision = market.get("precision") or {}
+        limits = (market.get("limits") or {}).get("amount") or {}
+
+        precision_amount = _to_float(precision.get("amount"))
+        min_amount = _to_float(limits.get("min"))
+        if min_amount is None:
+            min_amount = precision_amount
+
+        contract_size = market.get("contractSize")
+
+        rows["symbol"].append(market["symbol"])
+        rows["base"].append(market.get("base"))
+        rows["quote"].append(market.get("quote"))
+        rows["settle"].append(market.get("settle"))
+        rows["type"].append(market.get("type"))
+        rows["linear"].append(bool(market.get("linear")))
+        rows["active"].append(market.get("active") is not False)
+        rows["precision_amount"].append(precision_amount)
+        rows["precision_price"].append(_to_float(precision.get("price")))
+        rows["min_amount"].append(min_amount)
+        # 现货没有合约乘数，按 1 处理
+        rows["contract_size"].append(
+            1.0 if contract_size is None else float(contract_size)
+        )
+
+    return pl.DataFrame(rows, schema=MARKET_TABLE_SCHEMA).sort("symbol")
+
+
+def filter_market_table(
+    table: pl.DataFrame,
+    market_type: str | None = None,
+    settle: str | None = None,
+    linear: bool | None = None,
+    active_only: bool = True,
+    contract_only: bool = False,
+) -> pl.DataFrame:
+    """按 type / settle / linear / active 过滤市场表"""
+    conditions = []
+    if contract_only:
+        conditions.append(pl.col("type") != "spot")
+    if market_type is not None:
+        conditions.append(pl.col("type") == market_type)
+    if settle is not None:
+        conditions.append(pl.col("settle") == settle)
+    if linear is not None:
+        conditions.append(pl.col("linear") == linear)
+    if active_only:
+        conditions.append(pl.col("active"))
+
+    if not conditions:
+        return table
+    return table.filter(*conditions)
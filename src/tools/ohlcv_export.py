@@ -0,0 +1,432 @@
+"""
+OHLCV 缓存导出
+
+把任意多个 (exchange, mode, market, symbol, period) 在时间范围内的缓存数据导出为:
+- parquet: 单个 Parquet 文件 (每个分块一个 row group)
+- arrow:   单个 Arrow IPC stream
+- zip:     按 data/ohlcv 目录结构打包的分块 parquet + 对应的 fetch_log.jsonl，
+           解压到另一台机器的 data/ohlcv 即可直接作为缓存使用
+
+导出在后台线程中逐个分块读取、逐个写出，内存中最多只有一个分块。
+导出文件写入 export.dir，导出 id 由选择条件和数据文件的版本 (mtime / 大小) 决定:
+- 第一次下载时边生成边发送 (chunked transfer)，客户端断开后后台继续生成
+- 生成完成后支持 HTTP Range 断点续传，数据变化后 id 随之变化
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from filelock import FileLock
+
+from src.cache_tool.config import get_data_dir
+from src.cache_tool.log_manager import get_log_path, read_log
+from src.cache_tool.models import DataLocation
+from src.cache_tool.storage import list_partition_files
+from src.cache_tool.write_behind import write_behind
+from src.types import ExportRequest
+
+# 默认配置，可通过 config["export"] 覆盖
+# dir: 导出文件目录
+# ttl_seconds: 导出文件保留时间，过期后在下次创建导出时删除
+# max_concurrent: 同时生成的导出数
+# chunk_size: 发送时每块的字节数
+DEFAULT_EXPORT: dict[str, Any] = {
+    "dir": "./data/exports",
+    "ttl_seconds": 24 * 3600,
+    "max_concurrent": 2,
+    "chunk_size": 1 << 20,
+}
+
+# 格式 -> (扩展名, media type)
+EXPORT_FORMATS: dict[str, tuple[str, str]] = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrows", "application/vnd.apache.arrow.stream"),
+    "zip": (".zip", "application/zip"),
+}
+
+# 单文件导出 (parquet / arrow) 的列
+EXPORT_SCHEMA = pa.schema(
+    [
+        ("exchange", pa.string()),
+        ("mode", pa.string()),
+        ("market", pa.string()),
+        ("symbol", pa.string()),
+        ("period", pa.string()),
+        ("time", pa.int64()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+    ]
+)
+
+# 追加读取导出文件时，没有新数据的等待间隔 (秒)
+_FOLLOW_INTERVAL = 0.05
+
+
+def _data_dir(base_dir: Path, loc: DataLocation) -> Path:
+    return get_data_dir(
+        base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+    )
+
+
+class _AppendOnly(io.RawIOBase):
+    """
+    只能顺序追加的文件包装
+
+    zipfile 写入可 seek 的文件时会回头改写本地文件头，已发送的字节会失效;
+    不提供 tell/seek 时改用数据描述符，写出的字节不再变化。
+    """
+
+    def __init__(self, f) -> None:
+        self._f = f
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        return self._f.write(b)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+
+class _Writer:
+    """按分块写出导出文件"""
+
+    def __init__(self, f, fmt: str) -> None:
+        self.f = f
+        self.fmt = fmt
+        if fmt == "parquet":
+            self._parquet = pq.ParquetWriter(f, EXPORT_SCHEMA)
+        elif fmt == "arrow":
+            self._ipc = pa.ipc.new_stream(f, EXPORT_SCHEMA)
+        else:
+            self._zip = zipfile.ZipFile(_AppendOnly(f), "w", zipfile.ZIP_STORED)
+
+    def write(self, loc: DataLocation, partition: str, df: pl.DataFrame) -> None:
+        if self.fmt == "zip":
+            buffer = io.BytesIO()
+            df.write_parquet(buffer)
+            self._zip.writestr(
+                f"{self._dir_name(loc)}/{partition}.parquet", buffer.getvalue()
+            )
+        else:
+            table = (
+                df.select(
+                    pl.lit(loc.exchange).alias("exchange"),
+                    pl.lit(loc.mode).alias("mode"),
+                    pl.lit(loc.market).alias("market"),
+                    pl.lit(loc.symbol).alias("symbol"),
+                    pl.lit(loc.period).alias("period"),
+                    "time",
+                    "open",
+                    "high",
+                    "low",
+                    "close",
+                    "volume",
+                )
+                .to_arrow()
+                .cast(EXPORT_SCHEMA)
+            )
+            if self.fmt == "parquet":
+                self._parquet.write_table(table)
+            else:
+                self._ipc.write_table(table)
+        self.f.flush()
+
+    def write_log(self, loc: DataLocation, lines: list[str]) -> None:
+        """zip 格式: 写入该目录的获取日志 (只保留导出范围内的部分)"""
+        if self.fmt == "zip" and lines:
+            self._zip.writestr(
+                f"{self._dir_name(loc)}/{get_log_path(Path()).name}",
+                "".join(line + "\n" for line in lines),
+            )
+
+    def write_manifest(self, manifest: dict) -> None:
+        if self.fmt == "zip":
+            self._zip.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+    def close(self) -> None:
+        if self.fmt == "parquet":
+            self._parquet.close()
+        elif self.fmt == "arrow":
+            self._ipc.close()
+        else:
+            self._zip.close()
+        self.f.flush()
+
+    @staticmethod
+    def _dir_name(loc: DataLocation) -> str:
+        # 与 get_data_dir 的目录结构一致
+        return _data_dir(Path(), loc).as_posix()
+
+
+class ExportJob:
+    """一个导出 (id 相同的请求共用)"""
+
+    def __init__(self, export_id: str, request: ExportRequest, path: Path) -> None:
+        self.id = export_id
+        self.request = request
+        self.path = path
+        self.done = threading.Event()
+        self.complete = False
+        self.error: str | None = None
+        self.rows = 0
+        self.size: int | None = None
+        self.thread: threading.Thread | None = None
+
+    @property
+    def filename(self) -> str:
+        return f"ohlcv-{self.id}{EXPORT_FORMATS[self.request.format][0]}"
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_FORMATS[self.request.format][1]
+
+    def info(self) -> dict:
+        if self.complete:
+            status = "complete"
+        elif self.error is not None:
+            status = "failed"
+        elif self.thread is not None:
+            status = "running"
+        else:
+            status = "pending"
+        return {
+            "id": self.id,
+            "url": f"/export/ohlcv/{self.id}",
+            "format": self.request.format,
+            "status": status,
+            "rows": self.rows,
+            "size": self.size,
+            "error": self.error,
+        }
+
+
+class ExportManager:
+    """创建、生成和读取导出"""
+
+    def __init__(self) -> None:
+        self.settings: dict[str, Any] = dict(DEFAULT_EXPORT)
+        self.base_dir = Path("./data/ohlcv")
+        self._jobs: dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.settings["max_concurrent"])
+
+    def configure(self, config: dict, base_dir: Path) -> None:
+        """根据 config["export"] 初始化; base_dir 为 OHLCV 缓存目录"""
+        self.settings = {**DEFAULT_EXPORT, **config.get("export", {})}
+        self.base_dir = base_dir
+        self._slots = threading.Semaphore(self.settings["max_concurrent"])
+
+    @property
+    def export_dir(self) -> Path:
+        return Path(self.settings["dir"])
+
+    def create(self, request: ExportRequest) -> ExportJob:
+        """按选择条件和当前数据版本得到导出 (已有相同导出时直接复用)"""
+        self._prune()
+        export_id = self._export_id(request)
+        with self._lock:
+            job = self._jobs.get(export_id)
+            if job is None:
+                job = self._load(export_id) or ExportJob(
+                    export_id, request, self._path(export_id, request.format)
+                )
+                self._jobs[export_id] = job
+        return job
+
+    def get(self, export_id: str) -> ExportJob | None:
+        with self._lock:
+            job = self._jobs.get(export_id)
+            if job is None:
+                job = self._load(export_id)
+                if job is not None:
+                    self._jobs[export_id] = job
+            return job
+
+    def start(self, job: ExportJob) -> None:
+        """未生成或上次失败时在后台线程中生成"""
+        with self._lock:
+            if job.complete or (job.thread is not None and not job.done.is_set()):
+                return
+            job.error = None
+            job.done.clear()
+            self.export_dir.mkdir(parents=True, exist_ok=True)
+            # 先创建文件，读取方可以立即打开
+            job.path.write_bytes(b"")
+            self._write_meta(job)
+            job.thread = threading.Thread(
+                target=self._produce, args=(job,), name=f"export-{job.id}", daemon=True
+            )
+            job.thread.start()
+
+    async def stream(self, job: ExportJob):
+        """边生成边读取导出文件，按 chunk_size 产出字节"""
+        chunk_size = self.settings["chunk_size"]
+        with open(job.path, "rb") as f:
+            while True:
+                finished = job.done.is_set()
+                data = await asyncio.to_thread(f.read, chunk_size)
+                if data:
+                    yield data
+                elif finished:
+                    if job.error is not None:
+                        # 中断传输，客户端收到不完整的响应
+                        raise RuntimeError(f"导出失败: {job.error}")
+                    return
+                else:
+                    await asyncio.sleep(_FOLLOW_INTERVAL)
+
+    def _produce(self, job: ExportJob) -> None:
+        request = job.request
+        rows = 0
+        manifest: list[dict] = []
+        try:
+            with self._slots, open(job.path, "wb") as f:
+                writer = _Writer(f, request.format)
+                for loc in request.items:
+                    data_dir = _data_dir(self.base_dir, loc)
+                    item_rows = 0
+                    for partition in list_partition_files(
+                        self.base_dir, loc, request.since, request.end
+                    ):
+                        # 与缓存写入互斥，只在读取单个分块时持锁
+                        with FileLock(data_dir / ".lock"):
+                            df = pl.read_parquet(partition)
+                        df = self._clip(df, request.since, request.end)
+                        if df.is_empty():
+                            continue
+                        writer.write(loc, partition.stem, df)
+                        item_rows += len(df)
+                        job.rows = rows + item_rows
+                    rows += item_rows
+                    writer.write_log(loc, self._log_lines(data_dir, request))
+                    manifest.append({**loc.model_dump(), "rows": item_rows})
+                writer.write_manifest(
+                    {
+                        "id": job.id,
+                        "since": request.since,
+                        "end": request.end,
+                        "items": manifest,
+                    }
+                )
+                writer.close()
+            job.size = job.path.stat().st_size
+            job.complete = True
+            print(f"[Export] {job.id} 完成: {rows} 行, {job.size} 字节")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            print(f"[Export] {job.id} 失败: {job.error}")
+        finally:
+            self._write_meta(job)
+            job.done.set()
+
+    @staticmethod
+    def _clip(df: pl.DataFrame, since: int | None, end: int | None) -> pl.DataFrame:
+        if since is not None:
+            df = df.filter(pl.col("time") >= since)
+        if end is not None:
+            df = df.filter(pl.col("time") <= end)
+        return df
+
+    @staticmethod
+    def _log_lines(data_dir: Path, request: ExportRequest) -> list[str]:
+        """导出范围内的获取日志 (与范围相交的条目裁剪到范围内)"""
+        since = request.since if request.since is not None else 0
+        end = request.end if request.end is not None else 2**62
+        lines = []
+        for entry in read_log(data_dir):
+            if entry.data_end < since or entry.data_start > end:
+                continue
+            clipped = entry.model_copy(
+                update={
+                    "data_start": max(entry.data_start, since),
+                    "data_end": min(entry.data_end, end),
+                    "count": None,
+                    "source": "export",
+                }
+            )
+            lines.append(clipped.model_dump_json())
+        return lines
+
+    def _export_id(self, request: ExportRequest) -> str:
+        """选择条件 + 数据文件版本的摘要"""
+        digest = hashlib.sha256(request.model_dump_json().encode())
+        for loc in request.items:
+            data_dir = _data_dir(self.base_dir, loc)
+            # 尚未落盘的延迟写入也计入导出
+            write_behind.flush(data_dir)
+            files = list_partition_files(self.base_dir, loc, request.since, request.end)
+            for path in [get_log_path(data_dir), *files]:
+                if path.exists():
+                    stat = path.stat()
+                    digest.update(f"{path}|{stat.st_mtime_ns}|{stat.st_size}".encode())
+        return digest.hexdigest()[:24]
+
+    def _path(self, export_id: str, fmt: str) -> Path:
+        return self.export_dir / f"{export_id}{EXPORT_FORMATS[fmt][0]}"
+
+    def _meta_path(self, export_id: str) -> Path:
+        return self.export_dir / f"{export_id}.json"
+
+    def _write_meta(self, job: ExportJob) -> None:
+        meta = {
+            "request": job.request.model_dump(),
+            "complete": job.complete,
+            "rows": job.rows,
+            "size": job.size,
+        }
+        self._meta_path(job.id).write_text(json.dumps(meta), encoding="utf-8")
+
+    def _load(self, export_id: str) -> ExportJob | None:
+        """从磁盘恢复导出 (服务重启后继续提供已完成的导出)"""
+        meta_path = self._meta_path(export_id)
+        if not export_id.isalnum() or not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        request = ExportRequest.model_validate(meta["request"])
+        job = ExportJob(export_id, request, self._path(export_id, request.format))
+        if meta["complete"] and job.path.exists():
+            job.complete = True
+            job.rows = meta["rows"]
+            job.size = meta["size"]
+            job.done.set()
+        return job
+
+    def _prune(self) -> None:
+        """删除过期的导出文件"""
+        if not self.export_dir.exists():
+            return
+        deadline = time.time() - self.settings["ttl_seconds"]
+        with self._lock:
+            for meta_path in self.export_dir.glob("*.json"):
+                export_id = meta_path.stem
+                job = self._jobs.get(export_id)
+                if job is not None and not job.done.is_set() and job.thread:
+                    continue
+                if meta_path.stat().st_mtime >= deadline:
+                    continue
+                for path in self.export_dir.glob(f"{export_id}.*"):
+                    path.unlink(missing_ok=True)
+                self._jobs.pop(export_id, None)
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            return [job.info() for job in self._jobs.values()]
+
+
+# 全局单例，供外部导入使用
+export_manager = ExportManager()
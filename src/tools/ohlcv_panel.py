@@ -0,0 +1,259 @@
+"""
+多品种对齐面板 (time × symbol)
+
+把多个数据位置的 K 线对齐到同一个周期网格上，输出宽表:
+    time | close:BTC/USDT | close:ETH/USDT | ...
+
+流程:
+1. 按获取日志检查每个位置在 [start, end] 内是否有缺口，
+   有缺口的位置有界并发地经 get_ohlcv_with_cache 补齐 (只请求缺失部分)
+2. 已完整缓存的位置直接惰性扫描分块文件 (按分块 key 跳过范围外的文件)
+3. 所有位置与网格 left join 后按填充规则补值，一次 collect 完成
+
+填充规则 (fill):
+- none:    缺失的周期为 null
+- forward: 缺失的周期沿用上一根收盘价 (open/high/low/close 均为该值，volume 为 0)
+- both:    在 forward 的基础上，仍缺失的周期 (如最早的数据之前) 用其后第一根的开盘价填充
+fill_limit 限制连续填充的周期数，超出部分保持 null。
+"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Literal
+
+import polars as pl
+
+from src.cache_tool.config import get_data_dir, period_to_ms
+from src.cache_tool.entry import find_missing_segments
+from src.cache_tool.log_manager import read_log
+from src.cache_tool.models import DataLocation
+from src.cache_tool.storage import list_partition_files
+from src.cache_tool.write_behind import write_behind
+from src.tools.concurrent_calls import run_bounded
+
+PanelField = Literal["open", "high", "low", "close", "volume"]
+FillRule = Literal["none", "forward", "both"]
+
+OHLCV_FIELDS: list[str] = ["open", "high", "low", "close", "volume"]
+
+# 周线以周一 00:00 UTC 为起点 (1970-01-01 是周四，周一在其后 4 天)
+_WEEK_ORIGIN = 4 * 24 * 3600 * 1000
+
+_EMPTY_SCHEMA = {
+    "time": pl.Int64,
+    **{name: pl.Float64 for name in OHLCV_FIELDS},
+}
+
+
+@dataclass
+class PanelResult:
+    # time + 每个 (字段, 品种) 一列，列名见 panel_column
+    frame: pl.DataFrame
+    # 每个品种的概况: symbol, rows (原始 K 线数), filled (填充数),
+    # fetched, error, elapsed_ms (补齐耗时，未请求时为 None)
+    symbols: list[dict]
+
+
+def panel_column(field: str, symbol: str) -> str:
+    """宽表中 (字段, 品种) 对应的列名"""
+    return f"{field}:{symbol}"
+
+
+def grid_start(start: int, period: str) -> int:
+    """不早于 start 的第一个周期起点"""
+    period_ms = period_to_ms(period)
+    origin = _WEEK_ORIGIN if period.endswith("w") else 0
+    return origin + -(-(start - origin) // period_ms) * period_ms
+
+
+def scan_location(
+    base_dir: Path, loc: DataLocation, start: int, end: int
+) -> pl.LazyFrame:
+    """惰性读取缓存中 [start, end] 的 K 线"""
+    files = list_partition_files(base_dir, loc, start, end)
+    if not files:
+        return pl.LazyFrame(schema=_EMPTY_SCHEMA)
+    return (
+        pl.scan_parquet(files)
+        .select(pl.col("time").cast(pl.Int64), pl.col(OHLCV_FIELDS).cast(pl.Float64))
+        .filter(pl.col("time").is_between(start, end))
+    )
+
+
+def has_gaps(
+    base_dir: Path, loc: DataLocation, start: int, end: int, period_ms: int
+) -> bool:
+    """获取日志在 [start, end] 内是否有未覆盖的段"""
+    data_dir = get_data_dir(
+        base_dir, loc.exchange, loc.mode, loc.market, loc.symbol, loc.period
+    )
+    # 尚未落盘的延迟写入也算已缓存
+    write_behind.flush(data_dir)
+    return bool(find_missing_segments(read_log(data_dir), start, end, period_ms))
+
+
+def _fill(frame: pl.LazyFrame, fill: FillRule, fill_limit: int | None) -> pl.LazyFrame:
+    """按填充规则补齐单个品种 (已与网格对齐，缺失周期为 null)"""
+    missing = pl.col("close").is_null()
+    if fill == "none":
+        return frame.with_columns(filled=pl.lit(False))
+
+    price = pl.col("close").forward_fill(limit=fill_limit)
+    if fill == "both":
+        price = price.fill_null(pl.col("open").backward_fill(limit=fill_limit))
+
+    frame = frame.with_columns(__price__=price)
+    filled = missing & pl.col("__price__").is_not_null()
+    return frame.with_columns(
+        *(
+            pl.when(filled)
+            .then(pl.col("__price__"))
+            .otherwise(pl.col(name))
+            .alias(name)
+            for name in ("open", "high", "low", "close")
+        ),
+        pl.when(filled).then(0.0).otherwise(pl.col("volume")).alias("volume"),
+        filled.alias("filled"),
+    ).drop("__price__")
+
+
+def align_panel(
+    frames: dict[str, pl.LazyFrame],
+    start: int,
+    end: int,
+    period: str,
+    fields: list[str],
+    fill: FillRule = "forward",
+    fill_limit: int | None = None,
+    how: Literal["outer", "inner"] = "outer",
+) -> tuple[pl.DataFrame, dict[str, tuple[int, int]]]:
+    """
+    把各品种的 K 线对齐到 [start, end] 的周期网格
+
+    返回 (宽表, {symbol: (原始 K 线数, 填充数)})。
+    how=inner 时只保留所有品种在填充后都有值的周期。
+    """
+    period_ms = period_to_ms(period)
+    first = grid_start(start, period)
+    grid = pl.LazyFrame(
+        {"time": pl.int_range(first, end + 1, period_ms, dtype=pl.Int64, eager=True)}
+    )
+
+    panel = grid
+    stats = []
+    for symbol, frame in frames.items():
+        aligned = _fill(
+            grid.join(frame, on="time", how="left", maintain_order="left"),
+            fill,
+            fill_limit,
+        )
+        panel = panel.join(
+            aligned.select(
+                "time",
+                *(pl.col(name).alias(panel_column(name, symbol)) for name in fields),
+            ),
+            on="time",
+            how="left",
+            maintain_order="left",
+        )
+        stats.append(
+            aligned.select(
+                rows=pl.col("close").is_not_null().sum() - pl.col("filled").sum(),
+                filled=pl.col("filled").sum(),
+            )
+        )
+
+    if how == "inner" and frames:
+        panel = panel.filter(
+            pl.all_horizontal(
+                pl.col(panel_column(fields[0], symbol)).is_not_null()
+                for symbol in frames
+            )
+        )
+
+    # 宽表与各品种统计共享扫描，一次执行
+    result, *counts = pl.collect_all([panel, *stats])
+    return result, {
+        symbol: (int(c["rows"][0]), int(c["filled"][0]))
+        for symbol, c in zip(frames, counts)
+    }
+
+
+def build_panel(
+    base_dir: Path,
+    locs: dict[str, DataLocation],
+    start: int,
+    end: int,
+    fetch: Callable[[DataLocation], pl.DataFrame],
+    fields: list[str],
+    fill: FillRule = "forward",
+    fill_limit: int | None = None,
+    how: Literal["outer", "inner"] = "outer",
+    max_concurrency: int = 5,
+    enable_cache: bool = True,
+) -> PanelResult:
+    """
+    读取并对齐多个数据位置 (locs: 品种 -> 数据位置，周期相同)
+
+    fetch(loc) 补齐一个位置在 [start, end] 内的缺口并返回区间内的全部 K 线，
+    只对有缺口的位置调用 (enable_cache=False 时对全部位置调用)。
+    单个品种补齐失败时退回本地缓存，错误记录在对应品种的 error 中。
+    """
+    period = next(iter(locs.values())).period
+    period_ms = period_to_ms(period)
+    first = grid_start(start, period)
+
+    started = time.perf_counter()
+    pending = [
+        symbol
+        for symbol, loc in locs.items()
+        if not enable_cache or has_gaps(base_dir, loc, first, end, period_ms)
+    ]
+    outcomes = run_bounded(
+        [lambda loc=locs[symbol]: fetch(loc) for symbol in pending], max_concurrency
+    )
+    fetched: dict[str, pl.LazyFrame] = {}
+    errors: dict[str, str] = {}
+    elapsed = {
+        symbol: outcome["elapsed_ms"] for symbol, outcome in zip(pending, outcomes)
+    }
+    for symbol, outcome in zip(pending, outcomes):
+        if outcome["ok"]:
+            data = outcome["result"]
+            fetched[symbol] = (
+                data.lazy().select("time", *OHLCV_FIELDS)
+                if not data.is_empty()
+                else pl.LazyFrame(schema=_EMPTY_SCHEMA)
+            )
+        else:
+            errors[symbol] = outcome["error"]
+    if pending:
+        print(
+            f"[Panel] 补齐 {len(pending)}/{len(locs)} 个品种 "
+            f"({len(errors)} 个失败), 耗时 {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    frames = {
+        symbol: fetched[symbol]
+        if symbol in fetched
+        else scan_location(base_dir, loc, first, end)
+        for symbol, loc in locs.items()
+    }
+    frame, counts = align_panel(
+        frames, start, end, period, fields, fill, fill_limit, how
+    )
+    return PanelResult(
+        frame=frame,
+        symbols=[
+            {
+                "symbol": symbol,
+                "rows": counts[symbol][0],
+                "filled": counts[symbol][1],
+                "fetched": symbol in fetched,
+                "error": errors.get(symbol),
+                "elapsed_ms": elapsed.get(symbol),
+            }
+            for symbol in locs
+        ],
+    )
@@ -0,0 +1,287 @@
+"""
+OHLCV 缓存 SQL 查询 (只读)
+
+把 OHLCV_DIR 下的分块文件注册为一张惰性表 ohlcv，目录层级作为分区列:
+    exchange / mode / market / symbol / period / {分块}.parquet
+    symbol 为目录名形式 (BTC/USDT:USDT -> BTC_USDT_USDT)
+
+分区列上的过滤条件下推到 pyarrow dataset，只读取匹配目录下的文件。
+SQL 由 Polars SQLContext 执行，只允许 SELECT / WITH，超时后取消查询。
+只读检查基于词法切分 (去掉注释、字符串，引号标识符还原为名字)，不对原文做正则匹配。
+结果以 Arrow IPC stream 分批返回。
+"""
+
+import io
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.cache_tool.write_behind import write_behind
+
+# 默认配置，可通过 config["query"] 覆盖
+# timeout: 单个查询的最长执行时间 (秒)，请求中的 timeout 不能超过该值
+# max_rows: 最多返回的行数，超出部分截断
+# max_concurrent: 同时执行的查询数 (Polars 自身会用满多核)
+# batch_rows: Arrow IPC stream 每批的行数
+DEFAULT_QUERY: dict[str, Any] = {
+    "timeout": 30.0,
+    "max_rows": 1_000_000,
+    "max_concurrent": 2,
+    "batch_rows": 65_536,
+}
+
+# 表名
+TABLE_NAME = "ohlcv"
+
+PARTITION_COLUMNS = ["exchange", "mode", "market", "symbol", "period"]
+
+TABLE_SCHEMA = pa.schema(
+    [
+        *((name, pa.string()) for name in PARTITION_COLUMNS),
+        ("time", pa.int64()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+    ]
+)
+
+# 只允许以这些关键字开头的语句
+_READ_ONLY = {"select", "with"}
+# Polars SQL 的表函数 (read_csv / read_parquet / read_ipc ...) 可以读取任意本地文件
+_TABLE_FUNCTION_PREFIX = "read_"
+# 引号标识符: 开引号 -> 闭引号 (两个闭引号转义为一个)
+_IDENT_QUOTES = {'"': '"', "`": "`"}
+_DOLLAR_TAG = re.compile(r"\$(\w*)\$")
+
+# 轮询查询是否完成的间隔 (秒)
+_POLL_INTERVAL = 0.01
+
+
+class QueryError(Exception):
+    """SQL 不合法或执行失败"""
+
+
+class QueryTimeout(Exception):
+    """查询超时 (已取消)"""
+
+
+@dataclass
+class QueryResult:
+    frame: pl.DataFrame
+    truncated: bool
+    elapsed_ms: float
+
+
+def sql_tokens(sql: str) -> list[tuple[str, str]]:
+    """
+    按 Polars SQL (sqlparser) 的词法切分，返回 [(类型, 文本)]
+
+    类型: word (未加引号的标识符/关键字), ident (引号标识符，已去掉引号),
+    string (字符串字面量), symbol (其余单个字符)。注释和空白被丢弃。
+    块注释可嵌套，字符串中 '' 转义单引号，支持 $tag$...$tag$ 字符串。
+
+    异常:
+        QueryError: 字符串、引号标识符或注释未闭合
+    """
+    tokens: list[tuple[str, str]] = []
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if c.isspace():
+            i += 1
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = n if end < 0 else end + 1
+        elif sql.startswith("/*", i):
+            depth, i = 1, i + 2
+            while depth:
+                if i >= n:
+                    raise QueryError("注释未闭合")
+                if sql.startswith("/*", i):
+                    depth, i = depth + 1, i + 2
+                elif sql.startswith("*/", i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+        elif c == "'" or c in _IDENT_QUOTES:
+            close = _IDENT_QUOTES.get(c, "'")
+            text, i = [], i + 1
+            while True:
+                if i >= n:
+                    raise QueryError("字符串或引号标识符未闭合")
+                if sql[i] == close:
+                    if sql.startswith(close * 2, i):
+                        text.append(close)
+                        i += 2
+                        continue
+                    i += 1
+                    break
+                text.append(sql[i])
+                i += 1
+            tokens.append(("string" if c == "'" else "ident", "".join(text)))
+        elif c == "$" and (tag := _DOLLAR_TAG.match(sql, i)):
+            end = sql.find(tag.group(0), tag.end())
+            if end < 0:
+                raise QueryError("字符串未闭合")
+            tokens.append(("string", sql[tag.end() : end]))
+            i = end + len(tag.group(0))
+        elif c.isalnum() or c == "_":
+            start = i
+            while i < n and (sql[i].isalnum() or sql[i] in "_$"):
+                i += 1
+            tokens.append(("word", sql[start:i]))
+        else:
+            tokens.append(("symbol", c))
+            i += 1
+    return tokens
+
+
+def check_sql(sql: str) -> str:
+    """
+    只读检查，返回去掉末尾分号的 SQL
+
+    在词法切分后的结果上检查，注释、引号标识符和大小写都不能绕过。
+
+    异常:
+        QueryError: 不是单条 SELECT / WITH 语句，或使用了读取文件的表函数
+    """
+    sql = sql.strip().rstrip(";").strip()
+    tokens = sql_tokens(sql)
+    if not tokens or tokens[0][0] != "word" or tokens[0][1].lower() not in _READ_ONLY:
+        raise QueryError("只支持 SELECT / WITH 查询")
+    if ("symbol", ";") in tokens:
+        raise QueryError("一次只能执行一条语句")
+    for (kind, text), following in zip(tokens, tokens[1:]):
+        if (
+            kind in ("word", "ident")
+            and text.lower().startswith(_TABLE_FUNCTION_PREFIX)
+            and following == ("symbol", "(")
+        ):
+            raise QueryError(f"不支持读取文件的表函数，请查询 {TABLE_NAME} 表")
+    return sql
+
+
+class OhlcvQueryEngine:
+    """在缓存目录上执行只读 SQL"""
+
+    def __init__(self) -> None:
+        self.settings: dict[str, Any] = dict(DEFAULT_QUERY)
+        self.base_dir = Path("./data/ohlcv")
+        self._slots = threading.Semaphore(self.settings["max_concurrent"])
+
+    def configure(self, config: dict, base_dir: Path) -> None:
+        """根据 config["query"] 初始化; base_dir 为 OHLCV 缓存目录"""
+        self.settings = {**DEFAULT_QUERY, **config.get("query", {})}
+        self.base_dir = base_dir
+        self._slots = threading.Semaphore(self.settings["max_concurrent"])
+
+    def table(self) -> pl.LazyFrame:
+        """当前缓存文件组成的惰性表 (每次查询重新发现文件)"""
+        files = sorted(
+            str(p) for p in self.base_dir.glob("*/*/*/*/*/*.parquet") if p.is_file()
+        )
+        dataset = ds.dataset(
+            files,
+            schema=TABLE_SCHEMA,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS])
+            ),
+            partition_base_dir=str(self.base_dir),
+        )
+        return pl.scan_pyarrow_dataset(dataset)
+
+    def execute(self, sql: str, timeout: float | None = None) -> QueryResult:
+        """
+        执行查询 (阻塞，在工作线程中调用)
+
+        异常:
+            QueryError: SQL 不合法或执行失败
+            QueryTimeout: 超过 timeout 秒 (不超过配置的上限)
+        """
+        sql = check_sql(sql)
+        limit = self.settings["timeout"]
+        timeout = min(timeout, limit) if timeout else limit
+        max_rows = self.settings["max_rows"]
+
+        with self._slots:
+            started = time.perf_counter()
+            # 尚未落盘的延迟写入对查询可见
+            write_behind.flush()
+            try:
+                ctx = pl.SQLContext({TABLE_NAME: self.table()})
+                lazy = ctx.execute(sql, eager=False).limit(max_rows + 1)
+                query = lazy.collect(background=True)
+            except Exception as e:
+                raise QueryError(f"{type(e).__name__}: {e}")
+
+            deadline = started + timeout
+            while True:
+                try:
+                    frame = query.fetch()
+                except Exception as e:
+                    raise QueryError(f"{type(e).__name__}: {e}")
+                if frame is not None:
+                    break
+                if time.perf_counter() >= deadline:
+                    query.cancel()
+                    _reap(query)
+                    raise QueryTimeout(f"查询超过 {timeout:g} 秒，已取消")
+                time.sleep(_POLL_INTERVAL)
+
+        truncated = len(frame) > max_rows
+        return QueryResult(
+            frame=frame.head(max_rows),
+            truncated=truncated,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def ipc_stream(self, frame: pl.DataFrame) -> Iterator[bytes]:
+        """把结果编码为 Arrow IPC stream，每 batch_rows 行产出一块"""
+        table = frame.to_arrow()
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=self.settings["batch_rows"]):
+                writer.write_batch(batch)
+                yield _drain(sink)
+        yield _drain(sink)
+
+
+def _reap(query: Any) -> None:
+    """
+    持有已取消的查询直到其工作线程退出
+
+    Polars 的后台查询在结果通道被丢弃后仍尝试发送会直接 panic，
+    因此取消后不能立即释放句柄，由守护线程等到 fetch 返回或报错为止。
+    """
+
+    def wait() -> None:
+        while True:
+            try:
+                if query.fetch() is not None:
+                    return
+            except Exception:
+                return
+            time.sleep(_POLL_INTERVAL)
+
+    threading.Thread(target=wait, name="query-reaper", daemon=True).start()
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+# 全局单例，供外部导入使用
+query_engine = OhlcvQueryEngine()
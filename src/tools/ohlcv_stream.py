@@ -0,0 +1,293 @@
+"""
+OHLCV 实时推送
+
+同一 (exchange, market, mode, symbol, timeframe) 只有一个上游 feed，
+由后台任务定时轮询 (经执行通道和实例池)，把变化的 K 线推送给所有订阅者:
+- 正在形成的 K 线每次变化推送一次 (closed=false)
+- K 线收盘 (出现更新的 K 线) 时推送 closed=true，并写入本地缓存
+最后一个订阅者离开时 feed 停止。
+
+上游数据来源可替换 (set_source)，用于测试或接入其他推送源。
+"""
+
+import asyncio
+import time
+from typing import Any, NamedTuple, Protocol
+
+import polars as pl
+
+from src.cache_tool import DataLocation
+from src.cache_tool.config import period_to_ms
+from src.cache_tool.validation import ohlcv_validator
+from src.cache_tool.write_behind import write_behind
+from src.tools.exchange_manager import exchange_manager
+from src.tools.lanes import lane_manager
+
+# 默认配置，可通过 config["ohlcv_stream"] 覆盖
+# poll_interval: 上游轮询间隔 (秒)
+# max_queue: 每个订阅者最多积压的事件数，超过后断开该订阅者
+# heartbeat: 无事件时发送心跳的间隔 (秒)
+DEFAULT_STREAM: dict[str, Any] = {
+    "poll_interval": 2.0,
+    "max_queue": 256,
+    "heartbeat": 15.0,
+}
+
+# 轮询失败后的最长退避时间 (秒)
+MAX_BACKOFF = 30.0
+
+OHLCV_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+
+class StreamKey(NamedTuple):
+    exchange: str
+    market: str
+    mode: str
+    symbol: str
+    timeframe: str
+
+
+class CandleSource(Protocol):
+    """上游 K 线来源 (在执行通道线程中调用)"""
+
+    def fetch(
+        self, key: StreamKey, since: int | None, limit: int
+    ) -> list[list[float]]: ...
+
+
+class ExchangeCandleSource:
+    """默认来源: 从实例池借出交易所实例调用 fetch_ohlcv"""
+
+    def fetch(self, key: StreamKey, since: int | None, limit: int) -> list[list[float]]:
+        with exchange_manager.checkout(key.exchange, key.market, key.mode) as exchange:
+            return exchange.fetch_ohlcv(
+                key.symbol, key.timeframe, since=since, limit=limit
+            )
+
+
+class Subscriber:
+    """一个订阅者的事件队列; 积压超过上限时标记为溢出并结束"""
+
+    def __init__(self, max_queue: int) -> None:
+        self.queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def push(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 慢消费者: 清空队列并放入结束标记，由推送循环断开连接
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class OhlcvFeed:
+    """单个 key 的上游 feed"""
+
+    def __init__(self, key: StreamKey, manager: "OhlcvStreamManager") -> None:
+        self.key = key
+        self.manager = manager
+        self.subscribers: set[Subscriber] = set()
+        self.current: list[float] | None = None
+        self.last_closed: int | None = None
+        # 上一次写入缓存的收盘 K 线: 与下一批相邻时一并写入，使获取日志首尾衔接可合并
+        self.last_persisted: list[float] | None = None
+        self.task: asyncio.Task | None = None
+        self.polls = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.events = 0
+        self.persisted = 0
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run(), name=f"ohlcv-feed-{self.key}")
+
+    async def _run(self) -> None:
+        backoff = self.manager.settings["poll_interval"]
+        while True:
+            try:
+                await self.poll()
+                backoff = self.manager.settings["poll_interval"]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"[OhlcvStream] {'/'.join(self.key)} 轮询失败: {e}")
+                self._broadcast({"event": "error", "error": self.last_error})
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            await asyncio.sleep(backoff)
+
+    async def poll(self) -> None:
+        """拉取当前 K 线之后的数据，推送变化，保存新收盘的 K 线"""
+        since = self.current[0] if self.current else None
+        limit = 2 if since is None else 100
+        candles = await lane_manager.run(
+            "market_data", self.manager.source.fetch, self.key, since, limit
+        )
+        self.polls += 1
+        if not candles:
+            return
+        candles = sorted(candles, key=lambda c: c[0])
+
+        if self.current is None:
+            # 首次轮询: 倒数第二根已收盘 (只记录位置，不重复保存)
+            if len(candles) > 1:
+                self.last_closed = int(candles[-2][0])
+        else:
+            closed = [
+                c
+                for c in candles[:-1]
+                if self.last_closed is None or c[0] > self.last_closed
+            ]
+            for candle in closed:
+                self._broadcast(self._event(candle, closed=True))
+            if closed:
+                self.last_closed = int(closed[-1][0])
+                self._persist(closed)
+
+        newest = candles[-1]
+        if newest != self.current:
+            self.current = newest
+            self._broadcast(self._event(newest, closed=False))
+
+    def _event(self, candle: list[float], closed: bool) -> dict:
+        return {
+            "event": "candle",
+            "exchange": self.key.exchange,
+            "market": self.key.market,
+            "mode": self.key.mode,
+            "symbol": self.key.symbol,
+            "timeframe": self.key.timeframe,
+            "candle": candle,
+            "closed": closed,
+        }
+
+    def _broadcast(self, event: dict) -> None:
+        self.events += 1
+        for subscriber in list(self.subscribers):
+            subscriber.push(event)
+
+    def _persist(self, candles: list[list[float]]) -> None:
+        """收盘 K 线交给延迟写入队列 (不阻塞事件循环)"""
+        base_dir = self.manager.base_dir
+        if base_dir is None:
+            return
+        previous = self.last_persisted
+        if previous is not None and (
+            previous[0] + period_to_ms(self.key.timeframe) == candles[0][0]
+        ):
+            # 每次通常只有一根新收盘 K 线，单点日志 [t, t] 与 [t+p, t+p] 无法合并，
+            # 带上上一根 (与拉取路径的重叠一根相同)，日志段首尾衔接
+            candles = [previous, *candles]
+        else:
+            previous = None
+        df = pl.DataFrame(candles, schema=OHLCV_COLUMNS, orient="row").with_columns(
+            pl.col("time").cast(pl.Int64),
+            *(pl.col(c).cast(pl.Float64) for c in OHLCV_COLUMNS[1:]),
+        )
+        loc = DataLocation(
+            exchange=self.key.exchange,
+            mode="demo" if self.key.mode == "sandbox" else "live",
+            market=self.key.market,
+            symbol=self.key.symbol,
+            period=self.key.timeframe,
+        )
+        # 未通过校验的行已隔离，不写入缓存
+        df, _ = ohlcv_validator.clean(base_dir, loc, df, source="stream")
+        if df.is_empty():
+            return
+        write_behind.save(base_dir, loc, df)
+        if previous is not None:
+            self.persisted += df.filter(pl.col("time") != previous[0]).height
+        else:
+            self.persisted += len(df)
+        self.last_persisted = list(df.row(-1))
+
+    def stats(self) -> dict:
+        return {
+            "key": "/".join(self.key),
+            "subscribers": len(self.subscribers),
+            "polls": self.polls,
+            "events": self.events,
+            "persisted": self.persisted,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "current": self.current,
+        }
+
+
+class OhlcvStreamManager:
+    """按 key 管理上游 feed 和订阅者 (只在事件循环中调用)"""
+
+    def __init__(self) -> None:
+        self.settings: dict[str, Any] = dict(DEFAULT_STREAM)
+        self.source: CandleSource = ExchangeCandleSource()
+        self.base_dir = None
+        self._feeds: dict[StreamKey, OhlcvFeed] = {}
+
+    def configure(self, config: dict, base_dir=None) -> None:
+        """根据 config["ohlcv_stream"] 初始化; base_dir 为收盘 K 线的缓存目录"""
+        self.settings = {**DEFAULT_STREAM, **config.get("ohlcv_stream", {})}
+        self.base_dir = base_dir
+
+    def set_source(self, source: CandleSource) -> None:
+        self.source = source
+
+    def subscribe(self, key: StreamKey) -> Subscriber:
+        """订阅 key，没有 feed 时启动; 已有当前 K 线时立即推送一次"""
+        subscriber = Subscriber(self.settings["max_queue"])
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = OhlcvFeed(key, self)
+            feed.start()
+        feed.subscribers.add(subscriber)
+        if feed.current is not None:
+            subscriber.push(feed._event(feed.current, closed=False))
+        return subscriber
+
+    def unsubscribe(self, key: StreamKey, subscriber: Subscriber) -> None:
+        """取消订阅，最后一个订阅者离开时停止 feed"""
+        feed = self._feeds.get(key)
+        if feed is None:
+            return
+        feed.subscribers.discard(subscriber)
+        if not feed.subscribers:
+            del self._feeds[key]
+            if feed.task is not None:
+                feed.task.cancel()
+
+    async def events(self, key: StreamKey):
+        """
+        订阅 key 并逐个产出事件 (dict)，无事件时按 heartbeat 产出 None
+
+        调用方退出迭代 (例如客户端断开) 时自动取消订阅。
+        """
+        subscriber = self.subscribe(key)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=self.settings["heartbeat"]
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    # 积压过多被断开
+                    yield {"event": "overflow", "time": int(time.time() * 1000)}
+                    return
+                yield event
+        finally:
+            self.unsubscribe(key, subscriber)
+
+    def stats(self) -> list[dict]:
+        return [feed.stats() for feed in list(self._feeds.values())]
+
+
+# 全局单例，供外部导入使用
+ohlcv_streams = OhlcvStreamManager()
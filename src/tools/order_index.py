@@ -0,0 +1,114 @@
+"""订单类型索引 (记录订单 id 是普通单还是条件单)"""
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Literal
+
+OrderKind = Literal["normal", "stop"]
+
+ORDER_INDEX_PATH = Path("./data/order_index.jsonl")
+
+# 索引最多保留的订单数量，超出后淘汰最早写入的记录
+MAX_ENTRIES = 10000
+
+
+class OrderIndex:
+    """
+    订单类型索引
+
+    Binance 的条件单 (止损/止盈) 走单独的接口，查询/取消时需要带 {"stop": True}。
+    记录已知订单的类型，可以直接命中正确的接口，避免一次失败请求。
+
+    - 内存中是 LRU 有界字典
+    - 持久化为追加写的 jsonl，行数超过上限两倍时重写压缩
+    - 首次使用时才从文件加载
+    """
+
+    def __init__(self, path: Path, max_entries: int = MAX_ENTRIES) -> None:
+        self._path = path
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, OrderKind] = OrderedDict()
+        self._lines = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(exchange: str, market: str, mode: str, order_id: str) -> str:
+        return f"{exchange}/{market}/{mode}/{order_id}"
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not self._path.exists():
+            return
+
+        with open(self._path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                    self._put(item["key"], item["kind"])
+                except (ValueError, KeyError):
+                    # 损坏行直接跳过，下次压缩时会被清理
+                    continue
+                self._lines += 1
+
+    def _put(self, key: str, kind: OrderKind) -> None:
+        self._entries[key] = kind
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _compact(self) -> None:
+        tmp_path = self._path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, kind in self._entries.items():
+                f.write(json.dumps({"key": key, "kind": kind}) + "\n")
+        tmp_path.replace(self._path)
+        self._lines = len(self._entries)
+
+    def record(
+        self,
+        exchange: str,
+        market: str,
+        mode: str,
+        order_ids: list[str],
+        kind: OrderKind,
+    ) -> None:
+        """记录一批订单的类型 (已存在且类型相同的记录只刷新 LRU 顺序)"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            new_lines = []
+            for order_id in order_ids:
+                key = self._make_key(exchange, market, mode, order_id)
+                if self._entries.get(key) != kind:
+                    new_lines.append(json.dumps({"key": key, "kind": kind}) + "\n")
+                self._put(key, kind)
+
+            if not new_lines:
+                return
+
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.writelines(new_lines)
+            self._lines += len(new_lines)
+
+            if self._lines > self._max_entries * 2:
+                self._compact()
+
+    def lookup(
+        self, exchange: str, market: str, mode: str, order_id: str
+    ) -> OrderKind | None:
+        """查询订单类型，未知返回 None"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return self._entries.get(self._make_key(exchange, market, mode, order_id))
+
+
+# 全局单例，供外部导入使用
+order_index = OrderIndex(ORDER_INDEX_PATH)
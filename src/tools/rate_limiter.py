@@ -0,0 +1,266 @@
+"""跨进程共享的限频调度器 (按 API key + 接口类别的令牌桶)"""
+
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import ccxt
+from filelock import FileLock
+
+# === 优先级 (数值越小越优先) ===
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET_DATA = 2
+PRIORITY_BACKFILL = 3
+
+# 当前调用的优先级，未设置时按接口类别推断
+_priority: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "rate_limit_priority", default=None
+)
+
+# 各交易所的令牌桶配置: 接口类别 -> (容量, 每秒补充)
+# 权重单位与 ccxt 的 cost 一致 (Binance 即 request weight)
+DEFAULT_BUCKETS: dict[str, dict[str, dict[str, float]]] = {
+    "binance": {
+        "weight": {"capacity": 1200, "per_second": 20},
+        "order": {"capacity": 50, "per_second": 5},
+    },
+    "kraken": {
+        "weight": {"capacity": 15, "per_second": 1},
+        "order": {"capacity": 15, "per_second": 1},
+    },
+}
+
+DEFAULT_STATE_DIR = Path("./data/ratelimit")
+
+# 收到 429/418 后所有进程暂停补充令牌的时长
+PENALTY_SECONDS = 5.0
+
+# 排队者重新检查的最长间隔 (期间可能有更高优先级的调用插队)
+_POLL_INTERVAL = 0.05
+
+
+@contextmanager
+def rate_priority(priority: int):
+    """在上下文内发出的交易所请求使用指定优先级"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class SharedTokenBucket:
+    """
+    基于文件的令牌桶，同一台机器上的所有进程共享
+
+    状态保存在 json 文件中，每次读写都持有 FileLock。
+    """
+
+    def __init__(self, state_path: Path, capacity: float, per_second: float) -> None:
+        self._state_path = state_path
+        self._lock = FileLock(str(state_path) + ".lock")
+        self.capacity = capacity
+        self.per_second = per_second
+
+    def _read(self, now: float) -> dict:
+        try:
+            state = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {"tokens": self.capacity, "updated": now}
+
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(
+            self.capacity, state["tokens"] + elapsed * self.per_second
+        )
+        state["updated"] = max(now, state["updated"])
+        return state
+
+    def _write(self, state: dict) -> None:
+        self._state_path.write_text(json.dumps(state), encoding="utf-8")
+
+    def try_acquire(self, weight: float) -> float:
+        """
+        尝试扣除 weight 个令牌
+
+        返回 0 表示成功，否则返回需要等待的秒数 (不扣除令牌)
+        """
+        weight = min(weight, self.capacity)
+        with self._lock:
+            now = time.time()
+            state = self._read(now)
+            if state["tokens"] >= weight:
+                state["tokens"] -= weight
+                self._write(state)
+                return 0.0
+            # updated 可能在未来 (处于惩罚期)
+            wait = (weight - state["tokens"]) / self.per_second
+            return wait + max(0.0, state["updated"] - now)
+
+    def penalize(self, seconds: float) -> None:
+        """清空令牌并在 seconds 秒内不再补充"""
+        with self._lock:
+            self._write({"tokens": 0.0, "updated": time.time() + seconds})
+
+
+class RateLimitScheduler:
+    """
+    限频调度器
+
+    - 跨进程: 令牌桶状态放在本地文件中 (按 API key 哈希 + 接口类别区分)
+    - 进程内: 排队的调用按优先级出队，只有队首会去竞争令牌
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._state_dir = DEFAULT_STATE_DIR
+        self._bucket_config = DEFAULT_BUCKETS
+        self._buckets: dict[str, SharedTokenBucket] = {}
+        self._waiting: dict[str, list[tuple[int, int]]] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def configure(self, config: dict) -> None:
+        """
+        从配置初始化
+
+        config["rate_limit"] = {
+            "enabled": true,
+            "state_dir": "./data/ratelimit",
+            "buckets": {"binance": {"weight": {"capacity": 1200, "per_second": 20}}}
+        }
+        """
+        rate_config = config.get("rate_limit", {})
+        self.enabled = rate_config.get("enabled", False)
+        self._state_dir = Path(rate_config.get("state_dir", DEFAULT_STATE_DIR))
+        self._bucket_config = {name: dict(b) for name, b in DEFAULT_BUCKETS.items()}
+        for name, buckets in rate_config.get("buckets", {}).items():
+            self._bucket_config.setdefault(name, {}).update(buckets)
+        self._buckets.clear()
+
+    def _get_bucket(
+        self, exchange_name: str, account_key: str, endpoint_class: str
+    ) -> tuple[str, SharedTokenBucket]:
+        key = f"{exchange_name}-{account_key}-{endpoint_class}"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            settings = self._bucket_config.get(exchange_name, {}).get(
+                endpoint_class, {"capacity": 10, "per_second": 1}
+            )
+            self._state_dir.mkdir(parents=True, exist_ok=True)
+            bucket = SharedTokenBucket(
+                self._state_dir / f"{key}.json",
+                capacity=settings["capacity"],
+                per_second=settings["per_second"],
+            )
+            self._buckets[key] = bucket
+        return key, bucket
+
+    def acquire(
+        self,
+        exchange_name: str,
+        account_key: str,
+        endpoint_class: str,
+        weight: float,
+        priority: int,
+    ) -> float:
+        """阻塞直到拿到令牌，返回排队等待的秒数"""
+        start = time.perf_counter()
+        key, bucket = self._get_bucket(exchange_name, account_key, endpoint_class)
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            queue = self._waiting.setdefault(key, [])
+            heapq.heappush(queue, ticket)
+        try:
+            while True:
+                with self._cond:
+                    while queue[0] != ticket:
+                        self._cond.wait(timeout=_POLL_INTERVAL)
+                # 文件锁和文件读写不持有 Condition，避免阻塞其他桶的排队者
+                wait = bucket.try_acquire(weight)
+                if wait <= 0:
+                    return time.perf_counter() - start
+                with self._cond:
+                    self._cond.wait(timeout=min(wait, _POLL_INTERVAL))
+        finally:
+            with self._cond:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._cond.notify_all()
+
+    def penalize(self, exchange_name: str, account_key: str, endpoint_class: str):
+        """429/418 按 key 整体封禁: 清空该 key 的所有接口类别，不只是触发的那一类"""
+        classes = {"weight", "order", endpoint_class}
+        classes.update(self._bucket_config.get(exchange_name, {}))
+        for name in sorted(classes):
+            _, bucket = self._get_bucket(exchange_name, account_key, name)
+            bucket.penalize(PENALTY_SECONDS)
+
+    def install(self, exchange, exchange_name: str) -> None:
+        """
+        接管 ccxt 实例的限频
+
+        替换实例的 throttle (关闭进程内节流) 并包装 fetch2，
+        每次 REST 请求前按 ccxt 计算的 cost 从共享令牌桶中扣除，
+        下单/撤单请求额外从 order 桶中扣除 1 次。
+        """
+        if not self.enabled:
+            return
+
+        account_key = hashlib.sha256(
+            (exchange.apiKey or "public").encode()
+        ).hexdigest()[:12]
+        original_fetch2 = exchange.fetch2
+
+        def fetch2(
+            path,
+            api="public",
+            method="GET",
+            params={},
+            headers=None,
+            body=None,
+            config={},
+        ):
+            cost = exchange.calculate_rate_limiter_cost(
+                api, method, path, params, config
+            )
+            endpoint_class = _classify(path, method)
+            priority = _priority.get()
+            if priority is None:
+                priority = (
+                    PRIORITY_ORDER
+                    if endpoint_class == "order"
+                    else PRIORITY_MARKET_DATA
+                )
+
+            # 下单类请求同时占用下单次数和请求权重
+            if endpoint_class == "order":
+                self.acquire(exchange_name, account_key, "order", 1, priority)
+            self.acquire(exchange_name, account_key, "weight", cost, priority)
+            try:
+                return original_fetch2(path, api, method, params, headers, body, config)
+            except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+                # 429 / 418: 所有共享该 key 的进程一起退避
+                self.penalize(exchange_name, account_key, endpoint_class)
+                raise
+
+        exchange.throttle = lambda cost=None: None
+        exchange.fetch2 = fetch2
+
+
+def _classify(path: str, method: str) -> str:
+    """按接口路径划分类别: 下单/撤单计入 order 桶，其余计入 weight 桶"""
+    if method in ("POST", "DELETE", "PUT") and "order" in path.lower():
+        return "order"
+    return "weight"
+
+
+# 全局单例，供外部导入使用
+rate_limit_scheduler = RateLimitScheduler()
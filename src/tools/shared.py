@@ -3,6 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 import json
 from pathlib import Path
 from src.tools.exchange_manager import exchange_manager
+from src.tools.lanes import lane_manager
+from src.tools.ohlcv_stream import ohlcv_streams
+from src.tools.indicators import indicator_cache
+from src.tools.ohlcv_export import export_manager
+from src.tools.ohlcv_query import query_engine
+from src.tools.symbol_map import symbol_map
+from src.cache_tool import hooks as cache_hooks
+from src.cache_tool.validation import ohlcv_validator
+from src import metrics, tracing
+from src.tracing import trace_middleware
 
 
 app = FastAPI()
@@ -16,6 +26,9 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有 HTTP 头
 )
 
+# 按请求开启的阶段追踪 (X-Trace: 1 或 ?trace=1)
+app.middleware("http")(trace_middleware)
+
 
 OHLCV_DIR = Path("./data/ohlcv")
 OHLCV_DIR.mkdir(exist_ok=True)
@@ -45,6 +58,31 @@ CACHE_DIR = "./data/cache"
 STATIC_DIR = "./data/static"
 
 
+# 下单 / 账户 / 行情请求使用独立的执行通道
+lane_manager.configure(config)
+
+
 # 创建 sandbox 实例（模拟环境）
 # 根据白名单初始化交易所实例
 exchange_manager.init_from_config(config)
+
+# OHLCV 实时推送 (收盘 K 线写入 OHLCV_DIR)
+ohlcv_streams.configure(config, base_dir=OHLCV_DIR)
+
+# 指标结果缓存
+indicator_cache.configure(config)
+
+# 缓存导出 (读取 OHLCV_DIR)
+export_manager.configure(config, base_dir=OHLCV_DIR)
+
+# 缓存 SQL 查询 (读取 OHLCV_DIR)
+query_engine.configure(config, base_dir=OHLCV_DIR)
+
+# 跨交易所交易对映射 (config["symbol_map"])
+symbol_map.configure(config)
+
+# K 线入库前校验 (config["ohlcv_validation"])
+ohlcv_validator.configure(config)
+
+# 缓存模块的指标和追踪 (cache_tool 单独使用时不记录)
+cache_hooks.install(metrics, tracing)
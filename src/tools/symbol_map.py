@@ -0,0 +1,60 @@
+"""
+跨交易所的交易对映射
+
+同一个逻辑品种 (如 BTC) 在不同交易所的交易对写法不同:
+    binance 合约 BTC/USDT:USDT, kraken 合约 BTC/USD:USD
+默认按模板拼接 (与 minimal_example/adjust_amount.py 的 get_symbol 一致)，
+模板和个别品种的写法可在 config["symbol_map"] 中覆盖:
+
+    "symbol_map": {
+        "templates": {"kraken": {"future": "{base}/USD:USD"}},
+        "instruments": {"BTC": {"kraken": {"spot": "XBT/USD"}}}
+    }
+"""
+
+from typing import Any
+
+# 各交易所/市场的交易对模板，{base} 为品种的基础货币
+DEFAULT_TEMPLATES: dict[str, dict[str, str]] = {
+    "binance": {"future": "{base}/USDT:USDT", "spot": "{base}/USDT"},
+    "kraken": {"future": "{base}/USD:USD", "spot": "{base}/USD"},
+}
+
+
+class SymbolMap:
+    """逻辑品种 -> 各交易所交易对"""
+
+    def __init__(self) -> None:
+        self.templates: dict[str, dict[str, str]] = {
+            exchange: dict(markets) for exchange, markets in DEFAULT_TEMPLATES.items()
+        }
+        # 品种 -> 交易所 -> 市场 -> 交易对 (优先于模板)
+        self.instruments: dict[str, dict[str, dict[str, str]]] = {}
+
+    def configure(self, config: dict) -> None:
+        """根据 config["symbol_map"] 初始化"""
+        settings: dict[str, Any] = config.get("symbol_map", {})
+        self.templates = {
+            exchange: dict(markets) for exchange, markets in DEFAULT_TEMPLATES.items()
+        }
+        for exchange, markets in settings.get("templates", {}).items():
+            self.templates.setdefault(exchange, {}).update(markets)
+        self.instruments = {
+            instrument.upper(): exchanges
+            for instrument, exchanges in settings.get("instruments", {}).items()
+        }
+
+    def resolve(self, instrument: str, exchange: str, market: str) -> str | None:
+        """品种在指定交易所/市场的交易对，没有映射时返回 None"""
+        instrument = instrument.strip().upper()
+        override = self.instruments.get(instrument, {}).get(exchange, {}).get(market)
+        if override is not None:
+            return override
+        template = self.templates.get(exchange, {}).get(market)
+        if template is None:
+            return None
+        return template.format(base=instrument)
+
+
+# 全局单例，供外部导入使用
+symbol_map = SymbolMap()
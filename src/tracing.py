@@ -0,0 +1,209 @@
+"""
+按请求开启的阶段追踪
+
+请求头 X-Trace: 1 或查询参数 trace=1 开启。开启后各阶段的耗时:
+- 以 Server-Timing 响应头返回 (同名阶段合并)
+- 以 Chrome Trace Event 格式写入 ./data/traces/ (chrome://tracing 或 Perfetto 打开)，
+  只保留最近的 MAX_TRACE_FILES 份
+
+未开启时 span() 只有一次 ContextVar 读取。
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+TRACE_DIR = Path("./data/traces")
+# 追踪目录最多保留的文件数 (按修改时间删除最旧的)
+MAX_TRACE_FILES = 500
+
+_current: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar(
+    "trace", default=None
+)
+
+
+class Trace:
+    """一次请求的所有 span (各线程直接 append，list.append 是原子操作)"""
+
+    def __init__(self, name: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.origin = time.perf_counter()
+        # (name, start, end, thread id, args)
+        self.spans: list[tuple[str, float, float, int, dict]] = []
+
+    def add(self, name: str, start: float, end: float, args: dict | None = None):
+        self.spans.append((name, start, end, threading.get_ident(), args or {}))
+
+    def server_timing(self) -> str:
+        """同名阶段合并耗时，多次出现时在 desc 中注明次数"""
+        totals: dict[str, list[float]] = {}
+        for name, start, end, _, _ in self.spans:
+            totals.setdefault(name, [0.0, 0])
+            totals[name][0] += end - start
+            totals[name][1] += 1
+        parts = []
+        for name, (seconds, n) in totals.items():
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if n > 1:
+                part += f';desc="x{n}"'
+            parts.append(part)
+        return ", ".join(parts)
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": {k: _jsonable(v) for k, v in args.items()},
+            }
+            for name, start, end, tid, args in self.spans
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "trace_id": self.id,
+                "request": self.name,
+                "started_at": self.started_at.isoformat(),
+            },
+        }
+
+    def write(self, trace_dir: Path | None = None) -> Path:
+        trace_dir = trace_dir or TRACE_DIR
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%dT%H%M%S")
+        path = trace_dir / f"{stamp}_{self.id}.json"
+        path.write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+        _prune(trace_dir)
+        return path
+
+
+def _prune(trace_dir: Path) -> None:
+    """只保留最近的 MAX_TRACE_FILES 份追踪文件"""
+    files = sorted(trace_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in files[: max(0, len(files) - MAX_TRACE_FILES)]:
+        path.unlink(missing_ok=True)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace: Trace, name: str, args: dict) -> None:
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def set(self, **args: Any) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.trace.add(self.name, self.start, time.perf_counter(), self.args)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **args: Any) -> _Span | _NoopSpan:
+    """记录一个阶段 (with span("compact_log"): ...)，未开启追踪时为空操作"""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, args)
+
+
+def add_span(name: str, start: float, end: float, **args: Any) -> None:
+    """补记一个已结束的阶段 (start/end 为 time.perf_counter() 值)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, start, end, args)
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+def start_trace(name: str) -> contextvars.Token:
+    return _current.set(Trace(name))
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def trace_requested(headers, query_params) -> bool:
+    return headers.get("x-trace") in ("1", "true") or query_params.get("trace") in (
+        "1",
+        "true",
+    )
+
+
+async def trace_middleware(request, call_next):
+    """
+    FastAPI http 中间件: 按请求开启追踪
+
+    "serialize" 为 handler 返回到响应开始之间的耗时 (响应模型校验 + JSON 编码)。
+    """
+    if not trace_requested(request.headers, request.query_params):
+        return await call_next(request)
+
+    token = start_trace(f"{request.method} {request.url.path}")
+    trace = _current.get()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_trace(token)
+    ended = time.perf_counter()
+
+    handler_ends = [end for name, _, end, _, _ in trace.spans if name == "handler"]
+    if handler_ends:
+        trace.add("serialize", max(handler_ends), ended)
+    trace.add("request", started, ended, {"status": response.status_code})
+
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers["X-Trace-Id"] = trace.id
+    try:
+        # 文件写入不阻塞事件循环
+        await asyncio.to_thread(trace.write)
+    except OSError as e:
+        print(f"[Tracing] 写入追踪文件失败: {e}")
+    return response
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Annotated, get_args
+from typing import Optional, Annotated, Literal, get_args
 from fastapi import Query
 from src.base_types import (
     ExchangeName,
@@ -11,12 +11,17 @@ from src.base_types import (
     BaseExchangeRequest,
     BaseSymbolRequest,
 )
+from src.cache_tool.models import DataLocation
 
 
 class ExchangeWhitelistItem(BaseModel):
     exchange: ExchangeName
     market: MarketType
     mode: ModeType
+    # 实例池大小，未设置时使用 config["exchange_pool"]["size"]
+    pool_size: int | None = Field(default=None, ge=1)
+    # fake: 使用离线假交易所 (src/tools/fake_exchange.py)，用于压测
+    backend: Literal["ccxt", "fake"] = "ccxt"
 
 
 class FileInfo(BaseModel):
@@ -47,6 +52,13 @@ class OHLCVParams(BaseSymbolRequest):
     limit: Optional[int] = Field(
         None, title="数据条数", description="默认 100, 最大 1000", examples=[100]
     )
+    end: Optional[int] = Field(
+        None,
+        title="结束时间戳 (ms)",
+        description="与 since 同时使用时返回 [since, end] 内全部数据 (忽略 limit)；"
+        "单独使用时返回截止该时间 (含) 的 limit 根",
+        examples=[1672617600000],
+    )
     enable_cache: bool = Field(
         True, title="启用缓存", description="是否优先从本地缓存读取"
     )
@@ -55,6 +67,31 @@ class OHLCVParams(BaseSymbolRequest):
     )
 
 
+class IndicatorParams(OHLCVParams):
+    """指标计算请求参数 (K 线范围与 OHLCVParams 相同)"""
+
+    indicators: str = Field(
+        ...,
+        title="指标列表",
+        description="逗号分隔的 name:参数，支持 sma:N, ema:N, rsi:N, atr:N, bbands:N:K",
+        examples=["ema:20,rsi:14,atr:14,bbands:20:2"],
+    )
+    include_ohlcv: bool = Field(
+        False, title="包含 K 线", description="结果中是否同时返回 OHLCV 列"
+    )
+
+
+class OHLCVStreamParams(BaseSymbolRequest):
+    """OHLCV 实时推送订阅参数"""
+
+    timeframe: VALID_PERIODS = Field(
+        ...,
+        title="时间周期",
+        description="K线周期 (Min: 1m, Max: 1M)",
+        examples=list(get_args(VALID_PERIODS)),
+    )
+
+
 class MarketOrderRequest(BaseSymbolRequest):
     side: SideType = Field(..., title="方向", examples=["buy", "sell"])
     amount: float = Field(..., title="数量", examples=[0.001])
@@ -129,6 +166,22 @@ class ClosePositionRequest(BaseSymbolRequest):
     model_config = {"extra": "allow"}
 
 
+class CloseAllPositionsRequest(BaseExchangeRequest):
+    side: PositionSide | None = Field(
+        None,
+        title="方向",
+        description="指定平仓方向 (long/short), 不传则全平",
+        examples=["long", "short"],
+    )
+    max_concurrency: int = Field(
+        5,
+        ge=1,
+        le=20,
+        title="最大并发数",
+        description="同时提交的平仓订单数，控制瞬时请求量，避免触发限频",
+    )
+
+
 class CancelAllOrdersRequest(BaseExchangeRequest):
     symbol: str | None = Field(None, title="交易对", examples=["BTC/USDT"])
     model_config = {"extra": "allow"}
@@ -167,6 +220,27 @@ class MarketInfoRequest(BaseSymbolRequest):
     pass
 
 
+class MarketTableRequest(BaseExchangeRequest):
+    """批量获取市场信息表请求参数"""
+
+    type: Literal["swap", "future", "spot"] | None = Field(
+        None,
+        title="市场品种",
+        description="swap (永续), future (交割), spot (现货)，不传则按 market 自动过滤",
+        examples=["swap"],
+    )
+    settle: str | None = Field(
+        None, title="结算货币", description="按结算货币过滤", examples=["USDT", "USD"]
+    )
+    linear: bool | None = Field(
+        None,
+        title="是否U本位",
+        description="True=U本位 (Linear), False=币本位 (Inverse)，不传则不过滤",
+        examples=[True],
+    )
+    active_only: bool = Field(True, title="只返回可交易的市场")
+
+
 class FetchOrderRequest(BaseExchangeRequest):
     """获取特定订单请求参数"""
 
@@ -174,4 +248,186 @@ class FetchOrderRequest(BaseExchangeRequest):
     id: str = Field(..., title="订单ID", examples=["1234567890"])
 
 
+class ExportRequest(BaseModel):
+    """OHLCV 缓存导出请求"""
+
+    items: list[DataLocation] = Field(
+        ...,
+        min_length=1,
+        title="导出的数据",
+        description="每项为缓存中的一个 (exchange, mode, market, symbol, period)",
+        examples=[
+            [
+                {
+                    "exchange": "binance",
+                    "mode": "live",
+                    "market": "future",
+                    "symbol": "BTC/USDT",
+                    "period": "1m",
+                }
+            ]
+        ],
+    )
+    since: Optional[int] = Field(
+        None, title="起始时间戳 (ms)", description="不传则从最早的数据开始"
+    )
+    end: Optional[int] = Field(
+        None, title="结束时间戳 (ms)", description="包含该时间，不传则到最新的数据"
+    )
+    format: Literal["parquet", "arrow", "zip"] = Field(
+        "parquet",
+        title="导出格式",
+        description="parquet: 单个 Parquet 文件; arrow: Arrow IPC stream; "
+        "zip: 按缓存目录结构打包的分块 parquet 和获取日志",
+    )
+
+
+class PanelRequest(BaseExchangeRequest):
+    """多品种对齐面板请求参数 (同一交易所、同一周期)"""
+
+    symbols: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        title="交易对列表",
+        examples=[["BTC/USDT", "ETH/USDT", "SOL/USDT"]],
+    )
+    timeframe: VALID_PERIODS = Field(
+        ...,
+        title="时间周期",
+        description="K线周期 (不支持 1M)",
+        examples=["1h"],
+    )
+    since: int = Field(
+        ..., title="起始时间戳 (ms)", description="网格从不早于该时间的第一个周期开始"
+    )
+    end: Optional[int] = Field(
+        None, title="结束时间戳 (ms)", description="包含该时间，不传则到当前时间"
+    )
+    fields: list[Literal["open", "high", "low", "close", "volume"]] = Field(
+        ["close"], min_length=1, title="返回的字段", examples=[["close"]]
+    )
+    fill: Literal["none", "forward", "both"] = Field(
+        "forward",
+        title="填充规则",
+        description="none: 缺失为 null; forward: 沿用上一根收盘价 (成交量为 0); "
+        "both: 在 forward 基础上，仍缺失的周期用其后第一根的开盘价填充",
+    )
+    fill_limit: Optional[int] = Field(
+        None, ge=1, title="最多连续填充的周期数", description="不传则不限制"
+    )
+    how: Literal["outer", "inner"] = Field(
+        "outer",
+        title="对齐方式",
+        description="outer: 保留完整网格; inner: 只保留所有品种都有值的周期",
+    )
+    enable_cache: bool = Field(
+        True, title="启用缓存", description="关闭时所有品种都重新请求"
+    )
+    max_concurrency: int = Field(
+        5,
+        ge=1,
+        le=20,
+        title="最大并发数",
+        description="同时补齐缺口的品种数，控制瞬时请求量，避免触发限频",
+    )
+
+
+class ConsolidatedRequest(BaseModel):
+    """跨交易所查询同一品种的请求参数"""
+
+    instrument: str = Field(
+        ...,
+        min_length=1,
+        title="品种",
+        description="基础货币，按 config.json 的 symbol_map 映射为各交易所的交易对",
+        examples=["BTC"],
+    )
+    market: MarketType = Field(
+        ...,
+        title="市场类型",
+        description="future (合约) 或 spot (现货)",
+        examples=["future", "spot"],
+    )
+    mode: ModeType = Field(
+        "sandbox",
+        title="模式",
+        description="sandbox (测试网) 或 live (实盘)",
+        examples=["sandbox", "live"],
+    )
+    exchanges: Annotated[
+        str | None,
+        Query(
+            default=None,
+            title="交易所列表",
+            description="多个用逗号分隔，不传则使用白名单中已启用的全部交易所",
+            examples=["binance,kraken"],
+        ),
+    ]
+
+    @property
+    def exchanges_list(self) -> list[str] | None:
+        """将逗号分隔的 exchanges 字符串转换为列表"""
+        if not self.exchanges or not isinstance(self.exchanges, str):
+            return None
+        return [s.strip() for s in self.exchanges.split(",") if s.strip()]
+
+
+class ConsolidatedOHLCVRequest(ConsolidatedRequest):
+    """跨交易所 K 线对齐请求参数"""
+
+    timeframe: VALID_PERIODS = Field(
+        ...,
+        title="时间周期",
+        description="K线周期 (不支持 1M)",
+        examples=["1h"],
+    )
+    since: int = Field(
+        ..., title="起始时间戳 (ms)", description="网格从不早于该时间的第一个周期开始"
+    )
+    end: Optional[int] = Field(
+        None, title="结束时间戳 (ms)", description="包含该时间，不传则到当前时间"
+    )
+    fill: Literal["none", "forward", "both"] = Field(
+        "none",
+        title="填充规则",
+        description="none: 缺失为 null; forward: 沿用上一根收盘价 (成交量为 0); "
+        "both: 在 forward 基础上，仍缺失的周期用其后第一根的开盘价填充",
+    )
+    fill_limit: Optional[int] = Field(
+        None, ge=1, title="最多连续填充的周期数", description="不传则不限制"
+    )
+    how: Literal["outer", "inner"] = Field(
+        "outer",
+        title="对齐方式",
+        description="outer: 保留完整网格; inner: 只保留所有交易所都有值的周期",
+    )
+    enable_cache: bool = Field(
+        True, title="启用缓存", description="是否优先从本地缓存读取"
+    )
+
+
+class SqlQueryRequest(BaseModel):
+    """OHLCV 缓存 SQL 查询请求"""
+
+    sql: str = Field(
+        ...,
+        min_length=1,
+        title="SQL",
+        description="只读查询 (SELECT / WITH)，表名 ohlcv，"
+        "列: exchange, mode, market, symbol, period, time, open, high, low, close, volume",
+        examples=[
+            "SELECT symbol, max(high) - min(low) AS range FROM ohlcv "
+            "WHERE market = 'future' AND period = '1d' AND symbol LIKE '%_USDT_USDT' "
+            "GROUP BY symbol ORDER BY range DESC"
+        ],
+    )
+    timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        title="超时 (秒)",
+        description="不超过服务端配置的上限，不传则使用上限",
+    )
+
+
 # MarketInfoResponse has been moved to src/responses.py
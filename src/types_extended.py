@@ -1,12 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal
-from src.types import ExchangeName, MarketType, ModeType
+from src.types import ExchangeName, MarketType, ModeType, SideType
 
 
 class FetchOpenOrdersRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     symbol: str | None = None
     since: int | None = None
     limit: int | None = None
@@ -16,6 +17,7 @@ class FetchClosedOrdersRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     symbol: str | None = None
     since: int | None = None
     limit: int | None = None
@@ -25,6 +27,7 @@ class FetchMyTradesRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     symbol: str | None = None
     since: int | None = None
     limit: int | None = None
@@ -34,6 +37,7 @@ class FetchPositionsRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     symbols: list[str] | None = None
 
 
@@ -41,6 +45,7 @@ class SetLeverageRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     leverage: int
     symbol: str | None = None
     model_config = {"extra": "allow"}
@@ -50,6 +55,7 @@ class SetMarginModeRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     marginMode: Literal["cross", "isolated"]
     symbol: str | None = None
     model_config = {"extra": "allow"}
@@ -59,6 +65,46 @@ class CancelOrderRequest(BaseModel):
     exchange_name: ExchangeName
     market: MarketType
     mode: ModeType = "sandbox"
+    account: str | None = None
     id: str
     symbol: str | None = None
     model_config = {"extra": "allow"}
+
+
+class BatchOrderItem(BaseModel):
+    symbol: str
+    type: Literal["market", "limit"]
+    side: SideType
+    amount: float
+    price: float | None = None
+    params: dict = Field(
+        default_factory=dict,
+        description="透传给 create_order 的参数, 如 reduceOnly, clientOrderId, stopLossPrice",
+    )
+
+
+class CreateOrdersBatchRequest(BaseModel):
+    exchange_name: ExchangeName
+    market: MarketType
+    mode: ModeType = "sandbox"
+    account: str | None = None
+    orders: list[BatchOrderItem] = Field(..., min_length=1)
+    max_concurrency: int = Field(
+        5, ge=1, le=20, description="逐笔下单回退时的最大并发数"
+    )
+
+
+class CancelBatchItem(BaseModel):
+    id: str
+    symbol: str | None = None
+
+
+class CancelOrdersBatchRequest(BaseModel):
+    exchange_name: ExchangeName
+    market: MarketType
+    mode: ModeType = "sandbox"
+    account: str | None = None
+    orders: list[CancelBatchItem] = Field(..., min_length=1)
+    max_concurrency: int = Field(
+        5, ge=1, le=20, description="逐笔撤单回退时的最大并发数"
+    )